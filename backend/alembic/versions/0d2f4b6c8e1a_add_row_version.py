@@ -0,0 +1,47 @@
+"""add_row_version
+
+Revision ID: 0d2f4b6c8e1a
+Revises: 9c1e3a5b7d0f
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0d2f4b6c8e1a'
+down_revision: Union[str, None] = '9c1e3a5b7d0f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every table the migrations manage, all of them on app.models.base.BaseModel
+TABLES = (
+    'user', 'member', 'savingstransaction', 'shudistribution', 'customer', 'customercontact', 'supplier',
+    'salesorder', 'salesorderitem', 'salesinvoice', 'salespayment',
+    'purchaseorder', 'purchaseorderitem', 'supplierinvoice', 'supplierpayment',
+    'asset', 'assetdepreciation', 'assetmaintenance',
+    'chartofaccounts', 'journalentry', 'ledgerentry', 'fiscalperiod', 'employee', 'payroll', 'payrollitem',
+    'document', 'documentversion', 'documentblob', 'documenttag', 'documenttaglink', 'documenttext',
+)
+# Also on BaseModel, but created by init_db's create_all rather than by a migration,
+# so a database built only from migrations does not have them
+PROJECT_TABLES = (
+    'project', 'projecttask', 'projecttimeentry', 'projectinvoice', 'projectinvoiceitem', 'projectpayment',
+)
+
+
+def _tables():
+    inspector = sa.inspect(op.get_bind())
+    return TABLES + tuple(table for table in PROJECT_TABLES if inspector.has_table(table))
+
+
+def upgrade() -> None:
+    for table in _tables():
+        op.add_column(table, sa.Column('row_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    for table in reversed(_tables()):
+        op.drop_column(table, 'row_version')
@@ -0,0 +1,39 @@
+"""make_asset_depreciation_date_unique
+
+Revision ID: 1e3a5c7d9f2b
+Revises: 0d2f4b6c8e1a
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '1e3a5c7d9f2b'
+down_revision: Union[str, None] = '0d2f4b6c8e1a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicates need a decision on which entry is right, so they are reported rather than dropped
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT asset_id, depreciation_date FROM assetdepreciation "
+        "GROUP BY asset_id, depreciation_date HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        listed = ", ".join(f"asset {asset_id} on {depreciation_date}" for asset_id, depreciation_date in duplicates[:10])
+        raise RuntimeError(f"Remove duplicate depreciation entries before upgrading: {listed}")
+    # The constraint's index serves the same lookups, and comes first so asset_id's foreign key always has one.
+    # Batch mode, since SQLite can only add a constraint by copying the table
+    with op.batch_alter_table('assetdepreciation') as batch_op:
+        batch_op.create_unique_constraint('uq_assetdepreciation_asset_id_date', ['asset_id', 'depreciation_date'])
+        batch_op.drop_index('ix_assetdepreciation_asset_id_date')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('assetdepreciation') as batch_op:
+        batch_op.create_index('ix_assetdepreciation_asset_id_date', ['asset_id', 'depreciation_date'], unique=False)
+        batch_op.drop_constraint('uq_assetdepreciation_asset_id_date', type_='unique')
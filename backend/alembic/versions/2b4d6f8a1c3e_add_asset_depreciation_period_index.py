@@ -0,0 +1,25 @@
+"""add_asset_depreciation_period_index
+
+Revision ID: 2b4d6f8a1c3e
+Revises: 713b7c3ae82d
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2b4d6f8a1c3e'
+down_revision: Union[str, None] = '713b7c3ae82d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_assetdepreciation_asset_id_date', 'assetdepreciation', ['asset_id', 'depreciation_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_assetdepreciation_asset_id_date', table_name='assetdepreciation')
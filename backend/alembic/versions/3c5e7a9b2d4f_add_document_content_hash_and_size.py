@@ -0,0 +1,31 @@
+"""add_document_content_hash_and_size
+
+Revision ID: 3c5e7a9b2d4f
+Revises: 2b4d6f8a1c3e
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5e7a9b2d4f'
+down_revision: Union[str, None] = '2b4d6f8a1c3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('document', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('document', sa.Column('file_size', sa.BigInteger(), nullable=True))
+    op.add_column('documentversion', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('documentversion', sa.Column('file_size', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documentversion', 'file_size')
+    op.drop_column('documentversion', 'content_hash')
+    op.drop_column('document', 'file_size')
+    op.drop_column('document', 'content_hash')
@@ -0,0 +1,135 @@
+"""add_content_addressed_document_blobs
+
+Revision ID: 4d6f8b1c3e5a
+Revises: 3c5e7a9b2d4f
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+from collections import defaultdict
+from datetime import datetime
+import hashlib
+import os
+import shutil
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+
+# revision identifiers, used by Alembic.
+revision: str = '4d6f8b1c3e5a'
+down_revision: Union[str, None] = '3c5e7a9b2d4f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _blob_path(content_hash: str) -> str:
+    # Same layout as app.utils.file_storage.blob_path at the time of this revision
+    return os.path.join(settings.UPLOAD_DIRECTORY, "blobs", content_hash[:2], content_hash[2:4], content_hash)
+
+
+def _hash_file(path: str):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _dedupe_existing_files(connection) -> None:
+    """Re-hash every stored file, move it into the blob store and share identical content"""
+    blob = sa.table(
+        'documentblob',
+        sa.column('id', sa.Integer), sa.column('content_hash', sa.String), sa.column('file_path', sa.String),
+        sa.column('file_size', sa.BigInteger), sa.column('ref_count', sa.Integer),
+        sa.column('created_at', sa.DateTime), sa.column('updated_at', sa.DateTime)
+    )
+    tables = [
+        sa.table(name, sa.column('id', sa.Integer), sa.column('file_path', sa.String),
+                 sa.column('content_hash', sa.String), sa.column('file_size', sa.BigInteger),
+                 sa.column('blob_id', sa.Integer))
+        for name in ('document', 'documentversion')
+    ]
+    
+    references = defaultdict(list)
+    for table in tables:
+        for row_id, file_path in connection.execute(sa.select(table.c.id, table.c.file_path)):
+            references[file_path].append((table, row_id))
+    
+    originals = []
+    for file_path, rows in references.items():
+        if not file_path or not os.path.isfile(file_path):
+            print(f"Skipping missing file {file_path}")
+            continue
+        
+        content_hash, file_size = _hash_file(file_path)
+        target = _blob_path(content_hash)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Copy rather than move so a failed migration leaves the originals intact
+            shutil.copy2(file_path, target)
+        
+        find_blob = sa.select(blob.c.id).where(blob.c.content_hash == content_hash)
+        blob_id = connection.execute(find_blob).scalar()
+        if blob_id is None:
+            now = datetime.utcnow()
+            connection.execute(blob.insert().values(
+                content_hash=content_hash, file_path=target, file_size=file_size,
+                ref_count=0, created_at=now, updated_at=now
+            ))
+            blob_id = connection.execute(find_blob).scalar()
+        connection.execute(
+            blob.update().where(blob.c.id == blob_id).values(ref_count=blob.c.ref_count + len(rows))
+        )
+        
+        for table, row_id in rows:
+            connection.execute(table.update().where(table.c.id == row_id).values(
+                file_path=target, content_hash=content_hash, file_size=file_size, blob_id=blob_id
+            ))
+        
+        if os.path.abspath(file_path) != os.path.abspath(target):
+            originals.append(file_path)
+    
+    for file_path in originals:
+        os.remove(file_path)
+    print(f"Moved {len(originals)} files into the blob store")
+
+
+def upgrade() -> None:
+    op.create_table('documentblob',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('file_path', sa.String(length=255), nullable=False),
+    sa.Column('file_size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_documentblob_id'), 'documentblob', ['id'], unique=False)
+    op.create_index(op.f('ix_documentblob_content_hash'), 'documentblob', ['content_hash'], unique=True)
+    
+    op.add_column('document', sa.Column('blob_id', sa.Integer(), nullable=True))
+    op.add_column('documentversion', sa.Column('blob_id', sa.Integer(), nullable=True))
+    if op.get_bind().dialect.name != 'sqlite':
+        op.create_foreign_key('fk_document_blob_id', 'document', 'documentblob', ['blob_id'], ['id'])
+        op.create_foreign_key('fk_documentversion_blob_id', 'documentversion', 'documentblob', ['blob_id'], ['id'])
+    
+    _dedupe_existing_files(op.get_bind())
+
+
+def downgrade() -> None:
+    # Files stay in the blob layout; file_path already points at them
+    if op.get_bind().dialect.name != 'sqlite':
+        op.drop_constraint('fk_documentversion_blob_id', 'documentversion', type_='foreignkey')
+        op.drop_constraint('fk_document_blob_id', 'document', type_='foreignkey')
+    op.drop_column('documentversion', 'blob_id')
+    op.drop_column('document', 'blob_id')
+    op.drop_index(op.f('ix_documentblob_content_hash'), table_name='documentblob')
+    op.drop_index(op.f('ix_documentblob_id'), table_name='documentblob')
+    op.drop_table('documentblob')
@@ -0,0 +1,134 @@
+"""add_normalized_document_tags
+
+Revision ID: 5e7a9c1d3f6b
+Revises: 4d6f8b1c3e5a
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7a9c1d3f6b'
+down_revision: Union[str, None] = '4d6f8b1c3e5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def _parse_tags(value):
+    """Same normalization as DocumentService.parse_tags at the time of this revision"""
+    names = []
+    for part in (value or "").split(","):
+        name = " ".join(part.split()).lower()[:100]
+        if name and name not in names:
+            names.append(name)
+    # Drop trailing tags that no longer fit the display column
+    while len(", ".join(names)) > 255:
+        names.pop()
+    return names
+
+
+def _migrate_existing_tags(connection) -> None:
+    """Parse the comma-separated tags column into tag and link rows"""
+    document = sa.table(
+        'document',
+        sa.column('id', sa.Integer),
+        sa.column('tags', sa.String),
+    )
+    tag = sa.table(
+        'documenttag',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('created_at', sa.DateTime),
+        sa.column('updated_at', sa.DateTime),
+    )
+    link = sa.table(
+        'documenttaglink',
+        sa.column('document_id', sa.Integer),
+        sa.column('tag_id', sa.Integer),
+        sa.column('created_at', sa.DateTime),
+        sa.column('updated_at', sa.DateTime),
+    )
+
+    tag_ids = {}
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(document.c.id, document.c.tags)
+            .where(document.c.id > last_id, document.c.tags.isnot(None))
+            .order_by(document.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        now = datetime.utcnow()
+        parsed = {row.id: _parse_tags(row.tags) for row in rows}
+        new_names = sorted({name for names in parsed.values() for name in names} - tag_ids.keys())
+        if new_names:
+            connection.execute(tag.insert(), [
+                {"name": name, "created_at": now, "updated_at": now} for name in new_names
+            ])
+            tag_ids.update(connection.execute(
+                sa.select(tag.c.name, tag.c.id).where(tag.c.name.in_(new_names))
+            ).fetchall())
+
+        links = [
+            {"document_id": document_id, "tag_id": tag_ids[name], "created_at": now, "updated_at": now}
+            for document_id, names in parsed.items()
+            for name in names
+        ]
+        if links:
+            connection.execute(link.insert(), links)
+        for row in rows:
+            normalized = ", ".join(parsed[row.id]) or None
+            if normalized != row.tags:
+                connection.execute(
+                    document.update().where(document.c.id == row.id).values(tags=normalized)
+                )
+
+
+def upgrade() -> None:
+    op.create_table(
+        'documenttag',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_documenttag_id'), 'documenttag', ['id'], unique=False)
+    op.create_index(op.f('ix_documenttag_name'), 'documenttag', ['name'], unique=True)
+
+    op.create_table(
+        'documenttaglink',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tag_id'], ['documenttag.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_id', 'tag_id', name='uq_documenttaglink_document_id_tag_id')
+    )
+    op.create_index(op.f('ix_documenttaglink_id'), 'documenttaglink', ['id'], unique=False)
+    op.create_index('ix_documenttaglink_tag_id_document_id', 'documenttaglink', ['tag_id', 'document_id'], unique=False)
+
+    _migrate_existing_tags(op.get_bind())
+
+
+def downgrade() -> None:
+    # The tags column is kept up to date, so only the normalized tables go
+    op.drop_index('ix_documenttaglink_tag_id_document_id', table_name='documenttaglink')
+    op.drop_index(op.f('ix_documenttaglink_id'), table_name='documenttaglink')
+    op.drop_table('documenttaglink')
+    op.drop_index(op.f('ix_documenttag_name'), table_name='documenttag')
+    op.drop_index(op.f('ix_documenttag_id'), table_name='documenttag')
+    op.drop_table('documenttag')
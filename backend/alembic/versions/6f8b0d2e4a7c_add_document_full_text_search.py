@@ -0,0 +1,111 @@
+"""add_document_full_text_search
+
+Revision ID: 6f8b0d2e4a7c
+Revises: 5e7a9c1d3f6b
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision: str = '6f8b0d2e4a7c'
+down_revision: Union[str, None] = '5e7a9c1d3f6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same statements as app.models.documents at the time of this revision
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE documenttext_fts USING fts5("
+    "name, description, content, content='documenttext', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER documenttext_ai AFTER INSERT ON documenttext BEGIN "
+    "INSERT INTO documenttext_fts(rowid, name, description, content) "
+    "VALUES (new.id, new.name, new.description, new.content); END",
+    "CREATE TRIGGER documenttext_ad AFTER DELETE ON documenttext BEGIN "
+    "INSERT INTO documenttext_fts(documenttext_fts, rowid, name, description, content) "
+    "VALUES ('delete', old.id, old.name, old.description, old.content); END",
+    "CREATE TRIGGER documenttext_au AFTER UPDATE OF name, description, content ON documenttext BEGIN "
+    "INSERT INTO documenttext_fts(documenttext_fts, rowid, name, description, content) "
+    "VALUES ('delete', old.id, old.name, old.description, old.content); "
+    "INSERT INTO documenttext_fts(rowid, name, description, content) "
+    "VALUES (new.id, new.name, new.description, new.content); END",
+]
+MYSQL_DDL = [
+    "CREATE FULLTEXT INDEX ix_documenttext_fulltext ON documenttext (name, description, content)",
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'documenttext',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('content', sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('indexed_at', sa.DateTime(), nullable=True),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_id')
+    )
+    op.create_index(op.f('ix_documenttext_id'), 'documenttext', ['id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+
+    # Names and descriptions are searchable right away; file text is extracted
+    # by the API's index workers, which pick up pending rows on startup
+    now = datetime.utcnow()
+    document = sa.table(
+        'document',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('description', sa.Text),
+        sa.column('content_hash', sa.String),
+    )
+    documenttext = sa.table(
+        'documenttext',
+        sa.column('document_id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('description', sa.Text),
+        sa.column('content_hash', sa.String),
+        sa.column('status', sa.String),
+        sa.column('created_at', sa.DateTime),
+        sa.column('updated_at', sa.DateTime),
+    )
+    op.execute(documenttext.insert().from_select(
+        ['document_id', 'name', 'description', 'content_hash', 'status', 'created_at', 'updated_at'],
+        sa.select(
+            document.c.id,
+            document.c.name,
+            document.c.description,
+            document.c.content_hash,
+            sa.case((document.c.content_hash.is_(None), 'indexed'), else_='pending'),
+            sa.literal(now),
+            sa.literal(now)
+        )
+    ))
+
+    # Building the FULLTEXT index once after the bulk insert is much faster
+    if dialect == 'mysql':
+        for statement in MYSQL_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS documenttext_fts")
+    op.drop_index(op.f('ix_documenttext_id'), table_name='documenttext')
+    op.drop_table('documenttext')
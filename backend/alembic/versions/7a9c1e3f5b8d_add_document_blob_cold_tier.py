@@ -0,0 +1,30 @@
+"""add_document_blob_cold_tier
+
+Revision ID: 7a9c1e3f5b8d
+Revises: 6f8b0d2e4a7c
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7a9c1e3f5b8d'
+down_revision: Union[str, None] = '6f8b0d2e4a7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documentblob', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.add_column('documentblob', sa.Column('compression', sa.String(length=10), nullable=True))
+    op.add_column('documentblob', sa.Column('stored_size', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    # Compressed blobs cannot be served by older code; restore them before downgrading
+    op.drop_column('documentblob', 'stored_size')
+    op.drop_column('documentblob', 'compression')
+    op.drop_column('documentblob', 'archived_at')
@@ -0,0 +1,25 @@
+"""add_document_status_expiry_index
+
+Revision ID: 8b0d2f4a6c9e
+Revises: 7a9c1e3f5b8d
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8b0d2f4a6c9e'
+down_revision: Union[str, None] = '7a9c1e3f5b8d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_document_status_expiry_date', 'document', ['status', 'expiry_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_status_expiry_date', table_name='document')
@@ -0,0 +1,30 @@
+"""allow_documents_without_files
+
+Revision ID: 9c1e3a5b7d0f
+Revises: 8b0d2f4a6c9e
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1e3a5b7d0f'
+down_revision: Union[str, None] = '8b0d2f4a6c9e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Documents created through the JSON endpoint no longer take a client-supplied path.
+    # Batch mode, since SQLite can only change a column's nullability by copying the table
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.alter_column('file_path', existing_type=sa.String(length=255), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("UPDATE document SET file_path = '' WHERE file_path IS NULL")
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.alter_column('file_path', existing_type=sa.String(length=255), nullable=False)
@@ -1,8 +1,9 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from typing import FrozenSet, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request
 from sqlalchemy.orm import Session
 from datetime import date
 
+from app.config import settings
 from app.db.database import get_db
 from app.models.accounting import (
     ChartOfAccounts, JournalEntry, LedgerEntry, 
@@ -24,21 +25,52 @@ from app.schemas.accounting import (
     Employee as EmployeeSchema,
     EmployeeCreate, EmployeeUpdate
 )
-from app.services.accounting_service import AccountingService
+from app.services.accounting_service import (
+    ACCOUNT_LOADING, FISCAL_PERIOD_LOADING, JOURNAL_ENTRY_LOADING, PAYROLL_LOADING, AccountingService
+)
+from app.utils.expand import Expand
+from app.utils.export import ExportFormat, stream_export
+from app.utils.http_cache import CollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+accounts_etag = CollectionETag(ChartOfAccounts, LedgerEntry, max_age=settings.REFERENCE_DATA_MAX_AGE)
+account_etag = ResourceETag(ChartOfAccounts, "account_id", "ledger_entries", max_age=settings.REFERENCE_DATA_MAX_AGE)
+journal_entries_etag = CollectionETag(JournalEntry, LedgerEntry, FiscalPeriod, Payroll, PayrollItem)
+journal_entry_etag = ResourceETag(
+    JournalEntry, "entry_id", "ledger_entries", "fiscal_period", "fiscal_period.payrolls", "fiscal_period.payrolls.payroll_items"
+)
+ledger_entry_etag = ResourceETag(LedgerEntry, "entry_id")
+fiscal_periods_etag = CollectionETag(FiscalPeriod, Payroll, PayrollItem, max_age=settings.REFERENCE_DATA_MAX_AGE)
+fiscal_period_etag = ResourceETag(FiscalPeriod, "period_id", "payrolls", "payrolls.payroll_items", max_age=settings.REFERENCE_DATA_MAX_AGE)
+payrolls_etag = CollectionETag(Payroll, PayrollItem)
+payroll_etag = ResourceETag(Payroll, "payroll_id", "payroll_items")
+payroll_item_etag = ResourceETag(PayrollItem, "item_id")
+employees_etag = CollectionETag(Employee, max_age=settings.REFERENCE_DATA_MAX_AGE)
+employee_etag = ResourceETag(Employee, "employee_id", max_age=settings.REFERENCE_DATA_MAX_AGE)
+
 # Chart of Accounts endpoints
-@router.get("/chart-of-accounts", response_model=List[ChartOfAccountsSchema])
+@router.get("/chart-of-accounts", response_model=List[ChartOfAccountsSchema], dependencies=[Depends(accounts_etag)])
 def get_chart_of_accounts(
     skip: int = Query(0, description="Skip the first n items"),
     limit: int = Query(100, description="Limit the number of items returned"),
+    expand: FrozenSet[str] = Depends(Expand(ACCOUNT_LOADING)),
     db: Session = Depends(get_db)
 ):
-    """Get all chart of accounts with pagination"""
-    accounts = AccountingService.get_chart_of_accounts(db, skip=skip, limit=limit)
+    """Get all chart of accounts with pagination; ?expand=ledger_entries includes each account's ledger entries"""
+    accounts = AccountingService.get_chart_of_accounts(db, skip=skip, limit=limit, expand=expand)
     return accounts
 
+@router.get("/chart-of-accounts/export")
+def export_chart_of_accounts(
+    request: Request,
+    format: str = ExportFormat,
+    db: Session = Depends(get_db)
+):
+    """Download the whole chart of accounts as NDJSON or CSV"""
+    return stream_export(db, request, AccountingService.export_chart_of_accounts_query(), "chart-of-accounts", format)
+
 @router.post("/chart-of-accounts", response_model=ChartOfAccountsSchema)
 def create_account(
     account: ChartOfAccountsCreate,
@@ -55,7 +87,7 @@ def create_account(
     
     return AccountingService.create_account(db, account)
 
-@router.get("/chart-of-accounts/{account_id}", response_model=ChartOfAccountsSchema)
+@router.get("/chart-of-accounts/{account_id}", response_model=ChartOfAccountsSchema, dependencies=[Depends(account_etag)])
 def get_account(
     account_id: int = Path(..., description="The ID of the account to get"),
     db: Session = Depends(get_db)
@@ -99,16 +131,26 @@ def delete_account(
     return success
 
 # Journal Entry endpoints
-@router.get("/journal-entries", response_model=List[JournalEntrySchema])
+@router.get("/journal-entries", response_model=List[JournalEntrySchema], dependencies=[Depends(journal_entries_etag)])
 def get_journal_entries(
     skip: int = Query(0, description="Skip the first n items"),
     limit: int = Query(100, description="Limit the number of items returned"),
+    expand: FrozenSet[str] = Depends(Expand(JOURNAL_ENTRY_LOADING)),
     db: Session = Depends(get_db)
 ):
-    """Get all journal entries with pagination"""
-    entries = AccountingService.get_journal_entries(db, skip=skip, limit=limit)
+    """Get all journal entries with pagination; ?expand=ledger_entries,fiscal_period includes each entry's ledger entries and fiscal period"""
+    entries = AccountingService.get_journal_entries(db, skip=skip, limit=limit, expand=expand)
     return entries
 
+@router.get("/journal-entries/export")
+def export_journal_entries(
+    request: Request,
+    format: str = ExportFormat,
+    db: Session = Depends(get_db)
+):
+    """Download every journal entry as NDJSON or CSV"""
+    return stream_export(db, request, AccountingService.export_journal_entries_query(), "journal-entries", format)
+
 @router.post("/journal-entries", response_model=JournalEntrySchema)
 def create_journal_entry(
     entry: JournalEntryCreate,
@@ -126,13 +168,13 @@ def create_journal_entry(
     
     return AccountingService.create_journal_entry(db, entry)
 
-@router.get("/journal-entries/{entry_id}", response_model=JournalEntrySchema)
+@router.get("/journal-entries/{entry_id}", response_model=JournalEntrySchema, dependencies=[Depends(journal_entry_etag)])
 def get_journal_entry(
     entry_id: int = Path(..., description="The ID of the journal entry to get"),
     db: Session = Depends(get_db)
 ):
-    """Get a single journal entry by ID"""
-    db_entry = AccountingService.get_journal_entry(db, entry_id)
+    """Get a single journal entry by ID, with its ledger entries and fiscal period"""
+    db_entry = AccountingService.get_journal_entry(db, entry_id, expand=JOURNAL_ENTRY_LOADING.names)
     if db_entry is None:
         raise HTTPException(
             status_code=404,
@@ -170,7 +212,7 @@ def delete_journal_entry(
     return success
 
 # Ledger Entry endpoints
-@router.get("/journal-entries/{entry_id}/ledger-entries", response_model=List[LedgerEntrySchema])
+@router.get("/journal-entries/{entry_id}/ledger-entries", response_model=List[LedgerEntrySchema], dependencies=[Depends(journal_entry_etag)])
 def get_ledger_entries(
     entry_id: int = Path(..., description="The ID of the journal entry to get ledger entries for"),
     db: Session = Depends(get_db)
@@ -210,7 +252,19 @@ def create_ledger_entry(
     
     return AccountingService.create_ledger_entry(db, entry)
 
-@router.get("/ledger-entries/{entry_id}", response_model=LedgerEntrySchema)
+@router.get("/ledger-entries/export")
+def export_ledger_entries(
+    request: Request,
+    format: str = ExportFormat,
+    journal_entry_id: Optional[int] = Query(None, description="Only the entries of this journal entry"),
+    account_id: Optional[int] = Query(None, description="Only the entries posted to this account"),
+    db: Session = Depends(get_db)
+):
+    """Download ledger entries with their journal entry number and date and account number as NDJSON or CSV"""
+    statement = AccountingService.export_ledger_entries_query(journal_entry_id=journal_entry_id, account_id=account_id)
+    return stream_export(db, request, statement, "ledger-entries", format)
+
+@router.get("/ledger-entries/{entry_id}", response_model=LedgerEntrySchema, dependencies=[Depends(ledger_entry_etag)])
 def get_ledger_entry(
     entry_id: int = Path(..., description="The ID of the ledger entry to get"),
     db: Session = Depends(get_db)
@@ -254,16 +308,26 @@ def delete_ledger_entry(
     return success
 
 # Fiscal Period endpoints
-@router.get("/fiscal-periods", response_model=List[FiscalPeriodSchema])
+@router.get("/fiscal-periods", response_model=List[FiscalPeriodSchema], dependencies=[Depends(fiscal_periods_etag)])
 def get_fiscal_periods(
     skip: int = Query(0, description="Skip the first n items"),
     limit: int = Query(100, description="Limit the number of items returned"),
+    expand: FrozenSet[str] = Depends(Expand(FISCAL_PERIOD_LOADING)),
     db: Session = Depends(get_db)
 ):
-    """Get all fiscal periods with pagination"""
-    periods = AccountingService.get_fiscal_periods(db, skip=skip, limit=limit)
+    """Get all fiscal periods with pagination; ?expand=payrolls includes each period's payrolls"""
+    periods = AccountingService.get_fiscal_periods(db, skip=skip, limit=limit, expand=expand)
     return periods
 
+@router.get("/fiscal-periods/export")
+def export_fiscal_periods(
+    request: Request,
+    format: str = ExportFormat,
+    db: Session = Depends(get_db)
+):
+    """Download every fiscal period as NDJSON or CSV"""
+    return stream_export(db, request, AccountingService.export_fiscal_periods_query(), "fiscal-periods", format)
+
 @router.post("/fiscal-periods", response_model=FiscalPeriodSchema)
 def create_fiscal_period(
     period: FiscalPeriodCreate,
@@ -272,13 +336,13 @@ def create_fiscal_period(
     """Create a new fiscal period"""
     return AccountingService.create_fiscal_period(db, period)
 
-@router.get("/fiscal-periods/{period_id}", response_model=FiscalPeriodSchema)
+@router.get("/fiscal-periods/{period_id}", response_model=FiscalPeriodSchema, dependencies=[Depends(fiscal_period_etag)])
 def get_fiscal_period(
     period_id: int = Path(..., description="The ID of the fiscal period to get"),
     db: Session = Depends(get_db)
 ):
-    """Get a single fiscal period by ID"""
-    db_period = AccountingService.get_fiscal_period(db, period_id)
+    """Get a single fiscal period by ID, with its payrolls"""
+    db_period = AccountingService.get_fiscal_period(db, period_id, expand=FISCAL_PERIOD_LOADING.names)
     if db_period is None:
         raise HTTPException(
             status_code=404,
@@ -316,16 +380,26 @@ def delete_fiscal_period(
     return success
 
 # Payroll endpoints
-@router.get("/payrolls", response_model=List[PayrollSchema])
+@router.get("/payrolls", response_model=List[PayrollSchema], dependencies=[Depends(payrolls_etag)])
 def get_payrolls(
     skip: int = Query(0, description="Skip the first n items"),
     limit: int = Query(100, description="Limit the number of items returned"),
+    expand: FrozenSet[str] = Depends(Expand(PAYROLL_LOADING)),
     db: Session = Depends(get_db)
 ):
-    """Get all payrolls with pagination"""
-    payrolls = AccountingService.get_payrolls(db, skip=skip, limit=limit)
+    """Get all payrolls with pagination; ?expand=payroll_items includes each payroll's items"""
+    payrolls = AccountingService.get_payrolls(db, skip=skip, limit=limit, expand=expand)
     return payrolls
 
+@router.get("/payrolls/export")
+def export_payrolls(
+    request: Request,
+    format: str = ExportFormat,
+    db: Session = Depends(get_db)
+):
+    """Download every payroll as NDJSON or CSV"""
+    return stream_export(db, request, AccountingService.export_payrolls_query(), "payrolls", format)
+
 @router.post("/payrolls", response_model=PayrollSchema)
 def create_payroll(
     payroll: PayrollCreate,
@@ -334,13 +408,13 @@ def create_payroll(
     """Create a new payroll"""
     return AccountingService.create_payroll(db, payroll)
 
-@router.get("/payrolls/{payroll_id}", response_model=PayrollSchema)
+@router.get("/payrolls/{payroll_id}", response_model=PayrollSchema, dependencies=[Depends(payroll_etag)])
 def get_payroll(
     payroll_id: int = Path(..., description="The ID of the payroll to get"),
     db: Session = Depends(get_db)
 ):
-    """Get a single payroll by ID"""
-    db_payroll = AccountingService.get_payroll(db, payroll_id)
+    """Get a single payroll by ID, with its items"""
+    db_payroll = AccountingService.get_payroll(db, payroll_id, expand=PAYROLL_LOADING.names)
     if db_payroll is None:
         raise HTTPException(
             status_code=404,
@@ -378,7 +452,7 @@ def delete_payroll(
     return success
 
 # Payroll Item endpoints
-@router.get("/payrolls/{payroll_id}/items", response_model=List[PayrollItemSchema])
+@router.get("/payrolls/{payroll_id}/items", response_model=List[PayrollItemSchema], dependencies=[Depends(payroll_etag)])
 def get_payroll_items(
     payroll_id: int = Path(..., description="The ID of the payroll to get items for"),
     db: Session = Depends(get_db)
@@ -418,7 +492,7 @@ def create_payroll_item(
     
     return AccountingService.create_payroll_item(db, item)
 
-@router.get("/payroll-items/{item_id}", response_model=PayrollItemSchema)
+@router.get("/payroll-items/{item_id}", response_model=PayrollItemSchema, dependencies=[Depends(payroll_item_etag)])
 def get_payroll_item(
     item_id: int = Path(..., description="The ID of the payroll item to get"),
     db: Session = Depends(get_db)
@@ -462,7 +536,7 @@ def delete_payroll_item(
     return success
 
 # Employee endpoints
-@router.get("/employees", response_model=List[EmployeeSchema])
+@router.get("/employees", response_model=List[EmployeeSchema], dependencies=[Depends(employees_etag)])
 def get_employees(
     skip: int = Query(0, description="Skip the first n items"),
     limit: int = Query(100, description="Limit the number of items returned"),
@@ -472,6 +546,15 @@ def get_employees(
     employees = AccountingService.get_employees(db, skip=skip, limit=limit)
     return employees
 
+@router.get("/employees/export")
+def export_employees(
+    request: Request,
+    format: str = ExportFormat,
+    db: Session = Depends(get_db)
+):
+    """Download every employee as NDJSON or CSV"""
+    return stream_export(db, request, AccountingService.export_employees_query(), "employees", format)
+
 @router.post("/employees", response_model=EmployeeSchema)
 def create_employee(
     employee: EmployeeCreate,
@@ -488,7 +571,7 @@ def create_employee(
     
     return AccountingService.create_employee(db, employee)
 
-@router.get("/employees/{employee_id}", response_model=EmployeeSchema)
+@router.get("/employees/{employee_id}", response_model=EmployeeSchema, dependencies=[Depends(employee_etag)])
 def get_employee(
     employee_id: int = Path(..., description="The ID of the employee to get"),
     db: Session = Depends(get_db)
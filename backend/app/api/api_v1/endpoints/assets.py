@@ -1,5 +1,5 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from typing import FrozenSet, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
 from sqlalchemy.orm import Session
 from datetime import date
 
@@ -12,25 +12,51 @@ from app.schemas.asset import (
     AssetDepreciation as AssetDepreciationSchema,
     AssetDepreciationCreate,
     AssetDepreciationUpdate,
+    AssetDepreciationRunCreate,
+    AssetDepreciationRunResult,
+    AssetDepreciationForecast,
+    AssetRegisterSummary,
     AssetMaintenance as AssetMaintenanceSchema,
     AssetMaintenanceCreate,
     AssetMaintenanceUpdate
 )
-from app.services.asset_service import AssetService
+from app.services.asset_service import ASSET_LOADING, AssetService
+from app.utils.expand import Expand
+from app.utils.export import ExportFormat, stream_export
+from app.utils.http_cache import CollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+assets_etag = CollectionETag(Asset, AssetDepreciation, AssetMaintenance)
+forecast_etag = CollectionETag(Asset, AssetDepreciation, daily=True)
+asset_etag = ResourceETag(Asset, "asset_id", "depreciation_entries", "maintenance_records")
+asset_depreciations_etag = ResourceETag(Asset, "asset_id", "depreciation_entries")
+depreciation_etag = ResourceETag(AssetDepreciation, "depreciation_id")
+asset_maintenances_etag = ResourceETag(Asset, "asset_id", "maintenance_records")
+maintenance_etag = ResourceETag(AssetMaintenance, "maintenance_id")
+
 # Asset endpoints
-@router.get("/", response_model=List[AssetSchema])
+@router.get("/", response_model=List[AssetSchema], dependencies=[Depends(assets_etag)])
 def get_assets(
     skip: int = Query(0, description="Skip the first n items"),
     limit: int = Query(100, description="Limit the number of items returned"),
+    expand: FrozenSet[str] = Depends(Expand(ASSET_LOADING)),
     db: Session = Depends(get_db)
 ):
-    """Get all assets with pagination"""
-    assets = AssetService.get_assets(db, skip=skip, limit=limit)
+    """Get all assets with pagination; ?expand=depreciation_entries,maintenance_records includes each asset's history"""
+    assets = AssetService.get_assets(db, skip=skip, limit=limit, expand=expand)
     return assets
 
+@router.get("/export")
+def export_assets(
+    request: Request,
+    format: str = ExportFormat,
+    db: Session = Depends(get_db)
+):
+    """Download the whole asset register as NDJSON or CSV"""
+    return stream_export(db, request, AssetService.export_assets_query(), "assets", format)
+
 @router.post("/", response_model=AssetSchema)
 def create_asset(
     asset: AssetCreate,
@@ -48,13 +74,53 @@ def create_asset(
     
     return AssetService.create_asset(db, asset)
 
-@router.get("/{asset_id}", response_model=AssetSchema)
+@router.get("/summary", response_model=AssetRegisterSummary, dependencies=[Depends(assets_etag)])
+def get_asset_register_summary(
+    skip: int = Query(0, description="Skip the first n items"),
+    limit: int = Query(100, description="Limit the number of items returned"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    db: Session = Depends(get_db)
+):
+    """Get assets with maintenance and depreciation totals, rolled up by category and location"""
+    return AssetService.get_register_summary(
+        db,
+        skip=skip,
+        limit=limit,
+        category=category,
+        location=location,
+        status=status
+    )
+
+@router.get("/depreciation-forecast", response_model=AssetDepreciationForecast, dependencies=[Depends(forecast_etag)])
+def get_depreciation_forecast(
+    response: Response,
+    years: int = Query(5, description="Number of years to project", ge=1, le=30),
+    frequency: str = Query("yearly", description="Schedule granularity", pattern="^(monthly|yearly)$"),
+    method: str = Query("straight_line", description="Depreciation method", pattern="^(straight_line|declining_balance)$"),
+    start_date: Optional[date] = Query(None, description="Project from this date (defaults to today)"),
+    db: Session = Depends(get_db)
+):
+    """Project per-asset and per-category book values without recording depreciation"""
+    # The forecast is cached pre-encoded, so skip response model re-serialization
+    content = AssetService.get_depreciation_forecast_json(
+        db,
+        years=years,
+        frequency=frequency,
+        method=method,
+        start_date=start_date
+    )
+    # A returned Response does not pick up headers set by dependencies, such as the ETag
+    return Response(content=content, media_type="application/json", headers=dict(response.headers))
+
+@router.get("/{asset_id}", response_model=AssetSchema, dependencies=[Depends(asset_etag)])
 def get_asset(
     asset_id: int = Path(..., description="The ID of the asset to get"),
     db: Session = Depends(get_db)
 ):
-    """Get a single asset by ID"""
-    db_asset = AssetService.get_asset(db, asset_id)
+    """Get a single asset by ID, with its depreciation and maintenance history"""
+    db_asset = AssetService.get_asset(db, asset_id, expand=ASSET_LOADING.names)
     if db_asset is None:
         raise HTTPException(
             status_code=404,
@@ -92,7 +158,7 @@ def delete_asset(
     return success
 
 # Asset Depreciation endpoints
-@router.get("/{asset_id}/depreciations", response_model=List[AssetDepreciationSchema])
+@router.get("/{asset_id}/depreciations", response_model=List[AssetDepreciationSchema], dependencies=[Depends(asset_depreciations_etag)])
 def get_asset_depreciations(
     asset_id: int = Path(..., description="The ID of the asset to get depreciations for"),
     db: Session = Depends(get_db)
@@ -130,9 +196,29 @@ def create_asset_depreciation(
             detail=f"Asset ID in path ({asset_id}) does not match asset_id in request body ({depreciation.asset_id})"
         )
     
-    return AssetService.create_asset_depreciation(db, depreciation)
+    try:
+        return AssetService.create_asset_depreciation(db, depreciation)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+@router.post("/depreciation-runs", response_model=AssetDepreciationRunResult)
+def run_asset_depreciation(
+    run: AssetDepreciationRunCreate,
+    db: Session = Depends(get_db)
+):
+    """Depreciate all active assets for a period end date"""
+    try:
+        return AssetService.run_depreciation(db, run)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
 
-@router.get("/depreciations/{depreciation_id}", response_model=AssetDepreciationSchema)
+@router.get("/depreciations/{depreciation_id}", response_model=AssetDepreciationSchema, dependencies=[Depends(depreciation_etag)])
 def get_asset_depreciation(
     depreciation_id: int = Path(..., description="The ID of the depreciation entry to get"),
     db: Session = Depends(get_db)
@@ -153,7 +239,13 @@ def update_asset_depreciation(
     db: Session = Depends(get_db)
 ):
     """Update an existing depreciation entry"""
-    db_depreciation = AssetService.update_asset_depreciation(db, depreciation_id, depreciation)
+    try:
+        db_depreciation = AssetService.update_asset_depreciation(db, depreciation_id, depreciation)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     if db_depreciation is None:
         raise HTTPException(
             status_code=404,
@@ -176,7 +268,7 @@ def delete_asset_depreciation(
     return success
 
 # Asset Maintenance endpoints
-@router.get("/{asset_id}/maintenances", response_model=List[AssetMaintenanceSchema])
+@router.get("/{asset_id}/maintenances", response_model=List[AssetMaintenanceSchema], dependencies=[Depends(asset_maintenances_etag)])
 def get_asset_maintenances(
     asset_id: int = Path(..., description="The ID of the asset to get maintenances for"),
     db: Session = Depends(get_db)
@@ -216,7 +308,7 @@ def create_asset_maintenance(
     
     return AssetService.create_asset_maintenance(db, maintenance)
 
-@router.get("/maintenances/{maintenance_id}", response_model=AssetMaintenanceSchema)
+@router.get("/maintenances/{maintenance_id}", response_model=AssetMaintenanceSchema, dependencies=[Depends(maintenance_etag)])
 def get_asset_maintenance(
     maintenance_id: int = Path(..., description="The ID of the maintenance record to get"),
     db: Session = Depends(get_db)
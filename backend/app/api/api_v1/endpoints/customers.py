@@ -1,20 +1,29 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import FrozenSet, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
-from app.models.business_partners import Customer
+from app.models.business_partners import Customer, CustomerContact
 from app.schemas.customer import CustomerCreate, CustomerUpdate, CustomerResponse
 from app.services.customer_service import (
+    CUSTOMER_LOADING,
     create_customer,
     get_customer,
     get_customers,
+    export_customers_query,
     update_customer,
     delete_customer
 )
+from app.utils.expand import Expand
+from app.utils.export import ExportFormat, stream_export
+from app.utils.http_cache import CollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+customers_etag = CollectionETag(Customer, CustomerContact)
+customer_etag = ResourceETag(Customer, "customer_id", "contacts")
+
 @router.post("/", response_model=CustomerResponse, status_code=status.HTTP_201_CREATED)
 def create_new_customer(
     customer: CustomerCreate,
@@ -25,20 +34,34 @@ def create_new_customer(
     """
     return create_customer(db=db, customer=customer)
 
-@router.get("/", response_model=List[CustomerResponse])
+@router.get("/", response_model=List[CustomerResponse], dependencies=[Depends(customers_etag)])
 def read_customers(
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
     search: Optional[str] = None,
+    expand: FrozenSet[str] = Depends(Expand(CUSTOMER_LOADING)),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve customers with optional filtering; ?expand=contacts includes each customer's contacts
+    """
+    return get_customers(db=db, skip=skip, limit=limit, status=status, search=search, expand=expand)
+
+@router.get("/export")
+def export_customers(
+    request: Request,
+    format: str = ExportFormat,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Retrieve customers with optional filtering
+    Download every customer matching the list filters as NDJSON or CSV
     """
-    return get_customers(db=db, skip=skip, limit=limit, status=status, search=search)
+    return stream_export(db, request, export_customers_query(status=status, search=search), "customers", format)
 
-@router.get("/{customer_id}", response_model=CustomerResponse)
+@router.get("/{customer_id}", response_model=CustomerResponse, dependencies=[Depends(customer_etag)])
 def read_customer(
     customer_id: int,
     db: Session = Depends(get_db)
@@ -1,22 +1,47 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, UploadFile, File, Form, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from datetime import date
+import os
 
-from app.db.database import get_db
-from app.models.documents import Document, DocumentVersion
+from app.config import settings
+from app.db.database import get_async_db, get_db
+from app.models.documents import Document, DocumentTag, DocumentTagLink, DocumentText, DocumentVersion
 from app.schemas.document import (
     Document as DocumentSchema,
     DocumentCreate, DocumentUpdate,
     DocumentVersion as DocumentVersionSchema,
-    DocumentVersionCreate, DocumentVersionUpdate
+    DocumentVersionCreate, DocumentVersionUpdate,
+    DocumentTagFacet, DocumentSearchResult, BulkUploadResult,
+    DocumentArchiveRun, DocumentStorageReport,
+    DocumentExpiryDigestEntry, DocumentExpiryRun
 )
+from app.services.archive_service import ArchiveService
+from app.services.bulk_upload_service import BulkUploadService
 from app.services.document_service import DocumentService
+from app.services.expiry_service import ExpiryService
+from app.services.search_service import SearchService
+from app.utils.compression import FILE_SUFFIXES
+from app.utils.export import ExportFormat, stream_export
+from app.utils.file_storage import UploadTooLargeError
+from app.utils.file_download import storage_download_response
+from app.utils.http_cache import AsyncCollectionETag, AsyncResourceETag, CollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+documents_etag = AsyncCollectionETag(Document, DocumentVersion, DocumentTagLink, daily=True)
+search_etag = CollectionETag(Document, DocumentText, DocumentTagLink)
+tags_etag = CollectionETag(Document, DocumentTag, DocumentTagLink, max_age=settings.REFERENCE_DATA_MAX_AGE)
+expiring_etag = CollectionETag(Document, daily=True)
+document_etag = AsyncResourceETag(Document, "document_id", "versions")
+versions_etag = ResourceETag(Document, "document_id", "versions")
+version_etag = ResourceETag(DocumentVersion, "version_id")
+
 # Document endpoints
-@router.get("/", response_model=List[DocumentSchema])
+@router.get("/", response_model=List[DocumentSchema], dependencies=[Depends(documents_etag)])
 async def get_documents(
     skip: int = Query(0, description="Skip the first n items"),
     limit: int = Query(100, description="Limit the number of items returned"),
@@ -24,19 +49,142 @@ async def get_documents(
     related_entity_id: Optional[int] = Query(None, description="Filter by related entity ID"),
     document_type: Optional[str] = Query(None, description="Filter by document type"),
     status: Optional[str] = Query(None, description="Filter by status"),
-    db: Session = Depends(get_db)
+    tags: Optional[List[str]] = Query(None, description="Filter by tags, repeated or comma-separated"),
+    tag_match: str = Query("all", pattern="^(all|any)$", description="Require all tags or any of them"),
+    expiring: Optional[int] = Query(None, ge=0, description="Only documents expiring within n days, soonest first"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all documents with optional filtering"""
-    documents = DocumentService.get_documents(
-        db, 
-        skip=skip, 
+    try:
+        documents = await DocumentService.get_documents_async(
+            db, 
+            skip=skip, 
+            limit=limit,
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id,
+            document_type=document_type,
+            status=status,
+            tags=tags,
+            tag_match=tag_match,
+            expiring=expiring
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    return documents
+
+@router.get("/export")
+def export_documents(
+    request: Request,
+    format: str = ExportFormat,
+    related_entity_type: Optional[str] = Query(None, description="Filter by related entity type"),
+    related_entity_id: Optional[int] = Query(None, description="Filter by related entity ID"),
+    document_type: Optional[str] = Query(None, description="Filter by document type"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    tags: Optional[List[str]] = Query(None, description="Filter by tags, repeated or comma-separated"),
+    tag_match: str = Query("all", pattern="^(all|any)$", description="Require all tags or any of them"),
+    expiring: Optional[int] = Query(None, ge=0, description="Only documents expiring within n days, soonest first"),
+    db: Session = Depends(get_db)
+):
+    """Download the metadata of every document matching the list filters as NDJSON or CSV"""
+    try:
+        statement = DocumentService.export_documents_query(
+            db,
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id,
+            document_type=document_type,
+            status=status,
+            tags=tags,
+            tag_match=tag_match,
+            expiring=expiring
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    return stream_export(db, request, statement, "documents", format)
+
+@router.get("/search", response_model=List[DocumentSearchResult], dependencies=[Depends(search_etag)])
+def search_documents(
+    q: str = Query(..., min_length=1, description="Words to search for in names, descriptions and file text"),
+    skip: int = Query(0, description="Skip the first n items"),
+    limit: int = Query(20, le=100, description="Limit the number of items returned"),
+    document_type: Optional[str] = Query(None, description="Filter by document type"),
+    related_entity_type: Optional[str] = Query(None, description="Filter by related entity type"),
+    related_entity_id: Optional[int] = Query(None, description="Filter by related entity ID"),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over documents, best matches first, with highlighted snippets"""
+    return SearchService.search(
+        db,
+        q,
+        skip=skip,
         limit=limit,
-        related_entity_type=related_entity_type,
-        related_entity_id=related_entity_id,
         document_type=document_type,
-        status=status
+        related_entity_type=related_entity_type,
+        related_entity_id=related_entity_id
     )
-    return documents
+
+@router.get("/tags", response_model=List[DocumentTagFacet], dependencies=[Depends(tags_etag)])
+def get_document_tag_facets(
+    limit: int = Query(50, description="Limit the number of tags returned"),
+    related_entity_type: Optional[str] = Query(None, description="Filter by related entity type"),
+    related_entity_id: Optional[int] = Query(None, description="Filter by related entity ID"),
+    document_type: Optional[str] = Query(None, description="Filter by document type"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    tags: Optional[List[str]] = Query(None, description="Filter by tags, repeated or comma-separated"),
+    tag_match: str = Query("all", pattern="^(all|any)$", description="Require all tags or any of them"),
+    db: Session = Depends(get_db)
+):
+    """Get tag facet counts for the documents matching the filters"""
+    try:
+        return DocumentService.get_tag_facets(
+            db,
+            limit=limit,
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id,
+            document_type=document_type,
+            status=status,
+            tags=tags,
+            tag_match=tag_match
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+@router.post("/archive-runs", response_model=DocumentArchiveRun)
+async def run_document_archiver(
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of files to compress in this run"),
+    db: Session = Depends(get_db)
+):
+    """Compress files only referenced by old versions, per the archive policies"""
+    return await run_in_threadpool(ArchiveService.archive_old_versions, db, limit=limit)
+
+@router.get("/storage-report", response_model=DocumentStorageReport)
+def get_document_storage_report(db: Session = Depends(get_db)):
+    """Space used per storage tier and how much archiving has reclaimed"""
+    return ArchiveService.get_storage_report(db)
+
+@router.get("/expiring", response_model=List[DocumentExpiryDigestEntry], dependencies=[Depends(expiring_etag)])
+def get_expiring_documents(
+    days: Optional[int] = Query(None, ge=0, description="Expiring within n days, defaults to DOCUMENT_EXPIRY_WARNING_DAYS"),
+    db: Session = Depends(get_db)
+):
+    """Get the expiring-soon digest: active documents expiring within n days, grouped by related entity"""
+    return ExpiryService.get_expiring_digest(db, days)
+
+@router.post("/expiry-runs", response_model=DocumentExpiryRun)
+def run_document_expiry(
+    days: Optional[int] = Query(None, ge=0, description="Digest window in days, defaults to DOCUMENT_EXPIRY_WARNING_DAYS"),
+    db: Session = Depends(get_db)
+):
+    """Mark documents past their expiry date as expired and return the expiring-soon digest"""
+    return ExpiryService.run_expiry(db, days)
 
 @router.post("/", response_model=DocumentSchema)
 async def create_document(
@@ -44,7 +192,13 @@ async def create_document(
     db: Session = Depends(get_db)
 ):
     """Create a new document record without file upload"""
-    return DocumentService.create_document(db, document)
+    try:
+        return DocumentService.create_document(db, document)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
 
 @router.post("/upload", response_model=DocumentSchema)
 async def upload_document(
@@ -71,15 +225,62 @@ async def upload_document(
         "uploaded_by": uploaded_by
     }
     
-    return await DocumentService.upload_document(db, file, document_data)
+    try:
+        return await DocumentService.upload_document(db, file, document_data)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+@router.post("/bulk-upload", response_model=BulkUploadResult)
+async def bulk_upload_documents(
+    file: UploadFile = File(..., description="ZIP archive of document files"),
+    manifest: Optional[UploadFile] = File(
+        None,
+        description="CSV with file_name plus document_type, related_entity_type, related_entity_id, "
+                    "name, description, tags, expiry_date; manifest.csv inside the archive also works"
+    ),
+    document_type: Optional[str] = Form(None, description="Default for files without one in the manifest"),
+    related_entity_type: Optional[str] = Form(None),
+    related_entity_id: Optional[int] = Form(None),
+    tags: Optional[str] = Form(None),
+    uploaded_by: Optional[int] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """Upload many documents at once as a ZIP archive, with a result per file"""
+    defaults = {
+        "document_type": document_type,
+        "related_entity_type": related_entity_type,
+        "related_entity_id": related_entity_id,
+        "tags": tags
+    }
+    try:
+        return await BulkUploadService.bulk_upload(
+            db,
+            file,
+            manifest=manifest,
+            defaults=defaults,
+            uploaded_by=uploaded_by
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
 
-@router.get("/{document_id}", response_model=DocumentSchema)
+@router.get("/{document_id}", response_model=DocumentSchema, dependencies=[Depends(document_etag)])
 async def get_document(
     document_id: int = Path(..., description="The ID of the document to get"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a single document by ID"""
-    db_document = DocumentService.get_document(db, document_id)
+    db_document = await DocumentService.get_document_async(db, document_id)
     if db_document is None:
         raise HTTPException(
             status_code=404,
@@ -87,6 +288,49 @@ async def get_document(
         )
     return db_document
 
+def _download_filename(name: str, file_path: Optional[str]) -> str:
+    """Use the document name, keeping the stored file's extension"""
+    extension = os.path.splitext(file_path or "")[1]
+    if extension and not name.lower().endswith(extension.lower()):
+        return f"{name}{extension}"
+    return name
+
+@router.api_route("/{document_id}/download", methods=["GET", "HEAD"])
+def download_document(
+    request: Request,
+    document_id: int = Path(..., description="The ID of the document to download"),
+    db: Session = Depends(get_db)
+):
+    """Download the current file of a document, with Range and conditional request support"""
+    db_document = DocumentService.get_document(db, document_id)
+    if db_document is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Document with ID {document_id} not found"
+        )
+    # Only files in the blob store are served, never a path taken from a row alone
+    blob = db_document.blob
+    if blob is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Document with ID {document_id} has no stored file"
+        )
+    try:
+        return storage_download_response(
+            request,
+            DocumentService.get_storage(),
+            blob.file_path,
+            _download_filename(db_document.name, db_document.file_path),
+            content_hash=blob.content_hash,
+            compression=blob.compression,
+            file_size=blob.file_size
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"File for document with ID {document_id} not found"
+        )
+
 @router.put("/{document_id}", response_model=DocumentSchema)
 async def update_document(
     document: DocumentUpdate,
@@ -94,7 +338,13 @@ async def update_document(
     db: Session = Depends(get_db)
 ):
     """Update an existing document"""
-    db_document = DocumentService.update_document(db, document_id, document)
+    try:
+        db_document = DocumentService.update_document(db, document_id, document)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
     if db_document is None:
         raise HTTPException(
             status_code=404,
@@ -117,7 +367,7 @@ async def delete_document(
     return success
 
 # Document Version endpoints
-@router.get("/{document_id}/versions", response_model=List[DocumentVersionSchema])
+@router.get("/{document_id}/versions", response_model=List[DocumentVersionSchema], dependencies=[Depends(versions_etag)])
 async def get_document_versions(
     document_id: int = Path(..., description="The ID of the document to get versions for"),
     db: Session = Depends(get_db)
@@ -139,7 +389,7 @@ async def create_document_version(
     document_id: int = Path(..., description="The ID of the document to create version for"),
     db: Session = Depends(get_db)
 ):
-    """Create a new document version"""
+    """Record the document's current file as a new version, without file upload"""
     # Check if document exists
     db_document = DocumentService.get_document(db, document_id)
     if db_document is None:
@@ -155,7 +405,13 @@ async def create_document_version(
             detail=f"Document ID in path ({document_id}) does not match document_id in request body ({version.document_id})"
         )
     
-    return DocumentService.create_document_version(db, version)
+    try:
+        return DocumentService.create_document_version(db, version)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
 
 @router.post("/{document_id}/upload-version", response_model=DocumentVersionSchema)
 async def upload_document_version(
@@ -174,13 +430,18 @@ async def upload_document_version(
             notes=notes, 
             uploaded_by=uploaded_by
         )
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=404,
             detail=str(e)
         )
 
-@router.get("/versions/{version_id}", response_model=DocumentVersionSchema)
+@router.get("/versions/{version_id}", response_model=DocumentVersionSchema, dependencies=[Depends(version_etag)])
 async def get_document_version(
     version_id: int = Path(..., description="The ID of the document version to get"),
     db: Session = Depends(get_db)
@@ -194,6 +455,46 @@ async def get_document_version(
         )
     return db_version
 
+@router.api_route("/versions/{version_id}/download", methods=["GET", "HEAD"])
+def download_document_version(
+    request: Request,
+    version_id: int = Path(..., description="The ID of the document version to download"),
+    db: Session = Depends(get_db)
+):
+    """Download the file of a specific document version"""
+    db_version = DocumentService.get_document_version(db, version_id)
+    if db_version is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Document version with ID {version_id} not found"
+        )
+    blob = db_version.blob
+    if blob is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Document version with ID {version_id} has no stored file"
+        )
+    try:
+        return storage_download_response(
+            request,
+            DocumentService.get_storage(),
+            blob.file_path,
+            _download_filename(
+                f"{db_version.document.name}_v{db_version.version_number}",
+                # Archived copies carry a codec suffix that is not part of the file name
+                db_version.file_path[:-len(FILE_SUFFIXES[blob.compression])]
+                if blob.compression else db_version.file_path
+            ),
+            content_hash=blob.content_hash,
+            compression=blob.compression,
+            file_size=blob.file_size
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"File for document version with ID {version_id} not found"
+        )
+
 @router.put("/versions/{version_id}", response_model=DocumentVersionSchema)
 async def update_document_version(
     version: DocumentVersionUpdate,
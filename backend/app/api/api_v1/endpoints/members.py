@@ -1,8 +1,9 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.database import get_db
+from app.db.database import get_async_db, get_db
 from app.models.member import Member, SavingsTransaction, SHUDistribution
 from app.schemas.member import (
     MemberCreate, 
@@ -16,17 +17,28 @@ from app.schemas.member import (
 from app.services.member_service import (
     create_member,
     get_member,
-    get_members,
+    get_members_async,
+    export_members_query,
     update_member,
     delete_member,
     create_savings_transaction,
     get_member_savings_transactions,
+    export_savings_transactions_query,
     create_shu_distribution,
-    get_member_shu_distributions
+    get_member_shu_distributions,
+    export_shu_distributions_query
 )
+from app.utils.export import ExportFormat, stream_export
+from app.utils.http_cache import AsyncCollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+members_etag = AsyncCollectionETag(Member)
+member_etag = ResourceETag(Member, "member_id")
+member_savings_etag = ResourceETag(Member, "member_id", "savings_transactions")
+member_shu_etag = ResourceETag(Member, "member_id", "shu_distributions")
+
 @router.post("/", response_model=MemberResponse, status_code=status.HTTP_201_CREATED)
 def create_new_member(
     member: MemberCreate,
@@ -37,20 +49,33 @@ def create_new_member(
     """
     return create_member(db=db, member=member)
 
-@router.get("/", response_model=List[MemberResponse])
-def read_members(
+@router.get("/", response_model=List[MemberResponse], dependencies=[Depends(members_etag)])
+async def read_members(
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Retrieve members with optional filtering
     """
-    return get_members(db=db, skip=skip, limit=limit, status=status, search=search)
+    return await get_members_async(db=db, skip=skip, limit=limit, status=status, search=search)
 
-@router.get("/{member_id}", response_model=MemberResponse)
+@router.get("/export")
+def export_members(
+    request: Request,
+    format: str = ExportFormat,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download every member matching the list filters as NDJSON or CSV
+    """
+    return stream_export(db, request, export_members_query(status=status, search=search), "members", format)
+
+@router.get("/{member_id}", response_model=MemberResponse, dependencies=[Depends(member_etag)])
 def read_member(
     member_id: int,
     db: Session = Depends(get_db)
@@ -106,7 +131,7 @@ def create_member_savings_transaction(
         raise HTTPException(status_code=404, detail="Member not found")
     return create_savings_transaction(db=db, member_id=member_id, transaction=transaction)
 
-@router.get("/{member_id}/savings", response_model=List[SavingsTransactionResponse])
+@router.get("/{member_id}/savings", response_model=List[SavingsTransactionResponse], dependencies=[Depends(member_savings_etag)])
 def read_member_savings_transactions(
     member_id: int,
     skip: int = 0,
@@ -128,6 +153,23 @@ def read_member_savings_transactions(
         transaction_type=transaction_type
     )
 
+@router.get("/{member_id}/savings/export")
+def export_member_savings_transactions(
+    member_id: int,
+    request: Request,
+    format: str = ExportFormat,
+    transaction_type: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download a member's whole savings history as NDJSON or CSV
+    """
+    db_member = get_member(db=db, member_id=member_id)
+    if db_member is None:
+        raise HTTPException(status_code=404, detail="Member not found")
+    statement = export_savings_transactions_query(member_id=member_id, transaction_type=transaction_type)
+    return stream_export(db, request, statement, f"member-{member_id}-savings", format)
+
 # SHU Distribution endpoints
 @router.post("/{member_id}/shu", response_model=SHUDistributionResponse)
 def create_member_shu_distribution(
@@ -143,7 +185,7 @@ def create_member_shu_distribution(
         raise HTTPException(status_code=404, detail="Member not found")
     return create_shu_distribution(db=db, member_id=member_id, distribution=distribution)
 
-@router.get("/{member_id}/shu", response_model=List[SHUDistributionResponse])
+@router.get("/{member_id}/shu", response_model=List[SHUDistributionResponse], dependencies=[Depends(member_shu_etag)])
 def read_member_shu_distributions(
     member_id: int,
     skip: int = 0,
@@ -164,3 +206,20 @@ def read_member_shu_distributions(
         limit=limit, 
         fiscal_year=fiscal_year
     )
+
+@router.get("/{member_id}/shu/export")
+def export_member_shu_distributions(
+    member_id: int,
+    request: Request,
+    format: str = ExportFormat,
+    fiscal_year: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download all SHU distributions of a member as NDJSON or CSV
+    """
+    db_member = get_member(db=db, member_id=member_id)
+    if db_member is None:
+        raise HTTPException(status_code=404, detail="Member not found")
+    statement = export_shu_distributions_query(member_id=member_id, fiscal_year=fiscal_year)
+    return stream_export(db, request, statement, f"member-{member_id}-shu", format)
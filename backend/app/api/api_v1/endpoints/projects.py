@@ -1,5 +1,5 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from typing import FrozenSet, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request
 from sqlalchemy.orm import Session
 from datetime import date
 
@@ -22,21 +22,48 @@ from app.schemas.project import (
     ProjectPayment as ProjectPaymentSchema,
     ProjectPaymentCreate, ProjectPaymentUpdate
 )
-from app.services.project_service import ProjectService
+from app.services.project_service import PROJECT_INVOICE_LOADING, PROJECT_LOADING, ProjectService
+from app.utils.expand import Expand
+from app.utils.export import ExportFormat, stream_export
+from app.utils.http_cache import CollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+projects_etag = CollectionETag(Project, ProjectTask, ProjectTimeEntry, ProjectInvoice, ProjectInvoiceItem, ProjectPayment)
+project_etag = ResourceETag(Project, "project_id", "tasks", "tasks.time_entries", "invoices", "invoices.items", "invoices.payments")
+project_tasks_etag = ResourceETag(Project, "project_id", "tasks", "tasks.time_entries")
+task_etag = ResourceETag(ProjectTask, "task_id", "time_entries")
+time_entry_etag = ResourceETag(ProjectTimeEntry, "entry_id")
+invoices_etag = CollectionETag(ProjectInvoice, ProjectInvoiceItem, ProjectPayment)
+project_invoices_etag = ResourceETag(Project, "project_id", "invoices", "invoices.items", "invoices.payments")
+invoice_etag = ResourceETag(ProjectInvoice, "invoice_id", "items", "payments")
+invoice_items_etag = ResourceETag(ProjectInvoice, "invoice_id", "items")
+invoice_item_etag = ResourceETag(ProjectInvoiceItem, "item_id")
+invoice_payments_etag = ResourceETag(ProjectInvoice, "invoice_id", "payments")
+payment_etag = ResourceETag(ProjectPayment, "payment_id")
+
 # Project endpoints
-@router.get("/", response_model=List[ProjectSchema])
+@router.get("/", response_model=List[ProjectSchema], dependencies=[Depends(projects_etag)])
 def get_projects(
     skip: Optional[int] = Query(0, description="Skip the first n items", ge=0),
     limit: Optional[int] = Query(100, description="Limit the number of items returned", ge=1, le=100),
+    expand: FrozenSet[str] = Depends(Expand(PROJECT_LOADING)),
     db: Session = Depends(get_db)
 ):
-    """Get all projects with pagination"""
-    projects = ProjectService.get_projects(db, skip=skip, limit=limit)
+    """Get all projects with pagination; ?expand=tasks,invoices includes each project's tasks and invoices"""
+    projects = ProjectService.get_projects(db, skip=skip, limit=limit, expand=expand)
     return projects
 
+@router.get("/export")
+def export_projects(
+    request: Request,
+    format: str = ExportFormat,
+    db: Session = Depends(get_db)
+):
+    """Download every project as NDJSON or CSV"""
+    return stream_export(db, request, ProjectService.export_projects_query(), "projects", format)
+
 @router.post("/", response_model=ProjectSchema)
 def create_project(
     project: ProjectCreate,
@@ -54,13 +81,13 @@ def create_project(
     
     return ProjectService.create_project(db, project)
 
-@router.get("/{project_id}", response_model=ProjectSchema)
+@router.get("/{project_id}", response_model=ProjectSchema, dependencies=[Depends(project_etag)])
 def get_project(
     project_id: int = Path(..., description="The ID of the project to get"),
     db: Session = Depends(get_db)
 ):
-    """Get a single project by ID"""
-    db_project = ProjectService.get_project(db, project_id)
+    """Get a single project by ID, with its tasks and invoices"""
+    db_project = ProjectService.get_project(db, project_id, expand=PROJECT_LOADING.names)
     if db_project is None:
         raise HTTPException(
             status_code=404,
@@ -98,7 +125,7 @@ def delete_project(
     return success
 
 # Project Task endpoints
-@router.get("/{project_id}/tasks", response_model=List[ProjectTaskSchema])
+@router.get("/{project_id}/tasks", response_model=List[ProjectTaskSchema], dependencies=[Depends(project_tasks_etag)])
 def get_project_tasks(
     project_id: int = Path(..., description="The ID of the project to get tasks for"),
     db: Session = Depends(get_db)
@@ -138,7 +165,7 @@ def create_project_task(
     
     return ProjectService.create_project_task(db, task)
 
-@router.get("/tasks/{task_id}", response_model=ProjectTaskSchema)
+@router.get("/tasks/{task_id}", response_model=ProjectTaskSchema, dependencies=[Depends(task_etag)])
 def get_project_task(
     task_id: int = Path(..., description="The ID of the task to get"),
     db: Session = Depends(get_db)
@@ -182,7 +209,7 @@ def delete_project_task(
     return success
 
 # Project Time Entry endpoints
-@router.get("/tasks/{task_id}/time-entries", response_model=List[ProjectTimeEntrySchema])
+@router.get("/tasks/{task_id}/time-entries", response_model=List[ProjectTimeEntrySchema], dependencies=[Depends(task_etag)])
 def get_time_entries(
     task_id: int = Path(..., description="The ID of the task to get time entries for"),
     db: Session = Depends(get_db)
@@ -222,7 +249,7 @@ def create_time_entry(
     
     return ProjectService.create_time_entry(db, entry)
 
-@router.get("/time-entries/{entry_id}", response_model=ProjectTimeEntrySchema)
+@router.get("/time-entries/{entry_id}", response_model=ProjectTimeEntrySchema, dependencies=[Depends(time_entry_etag)])
 def get_time_entry(
     entry_id: int = Path(..., description="The ID of the time entry to get"),
     db: Session = Depends(get_db)
@@ -266,17 +293,29 @@ def delete_time_entry(
     return success
 
 # Project Invoice endpoints - All Invoices
-@router.get("/invoices/all", response_model=List[ProjectInvoiceSchema])
+@router.get("/invoices/all", response_model=List[ProjectInvoiceSchema], dependencies=[Depends(invoices_etag)])
 def get_all_invoices(
     skip: Optional[int] = Query(0, description="Skip the first n items", ge=0),
     limit: Optional[int] = Query(100, description="Limit the number of items returned", ge=1, le=100),
+    expand: FrozenSet[str] = Depends(Expand(PROJECT_INVOICE_LOADING)),
     db: Session = Depends(get_db)
 ):
-    """Get all project invoices with pagination"""
-    invoices = ProjectService.get_all_invoices(db, skip=skip, limit=limit)
+    """Get all project invoices with pagination; ?expand=items,payments includes each invoice's items and payments"""
+    invoices = ProjectService.get_all_invoices(db, skip=skip, limit=limit, expand=expand)
     return invoices
 
-@router.get("/{project_id}/invoices", response_model=List[ProjectInvoiceSchema])
+@router.get("/invoices/export")
+def export_invoices(
+    request: Request,
+    format: str = ExportFormat,
+    project_id: Optional[int] = Query(None, description="Only the invoices of this project"),
+    db: Session = Depends(get_db)
+):
+    """Download every project invoice as NDJSON or CSV"""
+    statement = ProjectService.export_invoices_query(project_id=project_id)
+    return stream_export(db, request, statement, "project-invoices", format)
+
+@router.get("/{project_id}/invoices", response_model=List[ProjectInvoiceSchema], dependencies=[Depends(project_invoices_etag)])
 def get_project_invoices(
     project_id: int = Path(..., description="The ID of the project to get invoices for"),
     db: Session = Depends(get_db)
@@ -325,13 +364,13 @@ def create_project_invoice(
     
     return ProjectService.create_project_invoice(db, invoice)
 
-@router.get("/invoices/{invoice_id}", response_model=ProjectInvoiceSchema)
+@router.get("/invoices/{invoice_id}", response_model=ProjectInvoiceSchema, dependencies=[Depends(invoice_etag)])
 def get_project_invoice(
     invoice_id: int = Path(..., description="The ID of the invoice to get"),
     db: Session = Depends(get_db)
 ):
-    """Get a single project invoice by ID"""
-    db_invoice = ProjectService.get_project_invoice(db, invoice_id)
+    """Get a single project invoice by ID, with its items and payments"""
+    db_invoice = ProjectService.get_project_invoice(db, invoice_id, expand=PROJECT_INVOICE_LOADING.names)
     if db_invoice is None:
         raise HTTPException(
             status_code=404,
@@ -369,7 +408,7 @@ def delete_project_invoice(
     return success
 
 # Project Invoice Item endpoints
-@router.get("/invoices/{invoice_id}/items", response_model=List[ProjectInvoiceItemSchema])
+@router.get("/invoices/{invoice_id}/items", response_model=List[ProjectInvoiceItemSchema], dependencies=[Depends(invoice_items_etag)])
 def get_invoice_items(
     invoice_id: int = Path(..., description="The ID of the invoice to get items for"),
     db: Session = Depends(get_db)
@@ -409,7 +448,7 @@ def create_invoice_item(
     
     return ProjectService.create_invoice_item(db, item)
 
-@router.get("/invoice-items/{item_id}", response_model=ProjectInvoiceItemSchema)
+@router.get("/invoice-items/{item_id}", response_model=ProjectInvoiceItemSchema, dependencies=[Depends(invoice_item_etag)])
 def get_invoice_item(
     item_id: int = Path(..., description="The ID of the invoice item to get"),
     db: Session = Depends(get_db)
@@ -453,7 +492,7 @@ def delete_invoice_item(
     return success
 
 # Project Payment endpoints
-@router.get("/invoices/{invoice_id}/payments", response_model=List[ProjectPaymentSchema])
+@router.get("/invoices/{invoice_id}/payments", response_model=List[ProjectPaymentSchema], dependencies=[Depends(invoice_payments_etag)])
 def get_invoice_payments(
     invoice_id: int = Path(..., description="The ID of the invoice to get payments for"),
     db: Session = Depends(get_db)
@@ -493,7 +532,7 @@ def create_payment(
     
     return ProjectService.create_payment(db, payment)
 
-@router.get("/payments/{payment_id}", response_model=ProjectPaymentSchema)
+@router.get("/payments/{payment_id}", response_model=ProjectPaymentSchema, dependencies=[Depends(payment_etag)])
 def get_payment(
     payment_id: int = Path(..., description="The ID of the payment to get"),
     db: Session = Depends(get_db)
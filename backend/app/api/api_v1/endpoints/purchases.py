@@ -1,8 +1,10 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import FrozenSet, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.database import get_db
+from app.db.database import get_async_db, get_db
+from app.models.business_partners import Supplier
 from app.models.purchases import PurchaseOrder, PurchaseOrderItem, SupplierInvoice, SupplierPayment
 from app.schemas.purchase import (
     PurchaseOrder as PurchaseOrderSchema,
@@ -17,15 +19,18 @@ from app.schemas.purchase import (
     SupplierPaymentUpdate
 )
 from app.services.purchase_service import (
+    PURCHASE_ORDER_LOADING,
     create_purchase_order,
     get_purchase_order,
-    get_purchase_orders,
+    get_purchase_orders_async,
+    export_purchase_orders_query,
     update_purchase_order,
     delete_purchase_order,
     get_purchase_order_items,
     create_supplier_invoice,
     get_supplier_invoice,
     get_supplier_invoices,
+    export_supplier_invoices_query,
     update_supplier_invoice,
     delete_supplier_invoice,
     create_supplier_payment,
@@ -34,9 +39,21 @@ from app.services.purchase_service import (
     update_supplier_payment,
     delete_supplier_payment
 )
+from app.utils.expand import Expand
+from app.utils.export import ExportFormat, stream_export
+from app.utils.http_cache import AsyncCollectionETag, CollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+orders_etag = AsyncCollectionETag(PurchaseOrder, PurchaseOrderItem, Supplier)
+order_etag = ResourceETag(PurchaseOrder, "order_id", "items", "supplier")
+order_invoices_etag = ResourceETag(PurchaseOrder, "order_id", "invoices")
+invoices_etag = CollectionETag(SupplierInvoice)
+invoice_etag = ResourceETag(SupplierInvoice, "invoice_id")
+invoice_payments_etag = ResourceETag(SupplierInvoice, "invoice_id", "payments")
+payment_etag = ResourceETag(SupplierPayment, "payment_id")
+
 # Purchase Order endpoints
 @router.post("/orders", response_model=PurchaseOrderSchema, status_code=status.HTTP_201_CREATED)
 def create_new_purchase_order(
@@ -54,36 +71,53 @@ def create_new_purchase_order(
             detail={"error": "Failed to create purchase order", "message": str(e)}
         )
 
-@router.get("/orders", response_model=List[PurchaseOrderSchema])
-def read_purchase_orders(
+@router.get("/orders", response_model=List[PurchaseOrderSchema], dependencies=[Depends(orders_etag)])
+async def read_purchase_orders(
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
     search: Optional[str] = None,
     supplier_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    expand: FrozenSet[str] = Depends(Expand(PURCHASE_ORDER_LOADING)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Retrieve purchase orders with optional filtering
+    Retrieve purchase orders with optional filtering; ?expand=items,supplier includes each order's items and supplier name
     """
-    return get_purchase_orders(
+    return await get_purchase_orders_async(
         db=db, 
         skip=skip, 
         limit=limit, 
         status=status, 
         search=search,
-        supplier_id=supplier_id
+        supplier_id=supplier_id,
+        expand=expand
     )
 
-@router.get("/orders/{order_id}", response_model=PurchaseOrderSchema)
+@router.get("/orders/export")
+def export_purchase_orders(
+    request: Request,
+    format: str = ExportFormat,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    supplier_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download every purchase order matching the list filters as NDJSON or CSV, with its supplier's name
+    """
+    statement = export_purchase_orders_query(status=status, search=search, supplier_id=supplier_id)
+    return stream_export(db, request, statement, "purchase-orders", format)
+
+@router.get("/orders/{order_id}", response_model=PurchaseOrderSchema, dependencies=[Depends(order_etag)])
 def read_purchase_order(
     order_id: int,
     db: Session = Depends(get_db)
 ):
     """
-    Get a specific purchase order by ID
+    Get a specific purchase order by ID, with its items and supplier name
     """
-    db_order = get_purchase_order(db=db, order_id=order_id)
+    db_order = get_purchase_order(db=db, order_id=order_id, expand=PURCHASE_ORDER_LOADING.names)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Purchase order not found")
     return db_order
@@ -123,7 +157,7 @@ def delete_existing_purchase_order(
     delete_purchase_order(db=db, order_id=order_id)
     return {"detail": "Purchase order deleted successfully"}
 
-@router.get("/orders/{order_id}/items", response_model=List[PurchaseOrderItemSchema])
+@router.get("/orders/{order_id}/items", response_model=List[PurchaseOrderItemSchema], dependencies=[Depends(order_etag)])
 def read_purchase_order_items(
     order_id: int,
     db: Session = Depends(get_db)
@@ -162,7 +196,7 @@ def create_new_supplier_invoice(
             detail={"error": "Failed to create supplier invoice", "message": str(e)}
         )
 
-@router.get("/orders/{order_id}/invoices", response_model=List[SupplierInvoiceSchema])
+@router.get("/orders/{order_id}/invoices", response_model=List[SupplierInvoiceSchema], dependencies=[Depends(order_invoices_etag)])
 def read_supplier_invoices_for_order(
     order_id: int,
     skip: int = 0,
@@ -185,7 +219,7 @@ def read_supplier_invoices_for_order(
         order_id=order_id
     )
 
-@router.get("/invoices", response_model=List[SupplierInvoiceSchema])
+@router.get("/invoices", response_model=List[SupplierInvoiceSchema], dependencies=[Depends(invoices_etag)])
 def read_all_supplier_invoices(
     skip: int = 0,
     limit: int = 100,
@@ -202,7 +236,21 @@ def read_all_supplier_invoices(
         status=status
     )
 
-@router.get("/invoices/{invoice_id}", response_model=SupplierInvoiceSchema)
+@router.get("/invoices/export")
+def export_supplier_invoices(
+    request: Request,
+    format: str = ExportFormat,
+    status: Optional[str] = None,
+    order_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download every supplier invoice matching the filters as NDJSON or CSV
+    """
+    statement = export_supplier_invoices_query(status=status, order_id=order_id)
+    return stream_export(db, request, statement, "supplier-invoices", format)
+
+@router.get("/invoices/{invoice_id}", response_model=SupplierInvoiceSchema, dependencies=[Depends(invoice_etag)])
 def read_supplier_invoice(
     invoice_id: int,
     db: Session = Depends(get_db)
@@ -308,7 +356,7 @@ def create_new_supplier_payment(
             detail={"error": "Failed to create supplier payment", "message": str(e)}
         )
 
-@router.get("/invoices/{invoice_id}/payments", response_model=List[SupplierPaymentSchema])
+@router.get("/invoices/{invoice_id}/payments", response_model=List[SupplierPaymentSchema], dependencies=[Depends(invoice_payments_etag)])
 def read_supplier_payments(
     invoice_id: int,
     skip: int = 0,
@@ -329,7 +377,7 @@ def read_supplier_payments(
         invoice_id=invoice_id
     )
 
-@router.get("/invoices/{invoice_id}/payments/{payment_id}", response_model=SupplierPaymentSchema)
+@router.get("/invoices/{invoice_id}/payments/{payment_id}", response_model=SupplierPaymentSchema, dependencies=[Depends(payment_etag)])
 def read_supplier_payment(
     invoice_id: int,
     payment_id: int,
@@ -1,8 +1,10 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import FrozenSet, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.database import get_db
+from app.db.database import get_async_db, get_db
+from app.models.business_partners import Customer
 from app.models.sales import SalesOrder, SalesOrderItem, SalesInvoice, SalesPayment
 from app.schemas.sales import (
     SalesOrder as SalesOrderSchema,
@@ -17,15 +19,18 @@ from app.schemas.sales import (
     SalesPaymentUpdate
 )
 from app.services.sales_service import (
+    SALES_ORDER_LOADING,
     create_sales_order,
     get_sales_order,
-    get_sales_orders,
+    get_sales_orders_async,
+    export_sales_orders_query,
     update_sales_order,
     delete_sales_order,
     get_sales_order_items,
     create_sales_invoice,
     get_sales_invoice,
     get_sales_invoices,
+    export_sales_invoices_query,
     update_sales_invoice,
     delete_sales_invoice,
     create_sales_payment,
@@ -34,9 +39,20 @@ from app.services.sales_service import (
     update_sales_payment,
     delete_sales_payment
 )
+from app.utils.expand import Expand
+from app.utils.export import ExportFormat, stream_export
+from app.utils.http_cache import AsyncCollectionETag, CollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+orders_etag = AsyncCollectionETag(SalesOrder, SalesOrderItem, Customer)
+order_etag = ResourceETag(SalesOrder, "order_id", "items", "customer")
+invoices_etag = CollectionETag(SalesInvoice)
+invoice_etag = ResourceETag(SalesInvoice, "invoice_id")
+invoice_payments_etag = ResourceETag(SalesInvoice, "invoice_id", "payments")
+payment_etag = ResourceETag(SalesPayment, "payment_id")
+
 # Sales Order endpoints
 @router.post("/orders", response_model=SalesOrderSchema, status_code=status.HTTP_201_CREATED)
 def create_new_sales_order(
@@ -48,36 +64,53 @@ def create_new_sales_order(
     """
     return create_sales_order(db=db, order=order)
 
-@router.get("/orders", response_model=List[SalesOrderSchema])
-def read_sales_orders(
+@router.get("/orders", response_model=List[SalesOrderSchema], dependencies=[Depends(orders_etag)])
+async def read_sales_orders(
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
     search: Optional[str] = None,
     customer_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    expand: FrozenSet[str] = Depends(Expand(SALES_ORDER_LOADING)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Retrieve sales orders with optional filtering
+    Retrieve sales orders with optional filtering; ?expand=items,customer includes each order's items and customer name
     """
-    return get_sales_orders(
+    return await get_sales_orders_async(
         db=db, 
         skip=skip, 
         limit=limit, 
         status=status, 
         search=search,
-        customer_id=customer_id
+        customer_id=customer_id,
+        expand=expand
     )
 
-@router.get("/orders/{order_id}", response_model=SalesOrderSchema)
+@router.get("/orders/export")
+def export_sales_orders(
+    request: Request,
+    format: str = ExportFormat,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download every sales order matching the list filters as NDJSON or CSV, with its customer's name
+    """
+    statement = export_sales_orders_query(status=status, search=search, customer_id=customer_id)
+    return stream_export(db, request, statement, "sales-orders", format)
+
+@router.get("/orders/{order_id}", response_model=SalesOrderSchema, dependencies=[Depends(order_etag)])
 def read_sales_order(
     order_id: int,
     db: Session = Depends(get_db)
 ):
     """
-    Get a specific sales order by ID
+    Get a specific sales order by ID, with its items and customer name
     """
-    db_order = get_sales_order(db=db, order_id=order_id)
+    db_order = get_sales_order(db=db, order_id=order_id, expand=SALES_ORDER_LOADING.names)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Sales order not found")
     return db_order
@@ -110,7 +143,7 @@ def delete_existing_sales_order(
     delete_sales_order(db=db, order_id=order_id)
     return {"detail": "Sales order deleted successfully"}
 
-@router.get("/orders/{order_id}/items", response_model=List[SalesOrderItemSchema])
+@router.get("/orders/{order_id}/items", response_model=List[SalesOrderItemSchema], dependencies=[Depends(order_etag)])
 def read_sales_order_items(
     order_id: int,
     db: Session = Depends(get_db)
@@ -134,7 +167,7 @@ def create_new_sales_invoice(
     """
     return create_sales_invoice(db=db, invoice=invoice)
 
-@router.get("/invoices", response_model=List[SalesInvoiceSchema])
+@router.get("/invoices", response_model=List[SalesInvoiceSchema], dependencies=[Depends(invoices_etag)])
 def read_sales_invoices(
     skip: int = 0,
     limit: int = 100,
@@ -153,7 +186,21 @@ def read_sales_invoices(
         order_id=order_id
     )
 
-@router.get("/invoices/{invoice_id}", response_model=SalesInvoiceSchema)
+@router.get("/invoices/export")
+def export_sales_invoices(
+    request: Request,
+    format: str = ExportFormat,
+    status: Optional[str] = None,
+    order_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download every sales invoice matching the list filters as NDJSON or CSV
+    """
+    statement = export_sales_invoices_query(status=status, order_id=order_id)
+    return stream_export(db, request, statement, "sales-invoices", format)
+
+@router.get("/invoices/{invoice_id}", response_model=SalesInvoiceSchema, dependencies=[Depends(invoice_etag)])
 def read_sales_invoice(
     invoice_id: int,
     db: Session = Depends(get_db)
@@ -214,7 +261,7 @@ def create_new_sales_payment(
     
     return create_sales_payment(db=db, payment=payment)
 
-@router.get("/invoices/{invoice_id}/payments", response_model=List[SalesPaymentSchema])
+@router.get("/invoices/{invoice_id}/payments", response_model=List[SalesPaymentSchema], dependencies=[Depends(invoice_payments_etag)])
 def read_sales_payments(
     invoice_id: int,
     skip: int = 0,
@@ -235,7 +282,7 @@ def read_sales_payments(
         invoice_id=invoice_id
     )
 
-@router.get("/invoices/{invoice_id}/payments/{payment_id}", response_model=SalesPaymentSchema)
+@router.get("/invoices/{invoice_id}/payments/{payment_id}", response_model=SalesPaymentSchema, dependencies=[Depends(payment_etag)])
 def read_sales_payment(
     invoice_id: int,
     payment_id: int,
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
@@ -9,12 +9,19 @@ from app.services.supplier_service import (
     create_supplier,
     get_supplier,
     get_suppliers,
+    export_suppliers_query,
     update_supplier,
     delete_supplier
 )
+from app.utils.export import ExportFormat, stream_export
+from app.utils.http_cache import CollectionETag, ResourceETag
 
 router = APIRouter()
 
+# Validators for conditional GETs, see app.utils.http_cache
+suppliers_etag = CollectionETag(Supplier)
+supplier_etag = ResourceETag(Supplier, "supplier_id")
+
 @router.post("/", response_model=SupplierResponse, status_code=status.HTTP_201_CREATED)
 def create_new_supplier(
     supplier: SupplierCreate,
@@ -25,7 +32,7 @@ def create_new_supplier(
     """
     return create_supplier(db=db, supplier=supplier)
 
-@router.get("/", response_model=List[SupplierResponse])
+@router.get("/", response_model=List[SupplierResponse], dependencies=[Depends(suppliers_etag)])
 def read_suppliers(
     skip: int = 0,
     limit: int = 100,
@@ -38,7 +45,20 @@ def read_suppliers(
     """
     return get_suppliers(db=db, skip=skip, limit=limit, status=status, search=search)
 
-@router.get("/{supplier_id}", response_model=SupplierResponse)
+@router.get("/export")
+def export_suppliers(
+    request: Request,
+    format: str = ExportFormat,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download every supplier matching the list filters as NDJSON or CSV
+    """
+    return stream_export(db, request, export_suppliers_query(status=status, search=search), "suppliers", format)
+
+@router.get("/{supplier_id}", response_model=SupplierResponse, dependencies=[Depends(supplier_etag)])
 def read_supplier(
     supplier_id: int,
     db: Session = Depends(get_db)
@@ -1,6 +1,8 @@
 import os
+import json
+import tempfile
 from pydantic import BaseSettings
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,6 +21,12 @@ def get_database_url():
         # Fallback to SQLite for development if MySQL credentials are not available
         return os.getenv("DATABASE_URL", "sqlite:///./smartkoop.db")
 
+def get_async_database_url(url: str) -> str:
+    """The same database through an asyncio driver: aiosqlite for SQLite, aiomysql for MySQL"""
+    scheme, _, rest = url.partition("://")
+    drivers = {"sqlite": "sqlite+aiosqlite", "mysql": "mysql+aiomysql"}
+    return f"{drivers.get(scheme.split('+')[0], scheme)}://{rest}"
+
 class Settings(BaseSettings):
     # Application settings
     APP_NAME: str = "SmartKoop System"
@@ -27,6 +35,38 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str = get_database_url()
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(get_database_url())
+    
+    # Connection pools (the sync and async engines each get one of this size)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "300"))  # seconds
+    # Threads for sync endpoints and dependencies. Keep it above the connection count:
+    # a request still holding its connection needs a thread again to serialize the
+    # response, so with every thread waiting for a connection nothing moves
+    THREADPOOL_LIMIT: int = int(os.getenv("THREADPOOL_LIMIT") or 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW))
+    
+    # SQLite profile, applied on connect when DATABASE_URL is SQLite
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # durable in WAL mode except on power loss
+    SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds to wait for a lock
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", str(16 * 1024)))  # KiB per connection
+    SQLITE_FOREIGN_KEYS: bool = os.getenv("SQLITE_FOREIGN_KEYS", "True").lower() == "true"
+    SQLITE_SERIALIZE_WRITES: bool = os.getenv("SQLITE_SERIALIZE_WRITES", "True").lower() == "true"  # BEGIN IMMEDIATE on first write
+    
+    # Slow query log: statements slower than the threshold are kept, with their plan, at /admin/slow-queries
+    SLOW_QUERY_THRESHOLD: float = float(os.getenv("SLOW_QUERY_THRESHOLD", "0.2"))  # seconds, 0 disables
+    SLOW_QUERY_LOG_SIZE: int = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))  # distinct statements
+    SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "True").lower() == "true"
+    
+    # Read replicas for GET requests; comma-separated URLs, empty to read from the primary
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_MAX_LAG: float = float(os.getenv("REPLICA_MAX_LAG", "5"))  # seconds before a replica is skipped
+    REPLICA_CHECK_INTERVAL: int = int(os.getenv("REPLICA_CHECK_INTERVAL", "30"))  # seconds, 0 to disable
+    # After a client writes, its reads go to the primary for this many seconds
+    READ_YOUR_WRITES_WINDOW: int = int(os.getenv("READ_YOUR_WRITES_WINDOW", "10"))
     
     # JWT settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-for-jwt-please-change-in-production")
@@ -37,8 +77,69 @@ class Settings(BaseSettings):
     #BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000", "http://my-smartkoop-web.s3-website-us-east-1.amazonaws.com"]
     
+    # Conditional GETs: reference data (chart of accounts, fiscal periods, ...) may be
+    # reused by clients for this long; everything else is revalidated with its ETag
+    REFERENCE_DATA_MAX_AGE: int = int(os.getenv("REFERENCE_DATA_MAX_AGE", "60"))  # seconds
+    
+    # In-process cache of reference rows (accounts, fiscal periods, employees, customers,
+    # suppliers); a commit that writes one of these tables drops its cached rows
+    REFERENCE_CACHE_SIZE: int = int(os.getenv("REFERENCE_CACHE_SIZE", "1024"))  # rows per table
+    REFERENCE_CACHE_TTL: int = int(os.getenv("REFERENCE_CACHE_TTL", "300"))  # seconds, 0 disables
+    # Redis pub/sub that tells the other workers about those commits; without it they
+    # see each other's writes only once their entries expire
+    REFERENCE_CACHE_REDIS_URL: Optional[str] = os.getenv("REFERENCE_CACHE_REDIS_URL")
+    
+    # /export endpoints read this many rows per fetch from a server-side cursor
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # rows
+    
     # File storage
     UPLOAD_DIRECTORY: str = os.getenv("UPLOAD_DIRECTORY", "./uploads")
+    MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", str(250 * 1024 * 1024)))  # bytes
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # bytes
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")  # local or s3
+    
+    # Bulk ZIP uploads, limits apply to the uncompressed entries
+    BULK_UPLOAD_MAX_ENTRIES: int = int(os.getenv("BULK_UPLOAD_MAX_ENTRIES", "1000"))
+    BULK_UPLOAD_MAX_ENTRY_SIZE: int = int(os.getenv("BULK_UPLOAD_MAX_ENTRY_SIZE", str(50 * 1024 * 1024)))  # bytes
+    BULK_UPLOAD_MAX_TOTAL_SIZE: int = int(os.getenv("BULK_UPLOAD_MAX_TOTAL_SIZE", str(2 * 1024 * 1024 * 1024)))  # bytes
+    BULK_UPLOAD_MAX_COMPRESSION_RATIO: int = int(os.getenv("BULK_UPLOAD_MAX_COMPRESSION_RATIO", "100"))
+    BULK_UPLOAD_MAX_MANIFEST_SIZE: int = int(os.getenv("BULK_UPLOAD_MAX_MANIFEST_SIZE", str(5 * 1024 * 1024)))  # bytes
+    
+    # S3-compatible storage (STORAGE_BACKEND=s3)
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "smartkoop-documents")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL: Optional[str] = os.getenv("S3_ENDPOINT_URL")  # e.g. a local MinIO
+    S3_REGION: Optional[str] = os.getenv("S3_REGION")
+    S3_ACCESS_KEY_ID: Optional[str] = os.getenv("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY: Optional[str] = os.getenv("S3_SECRET_ACCESS_KEY")
+    S3_MULTIPART_THRESHOLD: int = int(os.getenv("S3_MULTIPART_THRESHOLD", str(16 * 1024 * 1024)))  # bytes
+    S3_MULTIPART_CHUNK_SIZE: int = int(os.getenv("S3_MULTIPART_CHUNK_SIZE", str(8 * 1024 * 1024)))  # bytes
+    S3_PRESIGN_EXPIRY: int = int(os.getenv("S3_PRESIGN_EXPIRY", "300"))  # seconds
+    S3_PRESIGN_DOWNLOADS: bool = os.getenv("S3_PRESIGN_DOWNLOADS", "True").lower() == "true"  # redirect instead of proxying
+    
+    # Cold tier for old document versions. DOCUMENT_ARCHIVE_POLICIES overrides per
+    # document_type as JSON, e.g. {"contract": {"min_age_days": 365, "codec": "zstd"},
+    # "receipt": {"min_age_days": null}} where a null age never archives that type
+    DOCUMENT_ARCHIVE_MIN_AGE_DAYS: Optional[int] = int(os.getenv("DOCUMENT_ARCHIVE_MIN_AGE_DAYS", "180"))
+    DOCUMENT_ARCHIVE_CODEC: str = os.getenv("DOCUMENT_ARCHIVE_CODEC", "zstd")  # zstd (needs zstandard) or gzip
+    DOCUMENT_ARCHIVE_POLICIES: Dict[str, Dict[str, Any]] = json.loads(os.getenv("DOCUMENT_ARCHIVE_POLICIES", "{}"))
+    DOCUMENT_ARCHIVE_BATCH_SIZE: int = int(os.getenv("DOCUMENT_ARCHIVE_BATCH_SIZE", "100"))
+    DOCUMENT_ARCHIVE_INTERVAL: int = int(os.getenv("DOCUMENT_ARCHIVE_INTERVAL", str(24 * 60 * 60)))  # seconds, 0 disables
+    
+    # Document expiry: expired documents are flagged and an expiring-soon digest is built
+    DOCUMENT_EXPIRY_WARNING_DAYS: int = int(os.getenv("DOCUMENT_EXPIRY_WARNING_DAYS", "30"))
+    DOCUMENT_EXPIRY_INTERVAL: int = int(os.getenv("DOCUMENT_EXPIRY_INTERVAL", str(60 * 60)))  # seconds, 0 disables
+    
+    # Periodic jobs that work on shared data (archiver, expiry) run in one worker process per
+    # host, whichever holds the lock file. Turn them off on all but one host when scaling out
+    SCHEDULED_JOBS_ENABLED: bool = os.getenv("SCHEDULED_JOBS_ENABLED", "True").lower() == "true"
+    SCHEDULED_JOBS_LOCK_FILE: str = os.getenv(
+        "SCHEDULED_JOBS_LOCK_FILE", os.path.join(tempfile.gettempdir(), "smartkoop-scheduled-jobs.lock")
+    )
+    
+    # Document search
+    SEARCH_INDEX_WORKERS: int = int(os.getenv("SEARCH_INDEX_WORKERS", "2"))  # text extraction threads
+    SEARCH_MAX_TEXT_LENGTH: int = int(os.getenv("SEARCH_MAX_TEXT_LENGTH", str(1000000)))  # characters per document
     
     # Currency settings
     DEFAULT_CURRENCY: str = "IDR"
@@ -1,18 +1,74 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.config import settings
+from app.config import settings, get_async_database_url
+from app.db.pool import pool_options
+from app.db.query_stats import name_database
+from app.db.replicas import Replica, ReplicaSet, routing_session_class
+from app.db.sqlite import apply_sqlite_profile
 
 # Create SQLAlchemy engine
-# Remove SQLite-specific connect_args for MySQL compatibility
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Enable connection health checks
-    pool_recycle=300     # Recycle connections every 5 minutes
+# Pool sizing comes from settings; see app.db.pool
+engine = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    apply_sqlite_profile(engine, serialize_writes=settings.SQLITE_SERIALIZE_WRITES)
+
+# Async engine for read paths that should not hold a threadpool worker per request
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    **pool_options(settings.ASYNC_DATABASE_URL, is_async=True)
 )
 
+# The async engine only serves reads, which never need the write lock
+if async_engine.dialect.name == "sqlite":
+    apply_sqlite_profile(async_engine, serialize_writes=False)
+
+# Query metrics are labelled by database; replicas are named below
+name_database(engine, "primary")
+name_database(async_engine, "primary")
+
+# Sync and async engines for one read replica, pooled like the primary
+def create_replica(index: int, url: str) -> Replica:
+    replica_engine = create_engine(url, **pool_options(url))
+    async_url = get_async_database_url(url)
+    replica_async_engine = create_async_engine(async_url, **pool_options(async_url, is_async=True))
+    # Replicas are only read from, so they never need the write lock
+    for bind in (replica_engine, replica_async_engine):
+        if bind.dialect.name == "sqlite":
+            apply_sqlite_profile(bind, serialize_writes=False)
+    name = f"replica-{index}"
+    name_database(replica_engine, name)
+    name_database(replica_async_engine, name)
+    return Replica(name, replica_engine, replica_async_engine)
+
+# Read replicas; with none configured, sessions always use the primary
+replicas = [
+    create_replica(index, url.strip())
+    for index, url in enumerate(settings.DATABASE_REPLICA_URLS.split(","), start=1)
+    if url.strip()
+]
+replica_set = ReplicaSet(engine, replicas, settings.REPLICA_MAX_LAG)
+async_replica_set = ReplicaSet(async_engine, replicas, settings.REPLICA_MAX_LAG, use_async=True)
+
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    class_=routing_session_class(replica_set)
+)
+
+# Objects stay usable after commit; lazy loads are not possible in async code anyway
+AsyncSessionLocal = sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=routing_session_class(async_replica_set),
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Create Base class
 Base = declarative_base()
@@ -24,3 +80,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,54 @@
+from typing import Any, Iterable, List
+from pydantic.utils import GetterDict
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+
+class LoadProfile:
+    """
+    The relationships a response for `model` can include, by the name clients
+    pass in ?expand=, and how each is loaded: collections with one
+    SELECT ... IN per level, many-to-one relationships joined into the query.
+    A dotted path loads nested relationships along with the first one, e.g.
+    "tasks.time_entries" with "tasks".
+
+    Relationships left out of an expansion are set to raise rather than load
+    one row at a time; LoadedGetterDict serializes them as null.
+    """
+
+    def __init__(self, model, *paths: str):
+        self.model = model
+        self.paths = paths
+        self.names = tuple(dict.fromkeys(path.split(".")[0] for path in paths))
+
+    def options(self, expand: Iterable[str] = ()) -> List[Any]:
+        """Loader options for a query returning `model`, loading the `expand` relationships and no others"""
+        expand = set(expand)
+        options = [raiseload(getattr(self.model, name)) for name in self.names if name not in expand]
+        options.extend(self._loader(path) for path in self.paths if path.split(".")[0] in expand)
+        return options
+
+    def _loader(self, path: str):
+        option, entity = None, self.model
+        for name in path.split("."):
+            attribute = getattr(entity, name)
+            collection = attribute.property.uselist
+            if option is None:
+                option = selectinload(attribute) if collection else joinedload(attribute)
+            else:
+                option = option.selectinload(attribute) if collection else option.joinedload(attribute)
+            entity = attribute.property.mapper.class_
+        return option
+
+
+class LoadedGetterDict(GetterDict):
+    """
+    Reads ORM objects for orm_mode schemas, giving None for a relationship
+    its query set to raise (see LoadProfile) instead of failing the response.
+    """
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        try:
+            return getattr(self._obj, key, default)
+        except InvalidRequestError:
+            return None
@@ -0,0 +1,92 @@
+from typing import Dict, Any
+import threading
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+
+class _WaitStatsMixin:
+    """Records how long checkouts wait for a connection, including timeouts"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+class InstrumentedQueuePool(_WaitStatsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """
+    create_engine arguments for a sized, instrumented connection pool.
+    In-memory SQLite keeps SQLAlchemy's default single-connection pool.
+    """
+    parsed = make_url(url)
+    options: Dict[str, Any] = {"pool_pre_ping": True, "pool_recycle": settings.DB_POOL_RECYCLE}
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:"):
+            return options
+        # SQLAlchemy defaults file databases to one connection per checkout; pooled
+        # connections move between threadpool workers, as they do on MySQL
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+    options.update({
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    })
+    return options
+
+
+def get_pool_stats(engine) -> Dict[str, Any]:
+    """Occupancy and wait statistics of an engine's pool"""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # Negative while fewer than pool_size connections have been opened
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, _WaitStatsMixin):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "timeouts": pool.timeouts,
+                "wait_seconds_total": round(pool.total_wait, 6),
+                "wait_seconds_max": round(pool.max_wait, 6),
+                "wait_seconds_avg": round(pool.total_wait / pool.checkouts, 6) if pool.checkouts else 0.0,
+            })
+    return stats
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+import time
+import weakref
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.db.slow_queries import slow_query_log
+from app.utils.metrics import DB_QUERY_DURATION
+
+
+class QueryStats:
+    """Database queries issued while handling one request"""
+
+    def __init__(self, scope: Optional[Dict[str, Any]] = None):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+
+    @property
+    def route(self) -> Optional[str]:
+        """Method and route template of the request, once it has been routed"""
+        if self.scope is None:
+            return None
+        return f"{self.scope['method']} {getattr(self.scope.get('route'), 'path', self.scope['path'])}"
+
+
+# Set for the duration of a request; the threadpool and async sessions run in a
+# copy of the request's context, so they add to the same QueryStats
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(scope: Optional[Dict[str, Any]] = None):
+    """Count the queries run inside the block, e.g. the request with ASGI `scope`, and the time spent in them"""
+    stats = QueryStats(scope)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# Metric label per engine, e.g. primary or replica-1; async engines by their sync facade
+_database_names: "weakref.WeakKeyDictionary[Engine, str]" = weakref.WeakKeyDictionary()
+
+
+def name_database(engine, name: str) -> None:
+    """Label the queries `engine` runs with `name` in the metrics"""
+    _database_names[getattr(engine, "sync_engine", engine)] = name
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    DB_QUERY_DURATION.observe(elapsed, _database_names.get(conn.engine, "other"))
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if settings.SLOW_QUERY_THRESHOLD and elapsed >= settings.SLOW_QUERY_THRESHOLD:
+        slow_query_log.record(
+            conn,
+            statement,
+            parameters,
+            executemany,
+            elapsed,
+            stats and stats.route,
+            streamed=bool(context is not None and context.execution_options.get("stream_results"))
+        )
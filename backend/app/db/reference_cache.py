@@ -0,0 +1,252 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+import weakref
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_mapper
+from sqlalchemy.orm.util import identity_key
+from app.config import settings
+from app.db.replicas import reads_from_replica
+
+logger = logging.getLogger(__name__)
+
+# Every ReferenceCache, so commits can find the ones they invalidate
+_caches: "weakref.WeakSet[ReferenceCache]" = weakref.WeakSet()
+
+# Session.info key for the cached tables written by the session's transaction
+_WRITES = "reference_writes"
+
+
+class ReferenceCache:
+    """
+    Rows of one rarely written table, kept in process across requests and
+    looked up by any column. Entries expire after `ttl` seconds, the least
+    recently used are evicted beyond `max_size`, and a committed write to the
+    table drops them all.
+
+    Rows are kept as column values and merged into the caller's session
+    without a query, so callers get an ordinary persistent instance they may
+    update or delete. Missing rows are cached too, which keeps duplicate
+    checks cheap.
+    """
+
+    def __init__(self, model, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        self.model = model
+        self.table = model.__table__.name
+        self.max_size = settings.REFERENCE_CACHE_SIZE if max_size is None else max_size
+        self.ttl = settings.REFERENCE_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        mapper = inspect(model)
+        self._columns = [prop.key for prop in mapper.column_attrs]
+        self._primary_key = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on invalidation, so a lookup racing a commit does not store what it read before it
+        self._generation = 0
+        _caches.add(self)
+
+    def get(self, db: Session, column: str, value: Any):
+        """The row whose `column` equals `value`, or None"""
+        if self.ttl <= 0 or self.table in db.info.get(_WRITES, ()):
+            # The session's own uncommitted writes are not in the cache
+            return self._query(db, column, value)
+
+        key = (column, value)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                values = entry[1]
+            else:
+                self.misses += 1
+                generation = self._generation
+                entry = None
+        if entry is not None:
+            return self._attach(db, values)
+
+        instance = self._query(db, column, value)
+        if reads_from_replica(db):
+            # A lagging replica could refill the cache with rows older than the last commit
+            return instance
+        values = None if instance is None else {name: getattr(instance, name) for name in self._columns}
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, values)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return instance
+
+    def _query(self, db: Session, column: str, value: Any):
+        return db.query(self.model).filter(getattr(self.model, column) == value).first()
+
+    def _attach(self, db: Session, values: Optional[Dict[str, Any]]):
+        if values is None:
+            return None
+        key = identity_key(self.model, tuple(values[name] for name in self._primary_key))
+        instance = db.identity_map.get(key)
+        if instance is not None:
+            # Keep the session's own copy, with any changes it has not flushed
+            return instance
+        instance = self.model(**values)
+        make_transient_to_detached(instance)
+        return db.merge(instance, load=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+class RedisInvalidationChannel:
+    """
+    Redis pub/sub between workers: each publishes the tables its commits
+    wrote and drops its entries for tables written by the others. Messages
+    sent while a worker is disconnected are lost, so it clears everything
+    whenever it (re)subscribes.
+    """
+
+    def __init__(self, url: str, name: str = "reference-cache"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.name = name
+        self.source = uuid.uuid4().hex
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._listen, name="reference-cache-invalidation", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        self.client.close()
+
+    def publish(self, tables: Iterable[str]) -> None:
+        try:
+            self.client.publish(self.name, json.dumps({"source": self.source, "tables": sorted(tables)}))
+        except Exception as e:
+            # The other workers see the write once their entries expire
+            logger.warning(f"Could not publish reference cache invalidation: {e}")
+
+    def _handle(self, message: Dict[str, Any]) -> None:
+        try:
+            payload = json.loads(message["data"])
+            source, tables = payload["source"], payload["tables"]
+        except (TypeError, ValueError, KeyError):
+            logger.warning(f"Ignoring malformed reference cache invalidation: {message.get('data')!r}")
+            return
+        if source != self.source:
+            invalidate(tables, publish=False)
+
+    def _listen(self) -> None:
+        while not self._stopped.is_set():
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.name)
+                invalidate({cache.table for cache in list(_caches)}, publish=False)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._handle(message)
+            except Exception as e:
+                logger.warning(f"Reference cache invalidation channel failed, retrying: {e}")
+                self._stopped.wait(5)
+            finally:
+                pubsub.close()
+
+
+_channel: Optional[RedisInvalidationChannel] = None
+
+
+def start_invalidation_channel(url: str) -> None:
+    """Keep this worker's caches coherent with other workers' writes"""
+    global _channel
+    _channel = RedisInvalidationChannel(url)
+    _channel.start()
+
+
+def stop_invalidation_channel() -> None:
+    global _channel
+    if _channel is not None:
+        _channel.stop()
+        _channel = None
+
+
+def invalidate(tables: Iterable[str], publish: bool = True) -> None:
+    """Drop the cached rows of `tables`, and by default tell the other workers to do the same"""
+    tables = set(tables)
+    caches = [cache for cache in list(_caches) if cache.table in tables]
+    for cache in caches:
+        cache.invalidate()
+    if publish and caches and _channel is not None:
+        _channel.publish({cache.table for cache in caches})
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {cache.table: cache.stats() for cache in sorted(_caches, key=lambda cache: cache.table)}
+
+
+def _record_writes(session: Session, tables: Iterable[str]) -> None:
+    tables = set(tables) & {cache.table for cache in list(_caches)}
+    if tables:
+        session.info.setdefault(_WRITES, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_writes(session, flush_context):
+    _record_writes(session, {
+        object_mapper(instance).local_table.name
+        for instance in itertools.chain(session.new, session.dirty, session.deleted)
+    })
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_writes(orm_execute_state):
+    # query.update() and query.delete() bypass the flush
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None:
+        _record_writes(orm_execute_state.session, [orm_execute_state.bind_mapper.local_table.name])
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_writes(session):
+    if session.in_nested_transaction():
+        # Releasing a savepoint commits nothing yet
+        return
+    tables = session.info.pop(_WRITES, None)
+    if tables:
+        invalidate(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_writes(session):
+    if not session.in_nested_transaction():
+        session.info.pop(_WRITES, None)
@@ -0,0 +1,165 @@
+from typing import List, Optional, Dict, Any
+from contextlib import contextmanager
+from contextvars import ContextVar
+import itertools
+import logging
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ClauseElement
+
+logger = logging.getLogger(__name__)
+
+# Set for the duration of a read-only request; sessions outside one (writes,
+# background jobs) always use the primary
+_use_replicas: ContextVar[bool] = ContextVar("use_replicas", default=False)
+
+
+@contextmanager
+def read_from_replicas(enabled: bool = True):
+    """Route sessions used inside the block to the replicas, e.g. for a report job"""
+    token = _use_replicas.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+class Replica:
+    """One replica database, its sync and async engines and its last known health"""
+
+    def __init__(self, name: str, engine, async_engine=None):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+        for bind in (engine, async_engine):
+            if bind is not None:
+                event.listen(getattr(bind, "sync_engine", bind), "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        # Failing to connect or losing the connection takes the replica out of
+        # rotation until the next successful check
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(str(context.original_exception))
+
+    def mark_down(self, error: str) -> None:
+        if self.healthy:
+            logger.warning(f"Database replica {self.name} is unavailable: {error}")
+        self.healthy = False
+        self.error = error[:255]
+
+
+class ReplicaSet:
+    """
+    The primary engine plus the replicas that reads are spread over round-robin.
+    With `use_async`, sessions are bound to the async engines' sync facades, as
+    AsyncSession requires.
+    """
+
+    def __init__(self, primary, replicas: List[Replica], max_lag: float, use_async: bool = False):
+        self.primary = getattr(primary, "sync_engine", primary)
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.use_async = use_async
+        self._counter = itertools.count()
+
+    def choose(self):
+        """A healthy replica, or the primary when none is"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return self.primary
+        replica = healthy[next(self._counter) % len(healthy)]
+        return replica.async_engine.sync_engine if self.use_async else replica.engine
+
+    @staticmethod
+    def _measure_lag(connection) -> Optional[float]:
+        """Seconds the replica is behind its source; 0 when the database is not replicated"""
+        if connection.dialect.name != "mysql":
+            return 0.0
+        for statement, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                row = connection.exec_driver_sql(statement).mappings().first()
+            except Exception:
+                continue
+            if row is None:
+                return 0.0  # not set up as a replica, e.g. a stand-in copy
+            value = row.get(column)
+            return None if value is None else float(value)  # NULL while replication is stopped
+        return 0.0
+
+    def check(self) -> None:
+        """Probe each replica, marking it down when unreachable or lagging beyond max_lag"""
+        for replica in self.replicas:
+            replica.checked_at = time.time()
+            try:
+                with replica.engine.connect() as connection:
+                    lag = self._measure_lag(connection)
+            except Exception as e:
+                replica.mark_down(str(e))
+                continue
+            replica.lag = lag
+            if lag is None:
+                replica.mark_down("replication is stopped")
+            elif lag > self.max_lag:
+                replica.mark_down(f"{lag:g}s behind the primary")
+            else:
+                if not replica.healthy:
+                    logger.info(f"Database replica {replica.name} is available again")
+                replica.healthy = True
+                replica.error = None
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "lag_seconds": replica.lag,
+                "error": replica.error
+            }
+            for replica in self.replicas
+        ]
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from a replica inside read-only requests. Writes, and
+    every statement after the session's first write, go to the primary so the
+    session reads its own writes.
+    """
+
+    replica_set: Optional[ReplicaSet] = None
+
+    def get_bind(self, mapper=None, clause: Optional[ClauseElement] = None, **kw):
+        replica_set = self.replica_set
+        if replica_set is None or not replica_set.replicas:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        if self._flushing or (clause is not None and (
+            not getattr(clause, "is_select", False) or getattr(clause, "_for_update_arg", None) is not None
+        )):
+            # INSERT, UPDATE, DELETE, SELECT ... FOR UPDATE and textual SQL
+            self.info["wrote"] = True
+        if self.info.get("wrote") or not _use_replicas.get():
+            return replica_set.primary
+        bind = self.info.get("replica")
+        if bind is None:
+            # One replica for the whole session, so its reads are consistent
+            bind = self.info["replica"] = replica_set.choose()
+        return bind
+
+
+def reads_from_replica(session: Session) -> bool:
+    """Whether the session's reads currently go to a replica rather than the primary"""
+    return session.info.get("replica") is not None and not session.info.get("wrote")
+
+
+def routing_session_class(replica_set: ReplicaSet) -> type:
+    """A RoutingSession subclass bound to one replica set"""
+    return type("RoutingSession", (RoutingSession,), {"replica_set": replica_set})
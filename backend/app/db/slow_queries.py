@@ -0,0 +1,159 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import hashlib
+import logging
+import re
+import sys
+import threading
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bound parameters in each DBAPI style, and literals, all become ?
+_PARAMETERS = re.compile(r"%\(\w+\)s|%s|\?")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# IN (?, ?, ?) with any number of values is the same statement
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Statements the databases can EXPLAIN without running them
+_EXPLAINABLE = ("select", "with", "update", "delete")
+
+
+def normalize_statement(statement: str) -> str:
+    """The statement with parameters and literals replaced, to group executions of the same query"""
+    statement = _PARAMETERS.sub("?", statement)
+    statement = _LITERALS.sub("?", statement)
+    statement = _LISTS.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def _shape(value: Any) -> str:
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+def parameter_shapes(parameters, executemany: bool) -> Any:
+    """Types (and lengths) of the bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "first": parameter_shapes(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: _shape(value) for name, value in parameters.items()}
+    return [_shape(value) for value in parameters or ()]
+
+
+def _origin() -> Optional[str]:
+    """The innermost application function outside the database layer on the stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and not module.startswith("app.db."):
+            return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+
+def explain(connection, statement: str, parameters) -> List[Dict[str, Any]]:
+    """
+    The plan for `statement`, run on the connection that executed it with a
+    cursor of its own, so it sees the same transaction and fires no events
+    """
+    prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """
+    The slowest statements seen by this process, one entry per normalized
+    statement with its execution count and timings. Holds at most `size`
+    entries, dropping the one seen least recently. The first execution of
+    each statement is EXPLAINed with its actual parameters.
+    """
+
+    def __init__(self, size: int, explain_plans: bool = True):
+        self.size = size
+        self.explain_plans = explain_plans
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        connection,
+        statement: str,
+        parameters,
+        executemany: bool,
+        seconds: float,
+        route: Optional[str] = None,
+        streamed: bool = False
+    ) -> None:
+        """
+        Count one execution. A `streamed` statement (stream_results) is not
+        EXPLAINed: its rows are still unread on the connection, and on an
+        unbuffered cursor such as pymysql's SSCursor another statement there
+        would break the pending result.
+        """
+        normalized = normalize_statement(statement)
+        fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            is_new = entry is None
+            if is_new:
+                entry = self._entries[fingerprint] = {
+                    "fingerprint": fingerprint,
+                    "statement": normalized,
+                    "database": connection.dialect.name,
+                    "parameters": parameter_shapes(parameters, executemany),
+                    "route": route,
+                    "origin": _origin(),
+                    "count": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "first_seen": now,
+                    "plan": None,
+                    "plan_error": None
+                }
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(fingerprint)
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["last_seconds"] = seconds
+            entry["last_seen"] = now
+
+        if not is_new:
+            return
+        logger.warning(
+            f"Slow query ({seconds * 1000:.0f} ms) from {entry['origin'] or route or 'unknown'}: {normalized[:500]}"
+        )
+        if self.explain_plans and not executemany and not streamed and normalized.lower().startswith(_EXPLAINABLE):
+            try:
+                entry["plan"] = explain(connection, statement, parameters)
+            except Exception as e:
+                entry["plan_error"] = str(e)[:255]
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Entries with the most total time first"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        for entry in entries:
+            entry["avg_seconds"] = entry["total_seconds"] / entry["count"]
+        return sorted(entries, key=lambda entry: entry["total_seconds"], reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE, explain_plans=settings.SLOW_QUERY_EXPLAIN)
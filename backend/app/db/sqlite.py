@@ -0,0 +1,97 @@
+from typing import List
+import threading
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app.config import settings
+
+# Statements that need the write lock; a transaction that starts with one of
+# these begins IMMEDIATE instead of upgrading a read lock later
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "SAVEPOINT")
+
+# Held by the one connection in this process that has a write transaction open
+_write_lock = threading.Lock()
+_LOCK_KEY = "sqlite_write_lock"
+
+
+def sqlite_pragmas() -> List[str]:
+    """Per-connection settings of the SQLite profile"""
+    pragmas = [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        # Negative sizes are in KiB rather than pages
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE}",
+    ]
+    if settings.SQLITE_FOREIGN_KEYS:
+        pragmas.append("PRAGMA foreign_keys=ON")
+    return pragmas
+
+
+def _release_write_lock(info) -> None:
+    if info.pop(_LOCK_KEY, False):
+        _write_lock.release()
+
+
+def apply_sqlite_profile(engine, serialize_writes: bool = True) -> None:
+    """
+    Tune an SQLite engine for concurrent API use: WAL so readers never wait for
+    the writer, a busy timeout instead of immediate lock errors, and a larger
+    page cache and memory map.
+
+    With `serialize_writes`, writers queue on a lock in this process and then
+    begin IMMEDIATE. SQLite's own busy handler polls, so under contention some
+    writers keep losing until busy_timeout runs out with "database is locked";
+    the lock hands over to one waiter at a time instead. busy_timeout still
+    covers other processes such as migrations or a second worker.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "connect")
+    def _configure(dbapi_connection, connection_record):
+        if serialize_writes:
+            # Reads run without a transaction; writes are begun below
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+
+    if not serialize_writes:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _begin_on_write(conn, cursor, statement, parameters, context, executemany):
+        if cursor.connection.in_transaction or not statement.lstrip()[:9].upper().startswith(_WRITE_PREFIXES):
+            return
+        if not conn.info.get(_LOCK_KEY):
+            if not _write_lock.acquire(timeout=settings.SQLITE_BUSY_TIMEOUT / 1000):
+                raise OperationalError(statement, parameters, Exception("database is locked"))
+            conn.info[_LOCK_KEY] = True
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            _release_write_lock(conn.info)
+            raise OperationalError("BEGIN IMMEDIATE", (), e) from e
+
+    @event.listens_for(sync_engine, "commit")
+    def _commit(conn):
+        # Commit before handing over, so the next writer finds the database free;
+        # SQLAlchemy's own commit afterwards has nothing left to do
+        try:
+            conn.connection.commit()
+        finally:
+            _release_write_lock(conn.info)
+
+    @event.listens_for(sync_engine, "rollback")
+    def _rollback(conn):
+        try:
+            conn.connection.rollback()
+        finally:
+            _release_write_lock(conn.info)
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        # A connection returned mid-transaction, e.g. after being invalidated
+        _release_write_lock(connection_record.info)
@@ -1,11 +1,143 @@
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.db.query_stats import track_queries
+from app.utils import metrics
+from typing import Optional
+import asyncio
+import logging
 import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class JobLock:
+    """
+    An exclusive, non-blocking lock on a file, so of the worker processes on a
+    host only one runs the jobs that work on shared data. The OS releases it
+    when its worker exits, and another worker takes over on its next attempt.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Whether this process holds the lock, taking it if it is free"""
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            # No flock (Windows): a single development worker
+            return True
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+async def run_periodically(interval: int, job, name: str, lock: Optional[JobLock] = None):
+    """
+    Run a blocking job on the threadpool every `interval` seconds; with a
+    `lock`, only while this process holds it
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if lock is not None and not lock.acquire():
+            continue
+        try:
+            await run_in_threadpool(job)
+        except Exception:
+            logger.exception(f"{name} run failed")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.db.database import SessionLocal, async_engine, replica_set
+    from app.db.reference_cache import start_invalidation_channel, stop_invalidation_channel
+    from app.services.archive_service import ArchiveService
+    from app.services.expiry_service import ExpiryService
+    from app.services.search_service import SearchService
+
+    # Size the threadpool for sync endpoints relative to the connection pool
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_LIMIT
+    # Requests may hold a connection from the primary's pool or any replica's
+    connections = (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW) * (len(replica_set.replicas) + 1)
+    if settings.THREADPOOL_LIMIT <= connections:
+        logger.warning(
+            f"THREADPOOL_LIMIT ({settings.THREADPOOL_LIMIT}) does not exceed the {connections} pooled "
+            "connections; under load, requests holding a connection can stall waiting for a thread"
+        )
+
+    # Resume text extraction for documents uploaded before the last shutdown
+    db = SessionLocal()
+    try:
+        SearchService.schedule_pending(db)
+    except Exception:
+        # The search tables do not exist until migrations have run
+        pass
+    finally:
+        db.close()
+
+    # Hear about reference data written by the other workers
+    if settings.REFERENCE_CACHE_REDIS_URL:
+        start_invalidation_channel(settings.REFERENCE_CACHE_REDIS_URL)
+
+    # Take unreachable or lagging replicas out of rotation before the first request
+    if replica_set.replicas:
+        await run_in_threadpool(replica_set.check)
+    
+    # Shared work: one worker process runs it, see JobLock
+    job_lock = JobLock(settings.SCHEDULED_JOBS_LOCK_FILE)
+    shared_jobs = [
+        # Moves old document versions to the compressed tier
+        (settings.DOCUMENT_ARCHIVE_INTERVAL, ArchiveService.run_archiver, "Document archiver"),
+        # Flags expired documents and logs the expiring-soon digest
+        (settings.DOCUMENT_EXPIRY_INTERVAL, ExpiryService.run_expiry_job, "Document expiry"),
+    ]
+    jobs = [
+        (interval, job, name, job_lock)
+        for interval, job, name in shared_jobs
+        if settings.SCHEDULED_JOBS_ENABLED
+    ] + [
+        # Puts recovered replicas back into rotation and drops lagging ones; every worker has its own view
+        (settings.REPLICA_CHECK_INTERVAL if replica_set.replicas else 0, replica_set.check, "Replica health check", None),
+    ]
+    tasks = [
+        asyncio.create_task(run_periodically(interval, job, name, lock))
+        for interval, job, name, lock in jobs
+        if interval > 0
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    job_lock.release()
+    SearchService.shutdown()
+    stop_invalidation_channel()
+    await async_engine.dispose()
+    for replica in replica_set.replicas:
+        await replica.async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc",
@@ -20,6 +152,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cookie holding the time until which a client that wrote reads from the primary
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+@app.middleware("http")
+async def route_reads_to_replicas(request: Request, call_next):
+    """
+    Serve GET and HEAD requests from the read replicas. A client that made a
+    successful write gets a short-lived cookie so its next reads see that write.
+    """
+    from app.db.database import replica_set
+    from app.db.replicas import read_from_replicas
+
+    if not replica_set.replicas:
+        return await call_next(request)
+
+    try:
+        primary_until = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    is_read = request.method in ("GET", "HEAD")
+    with read_from_replicas(is_read and primary_until < time.time()):
+        response = await call_next(request)
+    if not is_read and response.status_code < 400 and settings.READ_YOUR_WRITES_WINDOW > 0:
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            str(int(time.time() + settings.READ_YOUR_WRITES_WINDOW)),
+            max_age=settings.READ_YOUR_WRITES_WINDOW,
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Per-route latency, status and database use for /metrics, and a
+    Server-Timing header with the request's query count and database time.
+    Streaming responses are timed until their headers are sent.
+    """
+    started = time.perf_counter()
+    status = 500
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    try:
+        with track_queries(request.scope) as queries:
+            response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.REQUESTS_IN_FLIGHT.inc(amount=-1)
+        # The route template, so /customers/1 and /customers/2 share one series
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.REQUEST_DURATION.observe(elapsed, request.method, route)
+        metrics.REQUESTS.inc(request.method, route, status)
+        metrics.REQUEST_DB_QUERIES.inc(request.method, route, amount=queries.count)
+        metrics.REQUEST_DB_TIME.inc(request.method, route, amount=queries.seconds)
+    response.headers.append(
+        "Server-Timing",
+        f'db;desc="{queries.count} queries";dur={queries.seconds * 1000:.1f}, total;dur={elapsed * 1000:.1f}'
+    )
+    return response
+
 # Create upload directory if it doesn't exist
 os.makedirs(settings.UPLOAD_DIRECTORY, exist_ok=True)
 
@@ -28,10 +221,101 @@ os.makedirs(settings.UPLOAD_DIRECTORY, exist_ok=True)
 async def root():
     return {"message": "Welcome to SmartKoop System API"}
 
-# Health check endpoint
+# Health check endpoint: a database round trip and the pool state
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    from app.db.database import engine, async_engine
+    from app.db.pool import get_pool_stats
+
+    started = time.perf_counter()
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"Health check could not reach the database: {e}")
+        return JSONResponse(status_code=503, content={"status": "unhealthy", "database": {"error": str(e)[:255]}})
+    return {
+        "status": "healthy",
+        "database": {
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "pool": get_pool_stats(engine),
+            "pool_async": get_pool_stats(async_engine)
+        }
+    }
+
+# Connection pool and threadpool usage
+@app.get("/health/pool")
+async def pool_stats():
+    from app.db.database import engine, async_engine, replica_set
+    from app.db.pool import get_pool_stats
+
+    limiter = to_thread.current_default_thread_limiter().statistics()
+    return {
+        "database": get_pool_stats(engine),
+        "database_async": get_pool_stats(async_engine),
+        "threadpool": {
+            "limit": limiter.total_tokens,
+            "busy": limiter.borrowed_tokens,
+            "waiting": limiter.tasks_waiting
+        },
+        "replicas": [
+            {
+                **status,
+                "database": get_pool_stats(replica.engine),
+                "database_async": get_pool_stats(replica.async_engine)
+            }
+            for replica, status in zip(replica_set.replicas, replica_set.status())
+        ]
+    }
+
+# Reference data cache hit rates, for tuning REFERENCE_CACHE_SIZE and REFERENCE_CACHE_TTL
+@app.get("/health/cache")
+async def cache_stats():
+    from app.db.reference_cache import cache_stats as reference_cache_stats
+
+    return reference_cache_stats()
+
+# Slowest statements seen by this worker, with their query plans
+@app.get("/admin/slow-queries")
+async def slow_queries(limit: int = 50):
+    from app.db.slow_queries import slow_query_log
+
+    return {
+        "threshold_seconds": settings.SLOW_QUERY_THRESHOLD,
+        "queries": slow_query_log.entries()[:limit]
+    }
+
+@app.delete("/admin/slow-queries", status_code=204)
+async def clear_slow_queries():
+    from app.db.slow_queries import slow_query_log
+
+    slow_query_log.clear()
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    from app.db.database import engine, async_engine, replica_set
+    from app.db.pool import get_pool_stats
+
+    binds = [("primary", engine), ("primary-async", async_engine)]
+    for replica in replica_set.replicas:
+        binds.extend([(replica.name, replica.engine), (f"{replica.name}-async", replica.async_engine)])
+    for name, bind in binds:
+        stats = get_pool_stats(bind)
+        if "size" in stats:
+            metrics.DB_POOL_SIZE.set(name, value=stats["size"])
+            metrics.DB_POOL_CHECKED_OUT.set(name, value=stats["checked_out"])
+            metrics.DB_POOL_OVERFLOW.set(name, value=max(stats["overflow"], 0))
+        if "checkouts" in stats:
+            metrics.DB_POOL_CHECKOUTS.set(name, value=stats["checkouts"])
+            metrics.DB_POOL_TIMEOUTS.set(name, value=stats["timeouts"])
+            metrics.DB_POOL_WAIT.set(name, value=stats["wait_seconds_total"])
+
+    limiter = to_thread.current_default_thread_limiter().statistics()
+    metrics.THREADPOOL_BUSY.set(value=limiter.borrowed_tokens)
+    metrics.THREADPOOL_WAITING.set(value=limiter.tasks_waiting)
+    metrics.THREADPOOL_LIMIT.set(value=limiter.total_tokens)
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
 
 # Include API routers
 from app.api.api_v1.api import api_router
@@ -9,7 +9,7 @@ from app.models.accounting import (
     ChartOfAccounts, JournalEntry, LedgerEntry, FiscalPeriod,
     Payroll, PayrollItem, Employee
 )
-from app.models.documents import Document, DocumentVersion
+from app.models.documents import Document, DocumentVersion, DocumentBlob, DocumentTag, DocumentTagLink, DocumentText
 
 # For Alembic migrations
 from app.db.database import Base
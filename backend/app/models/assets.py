@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, Date, Numeric, Text
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, Date, Numeric, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from app.models.base import BaseModel
@@ -35,6 +35,12 @@ class AssetDepreciation(Base, BaseModel):
     
     # Relationships
     asset = relationship("Asset", back_populates="depreciation_entries")
+    
+    # Depreciation runs look up the latest entry per asset and per period; one entry
+    # per asset and date keeps concurrent runs from depreciating an asset twice
+    __table_args__ = (
+        UniqueConstraint("asset_id", "depreciation_date", name="uq_assetdepreciation_asset_id_date"),
+    )
 
 
 class AssetMaintenance(Base, BaseModel):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, func
+from sqlalchemy import Column, Integer, DateTime, func, literal_column
 from sqlalchemy.ext.declarative import declared_attr
 from app.db.database import Base
 from datetime import datetime
@@ -9,6 +9,8 @@ class BaseModel:
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Bumped by every UPDATE, bulk ones included, for validators finer than updated_at's whole seconds on MySQL
+    row_version = Column(Integer, default=1, server_default="1", onupdate=literal_column("row_version") + 1, nullable=False)
     
     @declared_attr
     def __tablename__(cls):
@@ -1,19 +1,38 @@
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, Date, Text
+from sqlalchemy import Column, String, Boolean, Integer, BigInteger, ForeignKey, Date, DateTime, Text, Index, UniqueConstraint, DDL, event
+from sqlalchemy.dialects.mysql import MEDIUMTEXT
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from app.models.base import BaseModel
 from datetime import date
 
+class DocumentBlob(Base, BaseModel):
+    """Content-addressed file shared by every document and version with the same content"""
+    
+    # Blob information
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 hex digest
+    file_path = Column(String(255), nullable=False)
+    file_size = Column(BigInteger, nullable=False)  # bytes
+    ref_count = Column(Integer, default=0, nullable=False)
+    
+    # Cold tier: set once the archiver has processed the blob
+    archived_at = Column(DateTime, nullable=True)
+    compression = Column(String(10), nullable=True)  # gzip, zstd; null when stored as is
+    stored_size = Column(BigInteger, nullable=True)  # bytes on storage when compressed
+
+
 class Document(Base, BaseModel):
     """Document model for document management"""
     
     # Document information
     name = Column(String(255), nullable=False)
-    file_path = Column(String(255), nullable=False)
+    file_path = Column(String(255), nullable=True)  # null for records created without a file
+    content_hash = Column(String(64), nullable=True)  # SHA-256 hex digest
+    file_size = Column(BigInteger, nullable=True)  # bytes
+    blob_id = Column(Integer, ForeignKey("documentblob.id"), nullable=True)
     document_type = Column(String(255), nullable=False)  # contract, invoice, receipt, report, etc.
     upload_date = Column(Date, default=date.today, nullable=False)
     uploaded_by = Column(Integer, ForeignKey("user.id"), nullable=True)
-    status = Column(String(50), default="active")  # active, archived
+    status = Column(String(50), default="active")  # active, archived, expired
     
     # Related entity information
     related_entity_type = Column(String(255), nullable=True)  # member, customer, supplier, asset, etc.
@@ -21,12 +40,20 @@ class Document(Base, BaseModel):
     
     # Document metadata
     description = Column(Text, nullable=True)
-    tags = Column(String(255), nullable=True)
+    tags = Column(String(255), nullable=True)  # normalized, comma-separated copy of tag_links for display
     expiry_date = Column(Date, nullable=True)
     
     # Relationships
     user = relationship("User", backref="uploaded_documents")
+    blob = relationship("DocumentBlob")
     versions = relationship("DocumentVersion", back_populates="document", cascade="all, delete-orphan")
+    tag_links = relationship("DocumentTagLink", back_populates="document", cascade="all, delete-orphan")
+    search_text = relationship("DocumentText", back_populates="document", uselist=False, cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Expired and expiring-soon documents, as a range scan within one status
+        Index("ix_document_status_expiry_date", "status", "expiry_date"),
+    )
 
 
 class DocumentVersion(Base, BaseModel):
@@ -36,10 +63,95 @@ class DocumentVersion(Base, BaseModel):
     document_id = Column(Integer, ForeignKey("document.id"), nullable=False)
     version_number = Column(Integer, nullable=False)
     file_path = Column(String(255), nullable=False)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 hex digest
+    file_size = Column(BigInteger, nullable=True)  # bytes
+    blob_id = Column(Integer, ForeignKey("documentblob.id"), nullable=True)
     upload_date = Column(Date, default=date.today, nullable=False)
     uploaded_by = Column(Integer, ForeignKey("user.id"), nullable=True)
     notes = Column(Text, nullable=True)
     
     # Relationships
     document = relationship("Document", back_populates="versions")
+    blob = relationship("DocumentBlob")
     user = relationship("User", backref="uploaded_versions")
+    
+    @property
+    def compression(self):
+        """Codec the version's file is archived with, None while it is stored as is"""
+        return self.blob.compression if self.blob else None
+
+
+class DocumentTag(Base, BaseModel):
+    """Normalized document tag"""
+    
+    name = Column(String(100), unique=True, index=True, nullable=False)  # lowercase, trimmed
+    
+    # Relationships
+    document_links = relationship("DocumentTagLink", back_populates="tag")
+
+
+class DocumentTagLink(Base, BaseModel):
+    """Link between a document and one of its tags"""
+    
+    document_id = Column(Integer, ForeignKey("document.id", ondelete="CASCADE"), nullable=False)
+    tag_id = Column(Integer, ForeignKey("documenttag.id", ondelete="CASCADE"), nullable=False)
+    
+    # Relationships
+    document = relationship("Document", back_populates="tag_links")
+    tag = relationship("DocumentTag", back_populates="document_links")
+    
+    __table_args__ = (
+        # Tags of a document
+        UniqueConstraint("document_id", "tag_id", name="uq_documenttaglink_document_id_tag_id"),
+        # Documents with a tag, answered from the index alone
+        Index("ix_documenttaglink_tag_id_document_id", "tag_id", "document_id"),
+    )
+
+
+class DocumentText(Base, BaseModel):
+    """Searchable text of a document, kept in the full-text index"""
+    
+    document_id = Column(Integer, ForeignKey("document.id", ondelete="CASCADE"), unique=True, nullable=False)
+    name = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    content = Column(Text().with_variant(MEDIUMTEXT(), "mysql"), nullable=True)  # extracted file text
+    content_hash = Column(String(64), nullable=True)  # file the content was (or is being) extracted from
+    status = Column(String(20), default="pending", nullable=False)  # pending, indexed, unsupported, failed
+    indexed_at = Column(DateTime, nullable=True)
+    error = Column(String(255), nullable=True)
+    
+    # Relationships
+    document = relationship("Document", back_populates="search_text")
+
+
+# The full-text index itself is dialect specific: an external-content FTS5 table
+# kept in sync by triggers on SQLite, a FULLTEXT index on MySQL
+DOCUMENT_TEXT_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE documenttext_fts USING fts5("
+    "name, description, content, content='documenttext', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER documenttext_ai AFTER INSERT ON documenttext BEGIN "
+    "INSERT INTO documenttext_fts(rowid, name, description, content) "
+    "VALUES (new.id, new.name, new.description, new.content); END",
+    "CREATE TRIGGER documenttext_ad AFTER DELETE ON documenttext BEGIN "
+    "INSERT INTO documenttext_fts(documenttext_fts, rowid, name, description, content) "
+    "VALUES ('delete', old.id, old.name, old.description, old.content); END",
+    "CREATE TRIGGER documenttext_au AFTER UPDATE OF name, description, content ON documenttext BEGIN "
+    "INSERT INTO documenttext_fts(documenttext_fts, rowid, name, description, content) "
+    "VALUES ('delete', old.id, old.name, old.description, old.content); "
+    "INSERT INTO documenttext_fts(rowid, name, description, content) "
+    "VALUES (new.id, new.name, new.description, new.content); END",
+]
+DOCUMENT_TEXT_MYSQL_DDL = [
+    "CREATE FULLTEXT INDEX ix_documenttext_fulltext ON documenttext (name, description, content)",
+]
+
+for statement in DOCUMENT_TEXT_SQLITE_DDL:
+    event.listen(DocumentText.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in DOCUMENT_TEXT_MYSQL_DDL:
+    event.listen(DocumentText.__table__, "after_create", DDL(statement).execute_if(dialect="mysql"))
+event.listen(
+    DocumentText.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS documenttext_fts").execute_if(dialect="sqlite")
+)
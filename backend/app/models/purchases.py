@@ -24,6 +24,11 @@ class PurchaseOrder(Base, BaseModel):
     supplier = relationship("Supplier", back_populates="purchase_orders")
     items = relationship("PurchaseOrderItem", back_populates="purchase_order", cascade="all, delete-orphan")
     invoices = relationship("SupplierInvoice", back_populates="purchase_order", cascade="all, delete-orphan")
+    
+    @property
+    def supplier_name(self):
+        """Name of the order's supplier, for responses that show it next to the order"""
+        return self.supplier.name if self.supplier else None
 
 
 class PurchaseOrderItem(Base, BaseModel):
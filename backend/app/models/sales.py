@@ -24,6 +24,11 @@ class SalesOrder(Base, BaseModel):
     customer = relationship("Customer", back_populates="sales_orders")
     items = relationship("SalesOrderItem", back_populates="sales_order", cascade="all, delete-orphan")
     invoices = relationship("SalesInvoice", back_populates="sales_order", cascade="all, delete-orphan")
+    
+    @property
+    def customer_name(self):
+        """Name of the order's customer, for responses that show it next to the order"""
+        return self.customer.name if self.customer else None
 
 
 class SalesOrderItem(Base, BaseModel):
@@ -3,6 +3,8 @@ from typing import Optional, List
 from datetime import date
 from decimal import Decimal
 
+from app.db.loading import LoadedGetterDict
+
 # Base schemas for ChartOfAccounts
 class ChartOfAccountsBase(BaseModel):
     account_number: str
@@ -157,35 +159,43 @@ class Payroll(PayrollBase):
     id: int
     created_at: date
     updated_at: Optional[date] = None
-    payroll_items: List[PayrollItem] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    payroll_items: Optional[List[PayrollItem]] = None
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
 
 class FiscalPeriod(FiscalPeriodBase):
     id: int
     created_at: date
     updated_at: Optional[date] = None
-    payrolls: List[Payroll] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    payrolls: Optional[List[Payroll]] = None
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
 
 class ChartOfAccounts(ChartOfAccountsBase):
     id: int
     created_at: date
     updated_at: Optional[date] = None
-    ledger_entries: List[LedgerEntry] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    ledger_entries: Optional[List[LedgerEntry]] = None
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
 
 class JournalEntry(JournalEntryBase):
     id: int
     created_at: date
     updated_at: Optional[date] = None
-    ledger_entries: List[LedgerEntry] = []
-    fiscal_period: FiscalPeriod
+    # Left out (null) of list responses unless asked for with ?expand=
+    ledger_entries: Optional[List[LedgerEntry]] = None
+    fiscal_period: Optional[FiscalPeriod] = None
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
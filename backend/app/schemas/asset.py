@@ -3,6 +3,8 @@ from typing import Optional, List
 from datetime import date
 from decimal import Decimal
 
+from app.db.loading import LoadedGetterDict
+
 # Base schemas for Asset
 class AssetBase(BaseModel):
     name: str
@@ -45,6 +47,73 @@ class AssetDepreciationUpdate(BaseModel):
     depreciation_amount: Optional[Decimal] = None
     book_value_after: Optional[Decimal] = None
 
+# Schemas for batch depreciation runs
+class AssetDepreciationRunCreate(BaseModel):
+    period_end: date
+    method: str = Field(default="straight_line", regex="^(straight_line|declining_balance)$")
+    post_journal: bool = False
+    fiscal_period_id: Optional[int] = None
+    expense_account_id: Optional[int] = None
+    accumulated_depreciation_account_id: Optional[int] = None
+
+class AssetDepreciationRunResult(BaseModel):
+    period_end: date
+    method: str
+    assets_depreciated: int
+    assets_skipped: int
+    total_depreciation: Decimal
+    journal_entry_id: Optional[int] = None
+
+# Schemas for depreciation forecasts
+class AssetForecastSchedule(BaseModel):
+    asset_id: int
+    asset_number: str
+    name: str
+    category: str
+    depreciation: List[Decimal]
+    book_values: List[Decimal]
+
+class CategoryForecastSchedule(BaseModel):
+    category: str
+    depreciation: List[Decimal]
+    book_values: List[Decimal]
+
+class AssetDepreciationForecast(BaseModel):
+    start_date: date
+    frequency: str
+    method: str
+    periods: List[date]
+    assets: List[AssetForecastSchedule] = []
+    categories: List[CategoryForecastSchedule] = []
+
+# Schemas for the asset register summary
+class AssetSummary(BaseModel):
+    asset_id: int
+    asset_number: str
+    name: str
+    category: str
+    location: Optional[str] = None
+    status: Optional[str] = None
+    acquisition_cost: Decimal
+    current_value: Decimal
+    accumulated_depreciation: Decimal
+    total_maintenance_cost: Decimal
+    maintenance_count: int
+    last_maintenance_date: Optional[date] = None
+
+class AssetRollup(BaseModel):
+    key: Optional[str] = None
+    asset_count: int
+    acquisition_cost: Decimal
+    current_value: Decimal
+    accumulated_depreciation: Decimal
+    total_maintenance_cost: Decimal
+
+class AssetRegisterSummary(BaseModel):
+    assets: List[AssetSummary] = []
+    by_category: List[AssetRollup] = []
+    by_location: List[AssetRollup] = []
+
 # Base schemas for AssetMaintenance
 class AssetMaintenanceBase(BaseModel):
     asset_id: int
@@ -85,8 +154,10 @@ class Asset(AssetBase):
     id: int
     created_at: date
     updated_at: Optional[date] = None
-    depreciation_entries: List[AssetDepreciation] = []
-    maintenance_records: List[AssetMaintenance] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    depreciation_entries: Optional[List[AssetDepreciation]] = None
+    maintenance_records: Optional[List[AssetMaintenance]] = None
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
@@ -2,6 +2,8 @@ from typing import Optional, List
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 
+from app.db.loading import LoadedGetterDict
+
 # Customer Contact Schemas
 class CustomerContactBase(BaseModel):
     name: str
@@ -53,7 +55,9 @@ class CustomerResponse(CustomerBase):
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
-    contacts: List[CustomerContactResponse] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    contacts: Optional[List[CustomerContactResponse]] = None
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
@@ -5,7 +5,6 @@ from datetime import date
 # Base schemas for Document
 class DocumentBase(BaseModel):
     name: str
-    file_path: str
     document_type: str
     upload_date: date = Field(default_factory=date.today)
     uploaded_by: Optional[int] = None
@@ -33,7 +32,6 @@ class DocumentUpdate(BaseModel):
 class DocumentVersionBase(BaseModel):
     document_id: int
     version_number: int
-    file_path: str
     upload_date: date = Field(default_factory=date.today)
     uploaded_by: Optional[int] = None
     notes: Optional[str] = None
@@ -45,8 +43,13 @@ class DocumentVersionUpdate(BaseModel):
     notes: Optional[str] = None
 
 # Response schemas
+# The file fields are set from uploads only, never by clients
 class DocumentVersion(DocumentVersionBase):
     id: int
+    file_path: str
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
+    compression: Optional[str] = None
     created_at: date
     updated_at: Optional[date] = None
 
@@ -55,9 +58,76 @@ class DocumentVersion(DocumentVersionBase):
 
 class Document(DocumentBase):
     id: int
+    file_path: Optional[str] = None
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
     created_at: date
     updated_at: Optional[date] = None
     versions: List[DocumentVersion] = []
 
     class Config:
         orm_mode = True
+
+class DocumentTagFacet(BaseModel):
+    name: str
+    document_count: int
+
+class DocumentSearchResult(BaseModel):
+    id: int
+    name: str
+    document_type: str
+    related_entity_type: Optional[str] = None
+    related_entity_id: Optional[int] = None
+    status: Optional[str] = None
+    score: float
+    snippet: Optional[str] = None
+
+class BulkUploadFileResult(BaseModel):
+    file_name: str
+    status: str  # created, failed
+    document_id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkUploadResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkUploadFileResult]
+
+class DocumentArchiveRun(BaseModel):
+    archived: int
+    skipped: int
+    original_size: int
+    stored_size: int
+    removed_files: int
+
+class DocumentStorageTier(BaseModel):
+    compression: Optional[str] = None
+    blob_count: int
+    original_size: int
+    stored_size: int
+
+class DocumentStorageReport(BaseModel):
+    blob_count: int
+    archived_count: int
+    original_size: int
+    stored_size: int
+    reclaimed_size: int
+    tiers: List[DocumentStorageTier]
+
+class DocumentExpiringItem(BaseModel):
+    id: int
+    name: str
+    document_type: str
+    expiry_date: date
+
+class DocumentExpiryDigestEntry(BaseModel):
+    related_entity_type: Optional[str] = None
+    related_entity_id: Optional[int] = None
+    document_count: int
+    earliest_expiry_date: date
+    documents: List[DocumentExpiringItem]
+
+class DocumentExpiryRun(BaseModel):
+    expired: int
+    expiring_count: int
+    digest: List[DocumentExpiryDigestEntry]
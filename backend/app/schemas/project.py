@@ -3,6 +3,8 @@ from typing import Optional, List
 from datetime import date
 from decimal import Decimal
 
+from app.db.loading import LoadedGetterDict
+
 # Base schemas for Project
 class ProjectBase(BaseModel):
     project_name: str
@@ -170,11 +172,13 @@ class ProjectInvoice(ProjectInvoiceBase):
     id: int
     created_at: date
     updated_at: Optional[date] = None
-    items: List[ProjectInvoiceItem] = []
-    payments: List[ProjectPayment] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    items: Optional[List[ProjectInvoiceItem]] = None
+    payments: Optional[List[ProjectPayment]] = None
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
 
 class Project(ProjectBase):
     id: int
@@ -182,8 +186,10 @@ class Project(ProjectBase):
     updated_at: Optional[date] = None
     total_invoiced: Decimal
     total_cost: Decimal
-    tasks: List[ProjectTask] = []
-    invoices: List[ProjectInvoice] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    tasks: Optional[List[ProjectTask]] = None
+    invoices: Optional[List[ProjectInvoice]] = None
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
@@ -3,6 +3,8 @@ from datetime import date
 from pydantic import BaseModel, Field
 from decimal import Decimal
 
+from app.db.loading import LoadedGetterDict
+
 
 class PurchaseOrderItemBase(BaseModel):
     item_description: str
@@ -64,12 +66,15 @@ class PurchaseOrderUpdate(BaseModel):
 
 class PurchaseOrder(PurchaseOrderBase):
     id: int
-    items: List[PurchaseOrderItem] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    items: Optional[List[PurchaseOrderItem]] = None
+    supplier_name: Optional[str] = None
     created_at: date
     updated_at: date
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
 
 
 class SupplierInvoiceBase(BaseModel):
@@ -3,6 +3,8 @@ from datetime import date
 from pydantic import BaseModel, Field
 from decimal import Decimal
 
+from app.db.loading import LoadedGetterDict
+
 
 class SalesOrderItemBase(BaseModel):
     item_description: str
@@ -64,12 +66,15 @@ class SalesOrderUpdate(BaseModel):
 
 class SalesOrder(SalesOrderBase):
     id: int
-    items: List[SalesOrderItem] = []
+    # Left out (null) of list responses unless asked for with ?expand=
+    items: Optional[List[SalesOrderItem]] = None
+    customer_name: Optional[str] = None
     created_at: date
     updated_at: date
 
     class Config:
         orm_mode = True
+        getter_dict = LoadedGetterDict
 
 
 class SalesInvoiceBase(BaseModel):
@@ -1,5 +1,7 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional, Dict, Any
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.sql import Select
 from datetime import date
 
 from app.models.accounting import (
@@ -15,24 +17,42 @@ from app.schemas.accounting import (
     PayrollItemCreate, PayrollItemUpdate,
     EmployeeCreate, EmployeeUpdate
 )
+from app.db.loading import LoadProfile
+from app.db.reference_cache import ReferenceCache
 from app.utils.id_generator import generate_journal_entry_number
 
+# Reference rows shared across requests; see app.db.reference_cache
+_accounts = ReferenceCache(ChartOfAccounts)
+_fiscal_periods = ReferenceCache(FiscalPeriod)
+_employees = ReferenceCache(Employee)
+
+# Relationships each response can include, by their ?expand= name
+ACCOUNT_LOADING = LoadProfile(ChartOfAccounts, "ledger_entries")
+JOURNAL_ENTRY_LOADING = LoadProfile(JournalEntry, "ledger_entries", "fiscal_period.payrolls.payroll_items.employee")
+FISCAL_PERIOD_LOADING = LoadProfile(FiscalPeriod, "payrolls.payroll_items.employee")
+PAYROLL_LOADING = LoadProfile(Payroll, "payroll_items.employee")
+
 class AccountingService:
     # Chart of Accounts methods
     @staticmethod
-    def get_chart_of_accounts(db: Session, skip: int = 0, limit: int = 100) -> List[ChartOfAccounts]:
-        """Get all chart of accounts with pagination"""
-        return db.query(ChartOfAccounts).offset(skip).limit(limit).all()
+    def get_chart_of_accounts(db: Session, skip: int = 0, limit: int = 100, expand: Iterable[str] = ()) -> List[ChartOfAccounts]:
+        """Get all chart of accounts with pagination, with the `expand` relationships of ACCOUNT_LOADING"""
+        return db.query(ChartOfAccounts).options(*ACCOUNT_LOADING.options(expand)).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def export_chart_of_accounts_query() -> Select:
+        """The account rows, for app.utils.export"""
+        return select(ChartOfAccounts.__table__).order_by(ChartOfAccounts.account_number)
     
     @staticmethod
     def get_account(db: Session, account_id: int) -> Optional[ChartOfAccounts]:
         """Get a single account by ID"""
-        return db.query(ChartOfAccounts).filter(ChartOfAccounts.id == account_id).first()
+        return _accounts.get(db, "id", account_id)
     
     @staticmethod
     def get_account_by_number(db: Session, account_number: str) -> Optional[ChartOfAccounts]:
         """Get a single account by account number"""
-        return db.query(ChartOfAccounts).filter(ChartOfAccounts.account_number == account_number).first()
+        return _accounts.get(db, "account_number", account_number)
     
     @staticmethod
     def create_account(db: Session, account: ChartOfAccountsCreate) -> ChartOfAccounts:
@@ -68,14 +88,22 @@ class AccountingService:
     
     # Journal Entry methods
     @staticmethod
-    def get_journal_entries(db: Session, skip: int = 0, limit: int = 100) -> List[JournalEntry]:
-        """Get all journal entries with pagination"""
-        return db.query(JournalEntry).offset(skip).limit(limit).all()
+    def get_journal_entries(db: Session, skip: int = 0, limit: int = 100, expand: Iterable[str] = ()) -> List[JournalEntry]:
+        """Get all journal entries with pagination, with the `expand` relationships of JOURNAL_ENTRY_LOADING"""
+        return db.query(JournalEntry).options(*JOURNAL_ENTRY_LOADING.options(expand)).offset(skip).limit(limit).all()
     
     @staticmethod
-    def get_journal_entry(db: Session, entry_id: int) -> Optional[JournalEntry]:
-        """Get a single journal entry by ID"""
-        return db.query(JournalEntry).filter(JournalEntry.id == entry_id).first()
+    def export_journal_entries_query() -> Select:
+        """The journal entry rows in date order, for app.utils.export"""
+        return select(JournalEntry.__table__).order_by(JournalEntry.entry_date, JournalEntry.id)
+    
+    @staticmethod
+    def get_journal_entry(db: Session, entry_id: int, expand: Optional[Iterable[str]] = None) -> Optional[JournalEntry]:
+        """Get a single journal entry by ID, loading the `expand` relationships of JOURNAL_ENTRY_LOADING up front"""
+        query = db.query(JournalEntry).filter(JournalEntry.id == entry_id)
+        if expand is not None:
+            query = query.options(*JOURNAL_ENTRY_LOADING.options(expand))
+        return query.first()
     
     @staticmethod
     def get_journal_entry_by_number(db: Session, entry_number: str) -> Optional[JournalEntry]:
@@ -127,6 +155,26 @@ class AccountingService:
         """Get all ledger entries for a journal entry"""
         return db.query(LedgerEntry).filter(LedgerEntry.journal_entry_id == journal_entry_id).all()
     
+    @staticmethod
+    def export_ledger_entries_query(journal_entry_id: Optional[int] = None, account_id: Optional[int] = None) -> Select:
+        """
+        Ledger entry rows in journal date order, with the entry number and date
+        of their journal entry and their account number, for app.utils.export
+        """
+        statement = select(
+            LedgerEntry.__table__,
+            JournalEntry.entry_number,
+            JournalEntry.entry_date,
+            ChartOfAccounts.account_number
+        ).join(JournalEntry, LedgerEntry.journal_entry_id == JournalEntry.id).join(
+            ChartOfAccounts, LedgerEntry.account_id == ChartOfAccounts.id
+        )
+        if journal_entry_id:
+            statement = statement.filter(LedgerEntry.journal_entry_id == journal_entry_id)
+        if account_id:
+            statement = statement.filter(LedgerEntry.account_id == account_id)
+        return statement.order_by(JournalEntry.entry_date, LedgerEntry.journal_entry_id, LedgerEntry.id)
+    
     @staticmethod
     def get_ledger_entry(db: Session, entry_id: int) -> Optional[LedgerEntry]:
         """Get a single ledger entry by ID"""
@@ -166,14 +214,26 @@ class AccountingService:
     
     # Fiscal Period methods
     @staticmethod
-    def get_fiscal_periods(db: Session, skip: int = 0, limit: int = 100) -> List[FiscalPeriod]:
-        """Get all fiscal periods with pagination"""
-        return db.query(FiscalPeriod).offset(skip).limit(limit).all()
+    def get_fiscal_periods(db: Session, skip: int = 0, limit: int = 100, expand: Iterable[str] = ()) -> List[FiscalPeriod]:
+        """Get all fiscal periods with pagination, with the `expand` relationships of FISCAL_PERIOD_LOADING"""
+        return db.query(FiscalPeriod).options(*FISCAL_PERIOD_LOADING.options(expand)).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def export_fiscal_periods_query() -> Select:
+        """The fiscal period rows, for app.utils.export"""
+        return select(FiscalPeriod.__table__).order_by(FiscalPeriod.start_date, FiscalPeriod.id)
     
     @staticmethod
-    def get_fiscal_period(db: Session, period_id: int) -> Optional[FiscalPeriod]:
-        """Get a single fiscal period by ID"""
-        return db.query(FiscalPeriod).filter(FiscalPeriod.id == period_id).first()
+    def get_fiscal_period(db: Session, period_id: int, expand: Optional[Iterable[str]] = None) -> Optional[FiscalPeriod]:
+        """
+        Get a single fiscal period by ID. With `expand`, its relationships in
+        FISCAL_PERIOD_LOADING are loaded up front, by a query instead of the cache.
+        """
+        if expand is None:
+            return _fiscal_periods.get(db, "id", period_id)
+        return db.query(FiscalPeriod).filter(FiscalPeriod.id == period_id).options(
+            *FISCAL_PERIOD_LOADING.options(expand)
+        ).first()
     
     @staticmethod
     def create_fiscal_period(db: Session, period: FiscalPeriodCreate) -> FiscalPeriod:
@@ -209,14 +269,22 @@ class AccountingService:
     
     # Payroll methods
     @staticmethod
-    def get_payrolls(db: Session, skip: int = 0, limit: int = 100) -> List[Payroll]:
-        """Get all payrolls with pagination"""
-        return db.query(Payroll).offset(skip).limit(limit).all()
+    def get_payrolls(db: Session, skip: int = 0, limit: int = 100, expand: Iterable[str] = ()) -> List[Payroll]:
+        """Get all payrolls with pagination, with the `expand` relationships of PAYROLL_LOADING"""
+        return db.query(Payroll).options(*PAYROLL_LOADING.options(expand)).offset(skip).limit(limit).all()
     
     @staticmethod
-    def get_payroll(db: Session, payroll_id: int) -> Optional[Payroll]:
-        """Get a single payroll by ID"""
-        return db.query(Payroll).filter(Payroll.id == payroll_id).first()
+    def export_payrolls_query() -> Select:
+        """The payroll rows, for app.utils.export"""
+        return select(Payroll.__table__).order_by(Payroll.id)
+    
+    @staticmethod
+    def get_payroll(db: Session, payroll_id: int, expand: Optional[Iterable[str]] = None) -> Optional[Payroll]:
+        """Get a single payroll by ID, loading the `expand` relationships of PAYROLL_LOADING up front"""
+        query = db.query(Payroll).filter(Payroll.id == payroll_id)
+        if expand is not None:
+            query = query.options(*PAYROLL_LOADING.options(expand))
+        return query.first()
     
     @staticmethod
     def create_payroll(db: Session, payroll: PayrollCreate) -> Payroll:
@@ -254,7 +322,9 @@ class AccountingService:
     @staticmethod
     def get_payroll_items(db: Session, payroll_id: int) -> List[PayrollItem]:
         """Get all payroll items for a payroll"""
-        return db.query(PayrollItem).filter(PayrollItem.payroll_id == payroll_id).all()
+        return db.query(PayrollItem).filter(PayrollItem.payroll_id == payroll_id).options(
+            joinedload(PayrollItem.employee)
+        ).all()
     
     @staticmethod
     def get_payroll_item(db: Session, item_id: int) -> Optional[PayrollItem]:
@@ -323,15 +393,20 @@ class AccountingService:
         """Get all employees with pagination"""
         return db.query(Employee).offset(skip).limit(limit).all()
     
+    @staticmethod
+    def export_employees_query() -> Select:
+        """The employee rows, for app.utils.export"""
+        return select(Employee.__table__).order_by(Employee.id)
+    
     @staticmethod
     def get_employee(db: Session, employee_id: int) -> Optional[Employee]:
         """Get a single employee by ID"""
-        return db.query(Employee).filter(Employee.id == employee_id).first()
+        return _employees.get(db, "id", employee_id)
     
     @staticmethod
     def get_employee_by_employee_id(db: Session, employee_id: str) -> Optional[Employee]:
         """Get a single employee by employee ID"""
-        return db.query(Employee).filter(Employee.employee_id == employee_id).first()
+        return _employees.get(db, "employee_id", employee_id)
     
     @staticmethod
     def create_employee(db: Session, employee: EmployeeCreate) -> Employee:
@@ -0,0 +1,213 @@
+from typing import List, Optional, Dict, Any
+from datetime import date, datetime, timedelta
+import logging
+import os
+import tempfile
+from sqlalchemy import case, exists, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import database
+from app.models.documents import Document, DocumentBlob, DocumentVersion
+from app.services.blob_service import BlobService
+from app.utils.compression import FILE_SUFFIXES, compress_chunks, resolve_codec
+from app.utils.storage import StorageBackend, get_storage
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveService:
+    @staticmethod
+    def get_policy(document_type: Optional[str]) -> Dict[str, Any]:
+        """Archive policy for a document type: min_age_days (None never archives) and codec"""
+        policy = {
+            "min_age_days": settings.DOCUMENT_ARCHIVE_MIN_AGE_DAYS,
+            "codec": settings.DOCUMENT_ARCHIVE_CODEC
+        }
+        policy.update(settings.DOCUMENT_ARCHIVE_POLICIES.get(document_type or "", {}))
+        return policy
+
+    @staticmethod
+    def get_archivable_blobs(db: Session, limit: int, today: Optional[date] = None) -> List[DocumentBlob]:
+        """
+        Blobs that only old versions point at. A blob is skipped while any document
+        uses it as its current file or any version referencing it is younger than
+        the policy for its document type allows.
+        """
+        today = today or date.today()
+        never = date.min  # every upload_date is on or after it, so each version blocks archiving
+
+        def cutoff(document_type: Optional[str]) -> date:
+            min_age_days = ArchiveService.get_policy(document_type)["min_age_days"]
+            return never if min_age_days is None else today - timedelta(days=min_age_days)
+
+        typed = [
+            (Document.document_type == document_type, cutoff(document_type))
+            for document_type in settings.DOCUMENT_ARCHIVE_POLICIES
+        ]
+        version_cutoff = case(*typed, else_=cutoff(None)) if typed else cutoff(None)
+
+        too_young = select(DocumentVersion.id).join(
+            Document, Document.id == DocumentVersion.document_id
+        ).where(
+            DocumentVersion.blob_id == DocumentBlob.id,
+            DocumentVersion.upload_date >= version_cutoff
+        )
+        return db.query(DocumentBlob).filter(
+            DocumentBlob.archived_at.is_(None),
+            exists().where(DocumentVersion.blob_id == DocumentBlob.id),
+            ~exists().where(Document.blob_id == DocumentBlob.id),
+            ~exists(too_young)
+        ).order_by(DocumentBlob.id).limit(limit).all()
+
+    @staticmethod
+    def _codec_for_blob(db: Session, blob: DocumentBlob) -> str:
+        """Codec of the policy for the document type that references the blob most"""
+        document_type = db.query(Document.document_type).join(
+            DocumentVersion, DocumentVersion.document_id == Document.id
+        ).filter(DocumentVersion.blob_id == blob.id).group_by(Document.document_type).order_by(
+            func.count(DocumentVersion.id).desc()
+        ).limit(1).scalar()
+        return resolve_codec(ArchiveService.get_policy(document_type)["codec"])
+
+    @staticmethod
+    def _compress_blob(storage: StorageBackend, blob: DocumentBlob, codec: str) -> Optional[Dict[str, Any]]:
+        """
+        Write a compressed copy of a blob next to it. Returns its location and size,
+        or None when compressing does not save space.
+        """
+        os.makedirs(storage.staging_directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=storage.staging_directory, prefix=".archive-")
+        try:
+            with os.fdopen(fd, "wb") as target:
+                for chunk in compress_chunks(storage.open_stream(blob.file_path), codec):
+                    target.write(chunk)
+            stored_size = os.path.getsize(temp_path)
+            if stored_size >= blob.file_size:
+                os.unlink(temp_path)
+                return None
+            location = storage.put(temp_path, blob.content_hash, suffix=FILE_SUFFIXES[codec])
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return {"file_path": location, "stored_size": stored_size}
+
+    @staticmethod
+    def archive_old_versions(
+        db: Session,
+        limit: Optional[int] = None,
+        storage: Optional[StorageBackend] = None,
+        today: Optional[date] = None,
+        collect_garbage: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Compress a batch of blobs only referenced by old versions, then sweep the
+        uncompressed originals unless `collect_garbage` is off, for callers that
+        run several batches and sweep once. Safe to run from several processes at once.
+        """
+        storage = storage or get_storage()
+        report = {"archived": 0, "skipped": 0, "original_size": 0, "stored_size": 0, "removed_files": 0}
+        for blob in ArchiveService.get_archivable_blobs(db, limit or settings.DOCUMENT_ARCHIVE_BATCH_SIZE, today):
+            blob_id, original_path = blob.id, blob.file_path
+            codec = ArchiveService._codec_for_blob(db, blob)
+            try:
+                compressed = ArchiveService._compress_blob(storage, blob, codec)
+            except Exception as e:
+                logger.warning(f"Could not archive blob {blob_id}: {e}")
+                report["skipped"] += 1
+                continue
+
+            values = {DocumentBlob.archived_at: datetime.utcnow()}
+            if compressed:
+                values.update({
+                    DocumentBlob.file_path: compressed["file_path"],
+                    DocumentBlob.compression: codec,
+                    DocumentBlob.stored_size: compressed["stored_size"]
+                })
+            # The blob may have become a current file again while compressing
+            updated = db.query(DocumentBlob).filter(
+                DocumentBlob.id == blob_id,
+                DocumentBlob.archived_at.is_(None),
+                DocumentBlob.file_path == original_path,
+                ~exists().where(Document.blob_id == blob_id)
+            ).update(values, synchronize_session=False)
+            if updated and compressed:
+                db.query(DocumentVersion).filter(DocumentVersion.blob_id == blob_id).update(
+                    {DocumentVersion.file_path: compressed["file_path"], DocumentVersion.updated_at: datetime.utcnow()},
+                    synchronize_session=False
+                )
+            db.commit()
+
+            if updated and compressed:
+                report["archived"] += 1
+                report["original_size"] += blob.file_size
+                report["stored_size"] += compressed["stored_size"]
+            else:
+                report["skipped"] += 1
+
+        # Originals are now unreferenced; garbage collection removes them unless an
+        # upload of the same content touched them in the meantime
+        if collect_garbage and report["archived"]:
+            report["removed_files"] = len(BlobService.collect_garbage(db, storage=storage))
+        return report
+
+    @staticmethod
+    def run_archiver() -> Dict[str, Any]:
+        """
+        Archive everything currently eligible, batch by batch, with its own session,
+        and sweep the originals once at the end. Used by the periodic background job.
+        """
+        db = database.SessionLocal()
+        try:
+            storage = get_storage()
+            total = {"archived": 0, "skipped": 0, "original_size": 0, "stored_size": 0, "removed_files": 0}
+            while True:
+                report = ArchiveService.archive_old_versions(db, storage=storage, collect_garbage=False)
+                for key in total:
+                    total[key] += report[key]
+                # Stop on a short batch, or when nothing in a batch could be archived
+                if report["archived"] == 0 or report["archived"] + report["skipped"] < settings.DOCUMENT_ARCHIVE_BATCH_SIZE:
+                    break
+            if total["archived"]:
+                # Listing the whole store is the expensive part, so it happens once per job
+                total["removed_files"] = len(BlobService.collect_garbage(db, storage=storage))
+                logger.info(
+                    f"Archived {total['archived']} document files, "
+                    f"reclaimed {total['original_size'] - total['stored_size']} bytes"
+                )
+            return total
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_storage_report(db: Session) -> Dict[str, Any]:
+        """Space used per storage tier and how much archiving has reclaimed"""
+        stored_size = func.coalesce(DocumentBlob.stored_size, DocumentBlob.file_size)
+        rows = db.query(
+            DocumentBlob.compression,
+            func.count(DocumentBlob.id),
+            func.coalesce(func.sum(DocumentBlob.file_size), 0),
+            func.coalesce(func.sum(stored_size), 0),
+            func.count(DocumentBlob.archived_at)
+        ).group_by(DocumentBlob.compression).all()
+
+        tiers = [
+            {
+                "compression": compression,
+                "blob_count": count,
+                "original_size": int(original),
+                "stored_size": int(stored)
+            }
+            for compression, count, original, stored, _ in rows
+        ]
+        original_total = sum(tier["original_size"] for tier in tiers)
+        stored_total = sum(tier["stored_size"] for tier in tiers)
+        return {
+            "blob_count": sum(tier["blob_count"] for tier in tiers),
+            "archived_count": sum(archived for *_, archived in rows),
+            "original_size": original_total,
+            "stored_size": stored_total,
+            "reclaimed_size": original_total - stored_total,
+            "tiers": tiers
+        }
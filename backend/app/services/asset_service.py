@@ -1,21 +1,57 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from datetime import date
+from typing import Iterable, List, Optional, Dict, Any
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import Select
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from collections import OrderedDict
+import calendar
+import json
+import threading
 
+from app.db.loading import LoadProfile
 from app.models.assets import Asset, AssetDepreciation, AssetMaintenance
-from app.schemas.asset import AssetCreate, AssetUpdate, AssetDepreciationCreate, AssetDepreciationUpdate, AssetMaintenanceCreate, AssetMaintenanceUpdate
-from app.utils.id_generator import generate_asset_number
+from app.models.accounting import ChartOfAccounts, JournalEntry, LedgerEntry, FiscalPeriod
+from app.schemas.asset import AssetCreate, AssetUpdate, AssetDepreciationCreate, AssetDepreciationUpdate, AssetMaintenanceCreate, AssetMaintenanceUpdate, AssetDepreciationRunCreate
+from app.utils.export import json_default
+from app.utils.id_generator import generate_asset_number, generate_journal_entry_number
+
+CENT = Decimal("0.01")
+
+# Encoded forecasts keyed by register fingerprint and parameters, oldest evicted first.
+# Requests run on the threadpool, so the cache is only touched under its lock
+FORECAST_CACHE_SIZE = 32
+_forecast_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_forecast_cache_lock = threading.Lock()
+
+def _month_end(start: date, months: int) -> date:
+    """Return the last day of the month that is `months` months after `start`"""
+    month_index = start.year * 12 + start.month - 1 + months
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, calendar.monthrange(year, month + 1)[1])
+
+# Relationships an asset response can include, by their ?expand= name
+ASSET_LOADING = LoadProfile(Asset, "depreciation_entries", "maintenance_records")
 
 class AssetService:
     @staticmethod
-    def get_assets(db: Session, skip: int = 0, limit: int = 100) -> List[Asset]:
-        """Get all assets with pagination"""
-        return db.query(Asset).offset(skip).limit(limit).all()
+    def get_assets(db: Session, skip: int = 0, limit: int = 100, expand: Iterable[str] = ()) -> List[Asset]:
+        """Get all assets with pagination, with the `expand` relationships of ASSET_LOADING"""
+        return db.query(Asset).options(*ASSET_LOADING.options(expand)).offset(skip).limit(limit).all()
     
     @staticmethod
-    def get_asset(db: Session, asset_id: int) -> Optional[Asset]:
-        """Get a single asset by ID"""
-        return db.query(Asset).filter(Asset.id == asset_id).first()
+    def export_assets_query() -> Select:
+        """The asset rows of the register, for app.utils.export"""
+        return select(Asset.__table__).order_by(Asset.id)
+    
+    @staticmethod
+    def get_asset(db: Session, asset_id: int, expand: Optional[Iterable[str]] = None) -> Optional[Asset]:
+        """Get a single asset by ID, loading the `expand` relationships of ASSET_LOADING up front"""
+        query = db.query(Asset).filter(Asset.id == asset_id)
+        if expand is not None:
+            query = query.options(*ASSET_LOADING.options(expand))
+        return query.first()
     
     @staticmethod
     def get_asset_by_number(db: Session, asset_number: str) -> Optional[Asset]:
@@ -77,7 +113,7 @@ class AssetService:
         """Create a new depreciation entry for an asset"""
         db_depreciation = AssetDepreciation(**depreciation.dict())
         db.add(db_depreciation)
-        db.commit()
+        AssetService._commit_depreciation(db, depreciation.asset_id, db_depreciation.depreciation_date)
         db.refresh(db_depreciation)
         
         # Update the asset's current value
@@ -97,7 +133,7 @@ class AssetService:
             for key, value in update_data.items():
                 setattr(db_depreciation, key, value)
             
-            db.commit()
+            AssetService._commit_depreciation(db, db_depreciation.asset_id, db_depreciation.depreciation_date)
             db.refresh(db_depreciation)
             
             # Update the asset's current value if book_value_after was updated
@@ -109,6 +145,15 @@ class AssetService:
         
         return db_depreciation
     
+    @staticmethod
+    def _commit_depreciation(db: Session, asset_id: int, depreciation_date: Optional[date]) -> None:
+        """Commit a depreciation entry, with a ValueError when the asset already has one on its date"""
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise ValueError(f"Asset {asset_id} already has a depreciation entry on {depreciation_date}")
+    
     @staticmethod
     def delete_asset_depreciation(db: Session, depreciation_id: int) -> bool:
         """Delete a depreciation entry"""
@@ -119,6 +164,363 @@ class AssetService:
             return True
         return False
     
+    # Batch depreciation methods
+    @staticmethod
+    def compute_depreciation(
+        method: str,
+        acquisition_costs: List[Decimal],
+        book_values: List[Decimal],
+        rates: List[Decimal],
+        months: List[int]
+    ) -> List[Decimal]:
+        """Compute depreciation amounts for a whole batch of assets, column by column"""
+        if method == "declining_balance":
+            # The rate applies to the book value left by the month before, month by month
+            amounts = [
+                book_value * (1 - (1 - rate / 1200) ** period)
+                for book_value, rate, period in zip(book_values, rates, months)
+            ]
+        else:
+            # Straight-line depreciates the original cost by the same amount every month
+            amounts = [cost * rate * period / 1200 for cost, rate, period in zip(acquisition_costs, rates, months)]
+        return [
+            min(book_value, amount.quantize(CENT, rounding=ROUND_HALF_UP))
+            for book_value, amount in zip(book_values, amounts)
+        ]
+    
+    @staticmethod
+    def run_depreciation(db: Session, run: AssetDepreciationRunCreate) -> Dict[str, Any]:
+        """
+        Depreciate every active asset up to the period end in a single transaction.
+        Assets already depreciated for the period are skipped, so a rerun is a no-op.
+        """
+        for attempt in range(2):
+            try:
+                return AssetService._run_depreciation(db, run)
+            except IntegrityError:
+                # A concurrent run inserted entries for the same period first; once it has
+                # committed, running again skips the assets it depreciated
+                db.rollback()
+                if attempt:
+                    raise ValueError(f"Another depreciation run for the period ending {run.period_end} is in progress")
+    
+    @staticmethod
+    def _run_depreciation(db: Session, run: AssetDepreciationRunCreate) -> Dict[str, Any]:
+        period_end = run.period_end
+        
+        # Resolve the journal posting targets before touching any data
+        fiscal_period_id = run.fiscal_period_id
+        if run.post_journal:
+            if not run.expense_account_id or not run.accumulated_depreciation_account_id:
+                raise ValueError("Expense and accumulated depreciation accounts are required to post the journal entry")
+            account_ids = [run.expense_account_id, run.accumulated_depreciation_account_id]
+            found = {account_id for (account_id,) in db.query(ChartOfAccounts.id).filter(ChartOfAccounts.id.in_(account_ids))}
+            for account_id in account_ids:
+                if account_id not in found:
+                    raise ValueError(f"Account with ID {account_id} not found")
+            if fiscal_period_id is not None:
+                if db.query(FiscalPeriod.id).filter(FiscalPeriod.id == fiscal_period_id).first() is None:
+                    raise ValueError(f"Fiscal period {fiscal_period_id} not found")
+            else:
+                fiscal_period = db.query(FiscalPeriod).filter(
+                    FiscalPeriod.start_date <= period_end,
+                    FiscalPeriod.end_date >= period_end
+                ).first()
+                if not fiscal_period:
+                    raise ValueError(f"No fiscal period covers {period_end}")
+                fiscal_period_id = fiscal_period.id
+        
+        # The latest entry per asset, one per date: its book value is where this run starts,
+        # including one entered or corrected by hand
+        prior = db.query(
+            AssetDepreciation.asset_id.label("asset_id"),
+            func.max(AssetDepreciation.depreciation_date).label("last_date")
+        ).group_by(AssetDepreciation.asset_id).subquery()
+        last_entry = aliased(AssetDepreciation)
+        
+        rows = db.query(
+            Asset.id,
+            Asset.acquisition_date,
+            Asset.acquisition_cost,
+            Asset.depreciation_rate,
+            prior.c.last_date,
+            last_entry.book_value_after.label("last_book_value")
+        ).outerjoin(prior, prior.c.asset_id == Asset.id).outerjoin(
+            last_entry,
+            (last_entry.asset_id == prior.c.asset_id) & (last_entry.depreciation_date == prior.c.last_date)
+        ).filter(
+            Asset.status == "active",
+            Asset.acquisition_date <= period_end
+        ).all()
+        
+        # Build the input columns, skipping assets already depreciated for this period
+        asset_ids, costs, book_values, rates, months = [], [], [], [], []
+        for row in rows:
+            start = row.last_date or row.acquisition_date
+            elapsed = (period_end.year - start.year) * 12 + period_end.month - start.month
+            if elapsed <= 0 or not row.depreciation_rate:
+                continue
+            cost = Decimal(str(row.acquisition_cost))
+            asset_ids.append(row.id)
+            costs.append(cost)
+            book_values.append(cost if row.last_book_value is None else Decimal(str(row.last_book_value)))
+            rates.append(Decimal(str(row.depreciation_rate)))
+            months.append(elapsed)
+        
+        amounts = AssetService.compute_depreciation(run.method, costs, book_values, rates, months)
+        
+        entries = [
+            {
+                "asset_id": asset_id,
+                "depreciation_date": period_end,
+                "depreciation_amount": amount,
+                "book_value_after": book_value - amount
+            }
+            for asset_id, book_value, amount in zip(asset_ids, book_values, amounts)
+            if amount > 0
+        ]
+        total_depreciation = sum((entry["depreciation_amount"] for entry in entries), Decimal("0.00"))
+        
+        journal_entry_id = None
+        if entries:
+            db.bulk_insert_mappings(AssetDepreciation, entries)
+            
+            # Carry the new book values onto the assets with one set-based UPDATE
+            latest_book_value = select(AssetDepreciation.book_value_after).where(
+                AssetDepreciation.asset_id == Asset.id,
+                AssetDepreciation.depreciation_date == period_end
+            ).order_by(AssetDepreciation.id.desc()).limit(1).scalar_subquery()
+            db.query(Asset).filter(
+                Asset.status == "active",
+                Asset.id.in_(
+                    select(AssetDepreciation.asset_id).where(AssetDepreciation.depreciation_date == period_end)
+                )
+            ).update(
+                {Asset.current_value: latest_book_value, Asset.updated_at: datetime.utcnow()},
+                synchronize_session=False
+            )
+            
+            if run.post_journal:
+                journal_entry = JournalEntry(
+                    entry_number=generate_journal_entry_number(db),
+                    entry_date=period_end,
+                    description=f"Asset depreciation for period ending {period_end}",
+                    entry_type="system",
+                    status="posted",
+                    fiscal_period_id=fiscal_period_id
+                )
+                db.add(journal_entry)
+                db.flush()
+                db.add_all([
+                    LedgerEntry(
+                        journal_entry_id=journal_entry.id,
+                        account_id=run.expense_account_id,
+                        debit_amount=total_depreciation,
+                        credit_amount=0,
+                        description="Depreciation expense"
+                    ),
+                    LedgerEntry(
+                        journal_entry_id=journal_entry.id,
+                        account_id=run.accumulated_depreciation_account_id,
+                        debit_amount=0,
+                        credit_amount=total_depreciation,
+                        description="Accumulated depreciation"
+                    )
+                ])
+                journal_entry_id = journal_entry.id
+            
+            db.commit()
+        
+        return {
+            "period_end": period_end,
+            "method": run.method,
+            "assets_depreciated": len(entries),
+            "assets_skipped": len(rows) - len(entries),
+            "total_depreciation": total_depreciation,
+            "journal_entry_id": journal_entry_id
+        }
+    
+    @staticmethod
+    def get_register_fingerprint(db: Session) -> tuple:
+        """Cheap aggregate that changes whenever an asset or its depreciation history changes"""
+        return tuple(db.query(
+            select(func.count(Asset.id)).scalar_subquery(),
+            select(func.max(Asset.updated_at)).scalar_subquery(),
+            select(func.sum(Asset.row_version)).scalar_subquery(),
+            select(func.count(AssetDepreciation.id)).scalar_subquery(),
+            select(func.max(AssetDepreciation.updated_at)).scalar_subquery(),
+            select(func.sum(AssetDepreciation.row_version)).scalar_subquery()
+        ).one())
+    
+    @staticmethod
+    def forecast_depreciation(
+        db: Session,
+        years: int = 5,
+        frequency: str = "yearly",
+        method: str = "straight_line",
+        start_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Project book values for all active assets without writing anything"""
+        start_date = start_date or date.today()
+        step = 1 if frequency == "monthly" else 12
+        # Period i ends with the month step * i - 1 months after the start month: a monthly
+        # forecast from 1 January starts with January, a yearly one ends its first year in December
+        periods = [_month_end(start_date, step * i - 1) for i in range(1, years * 12 // step + 1)]
+        
+        assets = db.query(
+            Asset.id, Asset.asset_number, Asset.name, Asset.category,
+            Asset.acquisition_cost, Asset.current_value, Asset.depreciation_rate
+        ).filter(Asset.status == "active").order_by(Asset.id).all()
+        
+        costs = [Decimal(str(asset.acquisition_cost)) for asset in assets]
+        book_values = [Decimal(str(asset.current_value)) for asset in assets]
+        rates = [Decimal(str(asset.depreciation_rate or 0)) for asset in assets]
+        months = [step] * len(assets)
+        
+        # One column-wise step per period for the whole register
+        depreciation_columns, book_value_columns = [], []
+        for _ in periods:
+            amounts = AssetService.compute_depreciation(method, costs, book_values, rates, months)
+            amounts = [max(amount, Decimal("0.00")) for amount in amounts]
+            book_values = [book_value - amount for book_value, amount in zip(book_values, amounts)]
+            depreciation_columns.append(amounts)
+            book_value_columns.append(book_values)
+        
+        schedules = []
+        category_totals: Dict[str, Dict[str, List[Decimal]]] = {}
+        for index, asset in enumerate(assets):
+            depreciation = [column[index] for column in depreciation_columns]
+            values = [column[index] for column in book_value_columns]
+            schedules.append({
+                "asset_id": asset.id,
+                "asset_number": asset.asset_number,
+                "name": asset.name,
+                "category": asset.category,
+                "depreciation": depreciation,
+                "book_values": values
+            })
+            totals = category_totals.setdefault(asset.category, {
+                "depreciation": [Decimal("0.00")] * len(periods),
+                "book_values": [Decimal("0.00")] * len(periods)
+            })
+            totals["depreciation"] = [a + b for a, b in zip(totals["depreciation"], depreciation)]
+            totals["book_values"] = [a + b for a, b in zip(totals["book_values"], values)]
+        
+        return {
+            "start_date": start_date,
+            "frequency": frequency,
+            "method": method,
+            "periods": periods,
+            "assets": schedules,
+            "categories": [
+                {"category": category, **totals}
+                for category, totals in sorted(category_totals.items())
+            ]
+        }
+    
+    @staticmethod
+    def get_depreciation_forecast_json(
+        db: Session,
+        years: int = 5,
+        frequency: str = "yearly",
+        method: str = "straight_line",
+        start_date: Optional[date] = None
+    ) -> bytes:
+        """Return the encoded forecast, recomputing only when the register has changed"""
+        start_date = start_date or date.today()
+        cache_key = (AssetService.get_register_fingerprint(db), years, frequency, method, start_date)
+        with _forecast_cache_lock:
+            content = _forecast_cache.get(cache_key)
+            if content is not None:
+                _forecast_cache.move_to_end(cache_key)
+                return content
+        
+        # Computed outside the lock; two requests missing at once both compute, the last one is kept
+        forecast = AssetService.forecast_depreciation(
+            db, years=years, frequency=frequency, method=method, start_date=start_date
+        )
+        content = json.dumps(forecast, default=json_default).encode("utf-8")
+        
+        with _forecast_cache_lock:
+            _forecast_cache[cache_key] = content
+            while len(_forecast_cache) > FORECAST_CACHE_SIZE:
+                _forecast_cache.popitem(last=False)
+        return content
+    
+    # Asset register summary methods
+    @staticmethod
+    def get_register_summary(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        category: Optional[str] = None,
+        location: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Summarize assets with maintenance and depreciation totals, rolled up by category and location"""
+        maintenance = db.query(
+            AssetMaintenance.asset_id.label("asset_id"),
+            func.sum(AssetMaintenance.cost).label("total_cost"),
+            func.count(AssetMaintenance.id).label("record_count"),
+            func.max(AssetMaintenance.maintenance_date).label("last_date")
+        ).group_by(AssetMaintenance.asset_id).subquery()
+        
+        depreciation = db.query(
+            AssetDepreciation.asset_id.label("asset_id"),
+            func.sum(AssetDepreciation.depreciation_amount).label("total_amount")
+        ).group_by(AssetDepreciation.asset_id).subquery()
+        
+        total_maintenance = func.coalesce(maintenance.c.total_cost, 0)
+        accumulated_depreciation = func.coalesce(depreciation.c.total_amount, 0)
+        
+        def with_totals(query):
+            query = query.select_from(Asset).outerjoin(
+                maintenance, maintenance.c.asset_id == Asset.id
+            ).outerjoin(
+                depreciation, depreciation.c.asset_id == Asset.id
+            )
+            if category:
+                query = query.filter(Asset.category == category)
+            if location:
+                query = query.filter(Asset.location == location)
+            if status:
+                query = query.filter(Asset.status == status)
+            return query
+        
+        rows = with_totals(db.query(
+            Asset.id.label("asset_id"),
+            Asset.asset_number,
+            Asset.name,
+            Asset.category,
+            Asset.location,
+            Asset.status,
+            Asset.acquisition_cost,
+            Asset.current_value,
+            accumulated_depreciation.label("accumulated_depreciation"),
+            total_maintenance.label("total_maintenance_cost"),
+            func.coalesce(maintenance.c.record_count, 0).label("maintenance_count"),
+            maintenance.c.last_date.label("last_maintenance_date")
+        )).order_by(Asset.id).offset(skip).limit(limit).all()
+        
+        def rollup(column) -> List[Dict[str, Any]]:
+            return [
+                dict(row._mapping)
+                for row in with_totals(db.query(
+                    column.label("key"),
+                    func.count(Asset.id).label("asset_count"),
+                    func.coalesce(func.sum(Asset.acquisition_cost), 0).label("acquisition_cost"),
+                    func.coalesce(func.sum(Asset.current_value), 0).label("current_value"),
+                    func.sum(accumulated_depreciation).label("accumulated_depreciation"),
+                    func.sum(total_maintenance).label("total_maintenance_cost")
+                )).group_by(column).order_by(column).all()
+            ]
+        
+        return {
+            "assets": [dict(row._mapping) for row in rows],
+            "by_category": rollup(Asset.category),
+            "by_location": rollup(Asset.location)
+        }
+    
     # Asset Maintenance methods
     @staticmethod
     def get_asset_maintenances(db: Session, asset_id: int) -> List[AssetMaintenance]:
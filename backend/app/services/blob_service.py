@@ -0,0 +1,169 @@
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+import time
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+
+from app.models.documents import DocumentBlob, DocumentVersion
+from app.utils.storage import StorageBackend, get_storage
+
+class BlobService:
+    @staticmethod
+    def get_blob_by_hash(db: Session, content_hash: str) -> Optional[DocumentBlob]:
+        """Get a blob by its content hash"""
+        return db.query(DocumentBlob).filter(DocumentBlob.content_hash == content_hash).first()
+    
+    @staticmethod
+    def acquire_blob(
+        db: Session,
+        content_hash: str,
+        file_path: str,
+        file_size: int,
+        references: int = 1
+    ) -> DocumentBlob:
+        """
+        Take references on the blob for a content hash, creating its row if needed.
+        A concurrent insert of the same hash only rolls back to a savepoint, so
+        other writes already in the transaction are kept.
+        """
+        for _ in range(2):
+            updated = db.query(DocumentBlob).filter(DocumentBlob.content_hash == content_hash).update(
+                {DocumentBlob.ref_count: DocumentBlob.ref_count + references},
+                synchronize_session=False
+            )
+            if updated:
+                break
+            try:
+                with db.begin_nested():
+                    db.add(DocumentBlob(
+                        content_hash=content_hash,
+                        file_path=file_path,
+                        file_size=file_size,
+                        ref_count=references
+                    ))
+                break
+            except IntegrityError:
+                # Another request stored the same content first, take a reference on theirs
+                continue
+        
+        blob = BlobService.get_blob_by_hash(db, content_hash)
+        if blob is None:
+            # Inserted and released again by other requests on both attempts
+            raise RuntimeError(f"Could not take a reference on the blob for {content_hash}")
+        db.refresh(blob)
+        if blob.archived_at is not None:
+            BlobService.restore_blob(db, blob, file_path)
+        return blob
+    
+    @staticmethod
+    def acquire_blobs(db: Session, blobs: Dict[str, Tuple[str, int, int]]) -> Dict[str, int]:
+        """
+        Batch version of `acquire_blob` for {content_hash: (file_path, file_size, references)}.
+        Returns blob ids by content hash.
+        """
+        table = DocumentBlob.__table__
+        for attempt in range(2):
+            blob_ids = dict(
+                db.query(DocumentBlob.content_hash, DocumentBlob.id)
+                .filter(DocumentBlob.content_hash.in_(list(blobs)))
+                .all()
+            )
+            new_rows = [
+                {"content_hash": content_hash, "file_path": file_path, "file_size": file_size, "ref_count": references}
+                for content_hash, (file_path, file_size, references) in blobs.items()
+                if content_hash not in blob_ids
+            ]
+            try:
+                if new_rows:
+                    with db.begin_nested():
+                        db.execute(table.insert(), new_rows)
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+                # Another request stored some of the same content first
+        
+        # One UPDATE per distinct reference count, usually just one
+        by_references = defaultdict(list)
+        for content_hash in blob_ids:
+            by_references[blobs[content_hash][2]].append(content_hash)
+        for references, content_hashes in by_references.items():
+            db.query(DocumentBlob).filter(DocumentBlob.content_hash.in_(content_hashes)).update(
+                {DocumentBlob.ref_count: DocumentBlob.ref_count + references},
+                synchronize_session=False
+            )
+        
+        archived = db.query(DocumentBlob).filter(
+            DocumentBlob.content_hash.in_(list(blob_ids)),
+            DocumentBlob.archived_at.isnot(None)
+        ).all() if blob_ids else []
+        for blob in archived:
+            BlobService.restore_blob(db, blob, blobs[blob.content_hash][0])
+        
+        if new_rows:
+            blob_ids.update(
+                db.query(DocumentBlob.content_hash, DocumentBlob.id)
+                .filter(DocumentBlob.content_hash.in_([row["content_hash"] for row in new_rows]))
+                .all()
+            )
+        return blob_ids
+    
+    @staticmethod
+    def restore_blob(db: Session, blob: DocumentBlob, file_path: str) -> None:
+        """
+        Move an archived blob back to the uncompressed copy an upload just stored,
+        because it is about to become a document's current file. The compressed
+        copy is left for garbage collection.
+        """
+        blob.file_path = file_path
+        blob.compression = None
+        blob.stored_size = None
+        blob.archived_at = None
+        # The versions' payload changes, so their validators must too
+        db.query(DocumentVersion).filter(DocumentVersion.blob_id == blob.id).update(
+            {DocumentVersion.file_path: file_path, DocumentVersion.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+    
+    @staticmethod
+    def release_blob(db: Session, blob_id: Optional[int]) -> None:
+        """
+        Drop one reference on a blob, deleting its row when the last reference goes.
+        The file stays for `collect_garbage`: deleting it here could race an upload of
+        the same content that found it still stored and is about to reference it.
+        """
+        if blob_id is None:
+            return
+        
+        # Make pending deletes of referencing rows visible before the blob row can go
+        db.flush()
+        db.query(DocumentBlob).filter(DocumentBlob.id == blob_id).update(
+            {DocumentBlob.ref_count: DocumentBlob.ref_count - 1},
+            synchronize_session=False
+        )
+        db.query(DocumentBlob).filter(
+            DocumentBlob.id == blob_id,
+            DocumentBlob.ref_count <= 0
+        ).delete(synchronize_session=False)
+    
+    @staticmethod
+    def collect_garbage(
+        db: Session,
+        storage: Optional[StorageBackend] = None,
+        min_age_seconds: int = 3600
+    ) -> List[str]:
+        """
+        Remove stored blobs that no row references, e.g. left behind by a failed
+        transaction. Blobs younger than `min_age_seconds` are kept so uploads that
+        have not committed yet are not swept.
+        """
+        storage = storage or get_storage()
+        known = {path for (path,) in db.query(DocumentBlob.file_path).all()}
+        cutoff = time.time() - min_age_seconds
+        removed = []
+        for location, modified in storage.iter_blobs():
+            if location not in known and modified < cutoff:
+                storage.delete(location)
+                removed.append(location)
+        return removed
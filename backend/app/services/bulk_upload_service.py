@@ -0,0 +1,244 @@
+from typing import List, Optional, Dict, Any, BinaryIO
+from collections import Counter
+import csv
+import io
+import os
+import zipfile
+import zlib
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.documents import Document, DocumentTagLink, DocumentText
+from app.schemas.document import DocumentCreate
+from app.services.blob_service import BlobService
+from app.services.document_service import DocumentService
+from app.services.search_service import SearchService
+from app.utils.file_storage import UploadTooLargeError, store_file
+from app.utils.storage import StorageBackend
+
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_FIELDS = (
+    "name", "document_type", "related_entity_type", "related_entity_id",
+    "description", "tags", "expiry_date"
+)
+
+
+def _skip_entry(info: zipfile.ZipInfo) -> bool:
+    """Directories, the manifest and OS metadata files are not documents"""
+    base_name = os.path.basename(info.filename)
+    return (
+        info.is_dir()
+        or info.filename == MANIFEST_NAME
+        or info.filename.startswith("__MACOSX/")
+        or base_name.startswith(".")
+    )
+
+
+class BulkUploadService:
+    @staticmethod
+    def parse_manifest(data: bytes) -> Dict[str, Dict[str, Any]]:
+        """
+        Parse a CSV manifest into document fields keyed by file name.
+        The file_name column is required; other columns are any of MANIFEST_FIELDS.
+        """
+        if len(data) > settings.BULK_UPLOAD_MAX_MANIFEST_SIZE:
+            raise ValueError(f"Manifest exceeds {settings.BULK_UPLOAD_MAX_MANIFEST_SIZE} bytes")
+        try:
+            text = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("Manifest must be UTF-8 encoded")
+
+        reader = csv.DictReader(io.StringIO(text, newline=""))
+        fieldnames = [name.strip() for name in reader.fieldnames or []]
+        if "file_name" not in fieldnames:
+            raise ValueError("Manifest needs a file_name column")
+        reader.fieldnames = fieldnames
+
+        rows = {}
+        for row in reader:
+            file_name = (row.get("file_name") or "").strip()
+            if not file_name:
+                continue
+            if file_name in rows:
+                raise ValueError(f"Manifest lists {file_name} more than once")
+            rows[file_name] = {
+                key: value.strip()
+                for key, value in row.items()
+                if key in MANIFEST_FIELDS and value and value.strip()
+            }
+        return rows
+
+    @staticmethod
+    def _extract(
+        source: BinaryIO,
+        manifest: Optional[Dict[str, Dict[str, Any]]],
+        defaults: Dict[str, Any],
+        storage: Optional[StorageBackend] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Stream every entry of the archive into the blob store, one chunk at a time.
+        Returns one item per entry with either the stored file and its validated
+        document fields or the error that stopped it.
+        """
+        try:
+            archive = zipfile.ZipFile(source)
+        except zipfile.BadZipFile:
+            raise ValueError("Upload is not a valid ZIP archive")
+
+        with archive:
+            infos = [info for info in archive.infolist() if not _skip_entry(info)]
+            if len(infos) > settings.BULK_UPLOAD_MAX_ENTRIES:
+                raise ValueError(f"Archive has more than {settings.BULK_UPLOAD_MAX_ENTRIES} files")
+            if manifest is None and MANIFEST_NAME in archive.namelist():
+                try:
+                    with archive.open(MANIFEST_NAME) as entry:
+                        data = entry.read(settings.BULK_UPLOAD_MAX_MANIFEST_SIZE + 1)
+                except (zipfile.BadZipFile, zlib.error):
+                    raise ValueError(f"{MANIFEST_NAME} in the archive is corrupt")
+                manifest = BulkUploadService.parse_manifest(data)
+            manifest = manifest or {}
+
+            items = []
+            seen = set()
+            total_size = 0
+            for info in infos:
+                base_name = os.path.basename(info.filename)
+                fields = manifest.get(info.filename)
+                seen.add(info.filename)
+                if fields is None and base_name in manifest:
+                    fields = manifest[base_name]
+                    seen.add(base_name)
+                item = {"file_name": info.filename}
+                items.append(item)
+                try:
+                    data = {**defaults, **(fields or {})}
+                    data["name"] = data.get("name") or base_name
+                    if not data.get("document_type"):
+                        raise ValueError("No document_type in the manifest and no default given")
+                    document = DocumentCreate(**data)
+                    tag_names = DocumentService.parse_tags(document.tags)
+
+                    # Declared sizes are checked up front and enforced again while streaming
+                    if info.file_size > settings.BULK_UPLOAD_MAX_ENTRY_SIZE:
+                        raise UploadTooLargeError(f"File exceeds {settings.BULK_UPLOAD_MAX_ENTRY_SIZE} bytes")
+                    if info.compress_size and info.file_size / info.compress_size > settings.BULK_UPLOAD_MAX_COMPRESSION_RATIO:
+                        raise ValueError("File is compressed suspiciously well")
+                    remaining = settings.BULK_UPLOAD_MAX_TOTAL_SIZE - total_size
+                    if info.file_size > remaining:
+                        raise UploadTooLargeError(f"Archive exceeds {settings.BULK_UPLOAD_MAX_TOTAL_SIZE} bytes in total")
+
+                    with archive.open(info) as entry:
+                        file_path, content_hash, file_size = store_file(
+                            entry,
+                            storage,
+                            max_size=min(settings.BULK_UPLOAD_MAX_ENTRY_SIZE, remaining)
+                        )
+                    total_size += file_size
+
+                    item["document"] = document
+                    item["file"] = {"file_path": file_path, "content_hash": content_hash, "file_size": file_size}
+                    item["tag_names"] = tag_names
+                except (ValueError, RuntimeError, NotImplementedError, zipfile.BadZipFile) as e:
+                    # Encrypted entries raise RuntimeError, unknown compression NotImplementedError
+                    item["error"] = str(e)
+                except zlib.error:
+                    item["error"] = "File is corrupt"
+
+            for file_name in manifest:
+                if file_name not in seen:
+                    items.append({"file_name": file_name, "error": "Listed in the manifest but not in the archive"})
+        return items
+
+    @staticmethod
+    def _create_documents(db: Session, items: List[Dict[str, Any]], uploaded_by: Optional[int]) -> List[int]:
+        """Create the documents for stored items and commit them together"""
+        references = Counter(item["file"]["content_hash"] for item in items)
+        blob_ids = BlobService.acquire_blobs(db, {
+            item["file"]["content_hash"]: (
+                item["file"]["file_path"],
+                item["file"]["file_size"],
+                references[item["file"]["content_hash"]]
+            )
+            for item in items
+        })
+
+        tags = DocumentService.get_or_create_tags(
+            db, sorted({name for item in items for name in item["tag_names"]})
+        )
+        documents = []
+        for item in items:
+            document = item["document"]
+            documents.append(Document(
+                **document.dict(exclude={"tags", "uploaded_by"}),
+                **item["file"],
+                uploaded_by=document.uploaded_by or uploaded_by,
+                tags=", ".join(item["tag_names"]) or None,
+                blob_id=blob_ids[item["file"]["content_hash"]],
+                tag_links=[DocumentTagLink(tag=tags[name]) for name in item["tag_names"]]
+            ))
+        db.add_all(documents)
+        # Assigns every new id, each from its own insert
+        db.flush()
+        document_ids = [document.id for document in documents]
+
+        # Names and descriptions are searchable at once, file text follows from the index workers
+        db.execute(DocumentText.__table__.insert(), [
+            {
+                "document_id": document.id,
+                "name": document.name,
+                "description": document.description,
+                "content_hash": document.content_hash,
+                "status": "pending"
+            }
+            for document in documents
+        ])
+        db.commit()
+        return document_ids
+
+    @staticmethod
+    async def bulk_upload(
+        db: Session,
+        file: UploadFile,
+        manifest: Optional[UploadFile] = None,
+        defaults: Optional[Dict[str, Any]] = None,
+        uploaded_by: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Create documents from a ZIP archive. Fields come from a CSV manifest, passed
+        separately or as manifest.csv inside the archive, falling back to `defaults`.
+        Files that fail do not stop the others; each gets its own result.
+        """
+        manifest_rows = None
+        if manifest is not None:
+            manifest_rows = BulkUploadService.parse_manifest(
+                await manifest.read(settings.BULK_UPLOAD_MAX_MANIFEST_SIZE + 1)
+            )
+
+        await file.seek(0)
+        items = await run_in_threadpool(
+            BulkUploadService._extract,
+            file.file,
+            manifest_rows,
+            {key: value for key, value in (defaults or {}).items() if value is not None}
+        )
+
+        stored = [item for item in items if "document" in item]
+        if stored:
+            document_ids = BulkUploadService._create_documents(db, stored, uploaded_by)
+            for document_id, item in zip(document_ids, stored):
+                item["document_id"] = document_id
+                SearchService.schedule_indexing(document_id)
+
+        results = [
+            {
+                "file_name": item["file_name"],
+                "status": "failed" if "error" in item else "created",
+                "document_id": item.get("document_id"),
+                "error": item.get("error")
+            }
+            for item in items
+        ]
+        created = sum(1 for result in results if result["status"] == "created")
+        return {"created": created, "failed": len(results) - created, "results": results}
@@ -1,11 +1,20 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from datetime import date
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.sql import Select
 
 from app.models.business_partners import Customer, CustomerContact
+from app.db.loading import LoadProfile
+from app.db.reference_cache import ReferenceCache
 from app.schemas.customer import CustomerCreate, CustomerUpdate
 
+# Rows shared across requests; see app.db.reference_cache
+_customers = ReferenceCache(Customer)
+
+# Relationships a customer response can include, by their ?expand= name
+CUSTOMER_LOADING = LoadProfile(Customer, "contacts")
+
 # Customer CRUD operations
 def create_customer(db: Session, customer: CustomerCreate) -> Customer:
     """
@@ -57,20 +66,12 @@ def get_customer(db: Session, customer_id: int) -> Optional[Customer]:
     """
     Get a customer by ID
     """
-    return db.query(Customer).filter(Customer.id == customer_id).first()
+    return _customers.get(db, "id", customer_id)
 
-def get_customers(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100,
-    status: Optional[str] = None,
-    search: Optional[str] = None
-) -> List[Customer]:
+def _filter_customers(query, status: Optional[str] = None, search: Optional[str] = None):
     """
-    Get all customers with optional filtering
+    Apply the customer list filters to a Query or select()
     """
-    query = db.query(Customer)
-    
     # Apply status filter if provided
     if status:
         query = query.filter(Customer.status == status)
@@ -86,10 +87,32 @@ def get_customers(
                 Customer.phone.ilike(search_term)
             )
         )
+
+    return query
+
+def get_customers(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    expand: Iterable[str] = ()
+) -> List[Customer]:
+    """
+    Get all customers with optional filtering, with the `expand` relationships of CUSTOMER_LOADING
+    """
+    query = _filter_customers(db.query(Customer), status=status, search=search)
+    query = query.options(*CUSTOMER_LOADING.options(expand))
     
     # Apply pagination
     return query.offset(skip).limit(limit).all()
 
+def export_customers_query(status: Optional[str] = None, search: Optional[str] = None) -> Select:
+    """
+    The customer rows of the list filters, for app.utils.export
+    """
+    return _filter_customers(select(Customer.__table__), status=status, search=search).order_by(Customer.id)
+
 def update_customer(db: Session, customer_id: int, customer: CustomerUpdate) -> Customer:
     """
     Update a customer's information including contacts
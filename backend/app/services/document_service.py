@@ -1,26 +1,135 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from datetime import date
+from typing import List, Optional, Dict, Any, Union
+from sqlalchemy import false, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.sql import Select
+from datetime import date, timedelta
 import os
 from fastapi import UploadFile, File
 
-from app.models.documents import Document, DocumentVersion
+from app.models.documents import Document, DocumentVersion, DocumentTag, DocumentTagLink
 from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentVersionCreate, DocumentVersionUpdate
+from app.services.blob_service import BlobService
+from app.services.search_service import SearchService
+from app.utils.file_storage import save_upload
+from app.utils.storage import LocalStorageBackend, StorageBackend, get_storage
+
+TAG_MAX_LENGTH = 100  # DocumentTag.name
+TAGS_MAX_LENGTH = 255  # Document.tags
 
 class DocumentService:
     @staticmethod
-    def get_documents(
-        db: Session, 
-        skip: int = 0, 
-        limit: int = 100,
+    def get_storage(upload_dir: Optional[str] = None) -> StorageBackend:
+        """The configured storage backend, or local storage under an explicit upload directory"""
+        if upload_dir:
+            return LocalStorageBackend(upload_dir)
+        return get_storage()
+    
+    @staticmethod
+    def parse_tags(value: Optional[Union[str, List[str]]]) -> List[str]:
+        """
+        Normalize comma-separated tags, or a list of them, into trimmed,
+        lowercase, de-duplicated tag names
+        """
+        if not value:
+            return []
+        items = [value] if isinstance(value, str) else value
+        names = []
+        for item in items:
+            for part in item.split(","):
+                name = " ".join(part.split()).lower()
+                if not name or name in names:
+                    continue
+                if len(name) > TAG_MAX_LENGTH:
+                    raise ValueError(f"Tag '{name}' is longer than {TAG_MAX_LENGTH} characters")
+                names.append(name)
+        if len(", ".join(names)) > TAGS_MAX_LENGTH:
+            raise ValueError(f"Tags are longer than {TAGS_MAX_LENGTH} characters in total")
+        return names
+    
+    @staticmethod
+    def get_or_create_tags(db: Session, names: List[str]) -> Dict[str, DocumentTag]:
+        """
+        Tags by normalized name, inserting the ones that do not exist yet. A concurrent
+        insert of the same name only rolls back to a savepoint and its tag is used.
+        """
+        existing = {}
+        if names:
+            existing = {tag.name: tag for tag in db.query(DocumentTag).filter(DocumentTag.name.in_(names))}
+        for name in names:
+            if name in existing:
+                continue
+            tag = DocumentTag(name=name)
+            try:
+                with db.begin_nested():
+                    db.add(tag)
+            except IntegrityError:
+                # Another request created the tag first; a locking read sees its commit
+                # where a plain one could still read this transaction's snapshot
+                tag = db.query(DocumentTag).filter(DocumentTag.name == name).with_for_update(read=True).one()
+            existing[name] = tag
+        return existing
+    
+    @staticmethod
+    def set_document_tags(db: Session, document: Document, value: Optional[Union[str, List[str]]]) -> None:
+        """Replace a document's tags, creating tags that do not exist yet"""
+        names = DocumentService.parse_tags(value)
+        existing = DocumentService.get_or_create_tags(db, names)
+        
+        # Keep links that stay so the unique (document_id, tag_id) pair is never re-inserted
+        current = {link.tag.name: link for link in document.tag_links}
+        document.tag_links = [current.get(name) or DocumentTagLink(tag=existing[name]) for name in names]
+        document.tags = ", ".join(names) or None
+    
+    @staticmethod
+    def _tag_ids_statement(names: List[str]):
+        """Ids of the named tags"""
+        return select(DocumentTag.id).where(DocumentTag.name.in_(names))
+    
+    @staticmethod
+    def _filter_documents(
+        db: Session,
+        query,
         related_entity_type: Optional[str] = None,
         related_entity_id: Optional[int] = None,
         document_type: Optional[str] = None,
-        status: Optional[str] = None
-    ) -> List[Document]:
-        """Get all documents with optional filtering"""
-        query = db.query(Document)
-        
+        status: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_match: str = "all",
+        expiring: Optional[int] = None
+    ):
+        """Apply the document list filters to a query"""
+        names = DocumentService.parse_tags(tags)
+        tag_ids = db.execute(DocumentService._tag_ids_statement(names)).scalars().all() if names else []
+        return DocumentService._apply_document_filters(
+            query,
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id,
+            document_type=document_type,
+            status=status,
+            tag_names=names,
+            tag_ids=tag_ids,
+            tag_match=tag_match,
+            expiring=expiring
+        )
+    
+    @staticmethod
+    def _apply_document_filters(
+        query,
+        related_entity_type: Optional[str] = None,
+        related_entity_id: Optional[int] = None,
+        document_type: Optional[str] = None,
+        status: Optional[str] = None,
+        tag_names: Optional[List[str]] = None,
+        tag_ids: Optional[List[int]] = None,
+        tag_match: str = "all",
+        expiring: Optional[int] = None
+    ):
+        """
+        Apply the document list filters to a Query or select(). Tags are passed
+        already resolved to ids so the same filters serve sync and async sessions.
+        """
         if related_entity_type:
             query = query.filter(Document.related_entity_type == related_entity_type)
         
@@ -33,20 +142,186 @@ class DocumentService:
         if status:
             query = query.filter(Document.status == status)
         
+        if expiring is not None:
+            # Equality on status plus a date range keeps this on the (status, expiry_date) index
+            if not status:
+                query = query.filter(Document.status == "active")
+            today = date.today()
+            query = query.filter(Document.expiry_date.between(today, today + timedelta(days=expiring)))
+        
+        if tag_names:
+            if not tag_ids or (tag_match == "all" and len(tag_ids) < len(tag_names)):
+                return query.filter(false())
+            
+            # Each lookup is a range scan of the (tag_id, document_id) index
+            if tag_match == "all":
+                for tag_id in tag_ids:
+                    query = query.filter(Document.id.in_(
+                        select(DocumentTagLink.document_id).where(DocumentTagLink.tag_id == tag_id)
+                    ))
+            else:
+                query = query.filter(Document.id.in_(
+                    select(DocumentTagLink.document_id).where(DocumentTagLink.tag_id.in_(tag_ids))
+                ))
+        
+        return query
+    
+    @staticmethod
+    def get_documents(
+        db: Session, 
+        skip: int = 0, 
+        limit: int = 100,
+        related_entity_type: Optional[str] = None,
+        related_entity_id: Optional[int] = None,
+        document_type: Optional[str] = None,
+        status: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_match: str = "all",
+        expiring: Optional[int] = None
+    ) -> List[Document]:
+        """
+        Get all documents with optional filtering.
+        With `tags`, tag_match="all" requires every tag and "any" at least one.
+        With `expiring`, only documents expiring within that many days, soonest first.
+        """
+        query = DocumentService._filter_documents(
+            db,
+            db.query(Document),
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id,
+            document_type=document_type,
+            status=status,
+            tags=tags,
+            tag_match=tag_match,
+            expiring=expiring
+        )
+        if expiring is not None:
+            query = query.order_by(Document.expiry_date, Document.id)
         return query.offset(skip).limit(limit).all()
     
+    @staticmethod
+    def export_documents_query(
+        db: Session,
+        related_entity_type: Optional[str] = None,
+        related_entity_id: Optional[int] = None,
+        document_type: Optional[str] = None,
+        status: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_match: str = "all",
+        expiring: Optional[int] = None
+    ) -> Select:
+        """The document rows of the list filters, in the list's order, for app.utils.export"""
+        statement = DocumentService._filter_documents(
+            db,
+            select(Document.__table__),
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id,
+            document_type=document_type,
+            status=status,
+            tags=tags,
+            tag_match=tag_match,
+            expiring=expiring
+        )
+        if expiring is not None:
+            return statement.order_by(Document.expiry_date, Document.id)
+        return statement.order_by(Document.id)
+    
+    @staticmethod
+    async def get_documents_async(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        related_entity_type: Optional[str] = None,
+        related_entity_id: Optional[int] = None,
+        document_type: Optional[str] = None,
+        status: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_match: str = "all",
+        expiring: Optional[int] = None
+    ) -> List[Document]:
+        """`get_documents` on an async session, without blocking the event loop"""
+        names = DocumentService.parse_tags(tags)
+        tag_ids = (await db.execute(DocumentService._tag_ids_statement(names))).scalars().all() if names else []
+        statement = DocumentService._apply_document_filters(
+            select(Document).options(*DocumentService._document_load_options()),
+            related_entity_type=related_entity_type,
+            related_entity_id=related_entity_id,
+            document_type=document_type,
+            status=status,
+            tag_names=names,
+            tag_ids=tag_ids,
+            tag_match=tag_match,
+            expiring=expiring
+        )
+        if expiring is not None:
+            statement = statement.order_by(Document.expiry_date, Document.id)
+        result = await db.execute(statement.offset(skip).limit(limit))
+        return result.scalars().all()
+    
+    @staticmethod
+    def get_tag_facets(
+        db: Session,
+        limit: int = 50,
+        related_entity_type: Optional[str] = None,
+        related_entity_id: Optional[int] = None,
+        document_type: Optional[str] = None,
+        status: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tag_match: str = "all"
+    ) -> List[Dict[str, Any]]:
+        """Count documents per tag within the documents matching the filters"""
+        document_count = func.count(DocumentTagLink.document_id)
+        query = db.query(DocumentTag.name, document_count).join(
+            DocumentTagLink, DocumentTagLink.tag_id == DocumentTag.id
+        )
+        
+        if any([related_entity_type, related_entity_id, document_type, status, tags]):
+            documents = DocumentService._filter_documents(
+                db,
+                db.query(Document.id),
+                related_entity_type=related_entity_type,
+                related_entity_id=related_entity_id,
+                document_type=document_type,
+                status=status,
+                tags=tags,
+                tag_match=tag_match
+            )
+            query = query.filter(DocumentTagLink.document_id.in_(documents.subquery().select()))
+        
+        rows = query.group_by(DocumentTag.id, DocumentTag.name).order_by(
+            document_count.desc(), DocumentTag.name
+        ).limit(limit).all()
+        return [{"name": name, "document_count": count} for name, count in rows]
+    
+    @staticmethod
+    def _document_load_options():
+        """Relationships the document response needs, loaded up front since async sessions cannot lazy load"""
+        return (selectinload(Document.versions).selectinload(DocumentVersion.blob),)
+    
     @staticmethod
     def get_document(db: Session, document_id: int) -> Optional[Document]:
         """Get a single document by ID"""
         return db.query(Document).filter(Document.id == document_id).first()
     
+    @staticmethod
+    async def get_document_async(db: AsyncSession, document_id: int) -> Optional[Document]:
+        """Get a single document by ID on an async session"""
+        result = await db.execute(
+            select(Document).options(*DocumentService._document_load_options()).where(Document.id == document_id)
+        )
+        return result.scalars().first()
+    
     @staticmethod
     def create_document(db: Session, document: DocumentCreate) -> Document:
-        """Create a new document"""
-        db_document = Document(**document.dict())
+        """Create a document record without a file; files come in through `upload_document`"""
+        db_document = Document(**document.dict(exclude={"tags"}))
+        DocumentService.set_document_tags(db, db_document, document.tags)
+        needs_extraction = SearchService.prepare_index(db, db_document)
         db.add(db_document)
         db.commit()
         db.refresh(db_document)
+        if needs_extraction:
+            SearchService.schedule_indexing(db_document.id)
         return db_document
     
     @staticmethod
@@ -54,29 +329,39 @@ class DocumentService:
         db: Session, 
         file: UploadFile, 
         document_data: Dict[str, Any],
-        upload_dir: str = "uploads"
+        upload_dir: Optional[str] = None
     ) -> Document:
         """Upload a new document file and create document record"""
-        # Ensure upload directory exists
-        os.makedirs(upload_dir, exist_ok=True)
+        # Reject bad tags before storing anything
+        DocumentService.parse_tags(document_data.get("tags"))
         
-        # Generate file path
-        file_extension = os.path.splitext(file.filename)[1]
-        timestamp = date.today().strftime("%Y%m%d")
-        file_name = f"{timestamp}_{file.filename}"
-        file_path = os.path.join(upload_dir, file_name)
-        
-        # Save file
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # Stream the file into the blob store off the event loop
+        storage = DocumentService.get_storage(upload_dir)
+        file_path, content_hash, file_size = await save_upload(file, storage=storage)
         
         # Create document record
-        document_data["file_path"] = file_path
         document_data["name"] = document_data.get("name", file.filename)
-        
         document = DocumentCreate(**document_data)
-        return DocumentService.create_document(db, document)
+        
+        # Identical content is stored once and shared through the blob's reference count
+        blob = BlobService.acquire_blob(db, content_hash, file_path, file_size)
+        db_document = Document(
+            **document.dict(exclude={"tags"}),
+            file_path=file_path,
+            content_hash=content_hash,
+            file_size=file_size,
+            blob_id=blob.id
+        )
+        DocumentService.set_document_tags(db, db_document, document.tags)
+        needs_extraction = SearchService.prepare_index(db, db_document)
+        db.add(db_document)
+        db.commit()
+        db.refresh(db_document)
+        
+        # Text extraction runs on the index worker pool, never in the request
+        if needs_extraction:
+            SearchService.schedule_indexing(db_document.id)
+        return db_document
     
     @staticmethod
     def update_document(db: Session, document_id: int, document: DocumentUpdate) -> Optional[Document]:
@@ -84,8 +369,11 @@ class DocumentService:
         db_document = DocumentService.get_document(db, document_id)
         if db_document:
             update_data = document.dict(exclude_unset=True)
+            if "tags" in update_data:
+                DocumentService.set_document_tags(db, db_document, update_data.pop("tags"))
             for key, value in update_data.items():
                 setattr(db_document, key, value)
+            SearchService.prepare_index(db, db_document)
             
             db.commit()
             db.refresh(db_document)
@@ -96,16 +384,13 @@ class DocumentService:
         """Delete a document"""
         db_document = DocumentService.get_document(db, document_id)
         if db_document:
-            # Delete the file if it exists
-            if os.path.exists(db_document.file_path):
-                os.remove(db_document.file_path)
-            
-            # Delete document versions files
-            for version in db_document.versions:
-                if os.path.exists(version.file_path):
-                    os.remove(version.file_path)
+            blob_ids = [db_document.blob_id] + [version.blob_id for version in db_document.versions]
             
             db.delete(db_document)
+            
+            # Files whose last reference goes with this document are left to garbage collection
+            for blob_id in blob_ids:
+                BlobService.release_blob(db, blob_id)
             db.commit()
             return True
         return False
@@ -122,15 +407,23 @@ class DocumentService:
     
     @staticmethod
     def create_document_version(db: Session, version: DocumentVersionCreate) -> DocumentVersion:
-        """Create a new document version"""
-        # Get the document to update its latest version
-        document = db.query(Document).filter(Document.id == version.document_id).first()
-        if document:
-            # Update the document's file path to the new version
-            document.file_path = version.file_path
-            db.commit()
+        """
+        Record the document's current file as a new version, e.g. to attach notes
+        to it; new files come in through `upload_document_version`
+        """
+        document = DocumentService.get_document(db, version.document_id)
+        if document is None or document.blob is None:
+            raise ValueError(f"Document with ID {version.document_id} has no stored file")
         
-        db_version = DocumentVersion(**version.dict())
+        # The version shares the document's blob, so it takes a reference of its own
+        blob = BlobService.acquire_blob(db, document.blob.content_hash, document.blob.file_path, document.blob.file_size)
+        db_version = DocumentVersion(
+            **version.dict(),
+            file_path=blob.file_path,
+            content_hash=blob.content_hash,
+            file_size=blob.file_size,
+            blob_id=blob.id
+        )
         db.add(db_version)
         db.commit()
         db.refresh(db_version)
@@ -143,12 +436,9 @@ class DocumentService:
         file: UploadFile, 
         notes: Optional[str] = None,
         uploaded_by: Optional[int] = None,
-        upload_dir: str = "uploads"
+        upload_dir: Optional[str] = None
     ) -> DocumentVersion:
         """Upload a new version of a document"""
-        # Ensure upload directory exists
-        os.makedirs(upload_dir, exist_ok=True)
-        
         # Get the document
         document = DocumentService.get_document(db, document_id)
         if not document:
@@ -160,28 +450,42 @@ class DocumentService:
         if versions:
             version_number = max(v.version_number for v in versions) + 1
         
-        # Generate file path
-        file_extension = os.path.splitext(file.filename)[1]
-        timestamp = date.today().strftime("%Y%m%d")
-        file_name = f"{timestamp}_{document.name}_v{version_number}{file_extension}"
-        file_path = os.path.join(upload_dir, file_name)
-        
-        # Save file
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # Stream the file into the blob store off the event loop
+        storage = DocumentService.get_storage(upload_dir)
+        file_path, content_hash, file_size = await save_upload(file, storage=storage)
         
         # Create version record
         version_data = {
             "document_id": document_id,
             "version_number": version_number,
-            "file_path": file_path,
             "uploaded_by": uploaded_by,
             "notes": notes
         }
-        
         version = DocumentVersionCreate(**version_data)
-        return DocumentService.create_document_version(db, version)
+        
+        # One reference for the version and one for the document now pointing at it
+        blob = BlobService.acquire_blob(db, content_hash, file_path, file_size, references=2)
+        previous_blob_id = document.blob_id
+        document.file_path = file_path
+        document.content_hash = content_hash
+        document.file_size = file_size
+        document.blob_id = blob.id
+        
+        db_version = DocumentVersion(
+            **version.dict(),
+            file_path=file_path,
+            content_hash=content_hash,
+            file_size=file_size,
+            blob_id=blob.id
+        )
+        db.add(db_version)
+        BlobService.release_blob(db, previous_blob_id)
+        needs_extraction = SearchService.prepare_index(db, document)
+        db.commit()
+        if needs_extraction:
+            SearchService.schedule_indexing(document_id)
+        db.refresh(db_version)
+        return db_version
     
     @staticmethod
     def update_document_version(db: Session, version_id: int, version: DocumentVersionUpdate) -> Optional[DocumentVersion]:
@@ -201,11 +505,11 @@ class DocumentService:
         """Delete a document version"""
         db_version = DocumentService.get_document_version(db, version_id)
         if db_version:
-            # Delete the file if it exists
-            if os.path.exists(db_version.file_path):
-                os.remove(db_version.file_path)
-            
+            blob_id = db_version.blob_id
             db.delete(db_version)
+            
+            # The blob row stays while the document or other versions still reference it
+            BlobService.release_blob(db, blob_id)
             db.commit()
             return True
         return False
@@ -0,0 +1,100 @@
+from typing import List, Optional, Dict, Any
+from datetime import date, datetime, timedelta
+import logging
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import database
+from app.models.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryService:
+    @staticmethod
+    def expire_documents(db: Session, today: Optional[date] = None) -> int:
+        """Flag every active document past its expiry date as expired in one UPDATE"""
+        today = today or date.today()
+        expired = db.query(Document).filter(
+            Document.status == "active",
+            Document.expiry_date < today
+        ).update(
+            {Document.status: "expired", Document.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        return expired
+
+    @staticmethod
+    def get_expiring_digest(db: Session, days: Optional[int] = None, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Active documents expiring within `days`, grouped by related entity.
+        Entities whose documents expire soonest come first.
+        """
+        today = today or date.today()
+        days = settings.DOCUMENT_EXPIRY_WARNING_DAYS if days is None else days
+        rows = db.query(
+            Document.id,
+            Document.name,
+            Document.document_type,
+            Document.expiry_date,
+            Document.related_entity_type,
+            Document.related_entity_id
+        ).filter(
+            Document.status == "active",
+            Document.expiry_date.between(today, today + timedelta(days=days))
+        ).order_by(Document.expiry_date, Document.id).all()
+
+        # Rows arrive in index order, so each group's first row is its earliest expiry
+        digest: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            key = (row.related_entity_type, row.related_entity_id)
+            entry = digest.get(key)
+            if entry is None:
+                entry = digest[key] = {
+                    "related_entity_type": row.related_entity_type,
+                    "related_entity_id": row.related_entity_id,
+                    "document_count": 0,
+                    "earliest_expiry_date": row.expiry_date,
+                    "documents": []
+                }
+            entry["document_count"] += 1
+            entry["documents"].append({
+                "id": row.id,
+                "name": row.name,
+                "document_type": row.document_type,
+                "expiry_date": row.expiry_date
+            })
+        return list(digest.values())
+
+    @staticmethod
+    def run_expiry(db: Session, days: Optional[int] = None, today: Optional[date] = None) -> Dict[str, Any]:
+        """Expire overdue documents and build the expiring-soon digest"""
+        expired = ExpiryService.expire_documents(db, today)
+        digest = ExpiryService.get_expiring_digest(db, days, today)
+        return {
+            "expired": expired,
+            "expiring_count": sum(entry["document_count"] for entry in digest),
+            "digest": digest
+        }
+
+    @staticmethod
+    def run_expiry_job() -> Dict[str, Any]:
+        """Periodic expiry run with its own session; the digest goes to the log"""
+        db = database.SessionLocal()
+        try:
+            report = ExpiryService.run_expiry(db)
+        finally:
+            db.close()
+
+        if report["expired"]:
+            logger.info(f"Marked {report['expired']} documents as expired")
+        for entry in report["digest"]:
+            entity = entry["related_entity_type"] or "unlinked"
+            if entry["related_entity_id"] is not None:
+                entity = f"{entity} {entry['related_entity_id']}"
+            logger.info(
+                f"{entity}: {entry['document_count']} documents expiring, "
+                f"first on {entry['earliest_expiry_date'].isoformat()}"
+            )
+        return report
@@ -1,7 +1,9 @@
 from typing import List, Optional
 from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.sql import Select
 
 from app.models.member import Member, SavingsTransaction, SHUDistribution
 from app.schemas.member import MemberCreate, MemberUpdate, SavingsTransactionCreate, SHUDistributionCreate
@@ -48,18 +50,10 @@ def get_member_by_member_id(db: Session, member_id: str) -> Optional[Member]:
     """
     return db.query(Member).filter(Member.member_id == member_id).first()
 
-def get_members(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100,
-    status: Optional[str] = None,
-    search: Optional[str] = None
-) -> List[Member]:
+def _filter_members(query, status: Optional[str] = None, search: Optional[str] = None):
     """
-    Get all members with optional filtering
+    Apply the member list filters to a Query or select()
     """
-    query = db.query(Member)
-    
     # Apply status filter if provided
     if status:
         query = query.filter(Member.status == status)
@@ -75,10 +69,44 @@ def get_members(
                 Member.member_id.ilike(search_term)
             )
         )
-    
+
+    return query
+
+def get_members(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    search: Optional[str] = None
+) -> List[Member]:
+    """
+    Get all members with optional filtering
+    """
+    query = _filter_members(db.query(Member), status=status, search=search)
+
     # Apply pagination
     return query.offset(skip).limit(limit).all()
 
+async def get_members_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    search: Optional[str] = None
+) -> List[Member]:
+    """
+    Get all members with optional filtering, without blocking the event loop
+    """
+    statement = _filter_members(select(Member), status=status, search=search)
+    result = await db.execute(statement.offset(skip).limit(limit))
+    return result.scalars().all()
+
+def export_members_query(status: Optional[str] = None, search: Optional[str] = None) -> Select:
+    """
+    The member rows of the list filters, for app.utils.export
+    """
+    return _filter_members(select(Member.__table__), status=status, search=search).order_by(Member.id)
+
 def update_member(db: Session, member_id: int, member: MemberUpdate) -> Member:
     """
     Update a member's information
@@ -143,6 +171,18 @@ def create_savings_transaction(
     db.refresh(db_transaction)
     return db_transaction
 
+def _filter_savings_transactions(query, member_id: int, transaction_type: Optional[str] = None):
+    """
+    Apply the savings history filters to a Query or select()
+    """
+    query = query.filter(SavingsTransaction.member_id == member_id)
+    
+    # Apply transaction type filter if provided
+    if transaction_type:
+        query = query.filter(SavingsTransaction.transaction_type == transaction_type)
+
+    return query
+
 def get_member_savings_transactions(
     db: Session, 
     member_id: int, 
@@ -153,15 +193,20 @@ def get_member_savings_transactions(
     """
     Get all savings transactions for a member with optional filtering
     """
-    query = db.query(SavingsTransaction).filter(SavingsTransaction.member_id == member_id)
-    
-    # Apply transaction type filter if provided
-    if transaction_type:
-        query = query.filter(SavingsTransaction.transaction_type == transaction_type)
+    query = _filter_savings_transactions(db.query(SavingsTransaction), member_id, transaction_type=transaction_type)
     
     # Apply pagination and ordering
     return query.order_by(SavingsTransaction.transaction_date.desc()).offset(skip).limit(limit).all()
 
+def export_savings_transactions_query(member_id: int, transaction_type: Optional[str] = None) -> Select:
+    """
+    The savings history rows of a member, newest first, for app.utils.export
+    """
+    statement = _filter_savings_transactions(
+        select(SavingsTransaction.__table__), member_id, transaction_type=transaction_type
+    )
+    return statement.order_by(SavingsTransaction.transaction_date.desc(), SavingsTransaction.id.desc())
+
 # SHU Distribution operations
 def create_shu_distribution(
     db: Session, 
@@ -196,6 +241,18 @@ def create_shu_distribution(
     db.refresh(db_distribution)
     return db_distribution
 
+def _filter_shu_distributions(query, member_id: int, fiscal_year: Optional[int] = None):
+    """
+    Apply the SHU distribution filters to a Query or select()
+    """
+    query = query.filter(SHUDistribution.member_id == member_id)
+    
+    # Apply fiscal year filter if provided
+    if fiscal_year:
+        query = query.filter(SHUDistribution.fiscal_year == fiscal_year)
+
+    return query
+
 def get_member_shu_distributions(
     db: Session, 
     member_id: int, 
@@ -206,11 +263,14 @@ def get_member_shu_distributions(
     """
     Get all SHU distributions for a member with optional filtering
     """
-    query = db.query(SHUDistribution).filter(SHUDistribution.member_id == member_id)
-    
-    # Apply fiscal year filter if provided
-    if fiscal_year:
-        query = query.filter(SHUDistribution.fiscal_year == fiscal_year)
+    query = _filter_shu_distributions(db.query(SHUDistribution), member_id, fiscal_year=fiscal_year)
     
     # Apply pagination and ordering
     return query.order_by(SHUDistribution.distribution_date.desc()).offset(skip).limit(limit).all()
+
+def export_shu_distributions_query(member_id: int, fiscal_year: Optional[int] = None) -> Select:
+    """
+    The SHU distribution rows of a member, newest first, for app.utils.export
+    """
+    statement = _filter_shu_distributions(select(SHUDistribution.__table__), member_id, fiscal_year=fiscal_year)
+    return statement.order_by(SHUDistribution.distribution_date.desc(), SHUDistribution.id.desc())
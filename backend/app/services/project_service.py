@@ -1,8 +1,11 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session, joinedload
+from typing import Iterable, List, Optional, Dict, Any
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.sql import Select
 from datetime import date
 from decimal import Decimal
 
+from app.db.loading import LoadProfile
 from app.models.project import (
     Project, ProjectTask, ProjectTimeEntry, 
     ProjectInvoice, ProjectInvoiceItem, ProjectPayment
@@ -17,17 +20,29 @@ from app.schemas.project import (
 )
 from app.utils.id_generator import generate_project_number, generate_invoice_number
 
+# Relationships a project or project invoice response can include, by their ?expand= name
+PROJECT_LOADING = LoadProfile(Project, "tasks.time_entries", "invoices.items", "invoices.payments")
+PROJECT_INVOICE_LOADING = LoadProfile(ProjectInvoice, "items", "payments")
+
 class ProjectService:
     # Project methods
     @staticmethod
-    def get_projects(db: Session, skip: int = 0, limit: int = 100) -> List[Project]:
-        """Get all projects with pagination"""
-        return db.query(Project).offset(skip).limit(limit).all()
+    def get_projects(db: Session, skip: int = 0, limit: int = 100, expand: Iterable[str] = ()) -> List[Project]:
+        """Get all projects with pagination, with the `expand` relationships of PROJECT_LOADING"""
+        return db.query(Project).options(*PROJECT_LOADING.options(expand)).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def export_projects_query() -> Select:
+        """The project rows, for app.utils.export"""
+        return select(Project.__table__).order_by(Project.id)
     
     @staticmethod
-    def get_project(db: Session, project_id: int) -> Optional[Project]:
-        """Get a single project by ID"""
-        return db.query(Project).filter(Project.id == project_id).first()
+    def get_project(db: Session, project_id: int, expand: Optional[Iterable[str]] = None) -> Optional[Project]:
+        """Get a single project by ID, loading the `expand` relationships of PROJECT_LOADING up front"""
+        query = db.query(Project).filter(Project.id == project_id)
+        if expand is not None:
+            query = query.options(*PROJECT_LOADING.options(expand))
+        return query.first()
     
     @staticmethod
     def get_project_by_number(db: Session, project_number: str) -> Optional[Project]:
@@ -77,7 +92,9 @@ class ProjectService:
     @staticmethod
     def get_project_tasks(db: Session, project_id: int) -> List[ProjectTask]:
         """Get all tasks for a project"""
-        return db.query(ProjectTask).filter(ProjectTask.project_id == project_id).all()
+        return db.query(ProjectTask).filter(ProjectTask.project_id == project_id).options(
+            selectinload(ProjectTask.time_entries)
+        ).all()
     
     @staticmethod
     def get_project_task(db: Session, task_id: int) -> Optional[ProjectTask]:
@@ -198,42 +215,36 @@ class ProjectService:
     def get_project_invoices(db: Session, project_id: int) -> List[ProjectInvoice]:
         """Get all invoices for a project"""
         return db.query(ProjectInvoice).filter(ProjectInvoice.project_id == project_id).options(
-            # Explicitly join the project relationship
-            joinedload(ProjectInvoice.project).joinedload(Project.customer),
-            # Also load items and payments
-            joinedload(ProjectInvoice.items),
-            joinedload(ProjectInvoice.payments)
+            *PROJECT_INVOICE_LOADING.options(PROJECT_INVOICE_LOADING.names)
         ).all()
     
     @staticmethod
-    def get_all_invoices(db: Session, skip: int = 0, limit: int = 100) -> List[ProjectInvoice]:
-        """Get all project invoices with pagination"""
+    def get_all_invoices(db: Session, skip: int = 0, limit: int = 100, expand: Iterable[str] = ()) -> List[ProjectInvoice]:
+        """Get all project invoices with pagination, with the `expand` relationships of PROJECT_INVOICE_LOADING"""
         return db.query(ProjectInvoice).options(
-            # Explicitly join the project relationship
-            joinedload(ProjectInvoice.project).joinedload(Project.customer)
+            *PROJECT_INVOICE_LOADING.options(expand)
         ).offset(skip).limit(limit).all()
     
     @staticmethod
-    def get_project_invoice(db: Session, invoice_id: int) -> Optional[ProjectInvoice]:
-        """Get a single project invoice by ID"""
-        return db.query(ProjectInvoice).filter(ProjectInvoice.id == invoice_id).options(
-            # Explicitly join the project relationship
-            joinedload(ProjectInvoice.project).joinedload(Project.customer),
-            # Also load items and payments
-            joinedload(ProjectInvoice.items),
-            joinedload(ProjectInvoice.payments)
-        ).first()
+    def export_invoices_query(project_id: Optional[int] = None) -> Select:
+        """The project invoice rows, of one project if `project_id` is given, for app.utils.export"""
+        statement = select(ProjectInvoice.__table__)
+        if project_id:
+            statement = statement.filter(ProjectInvoice.project_id == project_id)
+        return statement.order_by(ProjectInvoice.id)
+    
+    @staticmethod
+    def get_project_invoice(db: Session, invoice_id: int, expand: Optional[Iterable[str]] = None) -> Optional[ProjectInvoice]:
+        """Get a single project invoice by ID, loading the `expand` relationships of PROJECT_INVOICE_LOADING up front"""
+        query = db.query(ProjectInvoice).filter(ProjectInvoice.id == invoice_id)
+        if expand is not None:
+            query = query.options(*PROJECT_INVOICE_LOADING.options(expand))
+        return query.first()
     
     @staticmethod
     def get_invoice_by_number(db: Session, invoice_number: str) -> Optional[ProjectInvoice]:
         """Get a single project invoice by invoice number"""
-        return db.query(ProjectInvoice).filter(ProjectInvoice.invoice_number == invoice_number).options(
-            # Explicitly join the project relationship
-            joinedload(ProjectInvoice.project).joinedload(Project.customer),
-            # Also load items and payments
-            joinedload(ProjectInvoice.items),
-            joinedload(ProjectInvoice.payments)
-        ).first()
+        return db.query(ProjectInvoice).filter(ProjectInvoice.invoice_number == invoice_number).first()
     
     @staticmethod
     def create_project_invoice(db: Session, invoice: ProjectInvoiceCreate) -> ProjectInvoice:
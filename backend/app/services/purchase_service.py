@@ -1,9 +1,13 @@
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any
 from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.sql import Select
 import uuid
 
+from app.db.loading import LoadProfile
+from app.models.business_partners import Supplier
 from app.models.purchases import PurchaseOrder, PurchaseOrderItem, SupplierInvoice, SupplierPayment
 from app.schemas.purchase import (
     PurchaseOrderCreate, 
@@ -15,6 +19,9 @@ from app.schemas.purchase import (
     SupplierPaymentUpdate
 )
 
+# Relationships an order response can include, by their ?expand= name
+PURCHASE_ORDER_LOADING = LoadProfile(PurchaseOrder, "items", "supplier")
+
 # Helper function to generate order number
 def generate_order_number() -> str:
     """
@@ -107,25 +114,24 @@ def create_purchase_order(db: Session, order: PurchaseOrderCreate) -> PurchaseOr
         db.rollback()
         raise ValueError(f"Failed to create purchase order: {str(e)}")
 
-def get_purchase_order(db: Session, order_id: int) -> Optional[PurchaseOrder]:
+def get_purchase_order(db: Session, order_id: int, expand: Optional[Iterable[str]] = None) -> Optional[PurchaseOrder]:
     """
-    Get a purchase order by ID
+    Get a purchase order by ID, loading the `expand` relationships of PURCHASE_ORDER_LOADING up front
     """
-    return db.query(PurchaseOrder).filter(PurchaseOrder.id == order_id).first()
+    query = db.query(PurchaseOrder).filter(PurchaseOrder.id == order_id)
+    if expand is not None:
+        query = query.options(*PURCHASE_ORDER_LOADING.options(expand))
+    return query.first()
 
-def get_purchase_orders(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100,
+def _filter_purchase_orders(
+    query,
     status: Optional[str] = None,
     search: Optional[str] = None,
     supplier_id: Optional[int] = None
-) -> List[PurchaseOrder]:
+):
     """
-    Get all purchase orders with optional filtering
+    Apply the purchase order list filters to a Query or select()
     """
-    query = db.query(PurchaseOrder)
-    
     # Apply status filter if provided
     if status:
         query = query.filter(PurchaseOrder.status == status)
@@ -142,10 +148,60 @@ def get_purchase_orders(
                 PurchaseOrder.order_number.ilike(search_term)
             )
         )
-    
+
+    return query
+
+def get_purchase_orders(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    supplier_id: Optional[int] = None,
+    expand: Iterable[str] = ()
+) -> List[PurchaseOrder]:
+    """
+    Get all purchase orders with optional filtering, with the `expand` relationships of PURCHASE_ORDER_LOADING
+    """
+    query = _filter_purchase_orders(db.query(PurchaseOrder), status=status, search=search, supplier_id=supplier_id)
+    query = query.options(*PURCHASE_ORDER_LOADING.options(expand))
+
     # Apply pagination
     return query.offset(skip).limit(limit).all()
 
+async def get_purchase_orders_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    supplier_id: Optional[int] = None,
+    expand: Iterable[str] = ()
+) -> List[PurchaseOrder]:
+    """
+    Get all purchase orders with optional filtering, without blocking the event loop.
+    Only the `expand` relationships are loaded, up front, since async sessions cannot lazy load.
+    """
+    statement = _filter_purchase_orders(select(PurchaseOrder), status=status, search=search, supplier_id=supplier_id)
+    result = await db.execute(
+        statement.options(*PURCHASE_ORDER_LOADING.options(expand)).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+def export_purchase_orders_query(
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    supplier_id: Optional[int] = None
+) -> Select:
+    """
+    The purchase order rows of the list filters with their supplier's name, for app.utils.export
+    """
+    statement = select(PurchaseOrder.__table__, Supplier.name.label("supplier_name")).outerjoin(
+        Supplier, PurchaseOrder.supplier_id == Supplier.id
+    )
+    statement = _filter_purchase_orders(statement, status=status, search=search, supplier_id=supplier_id)
+    return statement.order_by(PurchaseOrder.id)
+
 def update_purchase_order(db: Session, order_id: int, order: PurchaseOrderUpdate) -> PurchaseOrder:
     """
     Update a purchase order's information
@@ -249,6 +305,20 @@ def get_supplier_invoice(db: Session, invoice_id: int) -> Optional[SupplierInvoi
     """
     return db.query(SupplierInvoice).filter(SupplierInvoice.id == invoice_id).first()
 
+def _filter_supplier_invoices(query, status: Optional[str] = None, order_id: Optional[int] = None):
+    """
+    Apply the supplier invoice list filters to a Query or select()
+    """
+    # Apply status filter if provided
+    if status:
+        query = query.filter(SupplierInvoice.status == status)
+    
+    # Apply order filter if provided
+    if order_id:
+        query = query.filter(SupplierInvoice.purchase_order_id == order_id)
+
+    return query
+
 def get_supplier_invoices(
     db: Session, 
     skip: int = 0, 
@@ -259,19 +329,18 @@ def get_supplier_invoices(
     """
     Get all supplier invoices with optional filtering
     """
-    query = db.query(SupplierInvoice)
-    
-    # Apply status filter if provided
-    if status:
-        query = query.filter(SupplierInvoice.status == status)
-    
-    # Apply order filter if provided
-    if order_id:
-        query = query.filter(SupplierInvoice.purchase_order_id == order_id)
+    query = _filter_supplier_invoices(db.query(SupplierInvoice), status=status, order_id=order_id)
     
     # Apply pagination
     return query.offset(skip).limit(limit).all()
 
+def export_supplier_invoices_query(status: Optional[str] = None, order_id: Optional[int] = None) -> Select:
+    """
+    The supplier invoice rows of the list filters, for app.utils.export
+    """
+    statement = _filter_supplier_invoices(select(SupplierInvoice.__table__), status=status, order_id=order_id)
+    return statement.order_by(SupplierInvoice.id)
+
 def update_supplier_invoice(db: Session, invoice_id: int, invoice: SupplierInvoiceUpdate) -> SupplierInvoice:
     """
     Update a supplier invoice's information
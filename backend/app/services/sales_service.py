@@ -1,9 +1,13 @@
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any
 from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.sql import Select
 import uuid
 
+from app.db.loading import LoadProfile
+from app.models.business_partners import Customer
 from app.models.sales import SalesOrder, SalesOrderItem, SalesInvoice, SalesPayment
 from app.schemas.sales import (
     SalesOrderCreate, 
@@ -15,6 +19,9 @@ from app.schemas.sales import (
     SalesPaymentUpdate
 )
 
+# Relationships an order response can include, by their ?expand= name
+SALES_ORDER_LOADING = LoadProfile(SalesOrder, "items", "customer")
+
 # Helper function to generate order number
 def generate_order_number() -> str:
     """
@@ -67,25 +74,24 @@ def create_sales_order(db: Session, order: SalesOrderCreate) -> SalesOrder:
     db.refresh(db_order)
     return db_order
 
-def get_sales_order(db: Session, order_id: int) -> Optional[SalesOrder]:
+def get_sales_order(db: Session, order_id: int, expand: Optional[Iterable[str]] = None) -> Optional[SalesOrder]:
     """
-    Get a sales order by ID
+    Get a sales order by ID, loading the `expand` relationships of SALES_ORDER_LOADING up front
     """
-    return db.query(SalesOrder).filter(SalesOrder.id == order_id).first()
+    query = db.query(SalesOrder).filter(SalesOrder.id == order_id)
+    if expand is not None:
+        query = query.options(*SALES_ORDER_LOADING.options(expand))
+    return query.first()
 
-def get_sales_orders(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100,
+def _filter_sales_orders(
+    query,
     status: Optional[str] = None,
     search: Optional[str] = None,
     customer_id: Optional[int] = None
-) -> List[SalesOrder]:
+):
     """
-    Get all sales orders with optional filtering
+    Apply the sales order list filters to a Query or select()
     """
-    query = db.query(SalesOrder)
-    
     # Apply status filter if provided
     if status:
         query = query.filter(SalesOrder.status == status)
@@ -102,10 +108,60 @@ def get_sales_orders(
                 SalesOrder.order_number.ilike(search_term)
             )
         )
-    
+
+    return query
+
+def get_sales_orders(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    expand: Iterable[str] = ()
+) -> List[SalesOrder]:
+    """
+    Get all sales orders with optional filtering, with the `expand` relationships of SALES_ORDER_LOADING
+    """
+    query = _filter_sales_orders(db.query(SalesOrder), status=status, search=search, customer_id=customer_id)
+    query = query.options(*SALES_ORDER_LOADING.options(expand))
+
     # Apply pagination
     return query.offset(skip).limit(limit).all()
 
+async def get_sales_orders_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    customer_id: Optional[int] = None,
+    expand: Iterable[str] = ()
+) -> List[SalesOrder]:
+    """
+    Get all sales orders with optional filtering, without blocking the event loop.
+    Only the `expand` relationships are loaded, up front, since async sessions cannot lazy load.
+    """
+    statement = _filter_sales_orders(select(SalesOrder), status=status, search=search, customer_id=customer_id)
+    result = await db.execute(
+        statement.options(*SALES_ORDER_LOADING.options(expand)).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+def export_sales_orders_query(
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    customer_id: Optional[int] = None
+) -> Select:
+    """
+    The sales order rows of the list filters with their customer's name, for app.utils.export
+    """
+    statement = select(SalesOrder.__table__, Customer.name.label("customer_name")).outerjoin(
+        Customer, SalesOrder.customer_id == Customer.id
+    )
+    statement = _filter_sales_orders(statement, status=status, search=search, customer_id=customer_id)
+    return statement.order_by(SalesOrder.id)
+
 def update_sales_order(db: Session, order_id: int, order: SalesOrderUpdate) -> SalesOrder:
     """
     Update a sales order's information
@@ -176,6 +232,20 @@ def get_sales_invoice(db: Session, invoice_id: int) -> Optional[SalesInvoice]:
     """
     return db.query(SalesInvoice).filter(SalesInvoice.id == invoice_id).first()
 
+def _filter_sales_invoices(query, status: Optional[str] = None, order_id: Optional[int] = None):
+    """
+    Apply the sales invoice list filters to a Query or select()
+    """
+    # Apply status filter if provided
+    if status:
+        query = query.filter(SalesInvoice.status == status)
+    
+    # Apply order filter if provided
+    if order_id:
+        query = query.filter(SalesInvoice.sales_order_id == order_id)
+
+    return query
+
 def get_sales_invoices(
     db: Session, 
     skip: int = 0, 
@@ -186,19 +256,18 @@ def get_sales_invoices(
     """
     Get all sales invoices with optional filtering
     """
-    query = db.query(SalesInvoice)
-    
-    # Apply status filter if provided
-    if status:
-        query = query.filter(SalesInvoice.status == status)
-    
-    # Apply order filter if provided
-    if order_id:
-        query = query.filter(SalesInvoice.sales_order_id == order_id)
+    query = _filter_sales_invoices(db.query(SalesInvoice), status=status, order_id=order_id)
     
     # Apply pagination
     return query.offset(skip).limit(limit).all()
 
+def export_sales_invoices_query(status: Optional[str] = None, order_id: Optional[int] = None) -> Select:
+    """
+    The sales invoice rows of the list filters, for app.utils.export
+    """
+    statement = _filter_sales_invoices(select(SalesInvoice.__table__), status=status, order_id=order_id)
+    return statement.order_by(SalesInvoice.id)
+
 def update_sales_invoice(db: Session, invoice_id: int, invoice: SalesInvoiceUpdate) -> SalesInvoice:
     """
     Update a sales invoice's information
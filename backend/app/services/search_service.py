@@ -0,0 +1,220 @@
+from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import re
+import tempfile
+from sqlalchemy import column, func, literal_column, select, table
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import database
+from app.models.documents import Document, DocumentText
+from app.utils.storage import get_storage
+from app.utils.text_extraction import extract_text
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_WIDTH = 240  # characters around the first match on MySQL
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.SEARCH_INDEX_WORKERS,
+            thread_name_prefix="document-index"
+        )
+    return _executor
+
+
+class SearchService:
+    @staticmethod
+    def prepare_index(db: Session, document: Document) -> bool:
+        """
+        Bring a document's search row in line with its name, description and file.
+        Returns True when the file text needs (re-)extracting, which the caller
+        schedules with `schedule_indexing` after committing.
+        """
+        search_text = document.search_text
+        if search_text is None:
+            search_text = DocumentText(status="indexed")
+            document.search_text = search_text
+        search_text.name = document.name
+        search_text.description = document.description
+
+        if document.content_hash and document.content_hash != search_text.content_hash:
+            # The previous text stays searchable until the new file is extracted
+            search_text.content_hash = document.content_hash
+            search_text.status = "pending"
+            search_text.error = None
+            return True
+        return False
+
+    @staticmethod
+    def schedule_indexing(document_id: int) -> None:
+        """Queue text extraction for a document on the index worker pool"""
+        _get_executor().submit(SearchService.index_document, document_id)
+
+    @staticmethod
+    def shutdown() -> None:
+        """Stop the index worker pool; queued documents stay pending for the next start"""
+        global _executor
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+    @staticmethod
+    def schedule_pending(db: Session) -> int:
+        """Queue every document still waiting for extraction, e.g. after a restart"""
+        document_ids = [
+            document_id for (document_id,) in
+            db.query(DocumentText.document_id).filter(DocumentText.status == "pending")
+        ]
+        for document_id in document_ids:
+            SearchService.schedule_indexing(document_id)
+        return len(document_ids)
+
+    @staticmethod
+    def index_document(document_id: int) -> Optional[str]:
+        """
+        Extract the text of a document's current file into the search index.
+        Runs on the worker pool with its own session; returns the final status.
+        """
+        db = database.SessionLocal()
+        try:
+            row = db.query(DocumentText.id, DocumentText.content_hash, Document.file_path).join(
+                Document, Document.id == DocumentText.document_id
+            ).filter(
+                DocumentText.document_id == document_id,
+                DocumentText.status == "pending"
+            ).first()
+            if row is None:
+                return None
+
+            values: Dict[str, Any] = {"indexed_at": datetime.utcnow(), "error": None}
+            try:
+                with tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_CHUNK_SIZE * 8) as buffer:
+                    for chunk in get_storage().open_stream(row.file_path):
+                        buffer.write(chunk)
+                    buffer.seek(0)
+                    content = extract_text(buffer, settings.SEARCH_MAX_TEXT_LENGTH)
+                if content is None:
+                    values["status"] = "unsupported"
+                else:
+                    values["status"] = "indexed"
+                    values["content"] = content
+            except Exception as e:
+                logger.warning(f"Could not extract text of document {document_id}: {e}")
+                values["status"] = "failed"
+                values["error"] = str(e)[:255]
+
+            # Only land if no newer file was uploaded while extracting
+            db.query(DocumentText).filter(
+                DocumentText.id == row.id,
+                DocumentText.content_hash == row.content_hash
+            ).update(values, synchronize_session=False)
+            db.commit()
+            return values["status"]
+        finally:
+            db.close()
+
+    @staticmethod
+    def _fts5_query(query: str) -> Optional[str]:
+        """Turn user input into an FTS5 query of quoted terms that must all match"""
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return None
+        return " ".join(f'"{term}"' for term in terms)
+
+    @staticmethod
+    def _mark_snippet(text: Optional[str], query: str) -> Optional[str]:
+        """Highlight query terms in a text excerpt the way FTS5 snippet() does"""
+        if not text:
+            return text
+        terms = [re.escape(term) for term in re.findall(r"\w+", query)]
+        if not terms:
+            return text
+        pattern = re.compile(r"\b(" + "|".join(terms) + r")\b", re.IGNORECASE)
+        return pattern.sub(lambda match: f"{SNIPPET_START}{match.group(0)}{SNIPPET_END}", text)
+
+    @staticmethod
+    def search(
+        db: Session,
+        query: str,
+        skip: int = 0,
+        limit: int = 20,
+        document_type: Optional[str] = None,
+        related_entity_type: Optional[str] = None,
+        related_entity_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ranked full-text search over document names, descriptions and file text.
+        Uses FTS5 (bm25) on SQLite and a FULLTEXT index on MySQL.
+        """
+        columns = [
+            Document.id,
+            Document.name,
+            Document.document_type,
+            Document.related_entity_type,
+            Document.related_entity_id,
+            Document.status,
+        ]
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            match_query = SearchService._fts5_query(query)
+            if match_query is None:
+                return []
+            fts = table("documenttext_fts", column("rowid"))
+            fts_name = literal_column("documenttext_fts")
+            # Weights favour the name over the description over the file text
+            rank = func.bm25(fts_name, 10.0, 5.0, 1.0)
+            statement = select(
+                *columns,
+                (-rank).label("score"),
+                func.snippet(fts_name, -1, SNIPPET_START, SNIPPET_END, "…", 16).label("snippet")
+            ).select_from(fts).join(
+                DocumentText, DocumentText.id == fts.c.rowid
+            ).join(
+                Document, Document.id == DocumentText.document_id
+            ).where(fts_name.op("MATCH")(match_query)).order_by(rank)
+        else:
+            if not query.strip():
+                return []
+            relevance = mysql.match(
+                DocumentText.name, DocumentText.description, DocumentText.content, against=query
+            ).in_natural_language_mode()
+            first_term = (re.findall(r"\w+", query) or [query])[0]
+            position = func.locate(first_term, DocumentText.content)
+            statement = select(
+                *columns,
+                relevance.label("score"),
+                func.substr(
+                    DocumentText.content,
+                    func.greatest(position - SNIPPET_WIDTH // 3, 1),
+                    SNIPPET_WIDTH
+                ).label("snippet")
+            ).join_from(
+                DocumentText, Document, Document.id == DocumentText.document_id
+            ).where(relevance > 0).order_by(relevance.desc())
+
+        if document_type:
+            statement = statement.where(Document.document_type == document_type)
+
+        if related_entity_type:
+            statement = statement.where(Document.related_entity_type == related_entity_type)
+
+        if related_entity_id:
+            statement = statement.where(Document.related_entity_id == related_entity_id)
+
+        rows = db.execute(statement.offset(skip).limit(limit)).all()
+        results = [dict(row._mapping) for row in rows]
+        if dialect != "sqlite":
+            for result in results:
+                result["snippet"] = SearchService._mark_snippet(result["snippet"], query)
+        return results
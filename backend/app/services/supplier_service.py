@@ -1,11 +1,16 @@
 from typing import List, Optional
 from datetime import date
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.sql import Select
 
 from app.models.business_partners import Supplier
+from app.db.reference_cache import ReferenceCache
 from app.schemas.supplier import SupplierCreate, SupplierUpdate
 
+# Rows shared across requests; see app.db.reference_cache
+_suppliers = ReferenceCache(Supplier)
+
 # Supplier CRUD operations
 def create_supplier(db: Session, supplier: SupplierCreate) -> Supplier:
     """
@@ -31,20 +36,12 @@ def get_supplier(db: Session, supplier_id: int) -> Optional[Supplier]:
     """
     Get a supplier by ID
     """
-    return db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    return _suppliers.get(db, "id", supplier_id)
 
-def get_suppliers(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100,
-    status: Optional[str] = None,
-    search: Optional[str] = None
-) -> List[Supplier]:
+def _filter_suppliers(query, status: Optional[str] = None, search: Optional[str] = None):
     """
-    Get all suppliers with optional filtering
+    Apply the supplier list filters to a Query or select()
     """
-    query = db.query(Supplier)
-    
     # Apply status filter if provided
     if status:
         query = query.filter(Supplier.status == status)
@@ -60,10 +57,30 @@ def get_suppliers(
                 Supplier.phone.ilike(search_term)
             )
         )
+
+    return query
+
+def get_suppliers(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100,
+    status: Optional[str] = None,
+    search: Optional[str] = None
+) -> List[Supplier]:
+    """
+    Get all suppliers with optional filtering
+    """
+    query = _filter_suppliers(db.query(Supplier), status=status, search=search)
     
     # Apply pagination
     return query.offset(skip).limit(limit).all()
 
+def export_suppliers_query(status: Optional[str] = None, search: Optional[str] = None) -> Select:
+    """
+    The supplier rows of the list filters, for app.utils.export
+    """
+    return _filter_suppliers(select(Supplier.__table__), status=status, search=search).order_by(Supplier.id)
+
 def update_supplier(db: Session, supplier_id: int, supplier: SupplierUpdate) -> Supplier:
     """
     Update a supplier's information
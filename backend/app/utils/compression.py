@@ -0,0 +1,67 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+
+CODECS = ("gzip", "zstd")
+FILE_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def resolve_codec(codec: str) -> str:
+    """The codec to use for `codec`, falling back to gzip when zstandard is not installed"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec {codec}, expected one of {', '.join(CODECS)}")
+    if codec == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            return "gzip"
+    return codec
+
+
+def compress_chunks(chunks: Iterable[bytes], codec: str, level: Optional[int] = None) -> Iterator[bytes]:
+    """Compress a stream of chunks with constant memory"""
+    if codec == "zstd":
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(level=level or 3).compressobj()
+    else:
+        # wbits=31 writes a gzip container with a fixed header, so output is deterministic
+        compressor = zlib.compressobj(level or 6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def decompress_chunks(chunks: Iterable[bytes], codec: str) -> Iterator[bytes]:
+    """Decompress a stream of chunks with constant memory"""
+    if codec == "zstd":
+        import zstandard
+
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        decompressor = zlib.decompressobj(31)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    if codec != "zstd":
+        data = decompressor.flush()
+        if data:
+            yield data
+
+
+def slice_chunks(chunks: Iterable[bytes], start: int, end: Optional[int] = None) -> Iterator[bytes]:
+    """Bytes `start` to `end` inclusive of a stream that cannot seek"""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            piece = chunk[max(start - position, 0):]
+            if end is not None and chunk_end > end + 1:
+                piece = piece[:len(piece) - (chunk_end - end - 1)]
+            if piece:
+                yield piece
+        position = chunk_end
+        if end is not None and position > end:
+            break
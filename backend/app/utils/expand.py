@@ -0,0 +1,29 @@
+from typing import FrozenSet, List
+
+from fastapi import HTTPException, Query
+
+from app.db.loading import LoadProfile
+
+
+class Expand:
+    """
+    The ?expand= parameter of a list endpoint: the relationships of `profile`
+    to include in each item, comma separated or repeated, e.g.
+    ?expand=items,customer. Unknown names are answered with 400.
+    """
+
+    def __init__(self, profile: LoadProfile):
+        self.profile = profile
+
+    def __call__(
+        self,
+        expand: List[str] = Query([], description="Related data to include in each item, comma separated")
+    ) -> FrozenSet[str]:
+        names = frozenset(name.strip() for value in expand for name in value.split(",") if name.strip())
+        unknown = names.difference(self.profile.names)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot expand {', '.join(sorted(unknown))}; choose from {', '.join(self.profile.names)}"
+            )
+        return names
@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Any, Iterator
+
+from fastapi import Query, Request
+from sqlalchemy.engine import Connection, Result
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from starlette.responses import StreamingResponse
+
+from app.config import settings
+from app.utils.compression import compress_chunks
+from app.utils.storage import content_disposition
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# The ?format= parameter of export endpoints
+ExportFormat = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson, one JSON object per line, or csv")
+
+
+def json_default(value: Any) -> Any:
+    """Encode Decimal and date values the same way FastAPI responses do"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def accepts_gzip(request: Request) -> bool:
+    """Whether the client's Accept-Encoding allows a gzip body"""
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, parameters = part.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        name, _, value = parameters.strip().partition("=")
+        if name.strip().lower() != "q":
+            return True
+        try:
+            return float(value) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def _ndjson(result: Result) -> Iterator[bytes]:
+    for rows in result.mappings().partitions():
+        yield "".join(json.dumps(dict(row), default=json_default) + "\n" for row in rows).encode("utf-8")
+
+
+def _csv(result: Result) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    for rows in result.partitions():
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # No rows, only the header
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _stream(connection: Connection, result: Result, format: str) -> Iterator[bytes]:
+    try:
+        yield from (_csv(result) if format == "csv" else _ndjson(result))
+    finally:
+        result.close()
+        connection.close()
+
+
+def stream_export(db: Session, request: Request, statement: Select, name: str, format: str = "ndjson") -> StreamingResponse:
+    """
+    Stream the rows of `statement` as a `name`.ndjson or `name`.csv download.
+
+    The rows come from a server-side cursor in batches of EXPORT_BATCH_SIZE and
+    are encoded a batch at a time, so memory stays flat however many rows
+    there are; the body is gzipped on the fly when the client accepts it.
+    The statement runs on its own connection from the bind `db` would use,
+    a replica inside read-only requests, which is held until the last row is
+    sent rather than until the request's session is closed.
+    """
+    bind = db.get_bind(clause=statement)
+    # stream_results is what selects the server-side cursor (pymysql's SSCursor); without
+    # it the driver buffers the whole result before the first batch. Set it rather than
+    # rely on yield_per implying it, which SQLAlchemy only does on some execution paths
+    connection = bind.connect().execution_options(stream_results=True, yield_per=settings.EXPORT_BATCH_SIZE)
+    try:
+        result = connection.execute(statement)
+    except BaseException:
+        connection.close()
+        raise
+    body = _stream(connection, result, format)
+    headers = {"Content-Disposition": content_disposition(f"{name}.{format}"), "Vary": "Accept-Encoding"}
+    if accepts_gzip(request):
+        body = compress_chunks(body, "gzip")
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
@@ -0,0 +1,223 @@
+import os
+from email.utils import formatdate
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import Request, Response
+from starlette.responses import FileResponse, RedirectResponse, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.utils.compression import decompress_chunks, slice_chunks
+from app.utils.http_cache import etag_matches
+from app.utils.storage import StorageBackend, content_disposition
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `Range: bytes=...` header into an inclusive (start, end) pair.
+
+    Returns None when the header is absent, malformed or asks for several ranges,
+    in which case the whole file is served. Raises ValueError when the range
+    cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    if not (start_text or end_text) or not all(part.isdigit() for part in (start_text, end_text) if part):
+        return None
+    if start_text:
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    else:
+        # Suffix range: the last N bytes
+        suffix = int(end_text)
+        if suffix == 0:
+            raise ValueError("Empty suffix range")
+        start, end = max(size - suffix, 0), size - 1
+    if start >= size or start > end:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse that serves a single byte range with constant memory.
+
+    When the server offers the ASGI `http.response.zerocopy` extension the
+    file descriptor is handed over for OS-level sendfile; otherwise the range
+    is read in fixed-size chunks off the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        byte_range: Optional[Tuple[int, int]] = None,
+        **kwargs
+    ) -> None:
+        self.byte_range = byte_range
+        super().__init__(path, status_code=206 if byte_range else 200, stat_result=stat_result, **kwargs)
+        self.headers["accept-ranges"] = "bytes"
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        super().set_stat_headers(stat_result)
+        if self.byte_range:
+            start, end = self.byte_range
+            self.headers["content-length"] = str(end - start + 1)
+            self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        start, end = self.byte_range or (0, self.stat_result.st_size - 1)
+        remaining = end - start + 1
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if self.send_header_only or remaining <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopy" in scope.get("extensions", {}):
+            file = await anyio.to_thread.run_sync(open, self.path, "rb")
+            try:
+                await send(
+                    {
+                        "type": "http.response.zerocopy",
+                        "file": file,
+                        "offset": start,
+                        "count": remaining,
+                        "more_body": False,
+                    }
+                )
+            finally:
+                await anyio.to_thread.run_sync(file.close)
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    remaining = remaining - len(chunk) if chunk else 0
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": remaining > 0,
+                        }
+                    )
+        if self.background is not None:
+            await self.background()
+
+
+def file_download_response(
+    request: Request,
+    path: str,
+    filename: str,
+    content_hash: Optional[str] = None
+) -> Response:
+    """
+    Build a download response for a stored file honouring If-None-Match,
+    If-Range and Range. Raises FileNotFoundError if the file is missing.
+    """
+    stat_result = os.stat(path)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {"last-modified": last_modified}
+    etag = f'"{content_hash}"' if content_hash else None
+    if etag:
+        headers["etag"] = etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range not in (etag, last_modified):
+        # The client's partial copy is stale, send the whole file
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, stat_result.st_size)
+    except ValueError:
+        return Response(
+            status_code=416,
+            headers={**headers, "content-range": f"bytes */{stat_result.st_size}"}
+        )
+
+    return RangeFileResponse(
+        path,
+        stat_result=stat_result,
+        byte_range=byte_range,
+        headers=headers,
+        filename=filename,
+        method=request.method
+    )
+
+
+def storage_download_response(
+    request: Request,
+    storage: StorageBackend,
+    location: str,
+    filename: str,
+    content_hash: Optional[str] = None,
+    compression: Optional[str] = None,
+    file_size: Optional[int] = None
+) -> Response:
+    """
+    Build a download response for a blob in any storage backend.
+
+    Local blobs are served from disk; remote blobs are redirected to a presigned
+    URL when enabled, otherwise streamed through with Range support. Archived
+    blobs (`compression` set, `file_size` the original size) are decompressed on
+    the fly. Raises FileNotFoundError if the blob is missing.
+    """
+    local_path = storage.local_path(location)
+    if local_path is not None and not compression:
+        return file_download_response(request, local_path, filename, content_hash=content_hash)
+
+    etag = f'"{content_hash}"' if content_hash else None
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"etag": etag})
+
+    if settings.S3_PRESIGN_DOWNLOADS and not compression:
+        url = storage.presign(location, filename=filename)
+        if url:
+            return RedirectResponse(url, status_code=307)
+
+    size, modified = storage.stat(location)
+    if compression:
+        size = file_size
+    last_modified = formatdate(modified, usegmt=True)
+    headers = {
+        "accept-ranges": "bytes",
+        "last-modified": last_modified,
+        "content-disposition": content_disposition(filename)
+    }
+    if etag:
+        headers["etag"] = etag
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range not in (etag, last_modified):
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+
+    start, end = byte_range or (0, size - 1)
+    headers["content-length"] = str(end - start + 1)
+    if byte_range:
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+    if request.method == "HEAD" or size == 0:
+        return Response(status_code=206 if byte_range else 200, headers=headers)
+    if compression:
+        # Compressed streams cannot seek, so a range decompresses from the start
+        body = slice_chunks(decompress_chunks(storage.open_stream(location), compression), start, end)
+    else:
+        body = storage.open_stream(location, start, end)
+    return StreamingResponse(
+        body,
+        status_code=206 if byte_range else 200,
+        headers=headers,
+        media_type="application/octet-stream"
+    )
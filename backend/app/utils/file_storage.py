@@ -0,0 +1,85 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.storage import StorageBackend, get_storage
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured maximum size"""
+
+
+def _copy_to_temp(
+    source: BinaryIO,
+    directory: str,
+    max_size: int,
+    chunk_size: int
+) -> Tuple[str, str, int]:
+    """
+    Copy a file object into a temp file in `directory` in fixed-size chunks,
+    hashing as it goes. Returns (temp_path, sha256 hex digest, size in bytes).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(f"Upload exceeds the maximum size of {max_size} bytes")
+                digest.update(chunk)
+                target.write(chunk)
+            target.flush()
+            os.fsync(target.fileno())
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+
+def store_file(
+    source: BinaryIO,
+    storage: Optional[StorageBackend] = None,
+    max_size: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> Tuple[str, str, int]:
+    """
+    Stage a file object on local disk while hashing it, then hand it to the
+    storage backend. Blocking; returns (storage location, sha256 hex digest, size).
+    """
+    storage = storage or get_storage()
+    os.makedirs(storage.staging_directory, exist_ok=True)
+    temp_path, content_hash, size = _copy_to_temp(
+        source,
+        storage.staging_directory,
+        max_size or settings.MAX_UPLOAD_SIZE,
+        chunk_size or settings.UPLOAD_CHUNK_SIZE
+    )
+    return storage.put(temp_path, content_hash), content_hash, size
+
+
+async def save_upload(
+    file: UploadFile,
+    storage: Optional[StorageBackend] = None,
+    max_size: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> Tuple[str, str, int]:
+    """
+    Save an uploaded file into the content-addressed blob store without
+    blocking the event loop.
+
+    The upload is copied chunk by chunk in a worker thread, so memory use is
+    bounded by the chunk size regardless of the file size.
+    Returns (storage location, sha256 hex digest, size in bytes).
+    """
+    await file.seek(0)
+    return await run_in_threadpool(store_file, file.file, storage, max_size, chunk_size)
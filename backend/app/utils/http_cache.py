@@ -0,0 +1,204 @@
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.database import get_async_db, get_db
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an entity tag"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (tag[2:] if tag.startswith("W/") else tag) == opaque
+        for tag in (candidate.strip() for candidate in header.split(","))
+    )
+
+
+def _not_modified_since(header: Optional[str], last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header) if header else None
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole seconds
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _aggregates(model):
+    """
+    Newest updated_at, row count, highest id and total row_version of a model's rows.
+    updated_at alone has whole seconds on MySQL; the id and row_version catch a
+    delete plus insert, or a second update, within the same second.
+    """
+    return (
+        func.max(model.updated_at),
+        func.count(model.id),
+        func.max(model.id),
+        func.coalesce(func.sum(model.row_version), 0),
+    )
+
+
+def _select(columns, subqueries):
+    """SELECT the columns plus every column of the one-row subqueries, joined without a condition"""
+    statement = select(*columns, *(column for subquery in subqueries for column in subquery.c))
+    if subqueries:
+        joined = subqueries[0]
+        for subquery in subqueries[1:]:
+            joined = joined.join(subquery, true())
+        statement = statement.select_from(joined)
+    return statement
+
+
+class _ConditionalGet(ABC):
+    """
+    Validators for a GET endpoint, checked before the endpoint runs so an
+    unchanged resource costs one aggregate query and no serialization.
+
+    Used as a route dependency: it answers a matching If-None-Match (or
+    If-Modified-Since) with 304, and otherwise sets ETag and Cache-Control on
+    the response. `max_age` marks reference data that clients may reuse
+    without asking; other responses must be revalidated.
+    """
+
+    def __init__(self, max_age: Optional[int] = None):
+        self.max_age = max_age
+
+    @abstractmethod
+    def statement(self, request: Request):
+        """The aggregate query whose values make up the validators"""
+
+    def last_modified(self, values: Sequence[Any]) -> Optional[datetime]:
+        return None
+
+    def exists(self, values: Sequence[Any]) -> bool:
+        return True
+
+    def respond(self, request: Request, response: Response, values: Sequence[Any]) -> None:
+        if not self.exists(values):
+            # Let the endpoint answer 404
+            return
+        # The path and query string stand in for the filters and pagination
+        key = repr((request.url.path, sorted(request.query_params.multi_items()), tuple(values)))
+        headers = {
+            "ETag": f'W/"{hashlib.sha1(key.encode()).hexdigest()}"',
+            "Cache-Control": f"private, max-age={self.max_age}" if self.max_age else "no-cache",
+        }
+        last_modified = self.last_modified(values)
+        if last_modified is not None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = etag_matches(if_none_match, headers["ETag"])
+        else:
+            not_modified = last_modified is not None and _not_modified_since(
+                request.headers.get("if-modified-since"), last_modified
+            )
+        if not_modified:
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+
+class CollectionETag(_ConditionalGet):
+    """
+    Validators for a list from the newest updated_at, row count, highest id and
+    total row_version of each model its payload is built from, so inserts,
+    updates and deletes all change the ETag. `daily` adds today's date, for
+    lists that depend on it.
+    """
+
+    def __init__(self, *models, max_age: Optional[int] = None, daily: bool = False):
+        super().__init__(max_age)
+        self.models = models
+        self.daily = daily
+
+    def statement(self, request: Request):
+        # One scan per model, each aggregating in a one-row subquery
+        return _select([], [select(*_aggregates(model)).subquery() for model in self.models])
+
+    def respond(self, request: Request, response: Response, values: Sequence[Any]) -> None:
+        if self.daily:
+            values = (*values, date.today())
+        super().respond(request, response, values)
+
+    def __call__(self, request: Request, response: Response, db: Session = Depends(get_db)) -> None:
+        self.respond(request, response, db.execute(self.statement(request)).one())
+
+
+class ResourceETag(_ConditionalGet):
+    """
+    Validators for one row from its updated_at and row_version, taken from the
+    `path_param` id. `related` names relationships, dotted for nested ones,
+    whose rows are part of the payload; their aggregates for this row are
+    included. Last-Modified is only sent without them, since it cannot
+    reflect deleted children.
+    """
+
+    def __init__(self, model, path_param: str, *related: str, max_age: Optional[int] = None):
+        super().__init__(max_age)
+        self.model = model
+        self.path_param = path_param
+        self.related = related
+
+    def _related_subquery(self, path: str, row_id: int):
+        query = select(self.model.id).where(self.model.id == row_id)
+        target = self.model
+        for name in path.split("."):
+            attribute = getattr(target, name)
+            query = query.join(attribute)
+            target = attribute.property.mapper.class_
+        return query.with_only_columns(*_aggregates(target)).subquery()
+
+    def statement(self, request: Request):
+        try:
+            row_id = int(request.path_params[self.path_param])
+        except (KeyError, ValueError):
+            return None
+        row = select(self.model.updated_at, self.model.row_version).where(self.model.id == row_id)
+        return _select(
+            [row.with_only_columns(self.model.updated_at).scalar_subquery(),
+             row.with_only_columns(self.model.row_version).scalar_subquery()],
+            [self._related_subquery(path, row_id) for path in self.related]
+        )
+
+    def exists(self, values: Sequence[Any]) -> bool:
+        return values[0] is not None
+
+    def last_modified(self, values: Sequence[Any]) -> Optional[datetime]:
+        return None if self.related else values[0]
+
+    def __call__(self, request: Request, response: Response, db: Session = Depends(get_db)) -> None:
+        statement = self.statement(request)
+        if statement is not None:
+            self.respond(request, response, db.execute(statement).one())
+
+
+class AsyncCollectionETag(CollectionETag):
+    """CollectionETag for endpoints on the async session"""
+
+    async def __call__(self, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)) -> None:
+        self.respond(request, response, (await db.execute(self.statement(request))).one())
+
+
+class AsyncResourceETag(ResourceETag):
+    """ResourceETag for endpoints on the async session"""
+
+    async def __call__(self, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)) -> None:
+        statement = self.statement(request)
+        if statement is not None:
+            self.respond(request, response, (await db.execute(statement)).one())
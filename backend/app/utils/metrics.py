@@ -0,0 +1,138 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Seconds; from fast cached reads to slow reports
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Every metric, in the order they are rendered
+_registry: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    """A metric in the Prometheus text format, with one series per label combination"""
+
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _series(self, values: Tuple, extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = [*zip(self.labels, values), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """The sample lines of every series"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def set(self, *values, value: float) -> None:
+        """For totals kept elsewhere, such as by the connection pool"""
+        with self._lock:
+            self._values[values] = value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield f"{self.name}{self._series(values)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per series: a count for each bucket (not cumulative), the sum and the count
+        self._values: Dict[Tuple, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *values) -> None:
+        with self._lock:
+            counts, total = self._values.setdefault(values, ([0] * len(self.buckets), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            total[0] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((values, (list(counts), total[0])) for values, (counts, total) in self._values.items())
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{self._series(values, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_sum{self._series(values)} {_number(total)}"
+            yield f"{self.name}_count{self._series(values)} {cumulative}"
+
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# HTTP requests, labelled by route template rather than path to keep the series bounded
+REQUESTS_IN_FLIGHT = Gauge("smartkoop_http_requests_in_flight", "Requests being handled")
+REQUEST_DURATION = Histogram(
+    "smartkoop_http_request_duration_seconds", "Time until the response headers are sent", ["method", "route"]
+)
+REQUESTS = Counter("smartkoop_http_requests_total", "Requests by response status", ["method", "route", "status"])
+REQUEST_DB_QUERIES = Counter(
+    "smartkoop_http_request_db_queries_total", "Database queries issued by requests", ["method", "route"]
+)
+REQUEST_DB_TIME = Counter(
+    "smartkoop_http_request_db_seconds_total", "Time requests spent in database queries", ["method", "route"]
+)
+
+# Every database query, inside requests or not
+DB_QUERY_DURATION = Histogram("smartkoop_db_query_duration_seconds", "Database query execution time", ["database"])
+
+# Pool and threadpool state, refreshed on each scrape
+DB_POOL_SIZE = Gauge("smartkoop_db_pool_size", "Connections the pool keeps open", ["database"])
+DB_POOL_CHECKED_OUT = Gauge("smartkoop_db_pool_checked_out", "Connections in use", ["database"])
+DB_POOL_OVERFLOW = Gauge("smartkoop_db_pool_overflow", "Connections open beyond the pool size", ["database"])
+DB_POOL_CHECKOUTS = Counter("smartkoop_db_pool_checkouts_total", "Connection checkouts", ["database"])
+DB_POOL_TIMEOUTS = Counter("smartkoop_db_pool_timeouts_total", "Checkouts that timed out waiting", ["database"])
+DB_POOL_WAIT = Counter("smartkoop_db_pool_wait_seconds_total", "Time checkouts waited for a connection", ["database"])
+THREADPOOL_BUSY = Gauge("smartkoop_threadpool_busy", "Threadpool workers running sync endpoints")
+THREADPOOL_WAITING = Gauge("smartkoop_threadpool_waiting", "Tasks waiting for a threadpool worker")
+THREADPOOL_LIMIT = Gauge("smartkoop_threadpool_limit", "Threadpool size")
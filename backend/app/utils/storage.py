@@ -0,0 +1,271 @@
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from app.config import settings
+
+
+def content_disposition(filename: str) -> str:
+    """Attachment Content-Disposition value, RFC 5987 encoded when the name is not plain ASCII"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+class StorageBackend(ABC):
+    """
+    Where document blobs live. A blob is addressed by the location returned
+    from `put`, which is what gets stored in `file_path` columns.
+    """
+
+    # Directory uploads are staged in while they are hashed
+    staging_directory: str
+
+    @abstractmethod
+    def put(self, temp_path: str, content_hash: str, suffix: str = "") -> str:
+        """
+        Store a fully written temp file under its content hash (plus `suffix`, e.g.
+        for a compressed copy) and consume the temp file
+        """
+
+    @abstractmethod
+    def stat(self, location: str) -> Tuple[int, float]:
+        """(size in bytes, modification timestamp); raises FileNotFoundError"""
+
+    @abstractmethod
+    def open_stream(
+        self,
+        location: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Yield the bytes from `start` to `end` inclusive in chunks"""
+
+    @abstractmethod
+    def delete(self, location: str) -> None:
+        """Remove a blob; missing blobs are ignored"""
+
+    @abstractmethod
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        """Yield (location, modification timestamp) for every stored blob"""
+
+    def presign(self, location: str, filename: Optional[str] = None, expires_in: Optional[int] = None) -> Optional[str]:
+        """A URL the client can download from directly, or None if not supported"""
+        return None
+
+    def local_path(self, location: str) -> Optional[str]:
+        """Filesystem path of a blob when it can be served from this host"""
+        return None
+
+
+class LocalStorageBackend(StorageBackend):
+    """Blobs on the local filesystem under blobs/ab/cd/<hash>"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.UPLOAD_DIRECTORY
+        self.staging_directory = self.root
+
+    def _resolve(self, location: str) -> str:
+        """
+        The real path of a location, which must lie under the storage root so a
+        file_path column can never point a download or delete elsewhere.
+        Raises FileNotFoundError otherwise.
+        """
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(location)
+        if os.path.commonpath([root, path]) != root:
+            raise FileNotFoundError(location)
+        return path
+
+    def blob_path(self, content_hash: str) -> str:
+        """
+        Location of a content-addressed blob, fanned out over two directory levels
+        (blobs/ab/cd/abcd...) so no single directory grows with the file count.
+        """
+        return os.path.join(self.root, "blobs", content_hash[:2], content_hash[2:4], content_hash)
+
+    def put(self, temp_path: str, content_hash: str, suffix: str = "") -> str:
+        path = self.blob_path(content_hash) + suffix
+        if os.path.exists(path):
+            os.unlink(temp_path)
+            # Fresh mtime keeps garbage collection off a blob an upload is about to reference
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+        return path
+
+    def stat(self, location: str) -> Tuple[int, float]:
+        stat_result = os.stat(self._resolve(location))
+        return stat_result.st_size, stat_result.st_mtime
+
+    def open_stream(
+        self,
+        location: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        with open(self._resolve(location), "rb") as source:
+            source.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = source.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, location: str) -> None:
+        try:
+            path = self._resolve(location)
+        except FileNotFoundError:
+            return
+        if os.path.exists(path):
+            os.remove(path)
+
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        for directory, _, file_names in os.walk(os.path.join(self.root, "blobs")):
+            for file_name in file_names:
+                path = os.path.join(directory, file_name)
+                yield path, os.path.getmtime(path)
+
+    def local_path(self, location: str) -> Optional[str]:
+        return self._resolve(location)
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Blobs in an S3-compatible bucket under <prefix>blobs/ab/cd/<hash>.
+
+    Large files are sent as multipart uploads and downloads are handed out as
+    presigned GET URLs so they bypass the API workers. Point `endpoint_url` at
+    MinIO or a moto server to run against a local stand-in.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        multipart_threshold: Optional[int] = None,
+        multipart_chunk_size: Optional[int] = None,
+        presign_expiry: Optional[int] = None,
+        staging_directory: Optional[str] = None,
+        client=None
+    ):
+        # boto3 is only needed when the S3 backend is configured
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign_expiry = presign_expiry or settings.S3_PRESIGN_EXPIRY
+        self.staging_directory = staging_directory or settings.UPLOAD_DIRECTORY
+        self.client = client or boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold or settings.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=multipart_chunk_size or settings.S3_MULTIPART_CHUNK_SIZE
+        )
+
+    def blob_key(self, content_hash: str) -> str:
+        return f"{self.prefix}blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+    def _head(self, key: str) -> Optional[dict]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def put(self, temp_path: str, content_hash: str, suffix: str = "") -> str:
+        key = self.blob_key(content_hash) + suffix
+        try:
+            head = self._head(key)
+            if head is None:
+                self.client.upload_file(temp_path, self.bucket, key, Config=self.transfer_config)
+            else:
+                # Copying the object onto itself refreshes LastModified, which keeps garbage
+                # collection off a blob an upload is about to reference, like utime locally
+                self.client.copy(
+                    {"Bucket": self.bucket, "Key": key},
+                    self.bucket,
+                    key,
+                    ExtraArgs={"MetadataDirective": "REPLACE", "Metadata": head.get("Metadata", {})},
+                    Config=self.transfer_config
+                )
+        finally:
+            os.unlink(temp_path)
+        return key
+
+    def stat(self, location: str) -> Tuple[int, float]:
+        head = self._head(location)
+        if head is None:
+            raise FileNotFoundError(location)
+        return head["ContentLength"], head["LastModified"].timestamp()
+
+    def open_stream(
+        self,
+        location: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        body = self.client.get_object(Bucket=self.bucket, Key=location, Range=byte_range)["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size or settings.UPLOAD_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def delete(self, location: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=location)
+
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}blobs/"):
+            for item in page.get("Contents", []):
+                yield item["Key"], item["LastModified"].timestamp()
+
+    def presign(self, location: str, filename: Optional[str] = None, expires_in: Optional[int] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": location}
+        if filename:
+            params["ResponseContentDisposition"] = content_disposition(filename)
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params=params,
+            ExpiresIn=expires_in or self.presign_expiry
+        )
+
+
+@lru_cache()
+def get_storage() -> StorageBackend:
+    """The storage backend selected by settings.STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY
+        )
+    return LocalStorageBackend()
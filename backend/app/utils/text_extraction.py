@@ -0,0 +1,96 @@
+import zipfile
+from typing import BinaryIO, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+# Parts of OOXML (docx, xlsx, pptx) and OpenDocument packages that hold the text
+OFFICE_TEXT_PARTS = ("word/document.xml", "xl/sharedStrings.xml", "content.xml")
+OFFICE_TEXT_PREFIXES = ("xl/worksheets/sheet", "ppt/slides/slide")
+
+# Elements whose text forms one line: paragraphs, headings, shared strings and cells
+TEXT_BLOCK_ELEMENTS = {"p", "h", "si", "c"}
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _limit(lines: Iterator[str], max_length: int) -> str:
+    """Join lines until `max_length` characters have been collected"""
+    collected: List[str] = []
+    length = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        collected.append(line)
+        length += len(line) + 1
+        if length >= max_length:
+            break
+    return "\n".join(collected)[:max_length]
+
+
+def _pdf_lines(source: BinaryIO) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    for page in PdfReader(source).pages:
+        yield page.extract_text() or ""
+
+
+def _office_lines(archive: zipfile.ZipFile) -> Iterator[str]:
+    names = [
+        name for name in archive.namelist()
+        if name in OFFICE_TEXT_PARTS or name.startswith(OFFICE_TEXT_PREFIXES)
+    ]
+    for name in names:
+        with archive.open(name) as part:
+            for _, element in iterparse(part):
+                if _local_name(element.tag) not in TEXT_BLOCK_ELEMENTS:
+                    continue
+                # Cells of type "s" only hold an index into the shared strings
+                if _local_name(element.tag) != "c" or element.get("t") != "s":
+                    yield "".join(element.itertext())
+                element.clear()
+
+
+def _plain_text(source: BinaryIO, max_length: int) -> Optional[str]:
+    data = source.read(max_length * 4)
+    if b"\x00" in data[:8192]:
+        return None
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the read is fine
+        if e.start < len(data) - 3:
+            text = data.decode("latin-1")
+        else:
+            text = data[:e.start].decode("utf-8-sig")
+    return text[:max_length]
+
+
+def extract_text(source: BinaryIO, max_length: int) -> Optional[str]:
+    """
+    Extract searchable text from a PDF, an office document (docx, xlsx, pptx,
+    OpenDocument) or a plain-text file, sniffed from its leading bytes.
+
+    Returns None when the format is not supported. PDF extraction needs the
+    optional pypdf package.
+    """
+    head = source.read(8)
+    source.seek(0)
+
+    if head.startswith(b"%PDF"):
+        try:
+            return _limit(_pdf_lines(source), max_length)
+        except ImportError:
+            return None
+
+    if head.startswith(b"PK\x03\x04"):
+        with zipfile.ZipFile(source) as archive:
+            if not any(
+                name in OFFICE_TEXT_PARTS or name.startswith(OFFICE_TEXT_PREFIXES)
+                for name in archive.namelist()
+            ):
+                return None
+            return _limit(_office_lines(archive), max_length)
+
+    return _plain_text(source, max_length)
@@ -0,0 +1,312 @@
+"""
+Synthetic cooperative dataset for benchmarks and load tests.
+
+seed() fills an empty database, through SQLAlchemy Core bulk inserts, with
+members and their savings, customers and suppliers with orders, invoices and
+payments, a chart of accounts with posted journal entries, projects with
+tasks, time entries and invoices, and an asset register. Row counts grow
+linearly with `scale`, and the same `seed` always produces the same data.
+
+    python benchmark_data.py sqlite:///./benchmark.db --scale 2
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Rows per unit of scale
+BASE_COUNTS = {
+    "members": 500,
+    "customers": 100,
+    "suppliers": 50,
+    "sales_orders": 2000,
+    "purchase_orders": 1000,
+    "journal_entries": 2000,
+    "projects": 50,
+    "assets": 300,
+    "employees": 30,
+}
+SAVINGS_PER_MEMBER = 10
+ITEMS_PER_ORDER = 3
+TASKS_PER_PROJECT = 10
+TIME_ENTRIES_PER_TASK = 10
+INVOICES_PER_PROJECT = 2
+DEPRECIATIONS_PER_ASSET = 12
+HISTORY_DAYS = 730
+BATCH_SIZE = 5000
+
+ACCOUNTS = [
+    ("1000", "Kas", "asset"), ("1100", "Bank", "asset"), ("1200", "Piutang Usaha", "asset"),
+    ("1500", "Aset Tetap", "asset"), ("1510", "Akumulasi Penyusutan", "asset"),
+    ("2000", "Utang Usaha", "liability"), ("2100", "Simpanan Sukarela", "liability"),
+    ("3000", "Simpanan Pokok", "equity"), ("3100", "Simpanan Wajib", "equity"), ("3200", "SHU", "equity"),
+    ("4000", "Pendapatan Penjualan", "revenue"), ("4100", "Pendapatan Jasa", "revenue"),
+    ("5000", "Harga Pokok Penjualan", "expense"), ("5100", "Beban Gaji", "expense"),
+    ("5200", "Beban Penyusutan", "expense"), ("5300", "Beban Pemeliharaan", "expense"),
+]
+
+
+def _insert(connection, model, rows) -> int:
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(model.__table__.insert(), rows[start:start + BATCH_SIZE])
+    return len(rows)
+
+
+def _money(rng: random.Random, low: float, high: float) -> float:
+    return round(rng.uniform(low, high), 2)
+
+
+def scaled_counts(scale: float) -> Dict[str, int]:
+    """BASE_COUNTS at `scale`"""
+    return {name: max(1, int(count * scale)) for name, count in BASE_COUNTS.items()}
+
+
+def seed(engine, scale: float = 1, seed: int = 0) -> Dict[str, int]:
+    """Fill the empty database behind `engine`; returns the rows inserted per table"""
+    from app.db.database import Base
+    import app.models  # noqa: F401 - registers every table on Base
+    from app.models.accounting import ChartOfAccounts, Employee, FiscalPeriod, JournalEntry, LedgerEntry
+    from app.models.assets import Asset, AssetDepreciation, AssetMaintenance
+    from app.models.business_partners import Customer, CustomerContact, Supplier
+    from app.models.member import Member, SavingsTransaction
+    from app.models.project import (
+        Project, ProjectInvoice, ProjectInvoiceItem, ProjectPayment, ProjectTask, ProjectTimeEntry
+    )
+    from app.models.purchases import PurchaseOrder, PurchaseOrderItem, SupplierInvoice, SupplierPayment
+    from app.models.sales import SalesInvoice, SalesOrder, SalesOrderItem, SalesPayment
+
+    rng = random.Random(seed)
+    counts = scaled_counts(scale)
+    today = date.today()
+    now = datetime.utcnow()
+
+    def past_date() -> date:
+        return today - timedelta(days=rng.randrange(HISTORY_DAYS))
+
+    Base.metadata.create_all(engine)
+    inserted: Dict[str, int] = {}
+    with engine.begin() as connection:
+        def insert(model, rows):
+            inserted[model.__table__.name] = _insert(connection, model, rows)
+
+        def stamped(row):
+            return {"created_at": now, "updated_at": now, **row}
+
+        # Members and their savings
+        insert(Member, [
+            stamped({
+                "id": i, "member_id": f"M{i:06d}", "name": f"Anggota {i}", "email": f"anggota{i}@example.com",
+                "phone": f"08{rng.randrange(10 ** 9, 10 ** 10)}", "join_date": past_date(),
+                "status": rng.choice(["anggota", "anggota", "anggota", "calon_anggota", "pengurus", "inactive"]),
+                "principal_savings": 100000, "mandatory_savings": _money(rng, 0, 2000000),
+                "voluntary_savings": _money(rng, 0, 5000000), "unpaid_mandatory": 0, "shu_balance": 0,
+            })
+            for i in range(1, counts["members"] + 1)
+        ])
+        insert(SavingsTransaction, [
+            stamped({
+                "member_id": member_id, "transaction_date": past_date(), "amount": _money(rng, 10000, 500000),
+                "transaction_type": rng.choice(["mandatory", "mandatory", "voluntary", "withdrawal"]),
+                "status": "completed",
+            })
+            for member_id in range(1, counts["members"] + 1)
+            for _ in range(SAVINGS_PER_MEMBER)
+        ])
+
+        # Business partners
+        insert(Customer, [
+            stamped({"id": i, "name": f"Pelanggan {i}", "email": f"pelanggan{i}@example.com", "status": "active",
+                     "credit_limit": _money(rng, 0, 50000000)})
+            for i in range(1, counts["customers"] + 1)
+        ])
+        insert(CustomerContact, [
+            stamped({"customer_id": i, "name": f"Kontak {i}", "is_primary": True})
+            for i in range(1, counts["customers"] + 1)
+        ])
+        insert(Supplier, [
+            stamped({"id": i, "name": f"Pemasok {i}", "email": f"pemasok{i}@example.com", "status": "active"})
+            for i in range(1, counts["suppliers"] + 1)
+        ])
+
+        # Sales and purchases: orders with items, invoices for most, payments for some
+        for prefix, order_model, item_model, invoice_model, payment_model, partner, partners, order_key in (
+            ("SO", SalesOrder, SalesOrderItem, SalesInvoice, SalesPayment, "customer_id", "customers", "sales_order_id"),
+            ("PO", PurchaseOrder, PurchaseOrderItem, SupplierInvoice, SupplierPayment, "supplier_id", "suppliers", "purchase_order_id"),
+        ):
+            orders, items, invoices, payments = [], [], [], []
+            orders_key = "sales_orders" if prefix == "SO" else "purchase_orders"
+            for order_id in range(1, counts[orders_key] + 1):
+                order_date = past_date()
+                order_items = [
+                    (rng.randint(1, 20), _money(rng, 5000, 500000)) for _ in range(ITEMS_PER_ORDER)
+                ]
+                subtotal = round(sum(quantity * price for quantity, price in order_items), 2)
+                tax = round(subtotal * 0.11, 2)
+                invoiced = rng.random() < 0.8
+                paid = invoiced and rng.random() < 0.6
+                orders.append(stamped({
+                    "id": order_id, partner: rng.randint(1, counts[partners]), "order_date": order_date,
+                    "order_number": f"{prefix}-{order_date:%Y%m%d}-{order_id:06d}",
+                    "status": "completed" if paid else rng.choice(["draft", "approved"]),
+                    "subtotal": subtotal, "tax_amount": tax, "total_amount": subtotal + tax,
+                    "payment_status": "paid" if paid else "unpaid", "due_date": order_date + timedelta(days=30),
+                }))
+                items.extend(
+                    stamped({
+                        order_key: order_id, "item_description": f"Barang {rng.randrange(1000)}", "quantity": quantity,
+                        "unit_price": price, "subtotal": round(quantity * price, 2), "tax_rate": 11,
+                    })
+                    for quantity, price in order_items
+                )
+                if invoiced:
+                    invoices.append(stamped({
+                        "id": len(invoices) + 1, order_key: order_id, "invoice_number": f"INV-{prefix}-{order_id:06d}",
+                        "invoice_date": order_date, "due_date": order_date + timedelta(days=30),
+                        "amount": subtotal + tax, "status": "paid" if paid else "unpaid",
+                    }))
+                    if paid:
+                        payments.append(stamped({
+                            "invoice_id": len(invoices), "payment_date": order_date + timedelta(days=rng.randrange(30)),
+                            "amount": subtotal + tax, "payment_method": rng.choice(["cash", "bank_transfer"]),
+                        }))
+            insert(order_model, orders)
+            insert(item_model, items)
+            insert(invoice_model, invoices)
+            insert(payment_model, payments)
+
+        # Accounting: chart of accounts, monthly periods, balanced journal entries
+        insert(ChartOfAccounts, [
+            stamped({"id": i, "account_number": number, "account_name": name, "account_type": kind, "is_active": True})
+            for i, (number, name, kind) in enumerate(ACCOUNTS, start=1)
+        ])
+        # First day of every month the history covers
+        periods = sorted({date(day.year, day.month, 1) for day in (today - timedelta(days=n) for n in range(HISTORY_DAYS))})
+        insert(FiscalPeriod, [
+            stamped({
+                "id": i, "start_date": start, "period_name": f"{start:%Y-%m}",
+                "end_date": (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1),
+                "status": "closed" if i < len(periods) else "open",
+            })
+            for i, start in enumerate(periods, start=1)
+        ])
+        entries, lines = [], []
+        for entry_id in range(1, counts["journal_entries"] + 1):
+            entry_date = past_date()
+            amount = _money(rng, 10000, 10000000)
+            debit, credit = rng.sample(range(1, len(ACCOUNTS) + 1), 2)
+            entries.append(stamped({
+                "id": entry_id, "entry_number": f"JE-{entry_date:%Y%m%d}-{entry_id:06d}", "entry_date": entry_date,
+                "entry_type": rng.choice(["manual", "system"]), "status": "posted",
+                "fiscal_period_id": periods.index(date(entry_date.year, entry_date.month, 1)) + 1,
+            }))
+            lines.append(stamped({"journal_entry_id": entry_id, "account_id": debit, "debit_amount": amount, "credit_amount": 0}))
+            lines.append(stamped({"journal_entry_id": entry_id, "account_id": credit, "debit_amount": 0, "credit_amount": amount}))
+        insert(JournalEntry, entries)
+        insert(LedgerEntry, lines)
+        insert(Employee, [
+            stamped({"id": i, "name": f"Karyawan {i}", "employee_id": f"E{i:04d}", "hire_date": past_date(),
+                     "base_salary": _money(rng, 3000000, 15000000), "status": "active"})
+            for i in range(1, counts["employees"] + 1)
+        ])
+
+        # Projects with tasks, member time entries and invoices
+        projects, tasks, time_entries, project_invoices, project_items, project_payments = [], [], [], [], [], []
+        for project_id in range(1, counts["projects"] + 1):
+            start = past_date()
+            projects.append(stamped({
+                "id": project_id, "project_name": f"Proyek {project_id}", "project_number": f"PRJ-{project_id:05d}",
+                "customer_id": rng.randint(1, counts["customers"]), "start_date": start,
+                "status": rng.choice(["active", "active", "completed", "on-hold"]),
+                "budget_amount": _money(rng, 10000000, 90000000),
+            }))
+            for _ in range(TASKS_PER_PROJECT):
+                task_id = len(tasks) + 1
+                tasks.append(stamped({
+                    "id": task_id, "project_id": project_id, "task_name": f"Tugas {task_id}", "start_date": start,
+                    "status": rng.choice(["pending", "in-progress", "completed"]),
+                    "estimated_hours": rng.randint(8, 80), "hourly_rate": _money(rng, 50000, 250000),
+                }))
+                time_entries.extend(
+                    stamped({
+                        "task_id": task_id, "member_id": rng.randint(1, counts["members"]),
+                        "date": start + timedelta(days=rng.randrange(90)), "hours": rng.randint(1, 8), "billable": True,
+                    })
+                    for _ in range(TIME_ENTRIES_PER_TASK)
+                )
+            for _ in range(INVOICES_PER_PROJECT):
+                invoice_id = len(project_invoices) + 1
+                amounts = [_money(rng, 1000000, 20000000) for _ in range(ITEMS_PER_ORDER)]
+                project_invoices.append(stamped({
+                    "id": invoice_id, "project_id": project_id, "invoice_number": f"PINV-{invoice_id:06d}",
+                    "invoice_date": start + timedelta(days=30), "status": rng.choice(["sent", "paid"]),
+                    "subtotal": sum(amounts), "tax_amount": round(sum(amounts) * 0.11, 2),
+                    "total_amount": round(sum(amounts) * 1.11, 2),
+                }))
+                project_items.extend(
+                    stamped({"invoice_id": invoice_id, "description": "Jasa", "quantity": 1, "unit_price": amount,
+                             "subtotal": amount, "tax_rate": 11})
+                    for amount in amounts
+                )
+                project_payments.append(stamped({
+                    "invoice_id": invoice_id, "payment_date": start + timedelta(days=45), "amount": sum(amounts),
+                    "payment_method": "bank_transfer",
+                }))
+        insert(Project, projects)
+        insert(ProjectTask, tasks)
+        insert(ProjectTimeEntry, time_entries)
+        insert(ProjectInvoice, project_invoices)
+        insert(ProjectInvoiceItem, project_items)
+        insert(ProjectPayment, project_payments)
+
+        # Asset register with monthly depreciation history and some maintenance
+        assets, depreciations, maintenances = [], [], []
+        for asset_id in range(1, counts["assets"] + 1):
+            cost = _money(rng, 1000000, 90000000)
+            rate = rng.choice([10, 12.5, 20, 25])
+            acquired = past_date() - timedelta(days=365)
+            value = cost
+            for month_index in range(1, DEPRECIATIONS_PER_ASSET + 1):
+                amount = round(cost * rate / 1200, 2)
+                value = round(value - amount, 2)
+                depreciations.append(stamped({
+                    "asset_id": asset_id, "depreciation_date": acquired + timedelta(days=30 * month_index),
+                    "depreciation_amount": amount, "book_value_after": value,
+                }))
+            assets.append(stamped({
+                "id": asset_id, "name": f"Aset {asset_id}", "asset_number": f"AST-{asset_id:05d}",
+                "category": rng.choice(["kendaraan", "peralatan", "bangunan", "elektronik"]),
+                "acquisition_date": acquired, "acquisition_cost": cost, "current_value": value,
+                "depreciation_rate": rate, "location": rng.choice(["Kantor Pusat", "Gudang", "Cabang"]),
+                "status": "active" if rng.random() < 0.9 else "disposed",
+            }))
+            maintenances.extend(
+                stamped({"asset_id": asset_id, "maintenance_date": past_date(), "maintenance_type": "service",
+                         "cost": _money(rng, 100000, 5000000)})
+                for _ in range(2)
+            )
+        insert(Asset, assets)
+        insert(AssetDepreciation, depreciations)
+        insert(AssetMaintenance, maintenances)
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database_url", help="An empty database, e.g. sqlite:///./benchmark.db")
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+
+    engine = create_engine(args.database_url)
+    for table, count in seed(engine, args.scale, args.seed).items():
+        print(f"{table:>22} {count:>9}")
+
+
+if __name__ == "__main__":
+    main()
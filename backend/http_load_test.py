@@ -0,0 +1,321 @@
+"""
+End-to-end HTTP load test of the API under a mixed cooperative workload.
+
+Seeds a database with benchmark_data, starts app.main:app under uvicorn
+against it and runs virtual users, each one sending a request as soon as its
+previous one is answered. Every request is a scenario picked by weight:
+member lookups and savings history, savings deposits, sales orders with
+items, invoice payments and document uploads. Each concurrency level runs for
+a fixed time after a warm-up and reports throughput, p50/p95/p99 latency and
+the error rate per scenario.
+
+    python http_load_test.py
+    python http_load_test.py --concurrency 1 8 32 64 --duration 30 --output load.json
+    python http_load_test.py --scenarios savings_post=3 member_lookup=1 --scale 5
+
+Scenario weights default to DEFAULT_WEIGHTS. Against MySQL, pass an empty
+database with --database-url; without it a temporary SQLite file is used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from pool_load_test import free_port
+
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_WEIGHTS = {
+    "member_lookup": 30,
+    "member_search": 10,
+    "savings_history": 15,
+    "savings_post": 20,
+    "order_create": 10,
+    "invoice_payment": 10,
+    "document_upload": 5,
+}
+
+
+def seed_database(database_url, scale, seed):
+    """Fill the empty database with benchmark_data; returns the highest id of each table the scenarios use"""
+    subprocess.check_call(
+        [sys.executable, "benchmark_data.py", database_url, "--scale", str(scale), "--seed", str(seed)],
+        cwd=BACKEND,
+        stdout=subprocess.DEVNULL,
+    )
+    engine = create_engine(database_url)
+    with engine.connect() as connection:
+        ids = {
+            table: connection.execute(text(f"SELECT max(id) FROM {table}")).scalar()
+            for table in ("member", "customer", "salesinvoice")
+        }
+    engine.dispose()
+    return ids
+
+
+def start_server(database_url, directory, workers):
+    """Run the API in a subprocess against `database_url` and wait until it answers"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        UPLOAD_DIRECTORY=os.path.join(directory, "uploads"),
+        # Keep the background jobs from competing with the measured requests
+        DOCUMENT_ARCHIVE_INTERVAL="0",
+        DOCUMENT_EXPIRY_INTERVAL="0",
+        # SQLite warns about Numeric columns once per statement
+        PYTHONWARNINGS=os.getenv("PYTHONWARNINGS", "ignore:Dialect sqlite"),
+    )
+    env.pop("ASYNC_DATABASE_URL", None)
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BACKEND,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.TransportError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+# Scenarios: async functions of (client, rng, ids) that send one request and return the response
+
+async def member_lookup(client, rng, ids):
+    return await client.get(f"/api/v1/members/{rng.randint(1, ids['member'])}")
+
+
+async def member_search(client, rng, ids):
+    return await client.get("/api/v1/members/", params={"search": f"Anggota {rng.randrange(100)}", "limit": 20})
+
+
+async def savings_history(client, rng, ids):
+    return await client.get(f"/api/v1/members/{rng.randint(1, ids['member'])}/savings", params={"limit": 20})
+
+
+async def savings_post(client, rng, ids):
+    return await client.post(
+        f"/api/v1/members/{rng.randint(1, ids['member'])}/savings",
+        json={"amount": str(rng.randint(1, 100) * 10000), "transaction_type": rng.choice(["mandatory", "voluntary"])},
+    )
+
+
+async def order_create(client, rng, ids):
+    items = []
+    for _ in range(rng.randint(1, 5)):
+        quantity, price = rng.randint(1, 20), rng.randint(5, 500) * 1000
+        items.append({
+            "item_description": f"Barang {rng.randrange(1000)}", "quantity": quantity,
+            "unit_price": price, "subtotal": quantity * price, "tax_rate": 11,
+        })
+    subtotal = sum(item["subtotal"] for item in items)
+    return await client.post("/api/v1/sales/orders", json={
+        "customer_id": rng.randint(1, ids["customer"]),
+        "order_number": f"SO-LOAD-{rng.getrandbits(48):012x}",
+        "subtotal": subtotal,
+        "tax_amount": round(subtotal * 0.11, 2),
+        "total_amount": round(subtotal * 1.11, 2),
+        "items": items,
+    })
+
+
+async def invoice_payment(client, rng, ids):
+    invoice_id = rng.randint(1, ids["salesinvoice"])
+    return await client.post(f"/api/v1/sales/invoices/{invoice_id}/payments", json={
+        "invoice_id": invoice_id, "amount": rng.randint(1, 50) * 10000,
+        "payment_method": rng.choice(["cash", "bank_transfer"]),
+    })
+
+
+async def document_upload(client, rng, ids):
+    # Distinct content each time, so uploads are not deduplicated into one blob
+    content = rng.getrandbits(8 * 16).to_bytes(16, "big") + os.urandom(rng.randint(1, 64) * 1024)
+    return await client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("receipt.bin", content, "application/octet-stream")},
+        data={"document_type": "receipt", "related_entity_type": "member", "related_entity_id": str(rng.randint(1, ids["member"]))},
+    )
+
+
+SCENARIOS = {
+    "member_lookup": member_lookup,
+    "member_search": member_search,
+    "savings_history": savings_history,
+    "savings_post": savings_post,
+    "order_create": order_create,
+    "invoice_payment": invoice_payment,
+    "document_upload": document_upload,
+}
+
+
+async def run_level(base_url, weights, ids, concurrency, duration, warmup, seed):
+    """Run `concurrency` virtual users for `warmup` + `duration` seconds; returns per-scenario samples"""
+    names = list(weights)
+    samples = {name: {"latencies": [], "errors": 0, "statuses": {}, "error_samples": []} for name in names}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        loop = asyncio.get_running_loop()
+        measure_from = loop.time() + warmup
+        deadline = measure_from + duration
+
+        async def user(number):
+            rng = random.Random(f"{seed}:{concurrency}:{number}")
+            while loop.time() < deadline:
+                name = rng.choices(names, [weights[name] for name in names])[0]
+                started = loop.time()
+                try:
+                    response = await SCENARIOS[name](client, rng, ids)
+                    status, failed = str(response.status_code), response.status_code >= 400
+                    detail = response.text[:200] if failed else None
+                except httpx.HTTPError as e:
+                    status, failed, detail = type(e).__name__, True, str(e)[:200]
+                finished = loop.time()
+                if started < measure_from or finished > deadline:
+                    continue
+                sample = samples[name]
+                sample["latencies"].append(finished - started)
+                sample["statuses"][status] = sample["statuses"].get(status, 0) + 1
+                if failed:
+                    sample["errors"] += 1
+                    if len(sample["error_samples"]) < 3:
+                        sample["error_samples"].append(f"{status}: {detail}")
+
+        await asyncio.gather(*(user(number) for number in range(concurrency)))
+    return samples
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(latencies, errors, duration):
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(ordered),
+        "throughput": round(len(ordered) / duration, 2),
+        "errors": errors,
+        "error_rate": round(errors / len(ordered), 4) if ordered else 0,
+    }
+    if ordered:
+        summary.update({
+            "p50_ms": round(statistics.median(ordered) * 1000, 2),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        })
+    return summary
+
+
+def print_level(concurrency, level):
+    print(f"\n=== {concurrency} concurrent ===")
+    print(f"{'scenario':>16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'error %':>8}")
+    for name, summary in [*level["scenarios"].items(), ("total", level["total"])]:
+        if not summary["requests"]:
+            print(f"{name:>16} {'-':>8}")
+            continue
+        print(
+            f"{name:>16} {summary['throughput']:>8.1f} {summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} "
+            f"{summary['p99_ms']:>8.1f} {summary['errors']:>7} {summary['error_rate'] * 100:>7.2f}%"
+        )
+    for name, errors in level["error_samples"].items():
+        for error in errors:
+            print(f"  {name}: {error}")
+
+
+def parse_weights(values):
+    weights = {}
+    for value in values:
+        name, _, weight = value.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name}; choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Virtual users, one run per value")
+    parser.add_argument("--duration", type=float, default=20, help="Measured seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds before each level")
+    parser.add_argument("--scenarios", nargs="+", help="name=weight, e.g. savings_post=3 member_lookup=1")
+    parser.add_argument("--scale", type=float, default=1, help="benchmark_data scale of the seeded database")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--database-url", help="An empty database to seed; a temporary SQLite file by default")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    weights = parse_weights(args.scenarios) if args.scenarios else DEFAULT_WEIGHTS
+    directory = tempfile.mkdtemp(prefix="http-load-test-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(directory, 'load.db')}"
+
+    print(f"Seeding {database_url} at scale {args.scale:g}")
+    ids = seed_database(database_url, args.scale, args.seed)
+    process, base_url = start_server(database_url, directory, args.workers)
+    levels = {}
+    try:
+        for concurrency in args.concurrency:
+            samples = asyncio.run(
+                run_level(base_url, weights, ids, concurrency, args.duration, args.warmup, args.seed)
+            )
+            level = {
+                "scenarios": {
+                    name: summarize(sample["latencies"], sample["errors"], args.duration)
+                    for name, sample in samples.items()
+                },
+                "total": summarize(
+                    [latency for sample in samples.values() for latency in sample["latencies"]],
+                    sum(sample["errors"] for sample in samples.values()),
+                    args.duration,
+                ),
+                "statuses": {name: sample["statuses"] for name, sample in samples.items()},
+                "error_samples": {name: sample["error_samples"] for name, sample in samples.items() if sample["error_samples"]},
+            }
+            levels[str(concurrency)] = level
+            print_level(concurrency, level)
+    finally:
+        process.terminate()
+        process.wait()
+
+    if args.output:
+        report = {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "database": database_url.split("://")[0],
+            "scale": args.scale,
+            "seed": args.seed,
+            "workers": args.workers,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "weights": weights,
+            "levels": levels,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Load test for connection pool and threadpool sizing.
+
+Starts the API once per configuration with the given DB_POOL_SIZE, DB_MAX_OVERFLOW
+and THREADPOOL_LIMIT, fires concurrent requests at a sync endpoint and prints
+throughput, latency and the pool wait statistics from /health/pool.
+
+    python pool_load_test.py
+    python pool_load_test.py --configs 5:0:40 10:10:40 20:10:60 --concurrency 64 --requests 2000
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_CONFIGS = ["5:10:40", "10:10:40", "20:20:80"]  # pool_size:max_overflow:threadpool_limit
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(pool_size, max_overflow, threadpool_limit, database_url):
+    """Run the API in a subprocess with the given sizing and wait until it answers"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        DB_POOL_SIZE=str(pool_size),
+        DB_MAX_OVERFLOW=str(max_overflow),
+        DB_POOL_TIMEOUT="10",
+        THREADPOOL_LIMIT=str(threadpool_limit),
+    )
+    if database_url:
+        env["DATABASE_URL"] = database_url
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def run_load(base_url, path, total, concurrency):
+    """Send `total` GET requests from `concurrency` threads; returns latencies and errors"""
+    def worker(count):
+        session = requests.Session()
+        latencies, errors = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                if session.get(f"{base_url}{path}", timeout=60).status_code != 200:
+                    errors += 1
+            except requests.RequestException:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        return latencies, errors
+
+    shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, shares))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for result, _ in results for latency in result)
+    return latencies, sum(errors for _, errors in results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS, help="pool_size:max_overflow:threadpool_limit")
+    parser.add_argument("--path", default="/api/v1/customers/", help="Sync endpoint to load")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    args = parser.parse_args()
+
+    print(f"\n=== {args.requests} requests to {args.path}, {args.concurrency} concurrent ===")
+    print(f"{'config':>12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7} {'pool wait max ms':>17} {'timeouts':>9}")
+    for config in args.configs:
+        pool_size, max_overflow, threadpool_limit = (int(value) for value in config.split(":"))
+        process, base_url = start_server(pool_size, max_overflow, threadpool_limit, args.database_url)
+        try:
+            run_load(base_url, args.path, min(args.concurrency * 2, args.requests), args.concurrency)  # warm up
+            latencies, errors, elapsed = run_load(base_url, args.path, args.requests, args.concurrency)
+            pool = requests.get(f"{base_url}/health/pool").json()["database"]
+        finally:
+            process.terminate()
+            process.wait()
+
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(
+            f"{config:>12} {len(latencies) / elapsed:>8.1f} {statistics.median(latencies) * 1000:>8.1f} "
+            f"{p95 * 1000:>8.1f} {errors:>7} {pool.get('wait_seconds_max', 0) * 1000:>17.1f} "
+            f"{pool.get('timeouts', 0):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
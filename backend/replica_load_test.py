@@ -0,0 +1,138 @@
+"""
+Load test for read replica routing.
+
+Builds an SQLite primary with many customers and copies it to stand-in
+replica files, then starts the API once per replica count and fires
+concurrent searches at a GET endpoint. Each database gets a small pool, so
+throughput shows how reads spread over the replicas.
+
+    python replica_load_test.py
+    python replica_load_test.py --replicas 0 1 2 4 --customers 100000 --concurrency 32
+
+SQLite stand-ins never lag and share this machine's CPUs, so they only show
+scaling on a multi-core host; against MySQL replicas pass --database-url and
+--replica-urls instead.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from pool_load_test import free_port, run_load
+
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+
+
+def build_databases(directory, customers, replicas):
+    """A primary with `customers` rows and `replicas` copies of it; returns their URLs"""
+    primary = os.path.join(directory, "primary.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{primary}", UPLOAD_DIRECTORY=os.path.join(directory, "uploads"))
+    subprocess.check_call(
+        [sys.executable, "-c", "import app.main; from app.db.database import Base, engine; Base.metadata.create_all(engine)"],
+        cwd=BACKEND,
+        env=env,
+    )
+    connection = sqlite3.connect(primary)
+    connection.executemany(
+        "INSERT INTO customer (name, email, status, created_at, updated_at) "
+        "VALUES (?, ?, 'active', datetime('now'), datetime('now'))",
+        ((f"Customer {i}", f"customer{i}@example.com") for i in range(customers)),
+    )
+    connection.commit()
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    connection.close()
+
+    urls = []
+    for i in range(replicas):
+        path = os.path.join(directory, f"replica{i + 1}.db")
+        shutil.copy(primary, path)
+        urls.append(f"sqlite:///{path}")
+    return f"sqlite:///{primary}", urls
+
+
+def start_server(database_url, replica_urls, pool_size):
+    """Run the API in a subprocess with the given replicas and wait until it answers"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        DATABASE_REPLICA_URLS=",".join(replica_urls),
+        DB_POOL_SIZE=str(pool_size),
+        DB_MAX_OVERFLOW="0",
+        # Enough threads that the connections, not the threadpool, are the limit
+        THREADPOOL_LIMIT="64",
+        DOCUMENT_ARCHIVE_INTERVAL="0",
+        DOCUMENT_EXPIRY_INTERVAL="0",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.ConnectionError:
+            pass
+        process.poll()
+        if process.returncode is not None:
+            break
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", nargs="+", type=int, default=[0, 1, 2, 3], help="Replica counts to compare")
+    parser.add_argument("--path", default="/api/v1/customers/?search=999@example", help="GET endpoint to load, by default a full-table search")
+    parser.add_argument("--customers", type=int, default=50000)
+    parser.add_argument("--pool-size", type=int, default=2, help="Connections per database")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--database-url", help="Existing primary; skips building SQLite stand-ins")
+    parser.add_argument("--replica-urls", nargs="*", default=[], help="Replicas of --database-url")
+    args = parser.parse_args()
+
+    directory = None
+    if args.database_url:
+        database_url, replica_urls = args.database_url, args.replica_urls
+    else:
+        directory = tempfile.mkdtemp(prefix="replica-load-test-")
+        database_url, replica_urls = build_databases(directory, args.customers, max(args.replicas))
+
+    print(f"\n=== {args.requests} requests to {args.path}, {args.concurrency} concurrent, pool {args.pool_size} ===")
+    print(f"{'replicas':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}  reads per replica")
+    try:
+        for count in args.replicas:
+            process, base_url = start_server(database_url, replica_urls[:count], args.pool_size)
+            try:
+                run_load(base_url, args.path, min(args.concurrency * 2, args.requests), args.concurrency)  # warm up
+                latencies, errors, elapsed = run_load(base_url, args.path, args.requests, args.concurrency)
+                stats = requests.get(f"{base_url}/health/pool").json()
+            finally:
+                process.terminate()
+                process.wait()
+
+            spread = " ".join(str(replica["database"].get("checkouts", 0)) for replica in stats["replicas"])
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(
+                f"{count:>9} {len(latencies) / elapsed:>8.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} "
+                f"{errors:>7}  {spread or '-'}"
+            )
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Microbenchmarks of the service layer against a synthetic cooperative dataset.
+
+Seeds a temporary SQLite database with benchmark_data at the given scale, then
+calls the core member, sales, purchase, project, accounting and asset service
+functions through the application's own engine and session factory. Each call
+gets a fresh session, like a request. Reports the median, p95 and minimum time
+and the queries per call, and can save them as a JSON baseline and compare a
+later run against one.
+
+    python service_benchmark.py --output baseline.json
+    python service_benchmark.py --compare baseline.json --threshold 20
+    python service_benchmark.py --scale 5 --cases sales.* accounting.*
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date, datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The application's engine is created on import, so point it at a scratch database first
+_directory = tempfile.mkdtemp(prefix="service-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directory, 'benchmark.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ.setdefault("SLOW_QUERY_THRESHOLD", "0")
+
+import sqlalchemy  # noqa: E402
+from sqlalchemy.exc import SAWarning  # noqa: E402
+
+import benchmark_data  # noqa: E402
+from app.db.database import SessionLocal, engine  # noqa: E402
+from app.db.query_stats import track_queries  # noqa: E402
+from app.schemas.member import SavingsTransactionCreate  # noqa: E402
+from app.schemas.sales import SalesOrderCreate, SalesOrderItemCreate  # noqa: E402
+from app.services import member_service, project_service, purchase_service, sales_service  # noqa: E402
+from app.services.accounting_service import AccountingService  # noqa: E402
+from app.services.asset_service import AssetService  # noqa: E402
+from app.services.project_service import ProjectService  # noqa: E402
+
+# Numeric columns on SQLite warn once per query; the output is for timings
+warnings.filterwarnings("ignore", "Dialect sqlite", SAWarning)
+
+
+def _sales_order(rng, counts):
+    quantity, price = rng.randint(1, 10), Decimal(rng.randint(5000, 500000))
+    return SalesOrderCreate(
+        customer_id=rng.randint(1, counts["customers"]),
+        order_number=f"SO-BENCH-{rng.getrandbits(48):x}",
+        items=[SalesOrderItemCreate(
+            item_description="Barang", quantity=quantity, unit_price=price, subtotal=quantity * price
+        )]
+    )
+
+
+# name -> function(db, rng, counts); the rng picks which rows each call touches.
+# Names are module.function, with a suffix where a function is measured twice.
+CASES = {
+    "member.get_members": lambda db, rng, counts: member_service.get_members(db, skip=rng.randrange(counts["members"] // 2)),
+    "member.get_members[search]": lambda db, rng, counts: member_service.get_members(db, search=f"Anggota {rng.randrange(100)}"),
+    "member.get_member_savings_transactions": lambda db, rng, counts: member_service.get_member_savings_transactions(
+        db, rng.randint(1, counts["members"])
+    ),
+    "member.create_savings_transaction": lambda db, rng, counts: member_service.create_savings_transaction(
+        db, rng.randint(1, counts["members"]),
+        SavingsTransactionCreate(amount=Decimal("50000"), transaction_type="voluntary")
+    ),
+    "sales.get_sales_orders": lambda db, rng, counts: sales_service.get_sales_orders(db, skip=rng.randrange(counts["sales_orders"] // 2)),
+    "sales.get_sales_orders[expand]": lambda db, rng, counts: sales_service.get_sales_orders(
+        db, skip=rng.randrange(counts["sales_orders"] // 2), expand=sales_service.SALES_ORDER_LOADING.names
+    ),
+    "sales.get_sales_orders[customer]": lambda db, rng, counts: sales_service.get_sales_orders(
+        db, customer_id=rng.randint(1, counts["customers"])
+    ),
+    "sales.get_sales_orders[search]": lambda db, rng, counts: sales_service.get_sales_orders(db, search=f"-{rng.randrange(1000):03d}"),
+    "sales.get_sales_order": lambda db, rng, counts: sales_service.get_sales_order(db, rng.randint(1, counts["sales_orders"])),
+    "sales.get_sales_invoices[order]": lambda db, rng, counts: sales_service.get_sales_invoices(
+        db, order_id=rng.randint(1, counts["sales_orders"])
+    ),
+    "sales.create_sales_order": lambda db, rng, counts: sales_service.create_sales_order(db, _sales_order(rng, counts)),
+    "purchase.get_purchase_orders[supplier]": lambda db, rng, counts: purchase_service.get_purchase_orders(
+        db, supplier_id=rng.randint(1, counts["suppliers"])
+    ),
+    "purchase.get_purchase_order_items": lambda db, rng, counts: purchase_service.get_purchase_order_items(
+        db, rng.randint(1, counts["purchase_orders"])
+    ),
+    "purchase.get_supplier_invoices[order]": lambda db, rng, counts: purchase_service.get_supplier_invoices(
+        db, order_id=rng.randint(1, counts["purchase_orders"])
+    ),
+    "project.get_projects": lambda db, rng, counts: ProjectService.get_projects(db),
+    "project.get_projects[expand]": lambda db, rng, counts: ProjectService.get_projects(
+        db, expand=project_service.PROJECT_LOADING.names
+    ),
+    "project.get_project_invoices": lambda db, rng, counts: ProjectService.get_project_invoices(db, rng.randint(1, counts["projects"])),
+    "project.get_all_invoices": lambda db, rng, counts: ProjectService.get_all_invoices(db),
+    "project.get_all_invoices[expand]": lambda db, rng, counts: ProjectService.get_all_invoices(
+        db, expand=project_service.PROJECT_INVOICE_LOADING.names
+    ),
+    "project.get_time_entries": lambda db, rng, counts: ProjectService.get_time_entries(
+        db, rng.randint(1, counts["projects"] * benchmark_data.TASKS_PER_PROJECT)
+    ),
+    "accounting.get_journal_entries": lambda db, rng, counts: AccountingService.get_journal_entries(
+        db, skip=rng.randrange(counts["journal_entries"] // 2)
+    ),
+    "accounting.get_ledger_entries": lambda db, rng, counts: AccountingService.get_ledger_entries(
+        db, rng.randint(1, counts["journal_entries"])
+    ),
+    "accounting.get_account_by_number": lambda db, rng, counts: AccountingService.get_account_by_number(
+        db, rng.choice(benchmark_data.ACCOUNTS)[0]
+    ),
+    "accounting.get_employee": lambda db, rng, counts: AccountingService.get_employee(db, rng.randint(1, counts["employees"])),
+    "asset.get_register_summary": lambda db, rng, counts: AssetService.get_register_summary(db),
+    "asset.forecast_depreciation": lambda db, rng, counts: AssetService.forecast_depreciation(db, years=5, frequency="monthly"),
+    "asset.get_depreciation_forecast_json": lambda db, rng, counts: AssetService.get_depreciation_forecast_json(db, years=5),
+}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(function, rng, counts, iterations, warmup):
+    """Time `iterations` calls after `warmup` untimed ones; milliseconds and queries per call"""
+    timings, queries = [], []
+    for iteration in range(warmup + iterations):
+        with track_queries() as stats:
+            started = time.perf_counter()
+            db = SessionLocal()
+            try:
+                function(db, rng, counts)
+            finally:
+                db.close()
+            elapsed = time.perf_counter() - started
+        if iteration >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(stats.count)
+    return {
+        "iterations": iterations,
+        "median_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(_percentile(timings, 0.95), 4),
+        "min_ms": round(min(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "queries": round(statistics.fmean(queries), 2),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change against `baseline`; returns the cases whose median grew by more than `threshold` percent"""
+    regressions = []
+    print(f"\n{'case':<44} {'baseline':>10} {'median':>10} {'change':>8} {'queries':>11}")
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<44} {'-':>10} {result['median_ms']:>10.3f} {'new':>8}")
+            continue
+        change = (result["median_ms"] - previous["median_ms"]) / previous["median_ms"] * 100
+        queries = f"{previous['queries']:g}->{result['queries']:g}" if previous["queries"] != result["queries"] else ""
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<44} {previous['median_ms']:>10.3f} {result['median_ms']:>10.3f} {change:>+7.1f}% {queries:>11}{flag}")
+    # Cases left out with --cases are not reported, only ones no longer in the suite
+    for name in sorted(baseline["results"].keys() - CASES.keys()):
+        print(f"{name:<44} {baseline['results'][name]['median_ms']:>10.3f} {'-':>10} {'gone':>8}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1, help="Dataset size; 1 is 500 members and 2000 sales orders")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--cases", nargs="+", default=["*"], help="Glob patterns of the cases to run")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="A JSON file from an earlier --output to compare against")
+    parser.add_argument("--threshold", type=float, default=20, help="Percent slower that counts as a regression")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if any(fnmatch.fnmatchcase(name, pattern) for pattern in args.cases)]
+    if not names:
+        parser.error(f"no case matches {' '.join(args.cases)}")
+
+    started = time.perf_counter()
+    rows = benchmark_data.seed(engine, args.scale, args.seed)
+    counts = benchmark_data.scaled_counts(args.scale)
+    print(f"Seeded {sum(rows.values())} rows at scale {args.scale:g} in {time.perf_counter() - started:.1f}s")
+
+    results = {}
+    print(f"\n{'case':<44} {'median':>10} {'p95':>10} {'min':>10} {'queries':>8}")
+    for name in names:
+        # Each case gets its own generator, so adding a case does not change what the others touch
+        result = measure(CASES[name], random.Random(f"{args.seed}:{name}"), counts, args.iterations, args.warmup)
+        results[name] = result
+        print(f"{name:<44} {result['median_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['min_ms']:>10.3f} {result['queries']:>8g}")
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": engine.dialect.dbapi.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "dataset": {"scale": args.scale, "seed": args.seed, "date": date.today().isoformat(), "rows": rows},
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nWrote {args.output}")
+
+    engine.dispose()
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["dataset"]["scale"] != args.scale or baseline["dataset"]["seed"] != args.seed:
+            print(f"\nWarning: the baseline used scale {baseline['dataset']['scale']:g} and seed {baseline['dataset']['seed']}")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) more than {args.threshold:g}% slower than the baseline")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark of the SQLite engine profile against SQLAlchemy's defaults.
+
+Each writer thread runs transactions that read a row and then write, the way
+ORM updates do; reader threads run counts at the same time. Prints committed
+transactions per second, reads per second and "database is locked" errors.
+
+    python sqlite_benchmark.py
+    python sqlite_benchmark.py --writers 16 --readers 8 --seconds 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.pool import pool_options  # noqa: E402
+from app.db.sqlite import apply_sqlite_profile  # noqa: E402
+
+
+def make_engine(profile, url, threads):
+    if profile == "defaults":
+        # What app.db.database created before the SQLite profile
+        return create_engine(url, pool_pre_ping=True, pool_recycle=300)
+    # One connection per thread, so the pool does not throttle the comparison
+    engine = create_engine(url, **{**pool_options(url), "pool_size": threads, "max_overflow": 0})
+    apply_sqlite_profile(engine, serialize_writes=profile == "profile")
+    return engine
+
+
+def run(profile, writers, readers, seconds, hold):
+    directory = tempfile.mkdtemp(prefix="sqlite-benchmark-")
+    url = f"sqlite:///{os.path.join(directory, 'benchmark.db')}"
+    engine = make_engine(profile, url, writers + readers)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE account (id INTEGER PRIMARY KEY, balance INTEGER NOT NULL)"))
+        connection.execute(text("CREATE TABLE entry (id INTEGER PRIMARY KEY, account_id INTEGER, amount INTEGER)"))
+        connection.execute(text("INSERT INTO account (id, balance) VALUES (1, 0), (2, 0), (3, 0), (4, 0)"))
+
+    counts = {"commits": 0, "reads": 0, "locked": 0, "other_errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def writer(number):
+        account_id = number % 4 + 1
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as connection:
+                    balance = connection.execute(
+                        text("SELECT balance FROM account WHERE id = :id"), {"id": account_id}
+                    ).scalar()
+                    connection.execute(
+                        text("UPDATE account SET balance = :balance WHERE id = :id"),
+                        {"balance": balance + 1, "id": account_id}
+                    )
+                    connection.execute(
+                        text("INSERT INTO entry (account_id, amount) VALUES (:id, 1)"), {"id": account_id}
+                    )
+                    # Application work while the write lock is held
+                    time.sleep(hold)
+                count("commits")
+            except OperationalError as e:
+                count("locked" if "locked" in str(e) else "other_errors")
+
+    def reader():
+        while time.perf_counter() < deadline:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT count(*), sum(amount) FROM entry")).all()
+                count("reads")
+            except OperationalError as e:
+                count("locked" if "locked" in str(e) else "other_errors")
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--hold-ms", type=float, default=0, help="Time each write transaction holds the lock")
+    parser.add_argument(
+        "--profiles", nargs="+", default=["defaults", "pragmas", "profile"],
+        help="defaults: no tuning; pragmas: profile without write serialization; profile: everything"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"\n=== {args.writers} writers, {args.readers} readers, {args.hold_ms:g}ms lock hold, "
+        f"{args.seconds:g}s per profile ==="
+    )
+    print(f"{'profile':>10} {'commits/s':>10} {'reads/s':>10} {'locked':>8} {'other':>6}")
+    for profile in args.profiles:
+        counts = run(profile, args.writers, args.readers, args.seconds, args.hold_ms / 1000)
+        print(
+            f"{profile:>10} {counts['commits'] / args.seconds:>10.1f} {counts['reads'] / args.seconds:>10.1f} "
+            f"{counts['locked']:>8} {counts['other_errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every table on Base
+import app.models.project  # noqa: F401 - Member relates to the project models
+from app.db.database import Base, get_db
+from app.main import app
+from app.models.accounting import ChartOfAccounts, FiscalPeriod, JournalEntry, LedgerEntry
+from app.models.assets import Asset, AssetDepreciation, AssetMaintenance
+from app.services import asset_service
+from app.services.asset_service import AssetService
+
+PERIOD_END = "2026-03-31"
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """
+    Session factory of a database with a vehicle, a fully depreciating computer,
+    accounts and a fiscal period. A file, so a second connection can race the API.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'assets.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    db.add_all([
+        # 12000 at 10% a year over the two months since January: 200.00
+        Asset(name="Kendaraan", asset_number="AST-1", category="vehicle", acquisition_date=date(2026, 1, 15),
+              acquisition_cost=12000, current_value=12000, depreciation_rate=10, status="active"),
+        # 1000 at 100% a year over 26 months would be 2166.67, more than its book value
+        Asset(name="Komputer", asset_number="AST-2", category="equipment", acquisition_date=date(2024, 1, 1),
+              acquisition_cost=1000, current_value=1000, depreciation_rate=100, status="active"),
+        ChartOfAccounts(account_number="6100", account_name="Beban penyusutan", account_type="expense"),
+        ChartOfAccounts(account_number="1590", account_name="Akumulasi penyusutan", account_type="asset"),
+        FiscalPeriod(start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), period_name="2026"),
+    ])
+    db.commit()
+    db.close()
+    yield session_factory
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db_session):
+    def get_session():
+        db = db_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_session
+    yield TestClient(app)
+    app.dependency_overrides = {}
+
+
+def _run(client, **fields):
+    return client.post("/api/v1/assets/depreciation-runs", json={"period_end": PERIOD_END, **fields})
+
+
+def _entries(db_session):
+    db = db_session()
+    entries = {
+        asset_id: (amount, book_value)
+        for asset_id, amount, book_value in db.query(
+            AssetDepreciation.asset_id, AssetDepreciation.depreciation_amount, AssetDepreciation.book_value_after
+        )
+    }
+    db.close()
+    return entries
+
+
+def test_run_depreciates_every_active_asset_and_posts_the_journal(client, db_session):
+    response = _run(client, post_journal=True, expense_account_id=1, accumulated_depreciation_account_id=2)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["assets_depreciated"] == 2
+    assert Decimal(str(result["total_depreciation"])) == Decimal("1200.00")
+
+    # The computer is capped at its book value
+    assert _entries(db_session) == {1: (Decimal("200.00"), Decimal("11800.00")), 2: (Decimal("1000.00"), Decimal("0.00"))}
+    db = db_session()
+    assert [value for (value,) in db.query(Asset.current_value).order_by(Asset.id)] == [Decimal("11800.00"), Decimal("0.00")]
+    journal_entry = db.query(JournalEntry).one()
+    assert (journal_entry.id, journal_entry.fiscal_period_id) == (result["journal_entry_id"], 1)
+    assert sorted(
+        (entry.account_id, entry.debit_amount, entry.credit_amount) for entry in db.query(LedgerEntry)
+    ) == [(1, Decimal("1200.00"), Decimal("0.00")), (2, Decimal("0.00"), Decimal("1200.00"))]
+    db.close()
+
+
+def test_rerun_for_the_same_period_is_a_no_op(client, db_session):
+    _run(client, post_journal=True, expense_account_id=1, accumulated_depreciation_account_id=2)
+    response = _run(client, post_journal=True, expense_account_id=1, accumulated_depreciation_account_id=2)
+    assert response.status_code == 200
+    assert response.json()["assets_depreciated"] == 0
+    assert response.json()["journal_entry_id"] is None
+
+    db = db_session()
+    assert db.query(AssetDepreciation).count() == 2
+    assert db.query(JournalEntry).count() == 1
+    db.close()
+
+    # A fully depreciated asset stays at zero in later periods
+    response = client.post("/api/v1/assets/depreciation-runs", json={"period_end": "2026-04-30"})
+    assert response.json()["assets_depreciated"] == 1
+    assert _entries(db_session)[2] == (Decimal("1000.00"), Decimal("0.00"))
+
+
+def test_run_checks_the_accounts_before_writing(client, db_session):
+    response = _run(client, post_journal=True, expense_account_id=1, accumulated_depreciation_account_id=99)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Account with ID 99 not found"
+
+    response = _run(client, post_journal=True, expense_account_id=1, accumulated_depreciation_account_id=2, fiscal_period_id=99)
+    assert response.status_code == 400
+    assert _entries(db_session) == {}
+
+
+def test_run_that_loses_a_race_skips_what_the_other_run_depreciated(client, db_session):
+    racer = db_session()
+    raced = []
+
+    def insert_first(conn, cursor, statement, parameters, context, executemany):
+        # Another run commits an entry for the vehicle just before ours inserts
+        if statement.startswith("INSERT INTO assetdepreciation") and not raced:
+            raced.append(statement)
+            racer.add(AssetDepreciation(
+                asset_id=1, depreciation_date=date(2026, 3, 31), depreciation_amount=200, book_value_after=11800
+            ))
+            racer.commit()
+
+    engine = racer.get_bind()
+    event.listen(engine, "before_cursor_execute", insert_first)
+    try:
+        response = _run(client)
+    finally:
+        event.remove(engine, "before_cursor_execute", insert_first)
+        racer.close()
+    assert response.status_code == 200
+    assert response.json()["assets_depreciated"] == 1
+    assert _entries(db_session) == {1: (Decimal("200.00"), Decimal("11800.00")), 2: (Decimal("1000.00"), Decimal("0.00"))}
+
+
+def test_second_manual_entry_on_the_same_date_is_rejected(client):
+    entry = {"asset_id": 1, "depreciation_date": PERIOD_END, "depreciation_amount": 100, "book_value_after": 11900}
+    assert client.post("/api/v1/assets/1/depreciations", json=entry).status_code == 200
+    response = client.post("/api/v1/assets/1/depreciations", json=entry)
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Asset 1 already has a depreciation entry on {PERIOD_END}"
+
+
+def test_declining_balance_compounds_month_by_month(client, db_session):
+    response = _run(client, method="declining_balance")
+    assert response.status_code == 200
+    # Two months of 10% a year on 12000: 12000 * (1 - (1 - 10/1200) ** 2), not 200.00 on one base
+    # 26 months of 100% a year on 1000 leave some value, where one base would take it all
+    assert _entries(db_session) == {1: (Decimal("199.17"), Decimal("11800.83")), 2: (Decimal("895.89"), Decimal("104.11"))}
+
+
+def test_run_continues_from_a_manually_entered_book_value(client, db_session):
+    # A revaluation entered by hand in February
+    entry = {"asset_id": 1, "depreciation_date": "2026-02-28", "depreciation_amount": 100, "book_value_after": 9000}
+    assert client.post("/api/v1/assets/1/depreciations", json=entry).status_code == 200
+
+    assert _run(client, method="declining_balance").status_code == 200
+    # One month of 10% a year on the 9000 left, not on 12000 less the entries' sum
+    assert _entries(db_session)[1] == (Decimal("75.00"), Decimal("8925.00"))
+    db = db_session()
+    assert db.query(Asset.current_value).filter(Asset.id == 1).scalar() == Decimal("8925.00")
+    db.close()
+
+
+def test_register_summary_totals_depreciation_and_maintenance(client, db_session):
+    db = db_session()
+    db.query(Asset).filter(Asset.id == 1).update({"location": "Jakarta", "current_value": 11800})
+    db.add_all([
+        Asset(name="Truk", asset_number="AST-3", category="vehicle", location="Jakarta", acquisition_date=date(2025, 1, 1),
+              acquisition_cost=50000, current_value=47500, depreciation_rate=5, status="active"),
+        AssetDepreciation(asset_id=1, depreciation_date=date(2026, 1, 31), depreciation_amount=Decimal("100.50"),
+                          book_value_after=Decimal("11899.50")),
+        AssetDepreciation(asset_id=1, depreciation_date=date(2026, 2, 28), depreciation_amount=Decimal("99.50"),
+                          book_value_after=Decimal("11800.00")),
+        AssetDepreciation(asset_id=3, depreciation_date=date(2025, 12, 31), depreciation_amount=Decimal("2500.00"),
+                          book_value_after=Decimal("47500.00")),
+        # Two maintenance records on the vehicle, so a join that fans out would double its depreciation
+        AssetMaintenance(asset_id=1, maintenance_date=date(2026, 2, 1), maintenance_type="service", cost=Decimal("150.25")),
+        AssetMaintenance(asset_id=1, maintenance_date=date(2026, 3, 1), maintenance_type="repair", cost=Decimal("49.75")),
+        AssetMaintenance(asset_id=3, maintenance_date=date(2026, 1, 10), maintenance_type="service", cost=Decimal("300.00")),
+    ])
+    db.commit()
+    db.close()
+
+    response = client.get("/api/v1/assets/summary")
+    assert response.status_code == 200
+    summary = response.json()
+
+    def totals(row):
+        return (
+            row["asset_count"], Decimal(str(row["acquisition_cost"])), Decimal(str(row["current_value"])),
+            Decimal(str(row["accumulated_depreciation"])), Decimal(str(row["total_maintenance_cost"]))
+        )
+
+    equipment = (1, Decimal("1000"), Decimal("1000"), Decimal("0"), Decimal("0"))
+    vehicles = (2, Decimal("62000"), Decimal("59300"), Decimal("2700.00"), Decimal("500.00"))
+    assert {row["key"]: totals(row) for row in summary["by_category"]} == {"equipment": equipment, "vehicle": vehicles}
+    assert {row["key"]: totals(row) for row in summary["by_location"]} == {None: equipment, "Jakarta": vehicles}
+
+    assets = {row["asset_id"]: row for row in summary["assets"]}
+    assert [
+        (Decimal(str(row["accumulated_depreciation"])), Decimal(str(row["total_maintenance_cost"])), row["maintenance_count"])
+        for row in (assets[1], assets[2], assets[3])
+    ] == [
+        (Decimal("200.00"), Decimal("200.00"), 2), (Decimal("0"), Decimal("0"), 0), (Decimal("2500.00"), Decimal("300.00"), 1)
+    ]
+    assert [assets[n]["last_maintenance_date"] for n in (1, 2, 3)] == ["2026-03-01", None, "2026-01-10"]
+
+    response = client.get("/api/v1/assets/summary", params={"category": "vehicle"})
+    assert [row["key"] for row in response.json()["by_location"]] == ["Jakarta"]
+
+
+@pytest.fixture
+def forecasts(monkeypatch):
+    """An empty forecast cache, counting how often a forecast is actually computed"""
+    monkeypatch.setattr(asset_service, "_forecast_cache", OrderedDict())
+    computed = []
+    forecast_depreciation = AssetService.forecast_depreciation
+
+    def counting(db, **kwargs):
+        computed.append(kwargs["years"])
+        return forecast_depreciation(db, **kwargs)
+
+    monkeypatch.setattr(AssetService, "forecast_depreciation", counting)
+    return computed
+
+
+def test_forecast_is_served_from_the_cache_until_the_register_changes(client, db_session, forecasts):
+    params = {"years": 2, "start_date": "2026-01-01"}
+    first = client.get("/api/v1/assets/depreciation-forecast", params=params)
+    assert first.status_code == 200
+    assert first.json()["periods"] == ["2026-12-31", "2027-12-31"]
+    assert client.get("/api/v1/assets/depreciation-forecast", params=params).content == first.content
+    assert forecasts == [2]
+    monthly = client.get("/api/v1/assets/depreciation-forecast", params={**params, "frequency": "monthly"})
+    assert monthly.json()["periods"][:3] == ["2026-01-31", "2026-02-28", "2026-03-31"]
+    assert monthly.json()["periods"][-1] == "2027-12-31"
+    assert forecasts == [2, 2]
+
+    db = db_session()
+    db.query(Asset).filter(Asset.id == 1).update({Asset.current_value: 6000}, synchronize_session=False)
+    db.commit()
+    db.close()
+    changed = client.get("/api/v1/assets/depreciation-forecast", params=params)
+    assert forecasts == [2, 2, 2]
+    assert changed.json()["assets"][0]["book_values"][0] != first.json()["assets"][0]["book_values"][0]
+
+
+def test_forecast_cache_evicts_the_least_recently_used(client, forecasts, monkeypatch):
+    monkeypatch.setattr(asset_service, "FORECAST_CACHE_SIZE", 2)
+    for years in (1, 2, 1, 3, 1, 2):
+        client.get("/api/v1/assets/depreciation-forecast", params={"years": years, "start_date": "2026-01-01"})
+    # 2 was evicted by 3, while 1 stayed in use
+    assert forecasts == [1, 2, 3, 2]
+    assert len(asset_service._forecast_cache) == 2
+
+
+def test_forecast_cache_is_safe_across_threads(db_session, forecasts, monkeypatch):
+    monkeypatch.setattr(asset_service, "FORECAST_CACHE_SIZE", 3)
+
+    def forecast(years):
+        db = db_session()
+        try:
+            return AssetService.get_depreciation_forecast_json(db, years=years, start_date=date(2026, 1, 1))
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(forecast, [1 + number % 5 for number in range(200)]))
+    assert all(results)
+    assert len(asset_service._forecast_cache) == 3
+
+
+@pytest.mark.parametrize("params", [
+    {"years": 0},
+    {"years": 31},
+    {"frequency": "weekly"},
+    {"method": "sum_of_years"},
+    {"start_date": "not-a-date"},
+])
+def test_forecast_rejects_invalid_parameters(client, params):
+    assert client.get("/api/v1/assets/depreciation-forecast", params=params).status_code == 422
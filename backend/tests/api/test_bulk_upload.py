@@ -0,0 +1,158 @@
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401 - registers every table on Base
+from app.config import settings
+from app.db.database import Base, get_db
+from app.main import app
+from app.models.documents import Document, DocumentBlob, DocumentText
+from app.services.search_service import SearchService
+from app.utils.storage import get_storage
+
+
+@pytest.fixture
+def db_session():
+    """Session factory of an in-memory database"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db_session, tmp_path, monkeypatch):
+    """The API on the in-memory database, storing blobs under tmp_path and queueing no indexing"""
+    def get_session():
+        db = db_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(settings, "UPLOAD_DIRECTORY", str(tmp_path / "uploads"))
+    get_storage.cache_clear()
+    indexed = []
+    monkeypatch.setattr(SearchService, "schedule_indexing", indexed.append)
+    app.dependency_overrides[get_db] = get_session
+    client = TestClient(app)
+    client.indexed = indexed
+    yield client
+    app.dependency_overrides = {}
+    get_storage.cache_clear()
+
+
+def _archive(files, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _corrupt(data, name):
+    """The archive with the deflate stream of `name` replaced by an invalid block"""
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    info = archive.getinfo(name)
+    header = data[info.header_offset:info.header_offset + 30]
+    start = info.header_offset + 30 + int.from_bytes(header[26:28], "little") + int.from_bytes(header[28:30], "little")
+    return data[:start] + b"\xff" * info.compress_size + data[start + info.compress_size:]
+
+
+def _bulk_upload(client, archive, manifest=None, **form):
+    files = {"file": ("documents.zip", archive, "application/zip")}
+    if manifest is not None:
+        files["manifest"] = ("manifest.csv", manifest, "text/csv")
+    return client.post("/api/v1/documents/bulk-upload", files=files, data=form)
+
+
+def test_manifest_fields_and_ids_belong_to_their_files(client, db_session):
+    manifest = (
+        "file_name,document_type,related_entity_id,tags\n"
+        "a/invoice.txt,invoice,1,\"pajak, 2026\"\n"
+        "b/invoice.txt,invoice,2,2026\n"
+        "contract.txt,contract,3,\n"
+    )
+    # Both invoices have the same name and content, so only the ids tell them apart
+    archive = _archive({
+        "a/invoice.txt": b"same", "b/invoice.txt": b"same", "contract.txt": b"kontrak", "manifest.csv": manifest
+    })
+    response = _bulk_upload(client, archive, tags="masuk")
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (3, 0)
+
+    db = db_session()
+    for item, related_entity_id in zip(result["results"], (1, 2, 3)):
+        document = db.query(Document).get(item["document_id"])
+        assert document.related_entity_id == related_entity_id
+        assert document.name == item["file_name"].split("/")[-1]
+    documents = {document.related_entity_id: document for document in db.query(Document)}
+    assert documents[1].tags == "pajak, 2026"
+    assert sorted(link.tag.name for link in documents[2].tag_links) == ["2026"]
+    assert documents[3].tags == "masuk"
+    assert documents[1].blob_id == documents[2].blob_id
+    assert db.query(DocumentBlob).filter(DocumentBlob.id == documents[1].blob_id).one().ref_count == 2
+    assert sorted(text.document_id for text in db.query(DocumentText)) == sorted(documents[n].id for n in (1, 2, 3))
+    db.close()
+    assert sorted(client.indexed) == sorted(item["document_id"] for item in result["results"])
+
+
+def test_separate_manifest_reports_unknown_and_missing_files(client):
+    manifest = "file_name,name\ninvoice.txt,Faktur\nmissing.txt,Hilang\n"
+    archive = _archive({"invoice.txt": b"faktur", "notes.txt": b"catatan", "__MACOSX/._invoice.txt": b""})
+    result = _bulk_upload(client, archive, manifest, document_type="invoice").json()
+    assert [(item["file_name"], item["status"]) for item in result["results"]] == [
+        ("invoice.txt", "created"), ("notes.txt", "created"), ("missing.txt", "failed")
+    ]
+
+    response = _bulk_upload(client, archive, "file_name\ninvoice.txt\ninvoice.txt\n", document_type="invoice")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Manifest lists invoice.txt more than once"
+
+    result = _bulk_upload(client, archive).json()
+    assert result["failed"] == 2
+    assert result["results"][0]["error"] == "No document_type in the manifest and no default given"
+
+
+def test_limits_fail_single_files_or_the_whole_upload(client, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_UPLOAD_MAX_ENTRY_SIZE", 10)
+    monkeypatch.setattr(settings, "BULK_UPLOAD_MAX_TOTAL_SIZE", 15)
+    archive = _archive({"a.txt": b"12345678", "big.txt": b"12345678901", "b.txt": b"12345678"})
+    result = _bulk_upload(client, archive, document_type="invoice").json()
+    assert [item["status"] for item in result["results"]] == ["created", "failed", "failed"]
+    assert result["results"][1]["error"] == "File exceeds 10 bytes"
+    assert result["results"][2]["error"] == "Archive exceeds 15 bytes in total"
+
+    monkeypatch.setattr(settings, "BULK_UPLOAD_MAX_ENTRIES", 2)
+    response = _bulk_upload(client, archive, document_type="invoice")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Archive has more than 2 files"
+
+    assert _bulk_upload(client, b"not a zip", document_type="invoice").status_code == 400
+
+
+def test_zip_bomb_is_refused_before_it_is_inflated(client, monkeypatch, tmp_path):
+    # A megabyte of zeros deflates about a thousandfold
+    archive = _archive({"bomb.txt": b"\0" * 1024 * 1024, "invoice.txt": b"faktur"})
+    result = _bulk_upload(client, archive, document_type="invoice").json()
+    assert [item["status"] for item in result["results"]] == ["failed", "created"]
+    assert result["results"][0]["error"] == "File is compressed suspiciously well"
+    assert sum(path.stat().st_size for path in (tmp_path / "uploads").rglob("*") if path.is_file()) == len(b"faktur")
+
+
+def test_corrupt_entries_fail_and_a_corrupt_manifest_is_a_bad_request(client):
+    archive = _archive({"broken.txt": b"faktur " * 100, "invoice.txt": b"faktur"})
+    result = _bulk_upload(client, _corrupt(archive, "broken.txt"), document_type="invoice").json()
+    assert [item["status"] for item in result["results"]] == ["failed", "created"]
+    assert result["results"][0]["error"] == "File is corrupt"
+
+    archive = _archive({"invoice.txt": b"faktur", "manifest.csv": "file_name,document_type\n" * 50})
+    response = _bulk_upload(client, _corrupt(archive, "manifest.csv"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "manifest.csv in the archive is corrupt"
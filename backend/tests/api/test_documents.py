@@ -0,0 +1,558 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401 - registers every table on Base
+from app.config import settings
+from app.db import database
+from app.db.database import Base, get_db
+from app.main import JobLock, app, run_periodically
+from app.models.documents import Document, DocumentBlob, DocumentTag, DocumentText, DocumentVersion
+from app.services import search_service
+from app.services.archive_service import ArchiveService
+from app.services.blob_service import BlobService
+from app.services.document_service import DocumentService
+from app.services.expiry_service import ExpiryService
+from app.services.search_service import SearchService
+from app.utils.storage import LocalStorageBackend, get_storage
+
+
+@pytest.fixture
+def db_session():
+    """Session factory of an in-memory database"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db_session, tmp_path, monkeypatch):
+    """The API on the in-memory database, storing blobs under tmp_path and queueing no indexing"""
+    def get_session():
+        db = db_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(settings, "UPLOAD_DIRECTORY", str(tmp_path / "uploads"))
+    get_storage.cache_clear()
+    indexed = []
+    monkeypatch.setattr(SearchService, "schedule_indexing", indexed.append)
+    app.dependency_overrides[get_db] = get_session
+    client = TestClient(app)
+    client.indexed = indexed
+    yield client
+    app.dependency_overrides = {}
+    get_storage.cache_clear()
+
+
+def _upload(client, data=b"invoice 42", **form):
+    response = client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("invoice.txt", data, "text/plain")},
+        data={"document_type": "invoice", **form}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _upload_version(client, document_id, data):
+    response = client.post(
+        f"/api/v1/documents/{document_id}/upload-version",
+        files={"file": ("invoice.txt", data, "text/plain")}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_download_serves_the_uploaded_blob(client):
+    document = _upload(client)
+    response = client.get(f"/api/v1/documents/{document['id']}/download")
+    assert response.status_code == 200
+    assert response.content == b"invoice 42"
+    assert response.headers["etag"] == f'"{document["content_hash"]}"'
+
+    version = _upload_version(client, document["id"], b"invoice 42, corrected")
+    response = client.get(f"/api/v1/documents/versions/{version['id']}/download", headers={"Range": "bytes=-9"})
+    assert response.status_code == 206
+    assert response.content == b"corrected"
+
+
+def test_upload_over_the_limit_is_413_and_stores_nothing(client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 16)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 4)
+    response = client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("invoice.txt", b"x" * 17, "text/plain")},
+        data={"document_type": "invoice"}
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Upload exceeds the maximum size of 16 bytes"
+
+    document = _upload(client, b"x" * 16)
+    response = client.post(
+        f"/api/v1/documents/{document['id']}/upload-version",
+        files={"file": ("invoice.txt", b"y" * 17, "text/plain")}
+    )
+    assert response.status_code == 413
+
+    db = db_session()
+    assert db.query(Document).count() == 1
+    assert db.query(DocumentVersion).count() == 0
+    db.close()
+    # Only the blob of the upload that fit, no staged leftovers
+    assert [path.name for path in (tmp_path / "uploads").rglob("*") if path.is_file()] == [document["content_hash"]]
+
+
+def test_json_create_takes_no_file_path(client):
+    response = client.post(
+        "/api/v1/documents/",
+        json={"name": "Kontrak", "document_type": "contract", "file_path": "/etc/passwd"}
+    )
+    assert response.status_code == 200
+    document = response.json()
+    assert document["file_path"] is None
+
+    response = client.get(f"/api/v1/documents/{document['id']}/download")
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"Document with ID {document['id']} has no stored file"
+
+
+def test_download_refuses_blobs_outside_the_storage_root(client, db_session):
+    db = db_session()
+    blob = DocumentBlob(content_hash="0" * 64, file_path="/etc/passwd", file_size=1, ref_count=1)
+    document = Document(name="Passwd", document_type="contract", file_path="/etc/passwd", blob=blob)
+    db.add(document)
+    db.commit()
+
+    response = client.get(f"/api/v1/documents/{document.id}/download")
+    assert response.status_code == 404
+    db.close()
+
+
+def test_json_version_takes_a_reference_on_the_current_blob(client, db_session):
+    document = _upload(client)
+    response = client.post(
+        f"/api/v1/documents/{document['id']}/versions",
+        json={"document_id": document["id"], "version_number": 1, "notes": "Ditandatangani", "file_path": "/etc/passwd"}
+    )
+    assert response.status_code == 200
+    version = response.json()
+    assert (version["file_path"], version["content_hash"]) == (document["file_path"], document["content_hash"])
+
+    db = db_session()
+    blob = db.query(DocumentBlob).one()
+    assert blob.ref_count == 2
+    db.close()
+
+    assert client.delete(f"/api/v1/documents/versions/{version['id']}").json() is True
+    assert client.delete(f"/api/v1/documents/{document['id']}").json() is True
+    db = db_session()
+    assert db.query(DocumentBlob).count() == 0
+    # The unreferenced file is left to garbage collection
+    assert os.path.exists(document["file_path"])
+    assert BlobService.collect_garbage(db, min_age_seconds=0) == [document["file_path"]]
+    db.close()
+
+    empty = client.post("/api/v1/documents/", json={"name": "Kosong", "document_type": "contract"}).json()
+    response = client.post(
+        f"/api/v1/documents/{empty['id']}/versions",
+        json={"document_id": empty["id"], "version_number": 1}
+    )
+    assert response.status_code == 400
+
+
+def test_acquire_blob_keeps_earlier_writes_when_losing_an_insert_race(db_session):
+    db = db_session()
+    engine = db.get_bind()
+    content_hash = "a" * 64
+    raced = []
+
+    def insert_first(conn, cursor, statement, parameters, context, executemany):
+        # Another request stores the same content between our UPDATE and INSERT
+        if statement.startswith("UPDATE documentblob") and cursor.rowcount == 0 and not raced:
+            raced.append(statement)
+            cursor.connection.execute(
+                "INSERT INTO documentblob (created_at, updated_at, content_hash, file_path, file_size, ref_count) "
+                "VALUES (CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, 'theirs', 5, 1)",
+                (content_hash,)
+            )
+
+    db.add(DocumentTag(name="pending"))
+    db.flush()
+    event.listen(engine, "after_cursor_execute", insert_first)
+    blob = BlobService.acquire_blob(db, content_hash, "ours", 5)
+    event.remove(engine, "after_cursor_execute", insert_first)
+    db.commit()
+
+    assert (blob.file_path, blob.ref_count) == ("theirs", 2)
+    assert db.query(DocumentTag.name).scalar() == "pending"
+    db.close()
+
+
+def _tagged_documents(client):
+    """Three documents: pajak and 2026, pajak alone, 2025 alone"""
+    return [
+        _upload(client, f"faktur {number}".encode(), tags=tags)["id"]
+        for number, tags in enumerate([" Pajak , 2026", "pajak", "2025"])
+    ]
+
+
+@pytest.mark.parametrize("tags, tag_match, expected", [
+    (["pajak", "2026"], "all", [0]),
+    (["pajak,2026"], "all", [0]),
+    (["pajak"], "all", [0, 1]),
+    (["2026", "2025"], "any", [0, 2]),
+    (["pajak", "unknown"], "all", []),
+    (["pajak", "unknown"], "any", [0, 1]),
+    (["unknown"], "any", []),
+])
+def test_tag_filters(client, db_session, tags, tag_match, expected):
+    ids = _tagged_documents(client)
+    db = db_session()
+    documents = DocumentService.get_documents(db, tags=tags, tag_match=tag_match)
+    assert [document.id for document in documents] == [ids[number] for number in expected]
+    db.close()
+
+    response = client.get("/api/v1/documents/export", params={"tags": tags, "tag_match": tag_match})
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [ids[number] for number in expected]
+
+
+def test_tag_facets_count_the_matching_documents(client):
+    _tagged_documents(client)
+    response = client.get("/api/v1/documents/tags")
+    assert response.json() == [
+        {"name": "pajak", "document_count": 2},
+        {"name": "2025", "document_count": 1},
+        {"name": "2026", "document_count": 1},
+    ]
+    response = client.get("/api/v1/documents/tags", params={"tags": "2026"})
+    assert response.json() == [{"name": "2026", "document_count": 1}, {"name": "pajak", "document_count": 1}]
+    response = client.get("/api/v1/documents/tags", params={"tags": ["2025", "2026"], "tag_match": "any"})
+    assert [facet["name"] for facet in response.json()] == ["2025", "2026", "pajak"]
+
+    assert client.get("/api/v1/documents/tags", params={"tag_match": "some"}).status_code == 422
+    assert client.get("/api/v1/documents/tags", params={"tags": "x" * 101}).status_code == 400
+
+
+def test_tag_created_by_another_request_meanwhile_is_reused(client, db_session):
+    _upload(client, b"faktur lama", tags="lama")
+    engine = db_session().get_bind()
+    raced = []
+
+    def insert_first(conn, cursor, statement, parameters, context, executemany):
+        # Another request creates the new tag right after our lookup found it missing
+        if statement.startswith("SELECT") and "FROM documenttag " in statement and not raced:
+            raced.append(statement)
+            cursor.connection.execute(
+                "INSERT INTO documenttag (created_at, updated_at, name) VALUES (CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 'baru')"
+            )
+
+    event.listen(engine, "after_cursor_execute", insert_first)
+    try:
+        document = _upload(client, b"faktur baru", tags="baru, lama")
+    finally:
+        event.remove(engine, "after_cursor_execute", insert_first)
+    assert raced
+    assert document["tags"] == "baru, lama"
+
+    db = db_session()
+    assert sorted(name for (name,) in db.query(DocumentTag.name)) == ["baru", "lama"]
+    links = db.query(Document).get(document["id"]).tag_links
+    assert sorted(link.tag.name for link in links) == ["baru", "lama"]
+    db.close()
+
+
+@pytest.fixture
+def indexer(client, db_session, monkeypatch):
+    """Runs the extraction the uploads queued, the way the index workers would"""
+    monkeypatch.setattr(database, "SessionLocal", db_session)
+
+    def run():
+        statuses = [SearchService.index_document(document_id) for document_id in client.indexed]
+        client.indexed.clear()
+        return statuses
+
+    return run
+
+
+def _search(client, q, **params):
+    response = client.get("/api/v1/documents/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_uploaded_text_is_indexed_and_ranked(client, indexer):
+    gudang = _upload(client, b"Perjanjian sewa gudang di Bekasi", name="Sewa kantor")["id"]
+    kantor = _upload(client, b"Faktur listrik", name="Kantor gudang", related_entity_type="supplier")["id"]
+    unsupported = _upload(client, b"\x89PNG\r\n\x1a\n\x00\x00", name="Foto")["id"]
+    # Names and descriptions are searchable before the file text is extracted
+    assert [result["id"] for result in _search(client, "bekasi")] == []
+    assert sorted(result["id"] for result in _search(client, "kantor")) == [gudang, kantor]
+
+    assert indexer() == ["indexed", "indexed", "unsupported"]
+    results = _search(client, "gudang")
+    # A match in the name outranks one in the file text
+    assert [result["id"] for result in results] == [kantor, gudang]
+    assert results[0]["score"] > results[1]["score"]
+    assert "<mark>gudang</mark>" in results[1]["snippet"].lower()
+    assert [result["id"] for result in _search(client, "Bekasi, sewa!")] == [gudang]
+    assert [result["id"] for result in _search(client, "gudang", related_entity_type="supplier")] == [kantor]
+    assert _search(client, "!!!") == []
+    assert client.get("/api/v1/documents/search", params={"q": ""}).status_code == 422
+
+    assert [result["id"] for result in _search(client, "foto")] == [unsupported]
+
+
+def test_new_file_replaces_the_indexed_text(client, db_session, indexer):
+    document = _upload(client, b"Kontrak lama")
+    indexer()
+    _upload_version(client, document["id"], b"Kontrak baru")
+    # The old text stays searchable until the new file is extracted
+    assert [result["id"] for result in _search(client, "lama")] == [document["id"]]
+    assert indexer() == ["indexed"]
+    assert _search(client, "lama") == []
+    assert [result["id"] for result in _search(client, "baru")] == [document["id"]]
+
+    response = client.put(f"/api/v1/documents/{document['id']}", json={"name": "Perjanjian distribusi"})
+    assert response.status_code == 200
+    assert client.indexed == []
+    assert [result["id"] for result in _search(client, "distribusi")] == [document["id"]]
+
+
+def test_extraction_of_a_superseded_file_does_not_land(client, db_session, indexer, monkeypatch):
+    document = _upload(client, b"Kontrak lama")
+    extract_text = search_service.extract_text
+
+    def upload_meanwhile(source, max_length):
+        # A newer file arrives while the old one is being extracted
+        db = db_session()
+        db.query(DocumentText).update({DocumentText.content_hash: "0" * 64}, synchronize_session=False)
+        db.commit()
+        db.close()
+        return extract_text(source, max_length)
+
+    monkeypatch.setattr(search_service, "extract_text", upload_meanwhile)
+    indexer()
+    db = db_session()
+    search_text = db.query(DocumentText).one()
+    assert (search_text.status, search_text.content) == ("pending", None)
+    assert SearchService.schedule_pending(db) == 1
+    db.close()
+    assert client.indexed == [document["id"]]
+
+
+def test_upload_racing_the_delete_of_the_same_content_keeps_its_file(client, db_session, monkeypatch):
+    document = _upload(client, b"faktur bersama")
+    put = LocalStorageBackend.put
+
+    def delete_meanwhile(storage, temp_path, content_hash, suffix=""):
+        # The upload finds the file still stored, then the last reference to it goes
+        location = put(storage, temp_path, content_hash, suffix)
+        db = db_session()
+        assert DocumentService.delete_document(db, document["id"])
+        db.close()
+        return location
+
+    monkeypatch.setattr(LocalStorageBackend, "put", delete_meanwhile)
+    again = _upload(client, b"faktur bersama")
+    assert again["file_path"] == document["file_path"]
+    assert client.get(f"/api/v1/documents/{again['id']}/download").content == b"faktur bersama"
+
+
+COMPRESSIBLE = b"Faktur pembelian, baris berulang\n" * 200
+
+
+def _age_old_versions(db_session, days):
+    """Backdate every version but the latest and its blob files, as if uploaded `days` ago"""
+    db = db_session()
+    latest = {document.id: document.blob_id for document in db.query(Document)}
+    for version in db.query(DocumentVersion):
+        if version.blob_id != latest[version.document_id]:
+            version.upload_date = date.today() - timedelta(days=days)
+    for blob in db.query(DocumentBlob):
+        modified = time.time() - days * 24 * 60 * 60
+        os.utime(blob.file_path, (modified, modified))
+    db.commit()
+    db.close()
+
+
+def _document_with_old_version(client, db_session, days=200, content=COMPRESSIBLE):
+    document = _upload(client, content + b"v1")
+    old = _upload_version(client, document["id"], content + b"v1")
+    _upload_version(client, document["id"], content + b"v2")
+    _age_old_versions(db_session, days)
+    return old
+
+
+@pytest.fixture
+def archive_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DOCUMENT_ARCHIVE_MIN_AGE_DAYS", 180)
+    monkeypatch.setattr(settings, "DOCUMENT_ARCHIVE_CODEC", "gzip")
+    monkeypatch.setattr(settings, "DOCUMENT_ARCHIVE_POLICIES", {})
+
+
+def test_archive_compresses_old_versions_and_sweeps_the_originals(client, db_session, archive_settings):
+    old = _document_with_old_version(client, db_session)
+    original_path = old["file_path"]
+    etag = client.get(f"/api/v1/documents/versions/{old['id']}").headers["etag"]
+
+    run = client.post("/api/v1/documents/archive-runs").json()
+    assert run["archived"] == 1
+    assert run["removed_files"] == 1
+    assert run["stored_size"] < run["original_size"] == len(COMPRESSIBLE) + 2
+    assert not os.path.exists(original_path)
+
+    response = client.get(f"/api/v1/documents/versions/{old['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    version = response.json()
+    assert version["compression"] == "gzip"
+    assert version["file_path"] == original_path + ".gz"
+    response = client.get(f"/api/v1/documents/versions/{old['id']}/download", headers={"Range": "bytes=-2"})
+    assert response.status_code == 206
+    assert response.content == b"v1"
+
+    report = client.get("/api/v1/documents/storage-report").json()
+    assert report["archived_count"] == 1
+    assert report["reclaimed_size"] == run["original_size"] - run["stored_size"]
+    assert client.post("/api/v1/documents/archive-runs").json()["archived"] == 0
+
+
+def test_archive_waits_for_the_minimum_age(client, db_session, archive_settings):
+    _document_with_old_version(client, db_session, days=30)
+    assert client.post("/api/v1/documents/archive-runs").json()["archived"] == 0
+
+
+def test_archive_policy_without_an_age_never_archives(client, db_session, archive_settings, monkeypatch):
+    monkeypatch.setattr(settings, "DOCUMENT_ARCHIVE_POLICIES", {"invoice": {"min_age_days": None}})
+    _document_with_old_version(client, db_session, days=10000)
+    assert client.post("/api/v1/documents/archive-runs").json()["archived"] == 0
+
+    monkeypatch.setattr(settings, "DOCUMENT_ARCHIVE_POLICIES", {"contract": {"min_age_days": None}})
+    assert client.post("/api/v1/documents/archive-runs").json()["archived"] == 1
+
+
+def test_reupload_restores_an_archived_blob(client, db_session, archive_settings):
+    old = _document_with_old_version(client, db_session)
+    client.post("/api/v1/documents/archive-runs")
+
+    current = _upload_version(client, old["document_id"], COMPRESSIBLE + b"v1")
+    assert current["compression"] is None
+    response = client.get(f"/api/v1/documents/versions/{old['id']}/download")
+    assert response.content == COMPRESSIBLE + b"v1"
+
+
+def test_archiver_job_sweeps_once(client, db_session, archive_settings, monkeypatch):
+    for number in range(3):
+        # Distinct content, or the documents would share their blobs
+        _document_with_old_version(client, db_session, content=COMPRESSIBLE * (number + 1))
+    monkeypatch.setattr(database, "SessionLocal", db_session)
+    monkeypatch.setattr(settings, "DOCUMENT_ARCHIVE_BATCH_SIZE", 1)
+    sweeps = []
+    collect_garbage = BlobService.collect_garbage
+    monkeypatch.setattr(BlobService, "collect_garbage", lambda *args, **kwargs: sweeps.append(1) or collect_garbage(*args, **kwargs))
+
+    total = ArchiveService.run_archiver()
+    assert total["archived"] == 3
+    assert total["removed_files"] == 3
+    assert len(sweeps) == 1
+
+
+def _expiring_documents(db_session):
+    """Documents expiring around today, linked to two suppliers; returns their ids by name"""
+    today = date.today()
+    db = db_session()
+    documents = [
+        Document(name="overdue", document_type="contract", expiry_date=today - timedelta(days=1),
+                 related_entity_type="supplier", related_entity_id=1),
+        Document(name="today", document_type="contract", expiry_date=today,
+                 related_entity_type="supplier", related_entity_id=2),
+        Document(name="soon", document_type="permit", expiry_date=today + timedelta(days=10),
+                 related_entity_type="supplier", related_entity_id=1),
+        Document(name="later", document_type="permit", expiry_date=today + timedelta(days=60),
+                 related_entity_type="supplier", related_entity_id=1),
+        Document(name="archived", document_type="permit", expiry_date=today - timedelta(days=1), status="archived"),
+        Document(name="unlinked", document_type="permit", expiry_date=today + timedelta(days=20)),
+    ]
+    db.add_all(documents)
+    db.commit()
+    ids = {document.name: document.id for document in documents}
+    db.close()
+    return ids
+
+
+def test_expiry_run_flags_overdue_documents_and_groups_the_digest(client, db_session):
+    ids = _expiring_documents(db_session)
+    response = client.post("/api/v1/documents/expiry-runs", params={"days": 30})
+    assert response.status_code == 200
+    run = response.json()
+    assert (run["expired"], run["expiring_count"]) == (1, 3)
+    # Earliest expiry first; the overdue document is no longer active
+    assert [
+        (entry["related_entity_type"], entry["related_entity_id"], [document["id"] for document in entry["documents"]])
+        for entry in run["digest"]
+    ] == [("supplier", 2, [ids["today"]]), ("supplier", 1, [ids["soon"]]), (None, None, [ids["unlinked"]])]
+
+    db = db_session()
+    statuses = {document.name: document.status for document in db.query(Document)}
+    db.close()
+    assert statuses["overdue"] == "expired"
+    assert statuses["archived"] == "archived"
+    assert statuses["today"] == "active"
+    assert client.post("/api/v1/documents/expiry-runs").json()["expired"] == 0
+
+
+def test_expiring_digest_defaults_to_the_warning_window(client, db_session, monkeypatch):
+    ids = _expiring_documents(db_session)
+    monkeypatch.setattr(settings, "DOCUMENT_EXPIRY_WARNING_DAYS", 15)
+    digest = client.get("/api/v1/documents/expiring").json()
+    # Overdue documents are not expiring soon, even before the next run flags them
+    assert [[document["id"] for document in entry["documents"]] for entry in digest] == [[ids["today"]], [ids["soon"]]]
+    assert digest[1]["earliest_expiry_date"] == (date.today() + timedelta(days=10)).isoformat()
+    assert client.get("/api/v1/documents/expiring", params={"days": -1}).status_code == 422
+
+
+def test_expiry_job_logs_the_digest(db_session, monkeypatch, caplog):
+    _expiring_documents(db_session)
+    monkeypatch.setattr(database, "SessionLocal", db_session)
+    monkeypatch.setattr(settings, "DOCUMENT_EXPIRY_WARNING_DAYS", 30)
+    with caplog.at_level(logging.INFO, logger="app.services.expiry_service"):
+        report = ExpiryService.run_expiry_job()
+    assert report["expired"] == 1
+    assert caplog.messages[0] == "Marked 1 documents as expired"
+    assert caplog.messages[1] == f"supplier 2: 1 documents expiring, first on {date.today().isoformat()}"
+    assert caplog.messages[-1].startswith("unlinked: 1 documents expiring")
+
+
+def test_only_the_job_lock_holder_runs_shared_jobs(tmp_path):
+    path = str(tmp_path / "jobs.lock")
+    first, second = JobLock(path), JobLock(path)
+    assert first.acquire() and first.acquire()
+    assert not second.acquire()
+
+    runs = []
+
+    async def worker():
+        task = asyncio.create_task(run_periodically(0.01, lambda: runs.append(len(runs)), "Test job", second))
+        await asyncio.sleep(0.1)
+        skipped = list(runs)
+        # The holder exits, the other worker takes over
+        first.release()
+        await asyncio.sleep(0.1)
+        task.cancel()
+        return skipped
+
+    assert asyncio.run(worker()) == []
+    assert runs
+    second.release()
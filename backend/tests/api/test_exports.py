@@ -0,0 +1,122 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+import app.models  # noqa: F401 - registers every table on Base
+from app.config import settings
+from app.db.database import Base, get_db
+from app.main import app
+from app.models.member import Member, SavingsTransaction
+from app.utils.export import accepts_gzip
+
+MEMBERS = 25
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The API on an in-memory database of MEMBERS members, recording its statements"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    db.add_all(
+        Member(
+            member_id=f"M-{number:05d}", name=f"Anggota {number}", status="anggota" if number % 2 else "calon_anggota",
+            savings_transactions=[SavingsTransaction(amount=10000 * number, transaction_type="voluntary")]
+        )
+        for number in range(1, MEMBERS + 1)
+    )
+    db.commit()
+    db.close()
+
+    def get_session():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    statements, options = [], []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        options.append(context.execution_options)
+
+    event.listen(engine, "before_cursor_execute", record)
+    # Several fetches per export
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 4)
+    app.dependency_overrides[get_db] = get_session
+    client = TestClient(app)
+    client.statements = statements
+    client.execution_options = options
+    yield client
+    app.dependency_overrides = {}
+    engine.dispose()
+
+
+def test_ndjson_export_streams_every_matching_row_in_one_statement(client):
+    response = client.get("/api/v1/members/export", params={"status": "anggota"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="members.ndjson"'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["member_id"] for row in rows] == [f"M-{number:05d}" for number in range(1, MEMBERS + 1, 2)]
+    assert rows[0]["principal_savings"] == 0.0 and isinstance(rows[0]["join_date"], str)
+    assert len(client.statements) == 1
+
+
+def test_export_asks_for_a_server_side_cursor(client):
+    # pymysql buffers the whole result unless stream_results asks for a server-side cursor
+    client.get("/api/v1/members/export")
+    assert client.execution_options[-1]["stream_results"] is True
+    assert client.execution_options[-1]["yield_per"] == 4
+
+
+def test_csv_export_has_a_header_and_one_line_per_row(client):
+    response = client.get("/api/v1/members/1/savings/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="member-1-savings.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["member_id"], row["amount"], row["transaction_type"]) for row in rows] == [("1", "10000.00", "voluntary")]
+
+    response = client.get("/api/v1/members/export", params={"format": "csv", "search": "no such member"})
+    assert response.text.splitlines()[0].startswith("id,")
+    assert len(response.text.splitlines()) == 1
+
+
+def test_export_is_gzipped_when_the_client_accepts_it(client):
+    with client.stream("GET", "/api/v1/members/export", headers={"Accept-Encoding": "gzip"}) as compressed:
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.headers["vary"] == "Accept-Encoding"
+        body = gzip.decompress(b"".join(compressed.iter_raw()))
+    plain = client.get("/api/v1/members/export", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert body == plain.content
+    assert len(body.splitlines()) == MEMBERS
+
+
+def test_export_rejects_unknown_formats_and_missing_parents(client):
+    assert client.get("/api/v1/members/export", params={"format": "xlsx"}).status_code == 422
+    assert client.get("/api/v1/members/999/savings/export").status_code == 404
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("deflate, gzip;q=0.5", True),
+    ("*", True),
+    ("gzip;q=0", False),
+    ("identity", False),
+    ("", False),
+])
+def test_accepts_gzip(header, expected):
+    request = Request({"type": "http", "headers": [(b"accept-encoding", header.encode())]})
+    assert accepts_gzip(request) is expected
@@ -58,6 +58,7 @@ def test_create_purchase_order_success(mock_db, override_get_db):
     mock_order.total_amount = 110.0
     mock_order.payment_status = "unpaid"
     mock_order.items = []
+    mock_order.supplier_name = "Test Supplier"
     mock_order.created_at = "2025-05-01"
     mock_order.updated_at = "2025-05-01"
     
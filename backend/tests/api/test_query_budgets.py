@@ -0,0 +1,309 @@
+"""
+Query budgets per endpoint, measured against a real SQLite database.
+
+Every GET endpoint is requested against a small and a large fixture, in which
+each collection (orders, their items, an invoice's payments, ...) has SMALL or
+LARGE rows. An endpoint must issue the same number of statements for both, so
+nothing is loaded one row at a time, and no more than its budget. List
+endpoints are measured both bare and with everything they can ?expand=.
+"""
+from datetime import date, timedelta
+from itertools import count
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+
+import app.models  # noqa: F401 - registers every table on Base
+from app.db.database import Base, get_async_db, get_db
+from app.db.reference_cache import invalidate
+from app.main import app
+from app.models.accounting import ChartOfAccounts, Employee, FiscalPeriod, JournalEntry, LedgerEntry, Payroll, PayrollItem
+from app.models.assets import Asset, AssetDepreciation, AssetMaintenance
+from app.models.business_partners import Customer, CustomerContact, Supplier
+from app.models.documents import Document, DocumentVersion
+from app.models.member import Member, SavingsTransaction, SHUDistribution
+from app.models.project import (
+    Project, ProjectInvoice, ProjectInvoiceItem, ProjectPayment, ProjectTask, ProjectTimeEntry
+)
+from app.models.purchases import PurchaseOrder, PurchaseOrderItem, SupplierInvoice, SupplierPayment
+from app.models.sales import SalesInvoice, SalesOrder, SalesOrderItem, SalesPayment
+
+SMALL = 2
+LARGE = 6
+
+# Statements each endpoint may issue, including its conditional GET validator
+BUDGETS = {
+    "/api/v1/members/": 2,
+    "/api/v1/members/1": 2,
+    "/api/v1/members/1/savings": 3,
+    "/api/v1/members/1/shu": 3,
+    "/api/v1/customers/": 2,
+    "/api/v1/customers/?expand=contacts": 3,
+    "/api/v1/customers/1": 3,
+    "/api/v1/suppliers/": 2,
+    "/api/v1/suppliers/1": 2,
+    "/api/v1/sales/orders": 2,
+    "/api/v1/sales/orders?expand=items,customer": 3,
+    "/api/v1/sales/orders/1": 3,
+    "/api/v1/sales/orders/1/items": 3,
+    "/api/v1/sales/invoices": 2,
+    "/api/v1/sales/invoices/1": 2,
+    "/api/v1/sales/invoices/1/payments": 3,
+    "/api/v1/purchases/orders": 2,
+    "/api/v1/purchases/orders?expand=items&expand=supplier": 3,
+    "/api/v1/purchases/orders/1": 3,
+    "/api/v1/purchases/orders/1/items": 3,
+    "/api/v1/purchases/orders/1/invoices": 3,
+    "/api/v1/purchases/invoices": 2,
+    "/api/v1/purchases/invoices/1": 2,
+    "/api/v1/purchases/invoices/1/payments": 3,
+    "/api/v1/projects/": 2,
+    "/api/v1/projects/?expand=tasks,invoices": 7,
+    "/api/v1/projects/1": 7,
+    "/api/v1/projects/1/tasks": 4,
+    "/api/v1/projects/tasks/1/time-entries": 3,
+    "/api/v1/projects/invoices/all": 2,
+    "/api/v1/projects/invoices/all?expand=items,payments": 4,
+    "/api/v1/projects/1/invoices": 5,
+    "/api/v1/projects/invoices/1": 4,
+    "/api/v1/projects/invoices/1/items": 3,
+    "/api/v1/projects/invoices/1/payments": 3,
+    "/api/v1/assets/": 2,
+    "/api/v1/assets/?expand=depreciation_entries,maintenance_records": 4,
+    "/api/v1/assets/1": 4,
+    "/api/v1/assets/1/depreciations": 3,
+    "/api/v1/assets/1/maintenances": 3,
+    "/api/v1/assets/summary": 4,
+    "/api/v1/accounting/chart-of-accounts": 2,
+    "/api/v1/accounting/chart-of-accounts?expand=ledger_entries": 3,
+    "/api/v1/accounting/chart-of-accounts/1": 3,
+    "/api/v1/accounting/journal-entries": 2,
+    "/api/v1/accounting/journal-entries?expand=ledger_entries,fiscal_period": 5,
+    "/api/v1/accounting/journal-entries/1": 5,
+    "/api/v1/accounting/journal-entries/1/ledger-entries": 3,
+    "/api/v1/accounting/fiscal-periods": 2,
+    "/api/v1/accounting/fiscal-periods?expand=payrolls": 4,
+    "/api/v1/accounting/fiscal-periods/1": 4,
+    "/api/v1/accounting/payrolls": 2,
+    "/api/v1/accounting/payrolls?expand=payroll_items": 3,
+    "/api/v1/accounting/payrolls/1": 3,
+    "/api/v1/accounting/payrolls/1/items": 3,
+    "/api/v1/accounting/employees": 2,
+    "/api/v1/documents/": 3,
+    "/api/v1/documents/1": 3,
+    "/api/v1/documents/1/versions": 3,
+    # Exports stream every row from a single statement
+    "/api/v1/members/export": 1,
+    "/api/v1/members/1/savings/export": 2,
+    "/api/v1/members/1/shu/export?format=csv": 2,
+    "/api/v1/customers/export": 1,
+    "/api/v1/suppliers/export": 1,
+    "/api/v1/sales/orders/export": 1,
+    "/api/v1/sales/invoices/export?format=csv": 1,
+    "/api/v1/purchases/orders/export": 1,
+    "/api/v1/purchases/invoices/export": 1,
+    "/api/v1/projects/export": 1,
+    "/api/v1/projects/invoices/export": 1,
+    "/api/v1/assets/export": 1,
+    "/api/v1/accounting/chart-of-accounts/export": 1,
+    "/api/v1/accounting/journal-entries/export": 1,
+    "/api/v1/accounting/ledger-entries/export?format=csv": 1,
+    "/api/v1/accounting/fiscal-periods/export": 1,
+    "/api/v1/accounting/payrolls/export": 1,
+    "/api/v1/accounting/employees/export": 1,
+    "/api/v1/documents/export": 1,
+}
+
+def _populate(db, size):
+    """Every collection the endpoints return, `size` rows each, hanging off rows with id 1"""
+    today = date.today()
+    numbers = count(1)
+
+    def number(prefix):
+        return f"{prefix}-{next(numbers):05d}"
+
+    def repeat(make):
+        return [make() for _ in range(size)]
+
+    members = repeat(lambda: Member(
+        member_id=number("M"), name="Anggota",
+        savings_transactions=repeat(lambda: SavingsTransaction(amount=10000, transaction_type="voluntary")),
+        shu_distributions=repeat(lambda: SHUDistribution(fiscal_year=today.year, amount=5000))
+    ))
+    customers = repeat(lambda: Customer(name="Pelanggan", contacts=repeat(lambda: CustomerContact(name="Kontak"))))
+    suppliers = repeat(lambda: Supplier(name="Pemasok"))
+
+    def sales_order():
+        return SalesOrder(
+            customer=customers[0], order_number=number("SO"),
+            items=repeat(lambda: SalesOrderItem(item_description="Barang", quantity=1, unit_price=100, subtotal=100)),
+            invoices=repeat(lambda: SalesInvoice(
+                invoice_number=number("SI"), amount=100,
+                payments=repeat(lambda: SalesPayment(amount=10, payment_method="cash"))
+            ))
+        )
+
+    def purchase_order():
+        return PurchaseOrder(
+            supplier=suppliers[0], order_number=number("PO"),
+            items=repeat(lambda: PurchaseOrderItem(item_description="Barang", quantity=1, unit_price=100, subtotal=100)),
+            invoices=repeat(lambda: SupplierInvoice(
+                invoice_number=number("PI"), amount=100,
+                payments=repeat(lambda: SupplierPayment(amount=10, payment_method="cash"))
+            ))
+        )
+
+    def project():
+        return Project(
+            project_name="Proyek", project_number=number("PRJ"), customer=customers[0],
+            tasks=repeat(lambda: ProjectTask(
+                task_name="Tugas",
+                time_entries=repeat(lambda: ProjectTimeEntry(member=members[0], hours=1))
+            )),
+            invoices=repeat(lambda: ProjectInvoice(
+                invoice_number=number("PINV"),
+                items=repeat(lambda: ProjectInvoiceItem(description="Jasa", quantity=1, unit_price=100, subtotal=100)),
+                payments=repeat(lambda: ProjectPayment(amount=10, payment_method="cash"))
+            ))
+        )
+
+    assets = repeat(lambda: Asset(
+        name="Aset", asset_number=number("AST"), category="peralatan", acquisition_date=today,
+        acquisition_cost=1000, current_value=900, depreciation_rate=10,
+        depreciation_entries=repeat(lambda: AssetDepreciation(
+            depreciation_date=today - timedelta(days=next(numbers)), depreciation_amount=10, book_value_after=990
+        )),
+        maintenance_records=repeat(lambda: AssetMaintenance(maintenance_type="service", cost=5))
+    ))
+
+    accounts = repeat(lambda: ChartOfAccounts(account_number=number("A"), account_name="Akun", account_type="asset"))
+    employees = repeat(lambda: Employee(name="Karyawan", employee_id=number("E"), hire_date=today, base_salary=100))
+    periods = repeat(lambda: FiscalPeriod(
+        start_date=today, end_date=today, period_name=number("P"),
+        journal_entries=repeat(lambda: JournalEntry(
+            entry_number=number("JE"), entry_type="manual",
+            ledger_entries=repeat(lambda: LedgerEntry(account=accounts[0], debit_amount=10))
+        )),
+        payrolls=repeat(lambda: Payroll(
+            payroll_items=repeat(lambda: PayrollItem(employee=employees[0], gross_salary=100, net_salary=90))
+        ))
+    ))
+    documents = repeat(lambda: Document(
+        name="Dokumen", file_path="dokumen.pdf", document_type="contract",
+        versions=repeat(lambda: DocumentVersion(version_number=next(numbers), file_path="dokumen.pdf"))
+    ))
+
+    db.add_all([
+        *members, *customers, *suppliers, *assets, *accounts, *employees, *periods, *documents,
+        *repeat(sales_order), *repeat(purchase_order), *repeat(project)
+    ])
+    db.commit()
+
+
+class Database:
+    """An in-memory SQLite database behind both get_db and get_async_db, recording its statements"""
+
+    def __init__(self, name, size):
+        url = f"file:{name}?mode=memory&cache=shared&uri=true"
+        # The one sync connection keeps the shared in-memory database alive
+        self.engine = create_engine(f"sqlite:///{url}", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{url}", poolclass=NullPool)
+        self.session_factory = sessionmaker(bind=self.engine, autoflush=False)
+        self.async_session_factory = sessionmaker(bind=self.async_engine, class_=AsyncSession, expire_on_commit=False)
+        Base.metadata.create_all(self.engine)
+        db = self.session_factory()
+        _populate(db, size)
+        db.close()
+
+        self.statements = []
+        for engine in (self.engine, self.async_engine.sync_engine):
+            event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def get_db(self):
+        db = self.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db(self):
+        async with self.async_session_factory() as db:
+            yield db
+
+    def get(self, path):
+        app.dependency_overrides[get_db] = self.get_db
+        app.dependency_overrides[get_async_db] = self.get_async_db
+        # Start every request from a cold reference cache, so counts do not depend on test order
+        invalidate(Base.metadata.tables, publish=False)
+        self.statements = []
+        try:
+            return TestClient(app).get(path)
+        finally:
+            app.dependency_overrides = {}
+
+    def statements_for(self, path):
+        """The statements issued while serving GET `path`"""
+        response = self.get(path)
+        assert response.status_code == 200, response.text
+        return self.statements
+
+    def close(self):
+        self.engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def databases():
+    small, large = Database("budgets_small", SMALL), Database("budgets_large", LARGE)
+    yield small, large
+    small.close()
+    large.close()
+
+
+def _listing(statements):
+    return "\n".join(f"  {index}. {' '.join(statement.split())}" for index, statement in enumerate(statements, 1))
+
+
+@pytest.mark.parametrize("path", BUDGETS)
+def test_query_budget(databases, path):
+    small, large = databases
+    small_statements = small.statements_for(path)
+    large_statements = large.statements_for(path)
+    assert len(large_statements) == len(small_statements), (
+        f"GET {path} issues {len(small_statements)} statements with {SMALL} rows per collection "
+        f"and {len(large_statements)} with {LARGE}:\n{_listing(large_statements)}"
+    )
+    assert len(large_statements) <= BUDGETS[path], (
+        f"GET {path} issues {len(large_statements)} statements, over its budget of {BUDGETS[path]}:\n"
+        f"{_listing(large_statements)}"
+    )
+
+
+def test_expand_includes_only_what_was_asked_for(databases):
+    small, _ = databases
+    orders = small.get("/api/v1/sales/orders").json()
+    assert all(order["items"] is None and order["customer_name"] is None for order in orders)
+
+    orders = small.get("/api/v1/sales/orders?expand=items,customer").json()
+    assert all(len(order["items"]) == SMALL and order["customer_name"] == "Pelanggan" for order in orders)
+
+    projects = small.get("/api/v1/projects/?expand=tasks").json()
+    assert all(project["invoices"] is None for project in projects)
+    assert [len(task["time_entries"]) for task in projects[0]["tasks"]] == [SMALL] * SMALL
+
+    # Detail endpoints always include everything
+    order = small.get("/api/v1/sales/orders/1").json()
+    assert len(order["items"]) == SMALL and order["customer_name"] == "Pelanggan"
+
+
+def test_expand_rejects_unknown_names(databases):
+    small, _ = databases
+    response = small.get("/api/v1/sales/orders?expand=items,invoices")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cannot expand invoices; choose from items, customer"
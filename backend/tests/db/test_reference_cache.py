@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401 - registers every table on Base
+from app.db.database import Base
+from app.db.reference_cache import ReferenceCache
+from app.models.accounting import ChartOfAccounts
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    factory = sessionmaker(bind=engine, autoflush=False)
+    factory.statements = statements
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def cache():
+    return ReferenceCache(ChartOfAccounts, max_size=2, ttl=60)
+
+
+def _account(number):
+    return ChartOfAccounts(account_number=number, account_name=f"Account {number}", account_type="asset")
+
+
+def test_hits_are_served_without_a_query(session_factory, cache):
+    db = session_factory()
+    db.add(_account("1000"))
+    db.commit()
+    db.close()
+    assert cache.get(session_factory(), "account_number", "1000") is not None
+    assert cache.get(session_factory(), "account_number", "9999") is None
+
+    session_factory.statements.clear()
+    db = session_factory()
+    account = cache.get(db, "account_number", "1000")
+    assert account.account_name == "Account 1000"
+    assert account in db
+    assert cache.get(db, "account_number", "9999") is None
+    assert session_factory.statements == []
+    assert cache.stats()["hits"] == 2
+
+
+def test_commit_invalidates_and_rollback_does_not_leak(session_factory, cache):
+    db = session_factory()
+    assert cache.get(db, "account_number", "1000") is None
+    db.add(_account("1000"))
+    db.commit()
+    # The cached miss is gone once the insert commits
+    assert cache.get(db, "account_number", "1000") is not None
+
+    account = cache.get(db, "account_number", "1000")
+    account.account_name = "Renamed"
+    db.flush()
+    # A session sees its own flushed writes, which are kept out of the cache
+    assert cache.get(db, "account_number", "1000").account_name == "Renamed"
+    db.rollback()
+    db.close()
+    assert cache.get(session_factory(), "account_number", "1000").account_name == "Account 1000"
+
+    db = session_factory()
+    cache.get(db, "id", 1).account_name = "Kas"
+    db.commit()
+    db.close()
+    assert cache.get(session_factory(), "id", 1).account_name == "Kas"
+
+
+def test_least_recently_used_rows_are_evicted(session_factory, cache):
+    db = session_factory()
+    db.add_all([_account("1000"), _account("2000"), _account("3000")])
+    db.commit()
+    for number in ("1000", "2000", "1000", "3000"):
+        cache.get(db, "account_number", number)
+    assert cache.stats()["evictions"] == 1
+    assert ("account_number", "1000") in cache._entries
+    assert ("account_number", "2000") not in cache._entries
@@ -0,0 +1,51 @@
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.db import query_stats
+from app.db.slow_queries import SlowQueryLog, normalize_statement
+
+
+def test_normalize_groups_parameters_literals_and_in_lists():
+    assert normalize_statement("SELECT *\n  FROM t WHERE a = ? AND b IN (?, ?, ?) AND c = 'x' LIMIT 10") == (
+        "SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ? LIMIT ?"
+    )
+    assert normalize_statement("SELECT * FROM t1 WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "SELECT * FROM t1 WHERE id IN (...)"
+
+
+def test_repeats_are_counted_once_and_explained():
+    engine = create_engine("sqlite://")
+    log = SlowQueryLog(size=2)
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+        for item_id, seconds in ((1, 0.5), (2, 1.5)):
+            log.record(connection, "SELECT name FROM item WHERE id = ?", (item_id,), False, seconds, "GET /items/{item_id}")
+        log.record(connection, "INSERT INTO item (name) VALUES (?)", ("a-name",), False, 0.3)
+
+    (select, insert) = log.entries()
+    assert select["count"] == 2
+    assert select["max_seconds"] == 1.5
+    assert select["avg_seconds"] == 1.0
+    assert select["parameters"] == ["int"]
+    assert select["route"] == "GET /items/{item_id}"
+    assert "item" in select["plan"][0]["detail"]
+    # Only the parameter shapes are kept, and inserts are not explained
+    assert insert["parameters"] == ["str(6)"]
+    assert insert["plan"] is None
+
+
+def test_streamed_results_are_not_explained(monkeypatch):
+    # EXPLAIN on the connection would break an unbuffered cursor's pending rows
+    log = SlowQueryLog(size=10)
+    monkeypatch.setattr(query_stats, "slow_query_log", log)
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD", 0.000001)
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text("INSERT INTO item (name) VALUES ('a'), ('b')"))
+        streamed = connection.execution_options(stream_results=True).execute(text("SELECT name FROM item"))
+        assert streamed.scalars().all() == ["a", "b"]
+        connection.execute(text("SELECT id FROM item"))
+
+    plans = {entry["statement"]: entry["plan"] for entry in log.entries()}
+    assert plans["SELECT name FROM item"] is None
+    assert plans["SELECT id FROM item"]
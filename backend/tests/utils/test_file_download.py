@@ -0,0 +1,124 @@
+import gzip
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils.file_download import file_download_response, parse_range, storage_download_response
+from app.utils.storage import LocalStorageBackend
+
+DATA = b"0123456789"
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-4", (0, 4)),
+    ("bytes=5-", (5, 9)),
+    ("bytes=-3", (7, 9)),
+    ("bytes=-20", (0, 9)),
+    ("bytes=2-100", (2, 9)),
+    # Malformed or several ranges: the whole file
+    ("bytes=0-1,3-4", None),
+    ("items=0-4", None),
+    ("bytes=a-b", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(DATA)) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=10-", "bytes=5-2", "bytes=-0"])
+def test_parse_range_rejects_unsatisfiable_ranges(header):
+    with pytest.raises(ValueError):
+        parse_range(header, len(DATA))
+
+
+@pytest.fixture
+def client(tmp_path):
+    """An app serving DATA from disk at /file and gzipped from storage at /archived"""
+    storage = LocalStorageBackend(str(tmp_path))
+    path = os.path.join(str(tmp_path), "invoice.txt")
+    with open(path, "wb") as f:
+        f.write(DATA)
+    archived = os.path.join(str(tmp_path), "invoice.txt.gz")
+    with open(archived, "wb") as f:
+        f.write(gzip.compress(DATA))
+
+    app = FastAPI()
+
+    @app.api_route("/file", methods=["GET", "HEAD"])
+    def download(request: Request):
+        return file_download_response(request, path, "invoice.txt", content_hash="abc")
+
+    @app.get("/archived")
+    def download_archived(request: Request):
+        return storage_download_response(
+            request, storage, archived, "invoice.txt", content_hash="abc", compression="gzip", file_size=len(DATA)
+        )
+
+    return TestClient(app)
+
+
+def test_whole_file(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == '"abc"'
+    assert response.headers["content-disposition"] == 'attachment; filename="invoice.txt"'
+
+
+def test_range_is_partial_content(client):
+    response = client.get("/file", headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.content == DATA[2:6]
+    assert response.headers["content-length"] == "4"
+    assert response.headers["content-range"] == f"bytes 2-5/{len(DATA)}"
+
+
+def test_unsatisfiable_range_is_416(client):
+    response = client.get("/file", headers={"Range": "bytes=20-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+def test_matching_etag_is_304(client):
+    response = client.get("/file", headers={"If-None-Match": '"other", "abc"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == '"abc"'
+
+
+def test_stale_if_range_sends_the_whole_file(client):
+    response = client.get("/file", headers={"Range": "bytes=2-5", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+    response = client.get("/file", headers={"Range": "bytes=2-5", "If-Range": '"abc"'})
+    assert response.status_code == 206
+
+
+def test_head_sends_headers_only(client):
+    response = client.head("/file")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == str(len(DATA))
+
+    response = client.head("/file", headers={"Range": "bytes=-4"})
+    assert response.status_code == 206
+    assert response.content == b""
+    assert response.headers["content-length"] == "4"
+    assert response.headers["content-range"] == f"bytes 6-9/{len(DATA)}"
+
+
+def test_archived_blob_is_decompressed_on_the_fly(client):
+    response = client.get("/archived")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["content-length"] == str(len(DATA))
+
+    response = client.get("/archived", headers={"Range": "bytes=3-6"})
+    assert response.status_code == 206
+    assert response.content == DATA[3:7]
+    assert response.headers["content-range"] == f"bytes 3-6/{len(DATA)}"
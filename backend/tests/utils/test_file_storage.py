@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from app.utils.file_storage import UploadTooLargeError, save_upload, store_file
+from app.utils.storage import LocalStorageBackend
+
+DATA = b"faktur pembelian " * 100
+
+
+class ChunkRecorder(io.BytesIO):
+    """A file object recording the size of every read"""
+
+    def __init__(self, data, fail_after=None):
+        super().__init__(data)
+        self.reads = []
+        self.fail_after = fail_after
+
+    def read(self, size=-1):
+        if self.fail_after is not None and len(self.reads) == self.fail_after:
+            raise OSError("connection reset")
+        self.reads.append(size)
+        return super().read(size)
+
+
+def _files(directory):
+    return sorted(
+        os.path.relpath(os.path.join(path, name), directory)
+        for path, _, names in os.walk(directory)
+        for name in names
+    )
+
+
+def test_store_file_copies_in_chunks_and_hashes(tmp_path):
+    storage = LocalStorageBackend(str(tmp_path))
+    source = ChunkRecorder(DATA)
+    location, content_hash, size = store_file(source, storage, chunk_size=256)
+
+    assert (content_hash, size) == (hashlib.sha256(DATA).hexdigest(), len(DATA))
+    assert set(source.reads) == {256}
+    assert location == storage.blob_path(content_hash)
+    with open(location, "rb") as stored:
+        assert stored.read() == DATA
+    assert _files(str(tmp_path)) == [os.path.relpath(location, str(tmp_path))]
+
+
+def test_too_large_upload_leaves_no_temp_file(tmp_path):
+    storage = LocalStorageBackend(str(tmp_path))
+    source = ChunkRecorder(DATA)
+    with pytest.raises(UploadTooLargeError):
+        store_file(source, storage, max_size=1000, chunk_size=256)
+    # Stopped at the first chunk over the limit rather than reading it all
+    assert len(source.reads) == 4
+    assert _files(str(tmp_path)) == []
+
+
+def test_failed_read_leaves_no_temp_file(tmp_path):
+    storage = LocalStorageBackend(str(tmp_path))
+    with pytest.raises(OSError):
+        store_file(ChunkRecorder(DATA, fail_after=2), storage, chunk_size=256)
+    assert _files(str(tmp_path)) == []
+
+
+def test_save_upload_reads_from_the_start(tmp_path):
+    storage = LocalStorageBackend(str(tmp_path))
+    upload = UploadFile(io.BytesIO(DATA), filename="invoice.txt")
+    upload.file.seek(0, os.SEEK_END)
+    _, content_hash, size = asyncio.run(save_upload(upload, storage, chunk_size=256))
+    assert (content_hash, size) == (hashlib.sha256(DATA).hexdigest(), len(DATA))
@@ -0,0 +1,122 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401 - registers every table on Base
+import app.models.project  # noqa: F401 - Member relates to the project models
+from app.db.database import Base, get_db
+from app.models.business_partners import Customer, CustomerContact
+from app.utils.http_cache import CollectionETag, ResourceETag, etag_matches
+
+
+@pytest.fixture
+def session_factory():
+    """In-memory database shared by the test and the endpoints"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory):
+    """An app whose endpoints count how often they actually run"""
+    api = FastAPI()
+    calls = []
+
+    def get_session():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @api.get("/customers", dependencies=[Depends(CollectionETag(Customer, CustomerContact))])
+    def list_customers():
+        calls.append("list")
+        return []
+
+    @api.get("/customers/{customer_id}", dependencies=[Depends(ResourceETag(Customer, "customer_id", "contacts"))])
+    def get_customer(customer_id: int):
+        calls.append("one")
+        return {}
+
+    api.dependency_overrides[get_db] = get_session
+    test_client = TestClient(api)
+    test_client.calls = calls
+    return test_client
+
+
+def _add(session_factory, *rows):
+    db = session_factory()
+    db.add_all(rows)
+    db.commit()
+    ids = [row.id for row in rows]
+    db.close()
+    return ids
+
+
+def test_etag_matches_uses_weak_comparison():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', 'W/"abc"')
+    assert etag_matches("*", 'W/"abc"')
+    assert not etag_matches('"abc"', 'W/"abcd"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_unchanged_list_answers_304_without_running_the_endpoint(client, session_factory):
+    _add(session_factory, Customer(name="Acme", status="active"))
+    first = client.get("/customers")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    repeat = client.get("/customers", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+    assert client.calls == ["list"]
+
+    # Query parameters are part of the validator
+    assert client.get("/customers?search=a", headers={"If-None-Match": etag}).status_code == 200
+
+    _add(session_factory, Customer(name="Other", status="active"))
+    assert client.get("/customers", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_resource_etag_covers_related_rows(client, session_factory):
+    (customer_id,) = _add(session_factory, Customer(name="Acme", status="active"))
+    etag = client.get(f"/customers/{customer_id}").headers["etag"]
+    assert client.get(f"/customers/{customer_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    _add(session_factory, CustomerContact(customer_id=customer_id, name="Bob"))
+    assert client.get(f"/customers/{customer_id}", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_changes_within_the_same_second_change_the_etag(client, session_factory):
+    # MySQL DATETIME keeps whole seconds, so updated_at alone would not move
+    (customer_id,) = _add(session_factory, Customer(name="Acme", status="active"))
+    list_etag = client.get("/customers").headers["etag"]
+    etag = client.get(f"/customers/{customer_id}").headers["etag"]
+
+    db = session_factory()
+    updated_at = db.query(Customer.updated_at).scalar()
+    db.query(Customer).update({Customer.name: "Acme Ltd", Customer.updated_at: updated_at}, synchronize_session=False)
+    db.commit()
+    assert client.get("/customers", headers={"If-None-Match": list_etag}).status_code == 200
+    assert client.get(f"/customers/{customer_id}", headers={"If-None-Match": etag}).status_code == 200
+
+    # A delete plus an insert keeps the count and may keep the newest updated_at
+    list_etag = client.get("/customers").headers["etag"]
+    db.query(Customer).delete()
+    db.add(Customer(name="Acme", status="active", created_at=updated_at, updated_at=updated_at))
+    db.commit()
+    db.close()
+    assert client.get("/customers", headers={"If-None-Match": list_etag}).status_code == 200
+
+
+def test_missing_resource_is_left_to_the_endpoint(client):
+    response = client.get("/customers/404", headers={"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
@@ -0,0 +1,28 @@
+from app.utils.metrics import Counter, Histogram, _registry
+
+
+def _render(metric):
+    _registry.remove(metric)
+    return metric.render().splitlines()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_duration_seconds", "Test durations", ["route"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, "/items/{item_id}")
+    assert _render(histogram) == [
+        "# HELP test_duration_seconds Test durations",
+        "# TYPE test_duration_seconds histogram",
+        'test_duration_seconds_bucket{route="/items/{item_id}",le="0.1"} 1',
+        'test_duration_seconds_bucket{route="/items/{item_id}",le="1"} 3',
+        'test_duration_seconds_bucket{route="/items/{item_id}",le="+Inf"} 4',
+        'test_duration_seconds_sum{route="/items/{item_id}"} 4.05',
+        'test_duration_seconds_count{route="/items/{item_id}"} 4',
+    ]
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("test_total", "Test counter", ["path"])
+    counter.inc('a "quoted"\\path')
+    counter.inc('a "quoted"\\path', amount=2)
+    assert _render(counter)[-1] == 'test_total{path="a \\"quoted\\"\\\\path"} 3'
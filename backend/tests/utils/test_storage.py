@@ -0,0 +1,105 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.utils.storage import LocalStorageBackend, S3StorageBackend
+
+MB = 1024 * 1024
+
+
+def _stage(directory, data):
+    """Write data to a temp file the way uploads are staged"""
+    path = os.path.join(directory, ".upload-test")
+    with open(path, "wb") as target:
+        target.write(data)
+    return path, hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def s3_storage(tmp_path, monkeypatch):
+    """S3 backend against moto's in-process S3 stand-in"""
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="documents")
+        yield S3StorageBackend(
+            bucket="documents",
+            prefix="test/",
+            multipart_threshold=5 * MB,
+            multipart_chunk_size=5 * MB,
+            staging_directory=str(tmp_path),
+            client=client
+        )
+
+
+def test_local_storage_roundtrip(tmp_path):
+    """Local blobs are content-addressed and deduplicated"""
+    storage = LocalStorageBackend(str(tmp_path))
+    temp_path, content_hash = _stage(str(tmp_path), b"invoice")
+    location = storage.put(temp_path, content_hash)
+    assert location.endswith(os.path.join("blobs", content_hash[:2], content_hash[2:4], content_hash))
+    assert not os.path.exists(temp_path)
+
+    temp_path, _ = _stage(str(tmp_path), b"invoice")
+    assert storage.put(temp_path, content_hash) == location
+    assert not os.path.exists(temp_path)
+    assert b"".join(storage.open_stream(location, 2, 4)) == b"voi"
+    assert [path for path, _ in storage.iter_blobs()] == [location]
+
+    storage.delete(location)
+    with pytest.raises(FileNotFoundError):
+        storage.stat(location)
+
+
+def test_s3_storage_multipart_upload(s3_storage, tmp_path):
+    """Files above the threshold go up as multipart uploads and read back intact"""
+    data = os.urandom(11 * MB)
+    temp_path, content_hash = _stage(str(tmp_path), data)
+    location = s3_storage.put(temp_path, content_hash)
+
+    assert location == f"test/blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+    assert not os.path.exists(temp_path)
+    head = s3_storage.client.head_object(Bucket="documents", Key=location)
+    assert head["ETag"].strip('"').endswith("-3")
+    assert s3_storage.stat(location)[0] == len(data)
+    assert b"".join(s3_storage.open_stream(location)) == data
+    assert b"".join(s3_storage.open_stream(location, 10, 19)) == data[10:20]
+
+
+def test_s3_storage_put_of_stored_content_refreshes_it(s3_storage, tmp_path, monkeypatch):
+    """Storing content again keeps the object but renews its modification time"""
+    temp_path, content_hash = _stage(str(tmp_path), b"receipt")
+    location = s3_storage.put(temp_path, content_hash)
+    _, modified = s3_storage.stat(location)
+
+    time.sleep(1.1)
+    temp_path, _ = _stage(str(tmp_path), b"receipt")
+    uploads = []
+    monkeypatch.setattr(s3_storage.client, "upload_file", lambda *args, **kwargs: uploads.append(args))
+    assert s3_storage.put(temp_path, content_hash) == location
+    assert uploads == []
+    assert not os.path.exists(temp_path)
+    assert s3_storage.stat(location)[1] > modified
+    assert b"".join(s3_storage.open_stream(location)) == b"receipt"
+
+
+def test_s3_storage_presign_and_delete(s3_storage, tmp_path):
+    """Presigned URLs name the file, deleting removes the object"""
+    temp_path, content_hash = _stage(str(tmp_path), b"contract")
+    location = s3_storage.put(temp_path, content_hash)
+
+    url = s3_storage.presign(location, filename="contract.pdf")
+    assert location in url
+    assert "Signature" in url or "X-Amz-Signature" in url
+    assert "contract.pdf" in url
+    assert [key for key, _ in s3_storage.iter_blobs()] == [location]
+
+    s3_storage.delete(location)
+    with pytest.raises(FileNotFoundError):
+        s3_storage.stat(location)
+    assert list(s3_storage.iter_blobs()) == []
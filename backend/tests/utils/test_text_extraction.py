@@ -0,0 +1,56 @@
+import io
+import zipfile
+
+import pytest
+
+from app.utils.text_extraction import extract_text
+
+WORD = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+SHEET = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+
+def _package(parts):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_plain_text():
+    assert extract_text(io.BytesIO("\ufeffFaktur pajak\nPT Maju".encode("utf-8")), 100) == "Faktur pajak\nPT Maju"
+    assert extract_text(io.BytesIO("Kwitansi caf\xe9".encode("latin-1") + b" lunas"), 100) == "Kwitansi caf\xe9 lunas"
+    assert extract_text(io.BytesIO(b"a" * 50), 10) == "a" * 10
+
+
+def test_binary_files_are_unsupported():
+    assert extract_text(io.BytesIO(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"), 100) is None
+    assert extract_text(_package({"photo.jpg": b"\xff\xd8"}), 100) is None
+
+
+def test_docx_paragraphs_become_lines():
+    document = (
+        f'<w:document xmlns:w="{WORD}"><w:body>'
+        "<w:p><w:r><w:t>Perjanjian </w:t></w:r><w:r><w:t>sewa</w:t></w:r></w:p>"
+        "<w:p/><w:p><w:r><w:t>Gudang Bekasi</w:t></w:r></w:p>"
+        "</w:body></w:document>"
+    )
+    assert extract_text(_package({"word/document.xml": document}), 100) == "Perjanjian sewa\nGudang Bekasi"
+
+
+def test_xlsx_uses_shared_strings_and_skips_their_indexes():
+    shared = f'<sst xmlns="{SHEET}"><si><t>Pupuk</t></si><si><t>Benih</t></si></sst>'
+    sheet = (
+        f'<worksheet xmlns="{SHEET}"><sheetData><row>'
+        '<c t="s"><v>0</v></c><c><v>1250</v></c>'
+        "</row></sheetData></worksheet>"
+    )
+    package = _package({"xl/sharedStrings.xml": shared, "xl/worksheets/sheet1.xml": sheet})
+    assert extract_text(package, 100) == "Pupuk\nBenih\n1250"
+
+
+@pytest.mark.parametrize("max_length, expected", [(5, "Pupuk"), (8, "Pupuk\nBe")])
+def test_office_text_is_cut_at_the_limit(max_length, expected):
+    shared = f'<sst xmlns="{SHEET}"><si><t>Pupuk</t></si><si><t>Benih</t></si><si><t>Pakan</t></si></sst>'
+    assert extract_text(_package({"xl/sharedStrings.xml": shared}), max_length) == expected
@@ -55,7 +55,8 @@ const SalesOrderList = () => {
         skip: page * rowsPerPage,
         limit: rowsPerPage,
         search: searchTerm || undefined,
-        status: statusFilter || undefined
+        status: statusFilter || undefined,
+        expand: 'customer'
       };
       
       const data = await salesService.getSalesOrders(params);